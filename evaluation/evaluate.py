@@ -0,0 +1,447 @@
+"""Scores answered test sets with RAGAS and summarises the methods.
+
+Scripted version of `start_evaluate` / `start_evaluate_2` and `analyze` from
+evaluate.ipynb. All rows that still need metrics are scored in a single
+`ragas.evaluate` call, so the judge LLM and the embedding model are queried
+concurrently (bounded by --llm-concurrency / --embedding-concurrency), and the
+results CSV is written once per test set.
+
+Judge LLM and embedding responses are cached on disk under --cache-dir, keyed
+by the model and the content of the request. Re-scoring a method whose answers
+changed only partially, or another method with the same references, sends only
+the requests that were not made before.
+
+    python evaluate.py score ./test_data/genetics/test_set_method1_lightrag_hybrid.json ./results/genetics/method1_lightrag_hybrid.csv
+    python evaluate.py score-all genetics
+    python evaluate.py analyze genetics
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+KEY_COLUMNS = ["user_input", "response", "reference"]
+METRIC_SETS = {
+    # start_evaluate
+    "basic": ["answer_correctness", "answer_relevancy"],
+    # start_evaluate_2
+    "full": [
+        "answer_correctness",
+        "answer_relevancy",
+        "factual_correctness(mode=f1)",
+        "factual_correctness(mode=recall)",
+        "semantic_similarity",
+    ],
+}
+METHOD_COLORS = {
+    "LightRAG": "#4575b4",
+    "GraphRAG": "#91bfdb",
+    "NaiveRAG": "#fdae61",
+}
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _cache_dir(cache_dir, kind, *identity):
+    # One directory per model keeps the answers of different judges apart
+    digest = hashlib.sha256("\n".join(str(i) for i in identity).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{kind}-{digest[:16]}")
+
+
+def build_judges(cache_dir=".cache/ragas", llm_concurrency=8, embedding_concurrency=8):
+    """Create the judge LLM and embeddings configured like in evaluate.ipynb"""
+    from diskcache import Cache
+    from langchain_localai import LocalAIEmbeddings
+    from langchain_openai import ChatOpenAI
+    from ragas.cache import DiskCacheBackend
+    from ragas.embeddings import LangchainEmbeddingsWrapper
+    from ragas.llms import LangchainLLMWrapper
+
+    class LimitedLLM(LangchainLLMWrapper):
+        def __init__(self, langchain_llm, max_concurrency, cache=None):
+            self._limit = asyncio.Semaphore(max_concurrency)
+            super().__init__(langchain_llm, cache=cache)
+
+        async def agenerate_text(self, *args, **kwargs):
+            async with self._limit:
+                return await super().agenerate_text(*args, **kwargs)
+
+    class CachedEmbeddings(LangchainEmbeddingsWrapper):
+        # The RAGAS cacher drops the first positional argument of bound
+        # methods, which is the text for embeddings, so they are cached here
+        # per text instead. References shared by several methods are embedded once.
+        def __init__(self, embeddings, max_concurrency, cache_dir):
+            self._limit = asyncio.Semaphore(max_concurrency)
+            self._cache = Cache(cache_dir)
+            super().__init__(embeddings)
+
+        def _lookup(self, texts):
+            keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+            vectors = [self._cache.get(key) for key in keys]
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            return keys, vectors, missing
+
+        def _store(self, keys, vectors, missing, embedded):
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+                self._cache.set(keys[i], vector)
+            return vectors
+
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+
+        def embed_documents(self, texts):
+            keys, vectors, missing = self._lookup(texts)
+            if missing:
+                embedded = super().embed_documents([texts[i] for i in missing])
+                self._store(keys, vectors, missing, embedded)
+            return vectors
+
+        async def aembed_query(self, text):
+            return (await self.aembed_documents([text]))[0]
+
+        async def aembed_documents(self, texts):
+            keys, vectors, missing = self._lookup(texts)
+            if missing:
+                async with self._limit:
+                    embedded = await super().aembed_documents([texts[i] for i in missing])
+                self._store(keys, vectors, missing, embedded)
+            return vectors
+
+    load_dotenv()
+    llm_base, llm_model = os.getenv("OPENAI_API_BASE"), os.getenv("LLM_MODEL_NAME")
+    llm = ChatOpenAI(
+        openai_api_base=llm_base,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        model_name=llm_model,
+    )
+    embed_url, embed_model = os.getenv("EMBED_URL"), os.getenv("EMBED_MODEL")
+    embedding = LocalAIEmbeddings(
+        openai_api_base=embed_url,
+        openai_api_key=os.getenv("EMBED_TOKEN"),
+        model=embed_model,
+    )
+    return (
+        LimitedLLM(
+            llm,
+            llm_concurrency,
+            DiskCacheBackend(_cache_dir(cache_dir, "llm", llm_base, llm_model)),
+        ),
+        CachedEmbeddings(
+            embedding,
+            embedding_concurrency,
+            _cache_dir(cache_dir, "embeddings", embed_url, embed_model),
+        ),
+    )
+
+
+def build_metrics(metric_set):
+    from ragas.metrics import AnswerCorrectness, AnswerRelevancy, FactualCorrectness, SemanticSimilarity
+
+    metrics = [AnswerCorrectness(), AnswerRelevancy()]
+    if metric_set == "full":
+        metrics += [FactualCorrectness(), FactualCorrectness(mode="recall"), SemanticSimilarity()]
+    return metrics
+
+
+def has_valid_metrics(row, metric_columns):
+    values = pd.to_numeric(row[metric_columns], errors="coerce")
+    return bool((values.notna() & (values > 0.0)).all())
+
+
+def pending_rows(data, existing_df, metric_columns):
+    """Rows of the test set without valid metrics in the results CSV"""
+    scored = set()
+    if not existing_df.empty and set(metric_columns) <= set(existing_df.columns):
+        for _, row in existing_df.iterrows():
+            if has_valid_metrics(row, metric_columns):
+                scored.add(tuple(row[KEY_COLUMNS]))
+
+    rows, skipped = [], 0
+    for idx, (q, a, g) in enumerate(zip(data["question"], data["answer"], data["ground_truth"]), start=1):
+        if a == "x":
+            print(f"[{idx}] Skipped (x in ans)")
+            continue
+        if (q, a, g) in scored:
+            skipped += 1
+            continue
+        rows.append({"user_input": q, "response": a, "reference": g})
+    if skipped:
+        print(f"Skipped {skipped} rows already evaluated with valid metrics")
+    # The same question answered twice in a test set is scored once
+    return list({tuple(r.values()): r for r in rows}.values())
+
+
+def score_rows(rows, llm, embedding, metric_set="full", max_workers=8):
+    """Score (user_input, response, reference) rows concurrently with one ragas.evaluate call"""
+    from ragas import EvaluationDataset, RunConfig, evaluate
+
+    metric_columns = METRIC_SETS[metric_set]
+    if not rows:
+        return pd.DataFrame(columns=KEY_COLUMNS + metric_columns)
+    results = evaluate(
+        dataset=EvaluationDataset.from_list(rows),
+        metrics=build_metrics(metric_set),
+        llm=llm,
+        embeddings=embedding,
+        run_config=RunConfig(max_workers=max_workers),
+        raise_exceptions=False,
+    )
+    scored = results.to_pandas()
+    # Failed jobs come back as NaN, they are stored as 0.0 like in the notebook
+    # and picked up again by the next run
+    failed = scored[metric_columns].isna().any(axis=1)
+    for idx in scored.index[failed]:
+        print(f"Evaluation error for: \"{scored.at[idx, 'user_input'][:50]}...\"")
+    scored[metric_columns] = scored[metric_columns].fillna(0.0)
+    return scored[KEY_COLUMNS + metric_columns]
+
+
+def start_evaluate(test_set_file, output_file, llm, embedding, metric_set="full", max_workers=8):
+    """Score the answers of a test set into output_file, keeping rows that already have valid metrics"""
+    data = load_json(test_set_file)
+    metric_columns = METRIC_SETS[metric_set]
+
+    if os.path.exists(output_file):
+        existing_df = pd.read_csv(output_file)
+    else:
+        existing_df = pd.DataFrame(columns=KEY_COLUMNS + metric_columns)
+    existing_df[KEY_COLUMNS] = existing_df[KEY_COLUMNS].fillna("")
+
+    rows = pending_rows(data, existing_df, metric_columns)
+    print(f"Running evaluation of {len(rows)} rows from {test_set_file}...")
+    scored = score_rows(rows, llm, embedding, metric_set, max_workers)
+
+    merged = pd.concat([existing_df, scored], ignore_index=True)
+    merged.drop_duplicates(subset=KEY_COLUMNS, keep="last", inplace=True)
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    tmp_file = output_file + ".tmp"
+    merged.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, output_file)
+
+    print(f"All done — results saved to: {output_file}")
+    for column in metric_columns:
+        print(f"Average {column}:", pd.to_numeric(merged[column], errors="coerce").mean())
+    return merged
+
+
+def test_sets(base, test_data_dir="./test_data"):
+    """(test set, results name) pairs of the answered test sets of a dataset"""
+    directory = os.path.join(test_data_dir, base)
+    return [
+        (os.path.join(directory, name), name[len("test_set_"):-len(".json")])
+        for name in sorted(os.listdir(directory))
+        if name.startswith("test_set_") and name.endswith(".json")
+    ]
+
+
+def analyze(
+    base,
+    lightrag_file="method1_lightrag_hybrid.csv",
+    graphrag_file="method2_graphrag_drift.csv",
+    naiverag_file="naive_rag_small_top_k.csv",
+    results_dir="./results",
+):
+    """Write the per-method summary, its plot and the per-question table to results/<base>/analyze"""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.lines import Line2D
+
+    plt.rcParams.update({
+        "figure.figsize": (10, 6),
+        "axes.grid": True,
+        "grid.alpha": 0.25,
+        "axes.spines.top": False,
+        "axes.spines.right": False,
+        "axes.titlesize": 14,
+        "axes.labelsize": 12,
+        "xtick.labelsize": 11,
+        "ytick.labelsize": 11,
+    })
+
+    results = {
+        "LightRAG": pd.read_csv(os.path.join(results_dir, base, lightrag_file)),
+        "GraphRAG": pd.read_csv(os.path.join(results_dir, base, graphrag_file)),
+        "NaiveRAG": pd.read_csv(os.path.join(results_dir, base, naiverag_file)),
+    }
+    methods = list(results)
+
+    # answer_correctness is left out of the comparison
+    metric_map = {
+        "answer_relevancy": "Rel",
+        "factual_correctness(mode=f1)": "Fact-F1",
+        "factual_correctness(mode=recall)": "Fact-Rec",
+        "semantic_similarity": "SemSim",
+    }
+    metrics_full = list(metric_map.keys())
+    metrics_short = list(metric_map.values())
+
+    def one_summary(df, label):
+        dfm = df[metrics_full].rename(columns=metric_map)
+        return pd.DataFrame({
+            (label, "Mean"): dfm.mean(),
+            (label, "Std"): dfm.std(ddof=1),
+            (label, "Count"): dfm.count(),
+        })
+
+    summary = pd.concat([one_summary(df, label) for label, df in results.items()], axis=1)
+    summary = summary.reindex(columns=pd.MultiIndex.from_product([methods, ["Mean", "Std", "Count"]]))
+    print(summary.round(3).to_string())
+
+    outdir = os.path.join(results_dir, base, "analyze")
+    os.makedirs(outdir, exist_ok=True)
+
+    summary.to_csv(f"{outdir}/per_method_summary.csv", float_format="%.6f")
+
+    # Excel gets flat "Method_Stat" headers
+    summary_xlsx = summary.copy()
+    summary_xlsx.index.name = "Metric"
+    summary_xlsx.columns = [f"{m}_{stat}" for (m, stat) in summary_xlsx.columns]
+    with pd.ExcelWriter(f"{outdir}/per_method_summary.xlsx", engine="xlsxwriter") as writer:
+        summary_xlsx.reset_index().to_excel(writer, index=False, sheet_name="summary")
+        ws = writer.sheets["summary"]
+        ws.set_column(0, 0, 14)
+        ws.set_column(1, len(summary_xlsx.columns), 12)
+        ws.freeze_panes(1, 1)
+        header_fmt = writer.book.add_format({"bold": True, "text_wrap": True, "align": "center"})
+        for col_num, value in enumerate(["Metric"] + list(summary_xlsx.columns)):
+            ws.write(0, col_num, value, header_fmt)
+
+    # Means with standard deviation per metric and method
+    means = summary.xs("Mean", axis=1, level=1).loc[metrics_short]
+    stds = summary.xs("Std", axis=1, level=1).loc[metrics_short]
+    ax = means.plot(kind="bar", yerr=stds, capsize=3, color=[METHOD_COLORS[c] for c in means.columns])
+    ax.set_ylabel("Wartość metryki")
+    ax.set_xlabel("")
+    ax.set_title("Metody RAG — średnie ± odchylenie standardowe")
+    ax.legend(title="Metoda", ncols=3, frameon=False, loc="upper center", bbox_to_anchor=(0.5, 1.20))
+
+    fig = ax.get_figure()
+    metric_names = {
+        "Rel": "Trafność odpowiedzi",
+        "Fact-F1": "Poprawność faktograficzna (miara F1)",
+        "Fact-Rec": "Poprawność faktograficzna (czułość)",
+        "SemSim": "Podobieństwo semantyczne",
+    }
+    metric_labels = [f"{m} — {metric_names[m]}" for m in metrics_short]
+    fig.legend(
+        [Line2D([], [], linestyle="none") for _ in metric_labels], metric_labels,
+        ncols=2, frameon=False, fontsize=10,
+        handlelength=0, handletextpad=0.4,
+        columnspacing=0.8, labelspacing=0.2, borderpad=0.2,
+        loc="upper center",
+        bbox_to_anchor=(0.5, -0.01),
+    )
+    for p in ax.patches:
+        h = p.get_height()
+        if not np.isnan(h):
+            ax.annotate(f"{h:.3f}", (p.get_x() + p.get_width() / 2, h),
+                        xytext=(0, 3), textcoords="offset points", ha="center", va="bottom", fontsize=9)
+    plt.tight_layout()
+    plt.savefig(f"{outdir}/per_method_means_with_std.png", dpi=300, bbox_inches="tight")
+    plt.savefig(f"{outdir}/per_method_means_with_std.svg", bbox_inches="tight")
+    plt.close(fig)
+
+    # Every question x metric x method, with the full metric names
+    key = "user_input"
+
+    def shrink_cols(df, method_name):
+        out = df[[key] + metrics_full].copy()
+        out = out.set_index(key)
+        out.columns = pd.MultiIndex.from_product([[method_name], out.columns])
+        return out
+
+    per_q = shrink_cols(results["LightRAG"], "LightRAG")
+    for method in methods[1:]:
+        per_q = per_q.join(shrink_cols(results[method], method), how="inner")
+    per_q = per_q.reset_index()
+    per_q.insert(1, "question_preview", per_q[key].str.slice(0, 120).fillna(""))
+    per_q.rename(columns={key: "question_full"}, inplace=True)
+    value_cols = per_q.columns[2:]
+    per_q[value_cols] = per_q[value_cols].astype(float).round(3)
+    per_q.to_csv(f"{outdir}/per_question_metrics.csv", index=False, encoding="utf-8")
+
+    per_q_xlsx = per_q.copy()
+    per_q_xlsx.columns = [c if isinstance(c, str) else f"{c[0]}_{c[1]}" for c in per_q_xlsx.columns]
+    with pd.ExcelWriter(f"{outdir}/per_question_metrics.xlsx", engine="xlsxwriter") as writer:
+        per_q_xlsx.to_excel(writer, index=False, sheet_name="metrics")
+        ws = writer.sheets["metrics"]
+        ws.set_column("A:A", 60)
+        ws.set_column("B:B", 50)
+        ws.set_column(2, len(per_q_xlsx.columns) - 1, 12)
+        ws.freeze_panes(1, 2)
+        header_fmt = writer.book.add_format({"bold": True, "text_wrap": True, "align": "center"})
+        for col_num, value in enumerate(per_q_xlsx.columns):
+            ws.write(0, col_num, value, header_fmt)
+
+    print(f"✔ Saved to {outdir}: per_method_summary.csv/.xlsx, per_method_means_with_std.png/.svg, per_question_metrics.csv/.xlsx")
+    return summary
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Score test sets with RAGAS and summarise the methods")
+    parser.add_argument("--cache-dir", default=os.getenv("RAGAS_CACHE_DIR", ".cache/ragas"))
+    parser.add_argument("--metrics", default="full", choices=METRIC_SETS)
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=int(os.getenv("RAGAS_LLM_CONCURRENCY", 8)),
+        help="max number of judge LLM requests at once",
+    )
+    parser.add_argument(
+        "--embedding-concurrency",
+        type=int,
+        default=int(os.getenv("RAGAS_EMBEDDING_CONCURRENCY", 8)),
+        help="max number of embedding requests at once",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="score one answered test set")
+    score.add_argument("test_set")
+    score.add_argument("output")
+
+    score_all = commands.add_parser(
+        "score-all", help="score every test_data/<base>/test_set_*.json into results/<results base>"
+    )
+    score_all.add_argument("base")
+    score_all.add_argument("--results-base", help="defaults to base")
+
+    analyze_cmd = commands.add_parser("analyze", help="write the per-method summaries to results/<base>/analyze")
+    analyze_cmd.add_argument("base")
+    analyze_cmd.add_argument("--lightrag", default="method1_lightrag_hybrid.csv")
+    analyze_cmd.add_argument("--graphrag", default="method2_graphrag_drift.csv")
+    analyze_cmd.add_argument("--naiverag", default="naive_rag_small_top_k.csv")
+    args = parser.parse_args()
+
+    if args.command == "analyze":
+        analyze(args.base, args.lightrag, args.graphrag, args.naiverag)
+        return
+
+    if args.command == "score":
+        jobs = [(args.test_set, args.output)]
+    else:
+        results_base = args.results_base or args.base
+        jobs = [
+            (test_set, os.path.join("./results", results_base, f"{name}.csv"))
+            for test_set, name in test_sets(args.base)
+        ]
+    for test_set, output in jobs:
+        # evaluate runs its own event loop, the judges' limits are created per test set
+        llm, embedding = build_judges(args.cache_dir, args.llm_concurrency, args.embedding_concurrency)
+        start_evaluate(test_set, output, llm, embedding, args.metrics, args.llm_concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Load test for the local embedding server.
+
+Simulates several LightRAG vector stores embedding concurrently: every client
+sends requests with a random number of texts of random length to
+/v1/embeddings and the script reports throughput, request latency and the
+server side batching metrics from /metrics.
+
+    python benchmark_embedding_server.py --concurrency 32 --requests 2000
+"""
+
+import argparse
+import asyncio
+import random
+import string
+import time
+
+import httpx
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def random_text(rng, min_words, max_words):
+    words = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10)))
+        for _ in range(rng.randint(min_words, max_words))
+    ]
+    return " ".join(words)
+
+
+async def worker(client, args, queue, latencies, errors):
+    while True:
+        try:
+            texts = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        started = time.perf_counter()
+        try:
+            response = await client.post(
+                "/v1/embeddings", json={"model": args.model, "input": texts}
+            )
+            response.raise_for_status()
+            if len(response.json()["data"]) != len(texts):
+                raise ValueError("Number of embeddings does not match the input")
+            latencies.append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            errors.append(repr(e))
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    # Generate the payloads up front so the client does not slow down the test
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(
+            [
+                random_text(rng, args.min_words, args.max_words)
+                for _ in range(rng.randint(1, args.max_texts))
+            ]
+        )
+    latencies, errors = [], []
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=args.timeout
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                worker(client, args, queue, latencies, errors)
+                for _ in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        metrics = (await client.get("/metrics")).json()
+
+    print(f"Requests:    {len(latencies)} ok, {len(errors)} failed in {elapsed:.2f}s")
+    if latencies:
+        print(f"Throughput:  {len(latencies) / elapsed:.1f} req/s")
+        print(
+            "Latency ms:  "
+            f"p50 {percentile(latencies, 0.5):.1f}  "
+            f"p95 {percentile(latencies, 0.95):.1f}  "
+            f"p99 {percentile(latencies, 0.99):.1f}"
+        )
+    if errors:
+        print(f"First error: {errors[0]}")
+    print(
+        f"Server:      {metrics['batches']} batches, "
+        f"avg batch size {metrics['batch_size']['avg']:.1f}, "
+        f"p95 queue wait {metrics['latency_ms']['queue_wait']['p95']:.1f} ms, "
+        f"p95 inference {metrics['latency_ms']['inference']['p95']:.1f} ms, "
+        f"{metrics['rejected']} rejected"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:54321")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--max-texts", type=int, default=8, help="max texts per request")
+    parser.add_argument("--min-words", type=int, default=5)
+    parser.add_argument("--max-words", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -1,19 +1,230 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import List, Union
+
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from sentence_transformers import SentenceTransformer
-from typing import List
 
-app = FastAPI()
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Max number of texts encoded in one forward pass
+MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", 64))
+# Max time the first request of a batch waits for others to join it
+MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", 5))
+# Max number of texts waiting in the queue, further requests get 503, a single
+# request with more texts gets 413
+MAX_QUEUE_SIZE = int(os.getenv("EMBEDDING_MAX_QUEUE_SIZE", 4096))
+# Number of recent requests / batches the latency and size metrics are computed over
+METRICS_WINDOW = int(os.getenv("EMBEDDING_METRICS_WINDOW", 1000))
+
+model = SentenceTransformer(MODEL_NAME)
 
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
 
 class EmbeddingRequest(BaseModel):
     model: str
-    input: List[str]
+    input: Union[str, List[str]]
+
+
+@dataclass
+class _Job:
+    texts: List[str]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MicroBatcher:
+    """Groups concurrent embedding requests into micro-batches.
+
+    Requests are queued and a single background task takes them off the queue,
+    closing a batch once it holds MAX_BATCH_SIZE texts or MAX_WAIT_MS passed
+    since its first request arrived. Texts are sorted by length before encoding
+    so that similar lengths are padded together, and the model runs on a
+    dedicated worker thread so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, max_batch_size, max_wait_ms, max_queue_size):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self._queue: deque[_Job] = deque()
+        self._queued_texts = 0
+        self._not_empty = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self._task = None
+        self._started_at = time.time()
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.texts = 0
+        self._batch_sizes = deque(maxlen=METRICS_WINDOW)
+        self._inference_ms = deque(maxlen=METRICS_WINDOW)
+        self._queue_wait_ms = deque(maxlen=METRICS_WINDOW)
+        self._latency_ms = deque(maxlen=METRICS_WINDOW)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) > self.max_queue_size:
+            # Would never fit into the queue, retrying does not help
+            self.rejected += 1
+            raise HTTPException(
+                status_code=413,
+                detail=f"Request has {len(texts)} texts, the limit is {self.max_queue_size}",
+            )
+        if self._queued_texts + len(texts) > self.max_queue_size:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Embedding queue is full",
+                headers={"Retry-After": "1"},
+            )
+        job = _Job(texts, asyncio.get_running_loop().create_future())
+        self._queue.append(job)
+        self._queued_texts += len(texts)
+        self._not_empty.set()
+        self.requests += 1
+        vectors = await job.future
+        self._latency_ms.append((time.perf_counter() - job.enqueued_at) * 1000)
+        return vectors
+
+    async def _next_batch(self) -> List[_Job]:
+        while not self._queue:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        deadline = self._queue[0].enqueued_at + self.max_wait
+        batch = [self._queue.popleft()]
+        size = len(batch[0].texts)
+        while size < self.max_batch_size:
+            if not self._queue:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                self._not_empty.clear()
+                try:
+                    await asyncio.wait_for(self._not_empty.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                continue
+            # Never split a request, a large one simply forms an oversized batch
+            if size + len(self._queue[0].texts) > self.max_batch_size:
+                break
+            job = self._queue.popleft()
+            batch.append(job)
+            size += len(job.texts)
+
+        self._queued_texts -= size
+        return batch
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        encoded = model.encode(
+            [texts[i] for i in order],
+            batch_size=max(min(len(texts), self.max_batch_size), 1),
+        ).tolist()
+        vectors = [None] * len(texts)
+        for position, i in enumerate(order):
+            vectors[i] = encoded[position]
+        return vectors
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            texts = [text for job in batch for text in job.texts]
+            started = time.perf_counter()
+            for job in batch:
+                self._queue_wait_ms.append((started - job.enqueued_at) * 1000)
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode, texts)
+            except Exception as e:
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                continue
+            self._inference_ms.append((time.perf_counter() - started) * 1000)
+            self.batches += 1
+            self.texts += len(texts)
+            self._batch_sizes.append(len(texts))
+
+            offset = 0
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_result(vectors[offset : offset + len(job.texts)])
+                offset += len(job.texts)
+
+    def metrics(self) -> dict:
+        def summary(values):
+            return {
+                "avg": sum(values) / len(values) if values else 0.0,
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "p99": _percentile(values, 0.99),
+            }
+
+        return {
+            "model": MODEL_NAME,
+            "uptime_s": time.time() - self._started_at,
+            "config": {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "max_queue_size": self.max_queue_size,
+            },
+            "queue_depth": {"requests": len(self._queue), "texts": self._queued_texts},
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "texts": self.texts,
+            "batch_size": summary(self._batch_sizes),
+            "latency_ms": {
+                "total": summary(self._latency_ms),
+                "queue_wait": summary(self._queue_wait_ms),
+                "inference": summary(self._inference_ms),
+            },
+        }
+
+
+batcher = MicroBatcher(MAX_BATCH_SIZE, MAX_WAIT_MS, MAX_QUEUE_SIZE)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    batcher.start()
+    yield
+    await batcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
 
 @app.post("/v1/embeddings")
-def create_embeddings(request: EmbeddingRequest):
-    vectors = model.encode(request.input).tolist()
+async def create_embeddings(request: EmbeddingRequest):
+    texts = [request.input] if isinstance(request.input, str) else request.input
+    vectors = await batcher.embed(texts)
     return {
         "data": [
             {
@@ -25,3 +236,8 @@ def create_embeddings(request: EmbeddingRequest):
         "object": "list",
         "model": request.model
     }
+
+
+@app.get("/metrics")
+async def metrics():
+    return batcher.metrics()
@@ -0,0 +1,163 @@
+"""Recall and latency of the pgvector ANN index used by PGVectorStorage.
+
+Runs nearest-neighbour queries against one of the vector tables twice, once
+through the index configured for the storages (POSTGRES_VECTOR_INDEX_TYPE,
+hnsw or ivfflat) and once as an exact scan with index scans disabled, and
+reports recall@k and the latency percentiles of both for every value of the
+search parameter (hnsw.ef_search or ivfflat.probes) given on the command line.
+
+With --populate the table is first filled with clustered synthetic vectors in
+a separate workspace, which is deleted afterwards. Without it the queries run
+on the rows of POSTGRES_WORKSPACE, perturbed copies of stored vectors are used
+as queries.
+
+    python benchmark_pgvector_search.py --populate 100000 --dim 1024 --search 40,100,200
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from lightrag.kg.postgres_impl import ClientManager
+
+ANN_SQL = """SELECT id FROM {table} WHERE workspace=$1
+             ORDER BY content_vector <=> $2::vector LIMIT $3"""
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def clustered_vectors(rng, count, dim, clusters=100):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)]
+    return vectors + 0.3 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+async def populate(db, table, workspace, count, dim, rng):
+    await db.ensure_vector_index(table, dim)
+    vectors = clustered_vectors(rng, count, dim)
+    if table == "LIGHTRAG_DOC_CHUNKS":
+        rows = [
+            (workspace, f"chunk-{i}", 100, i, "doc-0", "", vector, "bench")
+            for i, vector in enumerate(vectors)
+        ]
+    elif table == "LIGHTRAG_VDB_ENTITY":
+        rows = [
+            (workspace, f"ent-{i}", f"entity {i}", "", vector, [], "bench")
+            for i, vector in enumerate(vectors)
+        ]
+    else:
+        rows = [
+            (workspace, f"rel-{i}", "a", "b", "", vector, [], "bench")
+            for i, vector in enumerate(vectors)
+        ]
+    for i in range(0, len(rows), 5000):
+        await db.upsert_many(table, rows[i : i + 5000])
+    # Rebuild so IVFFlat computes its centroids from the data
+    await db.execute(f"REINDEX INDEX idx_{table.lower()}_vector_{db.vector_index_type}")
+    return vectors
+
+
+async def timed_search(db, sql, params, candidates, settings):
+    started = time.perf_counter()
+    rows = await db.vector_search(sql, params, candidates, settings)
+    return (time.perf_counter() - started) * 1000, [row["id"] for row in rows]
+
+
+async def main(args):
+    rng = np.random.default_rng(args.seed)
+    db = await ClientManager.get_client()
+    if db.vector_index_type == "none":
+        raise SystemExit("Set POSTGRES_VECTOR_INDEX_TYPE to hnsw or ivfflat")
+    table = args.table
+    workspace = "benchmark_search" if args.populate else db.workspace
+    try:
+        if args.populate:
+            print(f"Populating {table} with {args.populate} vectors")
+            vectors = await populate(db, table, workspace, args.populate, args.dim, rng)
+            queries = vectors[rng.integers(0, len(vectors), args.queries)]
+        else:
+            rows = await db.query(
+                f"SELECT content_vector FROM {table} WHERE workspace=$1 ORDER BY random() LIMIT $2",
+                {"workspace": workspace, "limit": args.queries},
+                multirows=True,
+            )
+            if not rows:
+                raise SystemExit(f"No vectors in {table} for workspace {workspace}")
+            queries = np.array(
+                [row["content_vector"] for row in rows], dtype=np.float32
+            )
+        queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+        sql = ANN_SQL.format(table=table)
+        exact, exact_ms = [], []
+        for query in queries:
+            ms, ids = await timed_search(
+                db,
+                sql,
+                {"workspace": workspace, "embedding": query, "k": args.k},
+                args.k,
+                {"enable_indexscan": "off"},
+            )
+            exact.append(set(ids))
+            exact_ms.append(ms)
+        print(
+            f"exact scan: p50 {percentile(exact_ms, 0.5):.1f} ms, p95 {percentile(exact_ms, 0.95):.1f} ms"
+        )
+
+        parameter = (
+            "hnsw.ef_search" if db.vector_index_type == "hnsw" else "ivfflat.probes"
+        )
+        print(
+            f"{parameter:>16} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for value in args.search:
+            latencies, recalls = [], []
+            for query, truth in zip(queries, exact):
+                ms, ids = await timed_search(
+                    db,
+                    sql,
+                    {"workspace": workspace, "embedding": query, "k": args.k},
+                    args.k,
+                    {parameter: value},
+                )
+                latencies.append(ms)
+                recalls.append(len(truth & set(ids)) / max(len(truth), 1))
+            print(
+                f"{value:>16} {np.mean(recalls):>10.3f} {percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.95):>8.1f}"
+            )
+    finally:
+        if args.populate:
+            await db.execute(
+                f"DELETE FROM {table} WHERE workspace=$1", {"workspace": workspace}
+            )
+        await ClientManager.release_client(db)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--table",
+        default="LIGHTRAG_VDB_ENTITY",
+        choices=["LIGHTRAG_DOC_CHUNKS", "LIGHTRAG_VDB_ENTITY", "LIGHTRAG_VDB_RELATION"],
+    )
+    parser.add_argument(
+        "--populate", type=int, default=0, help="synthetic vectors to insert first"
+    )
+    parser.add_argument(
+        "--dim", type=int, default=1024, help="dimension of the synthetic vectors"
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--search",
+        type=lambda value: [int(v) for v in value.split(",")],
+        default=[10, 40, 100, 200],
+        help="comma separated ef_search (hnsw) or probes (ivfflat) values",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,142 @@
+"""Write throughput of the Postgres storages, row by row vs. in bulk.
+
+Upserts synthetic full docs, LLM cache entries, doc status records, chunks,
+entities and relations (with vectors) into the LightRAG tables of a local
+Postgres with pgvector and reports rows/sec for three write paths:
+
+    row         one INSERT ... ON CONFLICT round trip per row (the old write path)
+    executemany one pipelined executemany per batch
+    copy        COPY into a staging table and one merge per batch
+
+The connection settings are read like for the storages (POSTGRES_* variables
+or config.ini). All rows are written to a separate workspace that is deleted
+afterwards.
+
+    python benchmark_postgres_upsert.py --rows 2000 --batch-size 500 --dim 1024
+"""
+
+import argparse
+import asyncio
+import random
+import string
+import time
+
+import numpy as np
+
+from lightrag.kg import postgres_impl
+from lightrag.kg.postgres_impl import BULK_UPSERTS, ClientManager, PostgreSQLDB
+
+MODES = ("row", "executemany", "copy")
+
+
+def random_text(rng, words):
+    return " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10)))
+        for _ in range(words)
+    )
+
+
+def make_rows(table, workspace, count, dim, rng):
+    rows = []
+    for i in range(count):
+        text = random_text(rng, 200)
+        vector = np.random.rand(dim).astype(np.float32)
+        chunk_ids = [f"chunk-{rng.randrange(count)}" for _ in range(3)]
+        if table == "LIGHTRAG_DOC_FULL":
+            rows.append((workspace, f"doc-{i}", text * 10))
+        elif table == "LIGHTRAG_LLM_CACHE":
+            rows.append((workspace, f"cache-{i}", "default", text, text))
+        elif table == "LIGHTRAG_DOC_STATUS":
+            rows.append(
+                (
+                    workspace,
+                    f"doc-{i}",
+                    text,
+                    text[:100],
+                    len(text),
+                    8,
+                    "processed",
+                    "doc.txt",
+                )
+            )
+        elif table == "LIGHTRAG_DOC_CHUNKS":
+            rows.append(
+                (workspace, f"chunk-{i}", 1200, i, "doc-0", text, vector, "doc.txt")
+            )
+        elif table == "LIGHTRAG_VDB_ENTITY":
+            rows.append(
+                (
+                    workspace,
+                    f"ent-{i}",
+                    f"entity {i}",
+                    text,
+                    vector,
+                    chunk_ids,
+                    "doc.txt",
+                )
+            )
+        elif table == "LIGHTRAG_VDB_RELATION":
+            rows.append(
+                (
+                    workspace,
+                    f"rel-{i}",
+                    f"entity {i}",
+                    f"entity {i + 1}",
+                    text,
+                    vector,
+                    chunk_ids,
+                    "doc.txt",
+                )
+            )
+    return rows
+
+
+async def write(db: PostgreSQLDB, table, rows, mode, batch_size):
+    if mode == "row":
+        sql = db.upsert_sql(table)
+        columns = BULK_UPSERTS[table]["columns"]
+        for row in rows:
+            await db.execute(sql, dict(zip(columns, row)))
+        return
+    # upsert_many picks the write path by batch size
+    postgres_impl.POSTGRES_COPY_MIN_ROWS = 0 if mode == "copy" else len(rows) + 1
+    for i in range(0, len(rows), batch_size):
+        await db.upsert_many(table, rows[i : i + batch_size])
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    db = await ClientManager.get_client()
+    workspace = "benchmark_upsert"
+    try:
+        print(
+            f"{'table':<24}" + "".join(f"{mode:>14}" for mode in MODES) + "   rows/sec"
+        )
+        for table in BULK_UPSERTS:
+            rows = make_rows(table, workspace, args.rows, args.dim, rng)
+            results = []
+            for mode in MODES:
+                await db.execute(
+                    f"DELETE FROM {table} WHERE workspace=$1", {"workspace": workspace}
+                )
+                started = time.perf_counter()
+                await write(db, table, rows, mode, args.batch_size)
+                results.append(len(rows) / (time.perf_counter() - started))
+            print(f"{table:<24}" + "".join(f"{rate:>14.0f}" for rate in results))
+    finally:
+        for table in BULK_UPSERTS:
+            await db.execute(
+                f"DELETE FROM {table} WHERE workspace=$1", {"workspace": workspace}
+            )
+        await ClientManager.release_client(db)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="rows per table")
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="rows per upsert call"
+    )
+    parser.add_argument("--dim", type=int, default=1024, help="vector dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+"""Query latency of a vector storage under concurrency, one query vs. batched.
+
+Fills the collection of a vector storage (e.g. QdrantVectorDBStorage or
+MilvusVectorDBStorage, connection settings as for the server) with synthetic
+embeddings and runs the same keywords through it twice: as concurrent single
+queries and as query_batch calls of --batch keywords each. For both it reports
+the throughput and the longest stall of the event loop, which shows whether
+the storage blocks the loop while it waits for the server.
+
+    python benchmark_vector_query.py --storage QdrantVectorDBStorage --rows 20000 --queries 400
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from lightrag.kg import STORAGES
+from lightrag.kg.shared_storage import initialize_share_data
+from lightrag.utils import EmbeddingFunc
+
+
+def embedding_func(dim):
+    async def embed(texts):
+        # Deterministic vectors, the same text always gets the same embedding
+        return np.stack(
+            [
+                np.random.default_rng(zlib.crc32(text.encode()))
+                .standard_normal(dim)
+                .astype(np.float32)
+                for text in texts
+            ]
+        )
+
+    return EmbeddingFunc(embedding_dim=dim, max_token_size=8192, func=embed)
+
+
+async def loop_lag(stop: asyncio.Event, interval=0.005):
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def measure(run):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+    started = time.perf_counter()
+    await run()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await lag
+
+
+async def main(args):
+    initialize_share_data()
+    module = importlib.import_module(STORAGES[args.storage], package="lightrag")
+    storage_cls = getattr(module, args.storage)
+    storage = storage_cls(
+        namespace="benchmark_vector_query",
+        global_config={
+            "working_dir": tempfile.mkdtemp(),
+            "embedding_batch_num": 64,
+            "vector_db_storage_cls_kwargs": {"cosine_better_than_threshold": -1.0},
+        },
+        embedding_func=embedding_func(args.dim),
+        meta_fields={"content"},
+    )
+    await storage.initialize()
+    try:
+        data = {f"row-{i}": {"content": f"row {i}"} for i in range(args.rows)}
+        elapsed, lag = await measure(lambda: storage.upsert(data))
+        print(
+            f"upsert   {args.rows / elapsed:10.0f} rows/s   loop stall {lag * 1000:7.1f} ms"
+        )
+
+        keywords = [f"row {i}" for i in range(args.queries)]
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def single(keyword):
+            async with slots:
+                await storage.query(keyword, top_k=args.k)
+
+        async def batched(group):
+            async with slots:
+                await storage.query_batch(group, top_k=args.k)
+
+        groups = [
+            keywords[i : i + args.batch] for i in range(0, len(keywords), args.batch)
+        ]
+        for name, run in (
+            ("single", lambda: asyncio.gather(*map(single, keywords))),
+            ("batched", lambda: asyncio.gather(*map(batched, groups))),
+        ):
+            elapsed, lag = await measure(run)
+            print(
+                f"{name:<8} {len(keywords) / elapsed:10.0f} queries/s   loop stall {lag * 1000:7.1f} ms"
+            )
+    finally:
+        await storage.drop()
+        await storage.finalize()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--storage", default=os.getenv("LIGHTRAG_VECTOR_STORAGE"))
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--batch", type=int, default=8, help="keywords per query_batch")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -12,7 +12,15 @@ import pipmaster as pm
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Literal
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    UploadFile,
+)
 from pydantic import BaseModel, Field, field_validator
 
 from lightrag import LightRAG
@@ -215,6 +223,23 @@ class DocStatusResponse(BaseModel):
             return dt
         return dt.isoformat()
 
+    @classmethod
+    def from_doc(
+        cls, doc_id: str, doc_status: DocProcessingStatus
+    ) -> "DocStatusResponse":
+        return cls(
+            id=doc_id,
+            content_summary=doc_status.content_summary,
+            content_length=doc_status.content_length,
+            status=doc_status.status,
+            created_at=cls.format_datetime(doc_status.created_at),
+            updated_at=cls.format_datetime(doc_status.updated_at),
+            chunks_count=doc_status.chunks_count,
+            error=doc_status.error,
+            metadata=doc_status.metadata,
+            file_path=doc_status.file_path,
+        )
+
     id: str = Field(description="Document identifier")
     content_summary: str = Field(description="Summary of document content")
     content_length: int = Field(description="Length of document content in characters")
@@ -293,6 +318,26 @@ class DocsStatusesResponse(BaseModel):
         }
 
 
+class DocsPageResponse(BaseModel):
+    """Response model for a page of documents
+
+    Attributes:
+        documents: Documents of the page ordered by creation time
+        next_cursor: Cursor of the next page, None after the last page
+        status_counts: Number of documents in each status
+    """
+
+    documents: List[DocStatusResponse] = Field(
+        default_factory=list, description="Documents of the page"
+    )
+    next_cursor: Optional[str] = Field(
+        default=None, description="Cursor of the next page, None after the last page"
+    )
+    status_counts: Dict[str, int] = Field(
+        default_factory=dict, description="Number of documents in each status"
+    )
+
+
 class PipelineStatusResponse(BaseModel):
     """Response model for pipeline status
 
@@ -308,6 +353,8 @@ class PipelineStatusResponse(BaseModel):
         latest_message: Latest message from pipeline processing
         history_messages: List of history messages
         update_status: Status of update flags for all namespaces
+        stages: Backlog, throughput and counters of each ingestion pipeline stage
+        lock_wait_stats: Lock wait times of the worker answering the request
     """
 
     autoscanned: bool = False
@@ -321,6 +368,8 @@ class PipelineStatusResponse(BaseModel):
     latest_message: str = ""
     history_messages: Optional[List[str]] = None
     update_status: Optional[dict] = None
+    stages: Optional[dict] = None
+    lock_wait_stats: Optional[dict] = None
 
     class Config:
         extra = "allow"  # Allow additional fields from the pipeline status
@@ -1010,6 +1059,7 @@ def create_document_routes(
             storages = [
                 rag.text_chunks,
                 rag.full_docs,
+                rag.chunk_index,
                 rag.entities_vdb,
                 rag.relationships_vdb,
                 rag.chunks_vdb,
@@ -1151,6 +1201,8 @@ def create_document_routes(
                 - request_pending (bool): Flag for pending request for processing
                 - latest_message (str): Latest message from pipeline processing
                 - history_messages (List[str], optional): List of history messages
+                - stages (dict, optional): Backlog, throughput and counters of each ingestion pipeline stage
+                - lock_wait_stats (dict, optional): Lock wait times of the worker answering the request
 
         Raises:
             HTTPException: If an error occurs while retrieving pipeline status (500)
@@ -1159,6 +1211,7 @@ def create_document_routes(
             from lightrag.kg.shared_storage import (
                 get_namespace_data,
                 get_all_update_flags_status,
+                get_lock_wait_stats,
             )
 
             pipeline_status = await get_namespace_data("pipeline_status")
@@ -1183,6 +1236,7 @@ def create_document_routes(
 
             # Add processed update_status to the status dictionary
             status_dict["update_status"] = processed_update_status
+            status_dict["lock_wait_stats"] = get_lock_wait_stats()
 
             # Convert history_messages to a regular list if it's a Manager.list
             if "history_messages" in status_dict:
@@ -1235,22 +1289,7 @@ def create_document_routes(
                     if status not in response.statuses:
                         response.statuses[status] = []
                     response.statuses[status].append(
-                        DocStatusResponse(
-                            id=doc_id,
-                            content_summary=doc_status.content_summary,
-                            content_length=doc_status.content_length,
-                            status=doc_status.status,
-                            created_at=DocStatusResponse.format_datetime(
-                                doc_status.created_at
-                            ),
-                            updated_at=DocStatusResponse.format_datetime(
-                                doc_status.updated_at
-                            ),
-                            chunks_count=doc_status.chunks_count,
-                            error=doc_status.error,
-                            metadata=doc_status.metadata,
-                            file_path=doc_status.file_path,
-                        )
+                        DocStatusResponse.from_doc(doc_id, doc_status)
                     )
             return response
         except Exception as e:
@@ -1258,6 +1297,56 @@ def create_document_routes(
             logger.error(traceback.format_exc())
             raise HTTPException(status_code=500, detail=str(e))
 
+    @router.get(
+        "/paginated",
+        response_model=DocsPageResponse,
+        dependencies=[Depends(combined_auth)],
+    )
+    async def documents_paginated(
+        status: Optional[DocStatus] = Query(
+            default=None, description="Only list documents with this status"
+        ),
+        limit: int = Query(default=50, ge=1, le=1000),
+        offset: int = Query(default=0, ge=0),
+        cursor: Optional[str] = Query(
+            default=None, description="next_cursor of the previous page"
+        ),
+    ) -> DocsPageResponse:
+        """
+        Get one page of documents ordered by creation time.
+
+        Pages can be addressed by offset or by passing the next_cursor of the
+        previous page, cursors stay valid while documents are added. The
+        response also carries the number of documents in each status.
+
+        Returns:
+            DocsPageResponse: The documents of the page, the cursor of the next page
+                              (None after the last page) and the status counts.
+
+        Raises:
+            HTTPException: If the cursor is invalid (400) or an error occurs while
+                           retrieving document statuses (500).
+        """
+        try:
+            (docs, next_cursor), status_counts = await asyncio.gather(
+                rag.get_docs_paginated(status, limit, offset, cursor),
+                rag.get_processing_status(),
+            )
+            return DocsPageResponse(
+                documents=[
+                    DocStatusResponse.from_doc(doc_id, doc_status)
+                    for doc_id, doc_status in docs.items()
+                ],
+                next_cursor=next_cursor,
+                status_counts=status_counts,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error GET /documents/paginated: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise HTTPException(status_code=500, detail=str(e))
+
     @router.post(
         "/clear_cache",
         response_model=ClearCacheResponse,
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import asyncio
+import bisect
 from enum import Enum
 import os
 from dotenv import load_dotenv
@@ -150,6 +152,18 @@ class BaseVectorStorage(StorageNameSpace, ABC):
     ) -> list[dict[str, Any]]:
         """Query the vector storage and retrieve top_k results."""
 
+    async def query_batch(
+        self, queries: list[str], top_k: int, ids: list[str] | None = None
+    ) -> list[list[dict[str, Any]]]:
+        """Query the vector storage with several queries, one result list per query.
+
+        Storages whose backend searches several vectors in one request
+        override this to embed and search all queries at once.
+        """
+        return list(
+            await asyncio.gather(*(self.query(query, top_k, ids) for query in queries))
+        )
+
     @abstractmethod
     async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
         """Insert or update vectors in the storage.
@@ -273,6 +287,83 @@ class BaseKVStorage(StorageNameSpace, ABC):
              False: if the cache drop failed, or the cache mode is not supported
         """
 
+    async def drop_cache_entries(
+        self,
+        modes: list[str],
+        cache_types: list[str] | None = None,
+        models: list[str] | None = None,
+        older_than: float | None = None,
+    ) -> dict[str, list[str]]:
+        """Delete LLM cache entries matching all of the given filters
+
+        The entries are matched on the mode records read through get_by_id and
+        removed with delete_cache_entries.
+
+        Importance notes for in-memory storage:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. update flags to notify other processes that data persistence is needed
+
+        Args:
+            modes (list[str]): Cache modes to look into
+            cache_types (list[str] | None): Only drop entries of these cache types
+            models (list[str] | None): Only drop entries produced by these models
+            older_than (float | None): Only drop entries created before this unix
+                timestamp, entries without a creation time count as older
+
+        Returns:
+            dict[str, list[str]]: Ids of the dropped entries per mode
+        """
+        dropped: dict[str, list[str]] = {}
+        for mode in modes:
+            mode_cache = await self.get_by_id(mode)
+            if not mode_cache:
+                continue
+
+            for cache_id, entry in mode_cache.items():
+                if (
+                    isinstance(entry, dict)
+                    and (not cache_types or entry.get("cache_type") in cache_types)
+                    and (not models or entry.get("model") in models)
+                    and (
+                        older_than is None
+                        or (entry.get("create_time") or 0) < older_than
+                    )
+                ):
+                    dropped.setdefault(mode, []).append(cache_id)
+
+            if mode in dropped:
+                await self.delete_cache_entries(mode, dropped[mode])
+        return dropped
+
+    async def delete_cache_entries(self, mode: str, cache_ids: list[str]) -> None:
+        """Delete single entries of an LLM cache mode
+
+        Default implementation rewrites the mode record through get_by_id and
+        upsert. Override this method in storage backends that can delete
+        single cache entries directly.
+
+        Importance notes for in-memory storage:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. update flags to notify other processes that data persistence is needed
+
+        Args:
+            mode (str): Cache mode of the entries
+            cache_ids (list[str]): Ids of the entries to delete
+        """
+        mode_cache = await self.get_by_id(mode)
+        if not mode_cache:
+            return
+        dropped = set(cache_ids)
+        await self.upsert(
+            {
+                mode: {
+                    cache_id: entry
+                    for cache_id, entry in mode_cache.items()
+                    if cache_id not in dropped
+                }
+            }
+        )
+
 
 @dataclass
 class BaseGraphStorage(StorageNameSpace, ABC):
@@ -467,6 +558,32 @@ class BaseGraphStorage(StorageNameSpace, ABC):
             edge_data: A dictionary of edge properties
         """
 
+    async def upsert_nodes(self, nodes: dict[str, dict[str, str]]) -> None:
+        """Insert or update nodes as a batch
+
+        Default implementation upserts nodes one by one.
+        Override this method for better performance in storage backends
+        that support batch operations.
+
+        Args:
+            nodes: Mapping of node ID to its node properties
+        """
+        for node_id, node_data in nodes.items():
+            await self.upsert_node(node_id, node_data)
+
+    async def upsert_edges(self, edges: dict[tuple[str, str], dict[str, str]]) -> None:
+        """Insert or update edges as a batch, both endpoints must already exist
+
+        Default implementation upserts edges one by one.
+        Override this method for better performance in storage backends
+        that support batch operations.
+
+        Args:
+            edges: Mapping of (source ID, target ID) to its edge properties
+        """
+        for (source_node_id, target_node_id), edge_data in edges.items():
+            await self.upsert_edge(source_node_id, target_node_id, edge_data)
+
     @abstractmethod
     async def delete_node(self, node_id: str) -> None:
         """Delete a node from the graph.
@@ -541,12 +658,26 @@ class DocStatus(str, Enum):
     FAILED = "failed"
 
 
+def doc_order_key(doc_id: str, created_at: Any) -> tuple[str, str]:
+    """Sort key of a document in paged listings"""
+    return str(created_at), doc_id
+
+
+def encode_doc_cursor(key: tuple[str, str]) -> str:
+    return f"{key[0]}|{key[1]}"
+
+
+def decode_doc_cursor(cursor: str) -> tuple[str, str]:
+    created_at, sep, doc_id = cursor.partition("|")
+    if not sep:
+        raise ValueError(f"Invalid document cursor: {cursor}")
+    return created_at, doc_id
+
+
 @dataclass
 class DocProcessingStatus:
     """Document processing status data structure"""
 
-    content: str
-    """Original content of the document"""
     content_summary: str
     """First 100 chars of document content, used for preview"""
     content_length: int
@@ -559,6 +690,8 @@ class DocProcessingStatus:
     """ISO format timestamp when document was created"""
     updated_at: str
     """ISO format timestamp when document was last updated"""
+    content: str | None = None
+    """Original content of documents enqueued by older versions, the content lives in full_docs"""
     chunks_count: int | None = None
     """Number of chunks after splitting, used for processing"""
     error: str | None = None
@@ -581,6 +714,43 @@ class DocStatusStorage(BaseKVStorage, ABC):
     ) -> dict[str, DocProcessingStatus]:
         """Get all documents with a specific status"""
 
+    async def get_docs_paginated(
+        self,
+        status: DocStatus | None = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> tuple[dict[str, DocProcessingStatus], str | None]:
+        """Get a page of documents ordered by creation time and id
+
+        A page starts `offset` documents after `cursor`, the cursor returned
+        with the previous page. Unlike offsets, cursors stay valid while
+        documents are added or change their status.
+
+        Args:
+            status: Only list documents with this status, all documents if None
+            limit: Maximum number of documents in the page
+            offset: Number of documents to skip
+            cursor: Cursor of the previous page, None to start at the first document
+
+        Returns:
+            The documents of the page and the cursor of the next page, None after the last page
+        """
+        docs: dict[str, DocProcessingStatus] = {}
+        for doc_status in [status] if status is not None else list(DocStatus):
+            docs.update(await self.get_docs_by_status(doc_status))
+        ordered = sorted(
+            doc_order_key(doc_id, doc.created_at) for doc_id, doc in docs.items()
+        )
+        start = offset
+        if cursor is not None:
+            start += bisect.bisect_right(ordered, decode_doc_cursor(cursor))
+        page = ordered[start : start + limit]
+        next_cursor = (
+            encode_doc_cursor(page[-1]) if start + limit < len(ordered) else None
+        )
+        return {doc_id: docs[doc_id] for _, doc_id in page}, next_cursor
+
     async def drop_cache_by_modes(self, modes: list[str] | None = None) -> bool:
         """Drop cache is not supported for Doc Status storage"""
         return False
@@ -2,6 +2,7 @@ STORAGE_IMPLEMENTATIONS = {
     "KV_STORAGE": {
         "implementations": [
             "JsonKVStorage",
+            "LogKVStorage",
             "RedisKVStorage",
             "PGKVStorage",
             "MongoKVStorage",
@@ -12,6 +13,7 @@ STORAGE_IMPLEMENTATIONS = {
     "GRAPH_STORAGE": {
         "implementations": [
             "NetworkXStorage",
+            "CSRGraphStorage",
             "Neo4JStorage",
             "PGGraphStorage",
             # "AGEStorage",
@@ -24,6 +26,7 @@ STORAGE_IMPLEMENTATIONS = {
     "VECTOR_STORAGE": {
         "implementations": [
             "NanoVectorDBStorage",
+            "MmapVectorDBStorage",
             "MilvusVectorDBStorage",
             "ChromaVectorDBStorage",
             "PGVectorStorage",
@@ -48,12 +51,14 @@ STORAGE_IMPLEMENTATIONS = {
 STORAGE_ENV_REQUIREMENTS: dict[str, list[str]] = {
     # KV Storage Implementations
     "JsonKVStorage": [],
+    "LogKVStorage": [],
     "MongoKVStorage": [],
     "RedisKVStorage": ["REDIS_URI"],
     # "TiDBKVStorage": ["TIDB_USER", "TIDB_PASSWORD", "TIDB_DATABASE"],
     "PGKVStorage": ["POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DATABASE"],
     # Graph Storage Implementations
     "NetworkXStorage": [],
+    "CSRGraphStorage": [],
     "Neo4JStorage": ["NEO4J_URI", "NEO4J_USERNAME", "NEO4J_PASSWORD"],
     "MongoGraphStorage": [],
     # "TiDBGraphStorage": ["TIDB_USER", "TIDB_PASSWORD", "TIDB_DATABASE"],
@@ -70,6 +75,7 @@ STORAGE_ENV_REQUIREMENTS: dict[str, list[str]] = {
     ],
     # Vector Storage Implementations
     "NanoVectorDBStorage": [],
+    "MmapVectorDBStorage": [],
     "MilvusVectorDBStorage": [],
     "ChromaVectorDBStorage": [],
     # "TiDBVectorDBStorage": ["TIDB_USER", "TIDB_PASSWORD", "TIDB_DATABASE"],
@@ -86,8 +92,11 @@ STORAGE_ENV_REQUIREMENTS: dict[str, list[str]] = {
 # Storage implementation module mapping
 STORAGES = {
     "NetworkXStorage": ".kg.networkx_impl",
+    "CSRGraphStorage": ".kg.csr_graph_impl",
     "JsonKVStorage": ".kg.json_kv_impl",
+    "LogKVStorage": ".kg.log_kv_impl",
     "NanoVectorDBStorage": ".kg.nano_vector_db_impl",
+    "MmapVectorDBStorage": ".kg.mmap_vector_db_impl",
     "JsonDocStatusStorage": ".kg.json_doc_status_impl",
     "Neo4JStorage": ".kg.neo4j_impl",
     "MilvusVectorDBStorage": ".kg.milvus_impl",
@@ -0,0 +1,737 @@
+import os
+import pickle
+import sys
+from dataclasses import dataclass
+from typing import Any, final
+
+import numpy as np
+
+from lightrag.types import KnowledgeGraph, KnowledgeGraphNode, KnowledgeGraphEdge
+from lightrag.utils import logger
+from lightrag.base import BaseGraphStorage
+
+from .shared_storage import (
+    get_data_init_lock,
+    get_namespace_lock,
+    get_update_flag,
+    set_all_update_flags,
+)
+from .shared_memory import get_shared_snapshot
+
+from dotenv import load_dotenv
+
+# use the .env that is inside the current folder
+# allows to use different .env file for each lightrag instance
+# the OS environment variables take precedence over the .env file
+load_dotenv(dotenv_path=".env", override=False)
+
+MAX_GRAPH_NODES = int(os.getenv("MAX_GRAPH_NODES", 1000))
+
+_FORMAT_VERSION = 1
+# Short, heavily repeated values share one string object
+_INTERNED_PROPERTIES = {"entity_type", "file_path", "weight"}
+
+
+class _Columns:
+    """Properties of the rows of a table, one list per property name"""
+
+    def __init__(self, columns: dict[str, list] | None = None, rows: int = 0):
+        self.columns: dict[str, list] = columns or {}
+        self.rows = rows
+
+    def add_row(self) -> None:
+        for column in self.columns.values():
+            column.append(None)
+        self.rows += 1
+
+    def update(self, row: int, data: dict[str, Any]) -> None:
+        for key, value in data.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = [None] * self.rows
+            if key in _INTERNED_PROPERTIES and isinstance(value, str):
+                value = sys.intern(value)
+            column[row] = value
+
+    def get(self, row: int) -> dict[str, Any]:
+        return {
+            key: column[row]
+            for key, column in self.columns.items()
+            if column[row] is not None
+        }
+
+    def clear(self, row: int) -> None:
+        for column in self.columns.values():
+            column[row] = None
+
+    def take(self, rows: np.ndarray) -> dict[str, list]:
+        """Columns restricted to the given rows, dropping the empty ones"""
+        taken = {}
+        for key, column in self.columns.items():
+            values = [column[row] for row in rows.tolist()]
+            if any(value is not None for value in values):
+                taken[key] = values
+        return taken
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array), 1024), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+@final
+@dataclass
+class CSRGraphStorage(BaseGraphStorage):
+    """In-memory graph stored in flat arrays instead of NetworkX dicts.
+
+    Node ids are interned to integer slots. Edges are kept as parallel
+    source/target slot arrays, indexed by their endpoint pair, and the node
+    and edge properties are stored column-wise, one list per property name
+    (entity_type, description, source_id, ...). The node degrees are a NumPy
+    vector maintained on every edge change. Neighbor lookups use a CSR
+    adjacency (row pointers into the sorted neighbor slots) that is rebuilt
+    in a single vectorized pass on the first lookup after a change, so batch
+    degree and neighbor queries, the top-degree selection of
+    `get_knowledge_graph("*")` and the BFS of `get_knowledge_graph` work on
+    arrays instead of walking Python dicts.
+
+    Slots of deleted nodes and edges are left empty until the next save,
+    which writes a compacted `graph_<namespace>.csr` file. If the file does
+    not exist yet but the namespace was stored by NetworkXStorage, that graph
+    is imported on first start.
+    """
+
+    def __post_init__(self):
+        self._file_name = os.path.join(
+            self.global_config["working_dir"], f"graph_{self.namespace}.csr"
+        )
+        self._storage_lock = None
+        self.storage_updated = None
+        # Workers reload the graph from shared memory in multiprocess mode
+        self._snapshot = None
+        self._load()
+
+    async def initialize(self):
+        """Initialize storage data"""
+        # Get the update flag for cross-process update notification
+        self.storage_updated = await get_update_flag(self.namespace)
+        # Get the storage lock for use in other methods
+        self._storage_lock = get_namespace_lock(self.namespace)
+        async with get_data_init_lock():
+            self._snapshot = get_shared_snapshot(self.namespace)
+
+    # --------------------------------------------------------------------------------
+    # Internal helper methods
+    # --------------------------------------------------------------------------------
+
+    def _reset(self):
+        self._node_ids: list[str | None] = []
+        self._node_slot: dict[str, int] = {}
+        self._node_props = _Columns()
+        self._degree = np.zeros(0, dtype=np.int32)
+        self._edge_src = np.zeros(0, dtype=np.int32)
+        self._edge_dst = np.zeros(0, dtype=np.int32)
+        self._edge_live = np.zeros(0, dtype=bool)
+        self._edge_count = 0
+        self._edge_slot: dict[int, int] = {}
+        self._edge_props = _Columns()
+        self._csr: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+
+    def _load(self):
+        self._reset()
+        if os.path.exists(self._file_name):
+            with open(self._file_name, "rb") as f:
+                self._restore(pickle.load(f))
+            logger.info(
+                f"Loaded graph from {self._file_name} with {len(self._node_slot)} nodes, {len(self._edge_slot)} edges"
+            )
+        else:
+            self._import_networkx()
+
+    def _import_networkx(self):
+        """Import the graph NetworkXStorage persisted for this namespace, if any"""
+        from .networkx_impl import NetworkXStorage
+
+        working_dir = self.global_config["working_dir"]
+        if not any(
+            os.path.exists(os.path.join(working_dir, f"graph_{self.namespace}.{ext}"))
+            for ext in ("snapshot", "journal", "graphml")
+        ):
+            logger.info("Created new empty graph")
+            return
+        graph = NetworkXStorage(
+            namespace=self.namespace,
+            global_config=self.global_config,
+            embedding_func=None,
+        )._graph
+        for node_id, node_data in graph.nodes(data=True):
+            self._upsert_node(str(node_id), node_data)
+        for source, target, edge_data in graph.edges(data=True):
+            self._upsert_edge(str(source), str(target), edge_data)
+        logger.info(
+            f"Imported NetworkX graph {self.namespace} with {len(self._node_slot)} nodes, {len(self._edge_slot)} edges"
+        )
+        self._write_file(self._state())
+
+    def _state(self) -> dict[str, Any]:
+        """Compacted state without the slots of deleted nodes and edges"""
+        node_rows = np.array(
+            [
+                slot
+                for slot, node_id in enumerate(self._node_ids)
+                if node_id is not None
+            ],
+            dtype=np.int64,
+        )
+        new_slot = np.full(len(self._node_ids), -1, dtype=np.int32)
+        new_slot[node_rows] = np.arange(len(node_rows), dtype=np.int32)
+        edge_rows = np.nonzero(self._edge_live[: self._edge_count])[0]
+        return {
+            "version": _FORMAT_VERSION,
+            "node_ids": [self._node_ids[slot] for slot in node_rows.tolist()],
+            "node_props": self._node_props.take(node_rows),
+            "edge_src": new_slot[self._edge_src[edge_rows]],
+            "edge_dst": new_slot[self._edge_dst[edge_rows]],
+            "edge_props": self._edge_props.take(edge_rows),
+        }
+
+    def _restore(self, state: dict[str, Any]):
+        if state.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph file format in {self._file_name}")
+        self._reset()
+        self._node_ids = list(state["node_ids"])
+        self._node_slot = {node_id: slot for slot, node_id in enumerate(self._node_ids)}
+        self._node_props = _Columns(state["node_props"], len(self._node_ids))
+        edge_count = len(state["edge_src"])
+        self._edge_src = state["edge_src"].astype(np.int32)
+        self._edge_dst = state["edge_dst"].astype(np.int32)
+        self._edge_live = np.ones(edge_count, dtype=bool)
+        self._edge_count = edge_count
+        self._edge_props = _Columns(state["edge_props"], edge_count)
+        self._edge_slot = dict(
+            zip(
+                self._edge_keys(self._edge_src, self._edge_dst).tolist(),
+                range(edge_count),
+            )
+        )
+        self._degree = np.bincount(
+            np.concatenate([self._edge_src, self._edge_dst]),
+            minlength=len(self._node_ids),
+        ).astype(np.int32)
+
+    def _write_file(self, state: dict[str, Any]) -> bytes:
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_file = f"{self._file_name}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self._file_name)
+        return data
+
+    def _reload(self):
+        """Load the graph persisted by another process"""
+        buffer = self._snapshot.buffer() if self._snapshot is not None else None
+        if buffer is not None:
+            self._restore(pickle.loads(buffer))
+        else:
+            self._load()
+
+    @staticmethod
+    def _edge_keys(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        low = np.minimum(src, dst).astype(np.int64)
+        high = np.maximum(src, dst).astype(np.int64)
+        return (low << 32) | high
+
+    @staticmethod
+    def _edge_key(src: int, dst: int) -> int:
+        return (min(src, dst) << 32) | max(src, dst)
+
+    def _slots(self, node_ids: list[str]) -> np.ndarray:
+        """Slots of the node ids, -1 for unknown ones"""
+        return np.fromiter(
+            (self._node_slot.get(node_id, -1) for node_id in node_ids),
+            dtype=np.int64,
+            count=len(node_ids),
+        )
+
+    def _degrees(self, slots: np.ndarray) -> np.ndarray:
+        """Degrees of the given slots, 0 for unknown nodes"""
+        degrees = np.zeros(len(slots), dtype=np.int64)
+        known = slots >= 0
+        degrees[known] = self._degree[slots[known]]
+        return degrees
+
+    def _adjacency(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Row pointers, neighbor slots and edge slots of the CSR adjacency"""
+        if self._csr is None:
+            edges = np.nonzero(self._edge_live[: self._edge_count])[0]
+            src, dst = self._edge_src[edges], self._edge_dst[edges]
+            # A self loop is listed once in the adjacency of its node
+            both_ways = src != dst
+            heads = np.concatenate([src, dst[both_ways]])
+            order = np.argsort(heads, kind="stable")
+            neighbors = np.concatenate([dst, src[both_ways]])[order]
+            edge_ids = np.concatenate([edges, edges[both_ways]])[order]
+            indptr = np.zeros(len(self._node_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(heads, minlength=len(self._node_ids)), out=indptr[1:])
+            self._csr = (indptr, neighbors, edge_ids)
+        return self._csr
+
+    def _neighbors(self, slots: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Neighbor slots of the given nodes and the index of the node each belongs to"""
+        indptr, neighbors, _ = self._adjacency()
+        starts, ends = indptr[slots], indptr[slots + 1]
+        counts = ends - starts
+        owner = np.repeat(np.arange(len(slots)), counts)
+        positions = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        return neighbors[starts[owner] + positions], owner
+
+    def _upsert_node(self, node_id: str, node_data: dict[str, Any]) -> int:
+        slot = self._node_slot.get(node_id)
+        if slot is None:
+            slot = len(self._node_ids)
+            self._node_ids.append(node_id)
+            self._node_slot[node_id] = slot
+            self._node_props.add_row()
+            self._degree = _grow(self._degree, slot + 1)
+            self._csr = None
+        self._node_props.update(slot, node_data)
+        return slot
+
+    def _upsert_edge(self, source: str, target: str, edge_data: dict[str, Any]):
+        # Like NetworkX, an edge creates missing endpoints
+        src = self._upsert_node(source, {})
+        dst = self._upsert_node(target, {})
+        key = self._edge_key(src, dst)
+        slot = self._edge_slot.get(key)
+        if slot is None:
+            slot = self._edge_count
+            self._edge_src = _grow(self._edge_src, slot + 1)
+            self._edge_dst = _grow(self._edge_dst, slot + 1)
+            self._edge_live = _grow(self._edge_live, slot + 1)
+            self._edge_src[slot], self._edge_dst[slot] = src, dst
+            self._edge_live[slot] = True
+            self._edge_count += 1
+            self._edge_slot[key] = slot
+            self._edge_props.add_row()
+            self._degree[src] += 1
+            self._degree[dst] += 1
+            self._csr = None
+        self._edge_props.update(slot, edge_data)
+
+    def _remove_edge_slots(self, slots: np.ndarray):
+        if not len(slots):
+            return
+        src, dst = self._edge_src[slots], self._edge_dst[slots]
+        self._edge_live[slots] = False
+        np.subtract.at(self._degree, src, 1)
+        np.subtract.at(self._degree, dst, 1)
+        for key, slot in zip(self._edge_keys(src, dst).tolist(), slots.tolist()):
+            del self._edge_slot[key]
+            self._edge_props.clear(slot)
+        self._csr = None
+
+    def _remove_nodes(self, node_ids: list[str]) -> int:
+        slots = self._slots(node_ids)
+        slots = np.unique(slots[slots >= 0])
+        if not len(slots):
+            return 0
+        live = self._edge_live[: self._edge_count]
+        incident = live & (
+            np.isin(self._edge_src[: self._edge_count], slots)
+            | np.isin(self._edge_dst[: self._edge_count], slots)
+        )
+        self._remove_edge_slots(np.nonzero(incident)[0])
+        for slot in slots.tolist():
+            del self._node_slot[self._node_ids[slot]]
+            self._node_ids[slot] = None
+            self._node_props.clear(slot)
+        self._csr = None
+        return len(slots)
+
+    def _edge_slot_of(self, source: str, target: str) -> int | None:
+        src, dst = self._node_slot.get(source), self._node_slot.get(target)
+        if src is None or dst is None:
+            return None
+        return self._edge_slot.get(self._edge_key(src, dst))
+
+    async def _check_reload(self):
+        """Check if the storage should be reloaded"""
+        # Readers share the lock, a reload needs it exclusively
+        async with self._storage_lock.reader():
+            if not self.storage_updated.value:
+                return
+        async with self._storage_lock:
+            # Check if data needs to be reloaded
+            if self.storage_updated.value:
+                logger.info(
+                    f"Process {os.getpid()} reloading graph {self.namespace} due to update by another process"
+                )
+                self._reload()
+                # Reset update flag
+                self.storage_updated.value = False
+
+    # --------------------------------------------------------------------------------
+    # BaseGraphStorage
+    # --------------------------------------------------------------------------------
+
+    async def has_node(self, node_id: str) -> bool:
+        await self._check_reload()
+        return node_id in self._node_slot
+
+    async def has_edge(self, source_node_id: str, target_node_id: str) -> bool:
+        await self._check_reload()
+        return self._edge_slot_of(source_node_id, target_node_id) is not None
+
+    async def get_node(self, node_id: str) -> dict[str, str] | None:
+        await self._check_reload()
+        slot = self._node_slot.get(node_id)
+        return self._node_props.get(slot) if slot is not None else None
+
+    async def node_degree(self, node_id: str) -> int:
+        await self._check_reload()
+        slot = self._node_slot.get(node_id)
+        return int(self._degree[slot]) if slot is not None else 0
+
+    async def edge_degree(self, src_id: str, tgt_id: str) -> int:
+        return await self.node_degree(src_id) + await self.node_degree(tgt_id)
+
+    async def get_edge(
+        self, source_node_id: str, target_node_id: str
+    ) -> dict[str, str] | None:
+        await self._check_reload()
+        slot = self._edge_slot_of(source_node_id, target_node_id)
+        return self._edge_props.get(slot) if slot is not None else None
+
+    async def get_node_edges(self, source_node_id: str) -> list[tuple[str, str]] | None:
+        await self._check_reload()
+        slot = self._node_slot.get(source_node_id)
+        if slot is None:
+            return None
+        indptr, neighbors, _ = self._adjacency()
+        return [
+            (source_node_id, self._node_ids[neighbor])
+            for neighbor in neighbors[indptr[slot] : indptr[slot + 1]].tolist()
+        ]
+
+    async def get_nodes_batch(self, node_ids: list[str]) -> dict[str, dict]:
+        await self._check_reload()
+        result = {}
+        for node_id in node_ids:
+            slot = self._node_slot.get(node_id)
+            if slot is not None:
+                result[node_id] = self._node_props.get(slot)
+        return result
+
+    async def node_degrees_batch(self, node_ids: list[str]) -> dict[str, int]:
+        await self._check_reload()
+        slots = self._slots(node_ids)
+        degrees = self._degrees(slots)
+        return dict(zip(node_ids, degrees.tolist()))
+
+    async def edge_degrees_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], int]:
+        await self._check_reload()
+        if not edge_pairs:
+            return {}
+        src = self._slots([src_id for src_id, _ in edge_pairs])
+        dst = self._slots([tgt_id for _, tgt_id in edge_pairs])
+        degrees = self._degrees(src) + self._degrees(dst)
+        return dict(zip(edge_pairs, degrees.tolist()))
+
+    async def get_edges_batch(
+        self, pairs: list[dict[str, str]]
+    ) -> dict[tuple[str, str], dict]:
+        await self._check_reload()
+        result = {}
+        for pair in pairs:
+            slot = self._edge_slot_of(pair["src"], pair["tgt"])
+            if slot is not None:
+                result[(pair["src"], pair["tgt"])] = self._edge_props.get(slot)
+        return result
+
+    async def get_nodes_edges_batch(
+        self, node_ids: list[str]
+    ) -> dict[str, list[tuple[str, str]]]:
+        await self._check_reload()
+        result: dict[str, list[tuple[str, str]]] = {node_id: [] for node_id in node_ids}
+        slots = self._slots(node_ids)
+        known = np.nonzero(slots >= 0)[0]
+        neighbors, owner = self._neighbors(slots[known])
+        for index, neighbor in zip(known[owner].tolist(), neighbors.tolist()):
+            node_id = node_ids[index]
+            result[node_id].append((node_id, self._node_ids[neighbor]))
+        return result
+
+    async def upsert_node(self, node_id: str, node_data: dict[str, str]) -> None:
+        """
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+        """
+        await self._check_reload()
+        self._upsert_node(node_id, node_data)
+
+    async def upsert_edge(
+        self, source_node_id: str, target_node_id: str, edge_data: dict[str, str]
+    ) -> None:
+        """
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+        """
+        await self._check_reload()
+        self._upsert_edge(source_node_id, target_node_id, edge_data)
+
+    async def upsert_nodes(self, nodes: dict[str, dict[str, str]]) -> None:
+        await self._check_reload()
+        for node_id, node_data in nodes.items():
+            self._upsert_node(node_id, node_data)
+
+    async def upsert_edges(self, edges: dict[tuple[str, str], dict[str, str]]) -> None:
+        await self._check_reload()
+        for (source_node_id, target_node_id), edge_data in edges.items():
+            self._upsert_edge(source_node_id, target_node_id, edge_data)
+
+    async def delete_node(self, node_id: str) -> None:
+        """
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+        """
+        await self._check_reload()
+        if self._remove_nodes([node_id]):
+            logger.debug(f"Node {node_id} deleted from the graph.")
+        else:
+            logger.warning(f"Node {node_id} not found in the graph for deletion.")
+
+    async def remove_nodes(self, nodes: list[str]):
+        """Delete multiple nodes
+
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+
+        Args:
+            nodes: List of node IDs to be deleted
+        """
+        await self._check_reload()
+        self._remove_nodes(nodes)
+
+    async def remove_edges(self, edges: list[tuple[str, str]]):
+        """Delete multiple edges
+
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+
+        Args:
+            edges: List of edges to be deleted, each edge is a (source, target) tuple
+        """
+        await self._check_reload()
+        slots = {self._edge_slot_of(source, target) for source, target in edges}
+        slots.discard(None)
+        self._remove_edge_slots(np.array(sorted(slots), dtype=np.int64))
+
+    async def get_all_labels(self) -> list[str]:
+        """
+        Get all node labels in the graph
+        Returns:
+            [label1, label2, ...]  # Alphabetically sorted label list
+        """
+        await self._check_reload()
+        return sorted(self._node_slot)
+
+    def _top_degree_nodes(self, max_nodes: int) -> tuple[np.ndarray, bool]:
+        live = np.fromiter(self._node_slot.values(), dtype=np.int64)
+        if len(live) <= max_nodes:
+            order = np.argsort(-self._degree[live], kind="stable")
+            return live[order], False
+        degrees = self._degree[live]
+        top = np.argpartition(-degrees, max_nodes - 1)[:max_nodes]
+        top = top[np.argsort(-degrees[top], kind="stable")]
+        return live[top], True
+
+    def _bfs(
+        self, start: int, max_depth: int, max_nodes: int
+    ) -> tuple[np.ndarray, bool]:
+        """Breadth-first search visiting the nodes of each depth by descending degree"""
+        visited = np.zeros(len(self._node_ids), dtype=bool)
+        visited[start] = True
+        found = [np.array([start], dtype=np.int64)]
+        total = 1
+        frontier = found[0]
+        for _ in range(max_depth):
+            if total >= max_nodes or not len(frontier):
+                break
+            neighbors, _ = self._neighbors(frontier)
+            # First occurrence order, then the highest degrees first
+            neighbors, first = np.unique(neighbors, return_index=True)
+            neighbors = neighbors[np.argsort(first, kind="stable")]
+            neighbors = neighbors[~visited[neighbors]]
+            neighbors = neighbors[np.argsort(-self._degree[neighbors], kind="stable")]
+            if total + len(neighbors) > max_nodes:
+                found.append(neighbors[: max_nodes - total])
+                return np.concatenate(found), True
+            visited[neighbors] = True
+            found.append(neighbors)
+            total += len(neighbors)
+            frontier = neighbors
+        return np.concatenate(found), False
+
+    async def get_knowledge_graph(
+        self,
+        node_label: str,
+        max_depth: int = 3,
+        max_nodes: int = MAX_GRAPH_NODES,
+    ) -> KnowledgeGraph:
+        """
+        Retrieve a connected subgraph of nodes where the label includes the specified `node_label`.
+
+        Args:
+            node_label: Label of the starting node，* means all nodes
+            max_depth: Maximum depth of the subgraph, Defaults to 3
+            max_nodes: Maxiumu nodes to return by BFS, Defaults to 1000
+
+        Returns:
+            KnowledgeGraph object containing nodes and edges, with an is_truncated flag
+            indicating whether the graph was truncated due to max_nodes limit
+        """
+        await self._check_reload()
+        result = KnowledgeGraph()
+
+        if node_label == "*":
+            slots, result.is_truncated = self._top_degree_nodes(max_nodes)
+            if result.is_truncated:
+                logger.info(
+                    f"Graph truncated: {len(self._node_slot)} nodes found, limited to {max_nodes}"
+                )
+        else:
+            start = self._node_slot.get(node_label)
+            if start is None:
+                logger.warning(f"Node {node_label} not found in the graph")
+                return KnowledgeGraph()  # Return empty graph
+            slots, result.is_truncated = self._bfs(start, max_depth, max_nodes)
+            if result.is_truncated:
+                logger.info(
+                    f"Graph truncated: breadth-first search limited to {max_nodes} nodes"
+                )
+
+        for slot in slots.tolist():
+            node_id = self._node_ids[slot]
+            result.nodes.append(
+                KnowledgeGraphNode(
+                    id=node_id,
+                    labels=[node_id],
+                    properties=self._node_props.get(slot),
+                )
+            )
+
+        # Edges with both endpoints in the subgraph
+        selected = np.zeros(len(self._node_ids), dtype=bool)
+        selected[slots] = True
+        src = self._edge_src[: self._edge_count]
+        dst = self._edge_dst[: self._edge_count]
+        edges = np.nonzero(
+            self._edge_live[: self._edge_count] & selected[src] & selected[dst]
+        )[0]
+        for slot, source_slot, target_slot in zip(
+            edges.tolist(), src[edges].tolist(), dst[edges].tolist()
+        ):
+            source, target = self._node_ids[source_slot], self._node_ids[target_slot]
+            # Esure unique edge_id for undirect graph
+            if source > target:
+                source, target = target, source
+            result.edges.append(
+                KnowledgeGraphEdge(
+                    id=f"{source}-{target}",
+                    type="DIRECTED",
+                    source=source,
+                    target=target,
+                    properties=self._edge_props.get(slot),
+                )
+            )
+
+        logger.info(
+            f"Subgraph query successful | Node count: {len(result.nodes)} | Edge count: {len(result.edges)}"
+        )
+        return result
+
+    async def index_done_callback(self) -> bool:
+        """Save data to disk"""
+        async with self._storage_lock:
+            # Check if storage was updated by another process
+            if self.storage_updated.value:
+                # Storage was updated by another process, reload data instead of saving
+                logger.info(
+                    f"Graph for {self.namespace} was updated by another process, reloading..."
+                )
+                self._reload()
+                # Reset update flag
+                self.storage_updated.value = False
+                return False  # Return error
+
+            try:
+                logger.info(
+                    f"Writing graph with {len(self._node_slot)} nodes, {len(self._edge_slot)} edges"
+                )
+                state = self._state()
+                data = self._write_file(state)
+                if len(self._node_slot) < len(self._node_ids) or (
+                    len(self._edge_slot) < self._edge_count
+                ):
+                    # Continue from the compacted slots, like a freshly loaded graph
+                    self._restore(state)
+                if self._snapshot is not None:
+                    self._snapshot.publish([data])
+                # Notify other processes that data has been updated
+                await set_all_update_flags(self.namespace)
+                # Reset own update flag to avoid self-reloading
+                self.storage_updated.value = False
+                return True  # Return success
+            except Exception as e:
+                logger.error(f"Error saving graph for {self.namespace}: {e}")
+                return False  # Return error
+
+    async def drop(self) -> dict[str, str]:
+        """Drop all graph data from storage and clean up resources
+
+        This method will:
+        1. Reset the graph to an empty state
+        2. Persist the empty graph immediately
+        3. Update flags to notify other processes
+
+        Returns:
+            dict[str, str]: Operation status and message
+            - On success: {"status": "success", "message": "data dropped"}
+            - On failure: {"status": "error", "message": "<error details>"}
+        """
+        try:
+            async with self._storage_lock:
+                self._reset()
+                data = self._write_file(self._state())
+                if self._snapshot is not None:
+                    self._snapshot.publish([data])
+                # Notify other processes that data has been updated
+                await set_all_update_flags(self.namespace)
+                # Reset own update flag to avoid self-reloading
+                self.storage_updated.value = False
+                logger.info(
+                    f"Process {os.getpid()} drop graph {self.namespace} (file:{self._file_name})"
+                )
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"Error dropping graph {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
@@ -12,7 +12,7 @@ from lightrag.utils import logger, compute_mdhash_id
 from lightrag.base import BaseVectorStorage
 
 from .shared_storage import (
-    get_storage_lock,
+    get_namespace_lock,
     get_update_flag,
     set_all_update_flags,
 )
@@ -25,6 +25,8 @@ FAISS_PACKAGE = "faiss-gpu" if USE_GPU else "faiss-cpu"
 if not pm.is_installed(FAISS_PACKAGE):
     pm.install(FAISS_PACKAGE)
 
+FAISS_INDEX_TYPES = ("flat", "ivf", "hnsw")
+
 
 @final
 @dataclass
@@ -32,6 +34,20 @@ class FaissVectorDBStorage(BaseVectorStorage):
     """
     A Faiss-based Vector DB Storage for LightRAG.
     Uses cosine similarity by storing normalized vectors in a Faiss index with inner product search.
+
+    Vectors live in one contiguous float32 array of slots. The slot number of a
+    record is also its id inside the ID-mapped Faiss index, and a reverse map
+    from custom id to slot makes lookups, upserts and deletions O(1) per record.
+    Freed slots are reused by later inserts.
+
+    The index type is read from `faiss_index_type` in vector_db_storage_cls_kwargs
+    (or the FAISS_INDEX_TYPE env var):
+        - "flat": exact search, vectors are removed in place (default)
+        - "ivf": inverted lists, trained once enough vectors exist (`faiss_nlist`,
+          `faiss_nprobe`); exact flat search is used until then
+        - "hnsw": graph based search (`faiss_hnsw_m`, `faiss_ef_search`); HNSW does
+          not support removal, so the index is rebuilt from the vector array
+          before the next search after records were replaced or deleted
     """
 
     def __post_init__(self):
@@ -44,36 +60,137 @@ class FaissVectorDBStorage(BaseVectorStorage):
             )
         self.cosine_better_than_threshold = cosine_threshold
 
+        self._index_type = kwargs.get(
+            "faiss_index_type", os.getenv("FAISS_INDEX_TYPE", "flat")
+        ).lower()
+        if self._index_type not in FAISS_INDEX_TYPES:
+            raise ValueError(
+                f"Unknown faiss_index_type '{self._index_type}', expected one of {FAISS_INDEX_TYPES}"
+            )
+        self._nlist = int(kwargs.get("faiss_nlist", 100))
+        self._nprobe = int(kwargs.get("faiss_nprobe", 10))
+        self._hnsw_m = int(kwargs.get("faiss_hnsw_m", 32))
+        self._ef_search = int(kwargs.get("faiss_ef_search", 64))
+
         # Where to save index file if you want persistent storage
         self._faiss_index_file = os.path.join(
             self.global_config["working_dir"], f"faiss_index_{self.namespace}.index"
         )
         self._meta_file = self._faiss_index_file + ".meta.json"
+        self._vectors_file = self._faiss_index_file + ".vectors.npy"
 
         self._max_batch_size = self.global_config["embedding_batch_num"]
         # Embedding dimension (e.g. 768) must match your embedding function
         self._dim = self.embedding_func.embedding_dim
 
-        # Create an empty Faiss index for inner product (useful for normalized vectors = cosine similarity).
-        # If you have a large number of vectors, you might want IVF or other indexes.
-        # For demonstration, we use a simple IndexFlatIP.
-        self._index = faiss.IndexFlatIP(self._dim)
-        # Keep a local store for metadata, IDs, etc.
-        # Maps <int faiss_id> → metadata (including your original ID).
-        self._id_to_meta = {}
-
+        self._reset()
         self._load_faiss_index()
 
+    def _reset(self):
+        """Reset the in-memory index and its bookkeeping to an empty state"""
+        # Normalized vectors, row i holds the vector of slot i
+        self._vectors = np.empty((0, self._dim), dtype=np.float32)
+        # Custom id stored in each slot, None for free slots
+        self._slot_ids: list[str | None] = []
+        self._free_slots: list[int] = []
+        # Maps <custom id> → slot and <custom id> → metadata
+        self._slot_of: dict[str, int] = {}
+        self._id_to_meta: dict[str, dict[str, Any]] = {}
+        self._index = self._new_index(trained=False)
+        self._needs_rebuild = False
+
+    def _new_index(self, trained: bool):
+        """Create an empty ID-mapped index of the configured type.
+
+        Args:
+            trained: Whether enough vectors exist to train an IVF index
+        """
+        if self._index_type == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(
+                self._dim, self._hnsw_m, faiss.METRIC_INNER_PRODUCT
+            )
+            hnsw.hnsw.efSearch = self._ef_search
+            return faiss.IndexIDMap2(hnsw)
+        if self._index_type == "ivf" and trained:
+            quantizer = faiss.IndexFlatIP(self._dim)
+            ivf = faiss.IndexIVFFlat(
+                quantizer, self._dim, self._nlist, faiss.METRIC_INNER_PRODUCT
+            )
+            ivf.nprobe = self._nprobe
+            return ivf
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self._dim))
+
+    def _ivf_trainable(self) -> bool:
+        # Faiss needs around 39 training points per inverted list
+        return self._index_type == "ivf" and len(self._slot_of) >= 39 * self._nlist
+
+    def _is_ivf(self) -> bool:
+        return isinstance(self._index, faiss.IndexIVF)
+
+    def _rebuild_index(self):
+        """Rebuild the Faiss index from the contiguous vector array"""
+        slots = np.fromiter(
+            self._slot_of.values(), dtype=np.int64, count=len(self._slot_of)
+        )
+        slots.sort()
+        trained = self._ivf_trainable()
+        index = self._new_index(trained=trained)
+        if len(slots):
+            vectors = self._vectors[slots]
+            if trained:
+                index.train(vectors)
+            index.add_with_ids(vectors, slots)
+        self._index = index
+        self._needs_rebuild = False
+
+    def _allocate_slots(self, count: int) -> np.ndarray:
+        """Take free slots first, then grow the vector array geometrically"""
+        reused = [
+            self._free_slots.pop() for _ in range(min(count, len(self._free_slots)))
+        ]
+        start = len(self._slot_ids)
+        new_count = count - len(reused)
+        if new_count:
+            self._slot_ids.extend([None] * new_count)
+            needed = len(self._slot_ids)
+            if needed > self._vectors.shape[0]:
+                grown = np.empty(
+                    (max(needed, 2 * self._vectors.shape[0], 1024), self._dim),
+                    dtype=np.float32,
+                )
+                grown[:start] = self._vectors[:start]
+                self._vectors = grown
+        return np.array(reused + list(range(start, start + new_count)), dtype=np.int64)
+
+    def _remove_slots(self, slots: list[int]):
+        """Free slots and remove their vectors from the index"""
+        if not slots:
+            return
+        for slot in slots:
+            custom_id = self._slot_ids[slot]
+            self._slot_ids[slot] = None
+            self._slot_of.pop(custom_id, None)
+            self._id_to_meta.pop(custom_id, None)
+            self._free_slots.append(slot)
+
+        if self._index_type == "hnsw":
+            self._needs_rebuild = True
+        else:
+            self._index.remove_ids(np.array(slots, dtype=np.int64))
+
     async def initialize(self):
         """Initialize storage data"""
         # Get the update flag for cross-process update notification
         self.storage_updated = await get_update_flag(self.namespace)
         # Get the storage lock for use in other methods
-        self._storage_lock = get_storage_lock()
+        self._storage_lock = get_namespace_lock(self.namespace)
 
     async def _get_index(self):
         """Check if the shtorage should be reloaded"""
-        # Acquire lock to prevent concurrent read and write
+        # Readers share the lock, reloading or rebuilding the index needs it exclusively
+        async with self._storage_lock.reader():
+            if not self.storage_updated.value and not self._needs_rebuild:
+                return self._index
         async with self._storage_lock:
             # Check if storage was updated by another process
             if self.storage_updated.value:
@@ -81,10 +198,11 @@ class FaissVectorDBStorage(BaseVectorStorage):
                     f"Process {os.getpid()} FAISS reloading {self.namespace} due to update by another process"
                 )
                 # Reload data
-                self._index = faiss.IndexFlatIP(self._dim)
-                self._id_to_meta = {}
+                self._reset()
                 self._load_faiss_index()
                 self.storage_updated.value = False
+            if self._needs_rebuild:
+                self._rebuild_index()
             return self._index
 
     async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
@@ -138,33 +256,34 @@ class FaissVectorDBStorage(BaseVectorStorage):
             return []
 
         # Convert to float32 and normalize embeddings for cosine similarity (in-place)
-        embeddings = embeddings.astype(np.float32)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
         faiss.normalize_L2(embeddings)
 
-        # Upsert logic:
-        # 1. Identify which vectors to remove if they exist
-        # 2. Remove them
-        # 3. Add the new vectors
-        existing_ids_to_remove = []
-        for meta, emb in zip(list_data, embeddings):
-            faiss_internal_id = self._find_faiss_id_by_custom_id(meta["__id__"])
-            if faiss_internal_id is not None:
-                existing_ids_to_remove.append(faiss_internal_id)
-
-        if existing_ids_to_remove:
-            await self._remove_faiss_ids(existing_ids_to_remove)
-
-        # Step 2: Add new vectors
-        index = await self._get_index()
-        start_idx = index.ntotal
-        index.add(embeddings)
-
-        # Step 3: Store metadata + vector for each new ID
-        for i, meta in enumerate(list_data):
-            fid = start_idx + i
-            # Store the raw vector so we can rebuild if something is removed
-            meta["__vector__"] = embeddings[i].tolist()
-            self._id_to_meta.update({fid: meta})
+        await self._get_index()
+        async with self._storage_lock:
+            # Upsert logic:
+            # 1. Free the slots of records that already exist
+            # 2. Write the new vectors into (possibly reused) slots
+            # 3. Add them to the index under their slot ids
+            existing_slots = [
+                self._slot_of[meta["__id__"]]
+                for meta in list_data
+                if meta["__id__"] in self._slot_of
+            ]
+            self._remove_slots(existing_slots)
+
+            slots = self._allocate_slots(len(list_data))
+            self._vectors[slots] = embeddings
+            for slot, meta in zip(slots.tolist(), list_data):
+                self._slot_ids[slot] = meta["__id__"]
+                self._slot_of[meta["__id__"]] = slot
+                self._id_to_meta[meta["__id__"]] = meta
+
+            if self._ivf_trainable() and not self._is_ivf():
+                # Enough vectors to train the inverted lists
+                self._needs_rebuild = True
+            if not self._needs_rebuild:
+                self._index.add_with_ids(embeddings, slots)
 
         logger.info(f"Upserted {len(list_data)} vectors into Faiss index.")
         return [m["__id__"] for m in list_data]
@@ -201,7 +320,8 @@ class FaissVectorDBStorage(BaseVectorStorage):
             if dist < self.cosine_better_than_threshold:
                 continue
 
-            meta = self._id_to_meta.get(idx, {})
+            custom_id = self._slot_ids[idx] if idx < len(self._slot_ids) else None
+            meta = self._id_to_meta.get(custom_id, {})
             results.append(
                 {
                     **meta,
@@ -214,7 +334,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
         return results
 
     @property
-    def client_storage(self):
+    async def client_storage(self):
         # Return whatever structure LightRAG might need for debugging
         return {"data": list(self._id_to_meta.values())}
 
@@ -228,14 +348,9 @@ class FaissVectorDBStorage(BaseVectorStorage):
            KG-storage-log should be used to avoid data corruption
         """
         logger.info(f"Deleting {len(ids)} vectors from {self.namespace}")
-        to_remove = []
-        for cid in ids:
-            fid = self._find_faiss_id_by_custom_id(cid)
-            if fid is not None:
-                to_remove.append(fid)
-
-        if to_remove:
-            await self._remove_faiss_ids(to_remove)
+        async with self._storage_lock:
+            to_remove = [self._slot_of[cid] for cid in ids if cid in self._slot_of]
+            self._remove_slots(to_remove)
         logger.debug(
             f"Successfully deleted {len(to_remove)} vectors from {self.namespace}"
         )
@@ -259,91 +374,103 @@ class FaissVectorDBStorage(BaseVectorStorage):
            KG-storage-log should be used to avoid data corruption
         """
         logger.debug(f"Searching relations for entity {entity_name}")
-        relations = []
-        for fid, meta in self._id_to_meta.items():
-            if meta.get("src_id") == entity_name or meta.get("tgt_id") == entity_name:
-                relations.append(fid)
+        relations = [
+            custom_id
+            for custom_id, meta in self._id_to_meta.items()
+            if meta.get("src_id") == entity_name or meta.get("tgt_id") == entity_name
+        ]
 
         logger.debug(f"Found {len(relations)} relations for {entity_name}")
         if relations:
-            await self._remove_faiss_ids(relations)
+            await self.delete(relations)
             logger.debug(f"Deleted {len(relations)} relations for {entity_name}")
 
     # --------------------------------------------------------------------------------
     # Internal helper methods
     # --------------------------------------------------------------------------------
 
-    def _find_faiss_id_by_custom_id(self, custom_id: str):
-        """
-        Return the Faiss internal ID for a given custom ID, or None if not found.
-        """
-        for fid, meta in self._id_to_meta.items():
-            if meta.get("__id__") == custom_id:
-                return fid
-        return None
-
-    async def _remove_faiss_ids(self, fid_list):
-        """
-        Remove a list of internal Faiss IDs from the index.
-        Because IndexFlatIP doesn't support 'removals',
-        we rebuild the index excluding those vectors.
-        """
-        keep_fids = [fid for fid in self._id_to_meta if fid not in fid_list]
-
-        # Rebuild the index
-        vectors_to_keep = []
-        new_id_to_meta = {}
-        for new_fid, old_fid in enumerate(keep_fids):
-            vec_meta = self._id_to_meta[old_fid]
-            vectors_to_keep.append(vec_meta["__vector__"])  # stored as list
-            new_id_to_meta[new_fid] = vec_meta
-
-        async with self._storage_lock:
-            # Re-init index
-            self._index = faiss.IndexFlatIP(self._dim)
-            if vectors_to_keep:
-                arr = np.array(vectors_to_keep, dtype=np.float32)
-                self._index.add(arr)
-
-            self._id_to_meta = new_id_to_meta
-
     def _save_faiss_index(self):
         """
-        Save the current Faiss index + metadata to disk so it can persist across runs.
+        Save the current Faiss index, the vector array and the metadata to disk
+        so they can persist across runs.
         """
+        if self._needs_rebuild:
+            self._rebuild_index()
         faiss.write_index(self._index, self._faiss_index_file)
-
-        # Save metadata dict to JSON. Convert all keys to strings for JSON storage.
-        # _id_to_meta is { int: { '__id__': doc_id, '__vector__': [float,...], ... } }
-        # We'll keep the int -> dict, but JSON requires string keys.
-        serializable_dict = {}
-        for fid, meta in self._id_to_meta.items():
-            serializable_dict[str(fid)] = meta
+        np.save(self._vectors_file, self._vectors[: len(self._slot_ids)])
+
+        # Metadata is keyed by custom id, with the slot of each record
+        serializable_dict = {
+            "index_type": self._index_type,
+            "data": {
+                custom_id: {**meta, "__slot__": self._slot_of[custom_id]}
+                for custom_id, meta in self._id_to_meta.items()
+            },
+        }
 
         with open(self._meta_file, "w", encoding="utf-8") as f:
             json.dump(serializable_dict, f)
 
+    def _load_legacy_meta(self, stored_dict: dict):
+        """Import metadata written by the list based format, which kept the raw
+        vector of every record in its metadata and needs a full rebuild."""
+        vectors = []
+        for slot, meta in enumerate(stored_dict.values()):
+            vectors.append(meta.pop("__vector__"))
+            self._slot_ids.append(meta["__id__"])
+            self._slot_of[meta["__id__"]] = slot
+            self._id_to_meta[meta["__id__"]] = meta
+        if vectors:
+            self._vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self._rebuild_index()
+        logger.info(
+            f"Faiss index rebuilt with {len(vectors)} vectors from legacy metadata {self._meta_file}"
+        )
+
     def _load_faiss_index(self):
         """
         Load the Faiss index + metadata from disk if it exists,
         and rebuild in-memory structures so we can query.
         """
-        if not os.path.exists(self._faiss_index_file):
+        if not os.path.exists(self._meta_file):
             logger.warning("No existing Faiss index file found. Starting fresh.")
             return
 
         try:
-            # Load the Faiss index
-            self._index = faiss.read_index(self._faiss_index_file)
-            # Load metadata
             with open(self._meta_file, "r", encoding="utf-8") as f:
                 stored_dict = json.load(f)
 
-            # Convert string keys back to int
-            self._id_to_meta = {}
-            for fid_str, meta in stored_dict.items():
-                fid = int(fid_str)
-                self._id_to_meta[fid] = meta
+            if "data" not in stored_dict or not os.path.exists(self._vectors_file):
+                self._load_legacy_meta(stored_dict)
+                return
+
+            self._vectors = np.ascontiguousarray(
+                np.load(self._vectors_file), dtype=np.float32
+            )
+            self._slot_ids = [None] * self._vectors.shape[0]
+            for custom_id, meta in stored_dict["data"].items():
+                slot = meta.pop("__slot__")
+                self._slot_ids[slot] = custom_id
+                self._slot_of[custom_id] = slot
+                self._id_to_meta[custom_id] = meta
+            self._free_slots = [
+                slot
+                for slot, custom_id in enumerate(self._slot_ids)
+                if custom_id is None
+            ]
+
+            # Load the Faiss index, rebuild it when it does not match the vectors
+            index = None
+            if stored_dict.get("index_type") == self._index_type and os.path.exists(
+                self._faiss_index_file
+            ):
+                index = faiss.read_index(self._faiss_index_file)
+            if index is None or index.ntotal != len(self._slot_of):
+                self._rebuild_index()
+            else:
+                self._index = index
+                if self._is_ivf():
+                    self._index.nprobe = self._nprobe
 
             logger.info(
                 f"Faiss index loaded with {self._index.ntotal} vectors from {self._faiss_index_file}"
@@ -351,8 +478,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
         except Exception as e:
             logger.error(f"Failed to load Faiss index or metadata: {e}")
             logger.warning("Starting with an empty Faiss index.")
-            self._index = faiss.IndexFlatIP(self._dim)
-            self._id_to_meta = {}
+            self._reset()
 
     async def index_done_callback(self) -> None:
         async with self._storage_lock:
@@ -362,8 +488,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
                 logger.warning(
                     f"Storage for FAISS {self.namespace} was updated by another process, reloading..."
                 )
-                self._index = faiss.IndexFlatIP(self._dim)
-                self._id_to_meta = {}
+                self._reset()
                 self._load_faiss_index()
                 self.storage_updated.value = False
                 return False  # Return error
@@ -395,10 +520,10 @@ class FaissVectorDBStorage(BaseVectorStorage):
         matching_records = []
 
         # Search for records with IDs starting with the prefix
-        for faiss_id, meta in self._id_to_meta.items():
-            if "__id__" in meta and meta["__id__"].startswith(prefix):
+        for custom_id, meta in self._id_to_meta.items():
+            if custom_id.startswith(prefix):
                 # Create a copy of all metadata and add "id" field
-                record = {**meta, "id": meta["__id__"]}
+                record = {**meta, "id": custom_id}
                 matching_records.append(record)
 
         logger.debug(f"Found {len(matching_records)} records with prefix '{prefix}'")
@@ -413,13 +538,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
         Returns:
             The vector data if found, or None if not found
         """
-        # Find the Faiss internal ID for the custom ID
-        fid = self._find_faiss_id_by_custom_id(id)
-        if fid is None:
-            return None
-
-        # Get the metadata for the found ID
-        metadata = self._id_to_meta.get(fid, {})
+        metadata = self._id_to_meta.get(id)
         if not metadata:
             return None
 
@@ -439,11 +558,9 @@ class FaissVectorDBStorage(BaseVectorStorage):
 
         results = []
         for id in ids:
-            fid = self._find_faiss_id_by_custom_id(id)
-            if fid is not None:
-                metadata = self._id_to_meta.get(fid, {})
-                if metadata:
-                    results.append({**metadata, "id": metadata.get("__id__")})
+            metadata = self._id_to_meta.get(id)
+            if metadata:
+                results.append({**metadata, "id": metadata.get("__id__")})
 
         return results
 
@@ -465,18 +582,17 @@ class FaissVectorDBStorage(BaseVectorStorage):
         """
         try:
             async with self._storage_lock:
-                # Reset the index
-                self._index = faiss.IndexFlatIP(self._dim)
-                self._id_to_meta = {}
-
                 # Remove storage files if they exist
-                if os.path.exists(self._faiss_index_file):
-                    os.remove(self._faiss_index_file)
-                if os.path.exists(self._meta_file):
-                    os.remove(self._meta_file)
+                for file_name in (
+                    self._faiss_index_file,
+                    self._meta_file,
+                    self._vectors_file,
+                ):
+                    if os.path.exists(file_name):
+                        os.remove(file_name)
 
-                self._id_to_meta = {}
-                self._load_faiss_index()
+                # Reset the index
+                self._reset()
 
                 # Notify other processes
                 await set_all_update_flags(self.namespace)
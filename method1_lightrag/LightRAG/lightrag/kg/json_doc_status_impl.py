@@ -1,4 +1,7 @@
+import bisect
 from dataclasses import dataclass
+import heapq
+from itertools import islice
 import os
 from typing import Any, Union, final
 
@@ -6,6 +9,9 @@ from lightrag.base import (
     DocProcessingStatus,
     DocStatus,
     DocStatusStorage,
+    decode_doc_cursor,
+    doc_order_key,
+    encode_doc_cursor,
 )
 from lightrag.utils import (
     load_json,
@@ -14,7 +20,7 @@ from lightrag.utils import (
 )
 from .shared_storage import (
     get_namespace_data,
-    get_storage_lock,
+    get_namespace_lock,
     get_data_init_lock,
     get_update_flag,
     set_all_update_flags,
@@ -23,10 +29,29 @@ from .shared_storage import (
 )
 
 
+def _status_value(status: Any) -> str:
+    # Upserted records hold the enum until they are reloaded from the file,
+    # and the enum does not hash like its value
+    return status.value if isinstance(status, DocStatus) else status
+
+
+def _keys_after(keys: list[tuple[str, str]], after: tuple[str, str] | None):
+    start = bisect.bisect_right(keys, after) if after is not None else 0
+    return (keys[i] for i in range(start, len(keys)))
+
+
 @final
 @dataclass
 class JsonDocStatusStorage(DocStatusStorage):
-    """JSON implementation of document status storage"""
+    """JSON implementation of document status storage
+
+    Every process keeps an index of the documents by status: for each status
+    the sorted (created_at, doc id) keys of its documents. Status counts and
+    listings only touch the index and the listed records instead of scanning
+    all documents. Every change bumps a version in the shared namespace
+    `<namespace>_index`, a process rebuilds its index when it finds the
+    version changed by another process.
+    """
 
     def __post_init__(self):
         working_dir = self.global_config["working_dir"]
@@ -34,15 +59,20 @@ class JsonDocStatusStorage(DocStatusStorage):
         self._data = None
         self._storage_lock = None
         self.storage_updated = None
+        self._index_meta = None
+        self._index: dict[str, list[tuple[str, str]]] = {}
+        self._index_entries: dict[str, tuple[str, tuple[str, str]]] = {}
+        self._index_version = -1
 
     async def initialize(self):
         """Initialize storage data"""
-        self._storage_lock = get_storage_lock()
+        self._storage_lock = get_namespace_lock(self.namespace)
         self.storage_updated = await get_update_flag(self.namespace)
         async with get_data_init_lock():
             # check need_init must before get_namespace_data
             need_init = await try_initialize_namespace(self.namespace)
             self._data = await get_namespace_data(self.namespace)
+            self._index_meta = await get_namespace_data(f"{self.namespace}_index")
             if need_init:
                 loaded_data = load_json(self._file_name) or {}
                 async with self._storage_lock:
@@ -53,48 +83,116 @@ class JsonDocStatusStorage(DocStatusStorage):
 
     async def filter_keys(self, keys: set[str]) -> set[str]:
         """Return keys that should be processed (not in storage or not successfully processed)"""
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             return set(keys) - set(self._data.keys())
 
     async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
         result: list[dict[str, Any]] = []
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             for id in ids:
                 data = self._data.get(id, None)
                 if data:
                     result.append(data)
         return result
 
+    def _ensure_index(self) -> None:
+        """Rebuild the index if another process changed the data, call under the storage lock"""
+        version = self._index_meta.get("version", 0)
+        if version == self._index_version:
+            return
+        index: dict[str, list[tuple[str, str]]] = {
+            status.value: [] for status in DocStatus
+        }
+        entries = {}
+        for doc_id, doc in self._data.items():
+            key = doc_order_key(doc_id, doc.get("created_at"))
+            status = _status_value(doc["status"])
+            index.setdefault(status, []).append(key)
+            entries[doc_id] = (status, key)
+        for keys in index.values():
+            keys.sort()
+        self._index, self._index_entries = index, entries
+        self._index_version = version
+
+    def _index_remove(self, doc_id: str) -> None:
+        entry = self._index_entries.pop(doc_id, None)
+        if entry is not None:
+            status, key = entry
+            keys = self._index[status]
+            del keys[bisect.bisect_left(keys, key)]
+
+    def _index_add(self, doc_id: str, doc: dict[str, Any]) -> None:
+        key = doc_order_key(doc_id, doc.get("created_at"))
+        status = _status_value(doc["status"])
+        bisect.insort(self._index.setdefault(status, []), key)
+        self._index_entries[doc_id] = (status, key)
+
+    def _index_changed(self) -> None:
+        """Publish a change applied to the data and the local index"""
+        version = self._index_meta.get("version", 0) + 1
+        self._index_meta["version"] = version
+        self._index_version = version
+
+    def _doc_status(self, doc_id: str) -> DocProcessingStatus | None:
+        # Make a copy of the data to avoid modifying the original
+        data = dict(self._data[doc_id])
+        # If file_path is not in data, use document id as file path
+        if "file_path" not in data:
+            data["file_path"] = "no-file-path"
+        try:
+            return DocProcessingStatus(**data)
+        except (KeyError, TypeError) as e:
+            logger.error(f"Missing required field for document {doc_id}: {e}")
+            return None
+
+    def _doc_statuses(self, keys) -> dict[str, DocProcessingStatus]:
+        result = {}
+        for _, doc_id in keys:
+            doc = self._doc_status(doc_id)
+            if doc is not None:
+                result[doc_id] = doc
+        return result
+
     async def get_status_counts(self) -> dict[str, int]:
         """Get counts of documents in each status"""
-        counts = {status.value: 0 for status in DocStatus}
-        async with self._storage_lock:
-            for doc in self._data.values():
-                counts[doc["status"]] += 1
-        return counts
+        async with self._storage_lock.reader():
+            self._ensure_index()
+            return {status: len(keys) for status, keys in self._index.items()}
 
     async def get_docs_by_status(
         self, status: DocStatus
     ) -> dict[str, DocProcessingStatus]:
         """Get all documents with a specific status"""
-        result = {}
-        async with self._storage_lock:
-            for k, v in self._data.items():
-                if v["status"] == status.value:
-                    try:
-                        # Make a copy of the data to avoid modifying the original
-                        data = v.copy()
-                        # If content is missing, use content_summary as content
-                        if "content" not in data and "content_summary" in data:
-                            data["content"] = data["content_summary"]
-                        # If file_path is not in data, use document id as file path
-                        if "file_path" not in data:
-                            data["file_path"] = "no-file-path"
-                        result[k] = DocProcessingStatus(**data)
-                    except KeyError as e:
-                        logger.error(f"Missing required field for document {k}: {e}")
-                        continue
-        return result
+        async with self._storage_lock.reader():
+            self._ensure_index()
+            return self._doc_statuses(self._index.get(status.value, []))
+
+    async def get_docs_paginated(
+        self,
+        status: DocStatus | None = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> tuple[dict[str, DocProcessingStatus], str | None]:
+        after = decode_doc_cursor(cursor) if cursor is not None else None
+        async with self._storage_lock.reader():
+            self._ensure_index()
+            if status is not None:
+                keys = self._index.get(status.value, [])
+                start = offset
+                if after is not None:
+                    start += bisect.bisect_right(keys, after)
+                page = keys[start : start + limit + 1]
+            else:
+                # Merge the statuses, each starting after the cursor
+                merged = heapq.merge(
+                    *(_keys_after(keys, after) for keys in self._index.values())
+                )
+                page = list(islice(merged, offset, offset + limit + 1))
+            next_cursor = (
+                encode_doc_cursor(page[limit - 1]) if len(page) > limit else None
+            )
+            return self._doc_statuses(page[:limit]), next_cursor
 
     async def index_done_callback(self) -> None:
         async with self._storage_lock:
@@ -118,13 +216,18 @@ class JsonDocStatusStorage(DocStatusStorage):
             return
         logger.debug(f"Inserting {len(data)} records to {self.namespace}")
         async with self._storage_lock:
+            self._ensure_index()
             self._data.update(data)
+            for doc_id, doc in data.items():
+                self._index_remove(doc_id)
+                self._index_add(doc_id, doc)
+            self._index_changed()
             await set_all_update_flags(self.namespace)
 
         await self.index_done_callback()
 
     async def get_by_id(self, id: str) -> Union[dict[str, Any], None]:
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             return self._data.get(id)
 
     async def delete(self, doc_ids: list[str]) -> None:
@@ -141,13 +244,16 @@ class JsonDocStatusStorage(DocStatusStorage):
             None
         """
         async with self._storage_lock:
+            self._ensure_index()
             any_deleted = False
             for doc_id in doc_ids:
                 result = self._data.pop(doc_id, None)
                 if result is not None:
+                    self._index_remove(doc_id)
                     any_deleted = True
 
             if any_deleted:
+                self._index_changed()
                 await set_all_update_flags(self.namespace)
 
     async def drop(self) -> dict[str, str]:
@@ -166,6 +272,9 @@ class JsonDocStatusStorage(DocStatusStorage):
         try:
             async with self._storage_lock:
                 self._data.clear()
+                self._index = {status.value: [] for status in DocStatus}
+                self._index_entries = {}
+                self._index_changed()
                 await set_all_update_flags(self.namespace)
 
             await self.index_done_callback()
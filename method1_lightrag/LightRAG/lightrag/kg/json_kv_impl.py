@@ -12,13 +12,14 @@ from lightrag.utils import (
 )
 from .shared_storage import (
     get_namespace_data,
-    get_storage_lock,
+    get_namespace_lock,
     get_data_init_lock,
     get_update_flag,
     set_all_update_flags,
     clear_all_update_flags,
     try_initialize_namespace,
 )
+from .shared_memory import SharedKVSnapshot, get_shared_snapshot
 
 
 @final
@@ -30,12 +31,16 @@ class JsonKVStorage(BaseKVStorage):
         self._data = None
         self._storage_lock = None
         self.storage_updated = None
+        # Lookups are served from shared memory between persists in multiprocess mode
+        self._snapshot = None
 
     async def initialize(self):
         """Initialize storage data"""
-        self._storage_lock = get_storage_lock()
+        self._storage_lock = get_namespace_lock(self.namespace)
         self.storage_updated = await get_update_flag(self.namespace)
         async with get_data_init_lock():
+            shared = get_shared_snapshot(self.namespace)
+            self._snapshot = SharedKVSnapshot(shared) if shared is not None else None
             # check need_init must before get_namespace_data
             need_init = await try_initialize_namespace(self.namespace)
             self._data = await get_namespace_data(self.namespace)
@@ -43,6 +48,8 @@ class JsonKVStorage(BaseKVStorage):
                 loaded_data = load_json(self._file_name) or {}
                 async with self._storage_lock:
                     self._data.update(loaded_data)
+                    if self._snapshot is not None:
+                        self._snapshot.publish(loaded_data)
 
                     # Calculate data count based on namespace
                     if self.namespace.endswith("cache"):
@@ -83,6 +90,8 @@ class JsonKVStorage(BaseKVStorage):
                     f"Process {os.getpid()} KV writting {data_count} records to {self.namespace}"
                 )
                 write_json(data_dict, self._file_name)
+                if self._snapshot is not None:
+                    self._snapshot.publish(data_dict)
                 await clear_all_update_flags(self.namespace)
 
     async def get_all(self) -> dict[str, Any]:
@@ -91,15 +100,23 @@ class JsonKVStorage(BaseKVStorage):
         Returns:
             Dictionary containing all stored data
         """
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             return dict(self._data)
 
     async def get_by_id(self, id: str) -> dict[str, Any] | None:
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
+            if self._snapshot is not None:
+                values = self._snapshot.get_many([id])
+                if values is not None:
+                    return values[0]
             return self._data.get(id)
 
     async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
+            if self._snapshot is not None:
+                values = self._snapshot.get_many(ids)
+                if values is not None:
+                    return values
             return [
                 (
                     {k: v for k, v in self._data[id].items()}
@@ -110,7 +127,12 @@ class JsonKVStorage(BaseKVStorage):
             ]
 
     async def filter_keys(self, keys: set[str]) -> set[str]:
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
+            if self._snapshot is not None:
+                keys = list(keys)
+                values = self._snapshot.get_many(keys)
+                if values is not None:
+                    return {key for key, value in zip(keys, values) if value is None}
             return set(keys) - set(self._data.keys())
 
     async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
@@ -124,6 +146,8 @@ class JsonKVStorage(BaseKVStorage):
         logger.debug(f"Inserting {len(data)} records to {self.namespace}")
         async with self._storage_lock:
             self._data.update(data)
+            if self._snapshot is not None:
+                self._snapshot.mark_dirty()
             await set_all_update_flags(self.namespace)
 
     async def delete(self, ids: list[str]) -> None:
@@ -147,6 +171,31 @@ class JsonKVStorage(BaseKVStorage):
                     any_deleted = True
 
             if any_deleted:
+                if self._snapshot is not None:
+                    self._snapshot.mark_dirty()
+                await set_all_update_flags(self.namespace)
+
+    async def delete_cache_entries(self, mode: str, cache_ids: list[str]) -> None:
+        """Delete single entries of an LLM cache mode in place
+
+        Importance notes for in-memory storage:
+        1. Changes will be persisted to disk during the next index_done_callback,
+           which still writes the whole JSON file
+        2. update flags to notify other processes that data persistence is needed
+        """
+        async with self._storage_lock:
+            mode_cache = self._data.get(mode)
+            if not mode_cache:
+                return
+            any_deleted = False
+            for cache_id in cache_ids:
+                if mode_cache.pop(cache_id, None) is not None:
+                    any_deleted = True
+            if any_deleted:
+                # Values of a Manager dict are copies, write the mode back
+                self._data[mode] = mode_cache
+                if self._snapshot is not None:
+                    self._snapshot.mark_dirty()
                 await set_all_update_flags(self.namespace)
 
     async def drop_cache_by_modes(self, modes: list[str] | None = None) -> bool:
@@ -189,6 +238,8 @@ class JsonKVStorage(BaseKVStorage):
         try:
             async with self._storage_lock:
                 self._data.clear()
+                if self._snapshot is not None:
+                    self._snapshot.mark_dirty()
                 await set_all_update_flags(self.namespace)
 
             await self.index_done_callback()
@@ -0,0 +1,470 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, final
+
+from lightrag.base import (
+    BaseKVStorage,
+)
+from lightrag.utils import (
+    load_json,
+    logger,
+)
+from .shared_storage import (
+    get_namespace_data,
+    get_namespace_lock,
+    get_data_init_lock,
+    get_update_flag,
+    set_all_update_flags,
+    clear_all_update_flags,
+    try_initialize_namespace,
+)
+
+# Compact the log once it is this many times larger than its live records
+LOG_COMPACTION_RATIO = float(os.getenv("LOG_KV_COMPACTION_RATIO", "2.0"))
+# Never compact logs smaller than this many bytes
+LOG_COMPACTION_MIN_BYTES = int(
+    os.getenv("LOG_KV_COMPACTION_MIN_BYTES", str(4 * 1024 * 1024))
+)
+
+
+@final
+@dataclass
+class LogKVStorage(BaseKVStorage):
+    """Append-only, log-structured KV storage.
+
+    The data lives in memory like JsonKVStorage, but instead of rewriting the
+    whole namespace on every flush, `index_done_callback` appends one JSON line
+    per key changed or deleted since the last flush to `kv_store_<namespace>.log`.
+    In cache namespaces, whose values are dicts of cache entries per mode, the
+    lines hold single entries (field `f`) so that a flush writes only the
+    entries that changed rather than the whole mode.
+
+    On startup the log is replayed to rebuild the in-memory index; later records
+    of a key supersede earlier ones. A record counts once its line is complete,
+    a truncated trailing line left by a crash is cut off before anything is
+    appended. The log is compacted to one record per live key once its size
+    reaches LOG_COMPACTION_RATIO times the size of its live records, i.e. of
+    the latest record of every key and cache entry.
+
+    If no log exists yet but a `kv_store_<namespace>.json` file written by
+    JsonKVStorage does, it is imported on first start, so an existing working
+    directory can switch storages without re-indexing.
+    """
+
+    def __post_init__(self):
+        working_dir = self.global_config["working_dir"]
+        self._file_name = os.path.join(working_dir, f"kv_store_{self.namespace}.log")
+        self._json_file_name = os.path.join(
+            working_dir, f"kv_store_{self.namespace}.json"
+        )
+        self._data = None
+        self._dirty_keys = None
+        self._dirty_fields = None
+        self._log_state = None
+        self._record_sizes = None
+        # Cache namespaces map modes to dicts of entries, changes are logged per entry
+        self._field_level = self.namespace.endswith("cache")
+        self._storage_lock = None
+        self.storage_updated = None
+
+    async def initialize(self):
+        """Initialize storage data"""
+        self._storage_lock = get_namespace_lock(self.namespace)
+        self.storage_updated = await get_update_flag(self.namespace)
+        async with get_data_init_lock():
+            # check need_init must before get_namespace_data
+            need_init = await try_initialize_namespace(self.namespace)
+            self._data = await get_namespace_data(self.namespace)
+            # Keys changed since the last flush, shared by all processes
+            self._dirty_keys = await get_namespace_data(f"{self.namespace}_dirty_keys")
+            # (key, field) pairs of the cache entries changed since the last flush
+            self._dirty_fields = await get_namespace_data(
+                f"{self.namespace}_dirty_fields"
+            )
+            self._log_state = await get_namespace_data(f"{self.namespace}_log_state")
+            # Per key the size of its latest whole-key record and of its latest
+            # cache entry records, see _track_record
+            self._record_sizes = await get_namespace_data(
+                f"{self.namespace}_record_sizes"
+            )
+            if need_init:
+                async with self._storage_lock:
+                    if os.path.exists(self._file_name):
+                        loaded_data, log_bytes, record_sizes, live_bytes = (
+                            self._replay_log()
+                        )
+                        self._data.update(loaded_data)
+                        self._record_sizes.update(record_sizes)
+                        self._log_state["bytes"] = log_bytes
+                        self._log_state["live_bytes"] = live_bytes
+                    else:
+                        loaded_data = load_json(self._json_file_name) or {}
+                        self._data.update(loaded_data)
+                        self._write_compacted_log(loaded_data)
+                        if loaded_data:
+                            logger.info(
+                                f"Process {os.getpid()} imported {len(loaded_data)} keys from {self._json_file_name}"
+                            )
+
+                    logger.info(
+                        f"Process {os.getpid()} KV load {self.namespace} with {self._count_records(loaded_data)} records"
+                    )
+
+    def _count_records(self, data: dict[str, Any]) -> int:
+        if self.namespace.endswith("cache"):
+            # For cache namespaces, sum the cache entries across all cache types
+            return sum(
+                len(first_level_dict)
+                for first_level_dict in data.values()
+                if isinstance(first_level_dict, dict)
+            )
+        return len(data)
+
+    @staticmethod
+    def _track_record(
+        sizes: dict[str, Any], key: str, field: str | None, size: int
+    ) -> int:
+        """Account for a new record of a key or cache entry in `sizes`
+
+        A record supersedes the earlier records of its entry, a whole-key record
+        those of all entries of the key. Deletions are not live, their size is 0.
+
+        Returns:
+            The change of the live size of the log in bytes
+        """
+        whole, fields = sizes.get(key) or (0, {})
+        if field is None:
+            delta = size - whole - sum(fields.values())
+            whole, fields = size, {}
+        else:
+            fields = dict(fields)
+            delta = size - fields.pop(field, 0)
+            if size:
+                fields[field] = size
+        if whole or fields:
+            sizes[key] = (whole, fields)
+        else:
+            sizes.pop(key, None)
+        return delta
+
+    def _replay_log(self) -> tuple[dict[str, Any], int, dict[str, Any], int]:
+        """Rebuild the key-value index from the log
+
+        A torn record at the end of the log is cut off, so that the next
+        append starts on a line of its own.
+
+        Returns:
+            The live data, the size of the log in bytes, the record sizes and
+            the size of the live records in bytes
+        """
+        data: dict[str, Any] = {}
+        sizes: dict[str, Any] = {}
+        live_bytes = 0
+        offset = committed = 0
+        with open(self._file_name, "rb") as f:
+            for line_no, line in enumerate(f, start=1):
+                offset += len(line)
+                if not line.endswith(b"\n"):
+                    break
+                if not line.strip():
+                    committed = offset
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Skipping corrupted record at line {line_no} of {self._file_name}"
+                    )
+                    continue
+                committed = offset
+                key, field = record["k"], record.get("f")
+                deleted = record.get("op") == "del"
+                live_bytes += self._track_record(
+                    sizes, key, field, 0 if deleted else len(line)
+                )
+                if deleted:
+                    if field is None:
+                        data.pop(key, None)
+                    elif isinstance(data.get(key), dict):
+                        data[key].pop(field, None)
+                elif field is None:
+                    data[key] = record["v"]
+                else:
+                    data.setdefault(key, {})[field] = record["v"]
+
+        if committed < offset:
+            logger.warning(
+                f"Truncating {offset - committed} bytes of an incomplete record at the end of {self._file_name}"
+            )
+            with open(self._file_name, "r+b") as f:
+                f.truncate(committed)
+                f.flush()
+                os.fsync(f.fileno())
+        return data, committed, sizes, live_bytes
+
+    @staticmethod
+    def _encode(
+        op: str, key: str, value: Any = None, field: str | None = None
+    ) -> bytes:
+        record = {"op": op, "k": key}
+        if field is not None:
+            record["f"] = field
+        if op == "put":
+            record["v"] = value
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _write_compacted_log(self, data: dict[str, Any]) -> None:
+        tmp_file = self._file_name + ".tmp"
+        sizes = {}
+        with open(tmp_file, "wb") as f:
+            for key, value in data.items():
+                sizes[key] = (f.write(self._encode("put", key, value)), {})
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self._file_name)
+        self._record_sizes.clear()
+        self._record_sizes.update(sizes)
+        size = sum(whole for whole, _ in sizes.values())
+        self._log_state["bytes"] = size
+        self._log_state["live_bytes"] = size
+
+    def _changed_records(self) -> list[tuple[str, str | None, bytes, bool]]:
+        """(key, field, record, deleted) of the keys and cache entries changed since the last flush"""
+        dirty_keys = set(self._dirty_keys.keys())
+        records = []
+        for key in dirty_keys:
+            if key in self._data:
+                records.append(
+                    (key, None, self._encode("put", key, self._data[key]), False)
+                )
+            else:
+                records.append((key, None, self._encode("del", key), True))
+
+        values: dict[str, Any] = {}
+        for key, field in self._dirty_fields.keys():
+            if key in dirty_keys:
+                # Covered by the record of the whole key
+                continue
+            if key not in values:
+                values[key] = self._data.get(key)
+            value = values[key]
+            if isinstance(value, dict) and field in value:
+                record = self._encode("put", key, value[field], field)
+                records.append((key, field, record, False))
+            else:
+                records.append(
+                    (key, field, self._encode("del", key, field=field), True)
+                )
+        return records
+
+    async def index_done_callback(self) -> None:
+        async with self._storage_lock:
+            if not self.storage_updated.value:
+                return
+
+            records = self._changed_records()
+            # Record sizes of the touched keys as they will be after the append
+            touched = {key for key, *_ in records}
+            sizes = {key: self._record_sizes.get(key) for key in touched}
+            live_bytes = self._log_state.get("live_bytes", 0)
+            for key, field, record, deleted in records:
+                live_bytes += self._track_record(
+                    sizes, key, field, 0 if deleted else len(record)
+                )
+            log_bytes = self._log_state.get("bytes", 0) + sum(
+                len(record) for _, _, record, _ in records
+            )
+
+            if (
+                log_bytes >= LOG_COMPACTION_MIN_BYTES
+                and log_bytes > LOG_COMPACTION_RATIO * max(live_bytes, 1)
+            ):
+                data_dict = (
+                    dict(self._data) if hasattr(self._data, "_getvalue") else self._data
+                )
+                logger.info(
+                    f"Process {os.getpid()} KV compacting {self.namespace} log: {log_bytes} bytes, {live_bytes} live"
+                )
+                self._write_compacted_log(data_dict)
+            elif records:
+                logger.info(
+                    f"Process {os.getpid()} KV appending {len(records)} changed records to {self.namespace}"
+                )
+                with open(self._file_name, "ab") as f:
+                    f.write(b"".join(record for _, _, record, _ in records))
+                    f.flush()
+                    os.fsync(f.fileno())
+                for key in touched:
+                    if sizes.get(key) is None:
+                        self._record_sizes.pop(key, None)
+                    else:
+                        self._record_sizes[key] = sizes[key]
+                self._log_state["bytes"] = log_bytes
+                self._log_state["live_bytes"] = live_bytes
+
+            self._dirty_keys.clear()
+            self._dirty_fields.clear()
+            await clear_all_update_flags(self.namespace)
+
+    async def get_all(self) -> dict[str, Any]:
+        """Get all data from storage
+
+        Returns:
+            Dictionary containing all stored data
+        """
+        async with self._storage_lock.reader():
+            return dict(self._data)
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        async with self._storage_lock.reader():
+            return self._data.get(id)
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        async with self._storage_lock.reader():
+            return [
+                (
+                    {k: v for k, v in self._data[id].items()}
+                    if self._data.get(id, None)
+                    else None
+                )
+                for id in ids
+            ]
+
+    async def filter_keys(self, keys: set[str]) -> set[str]:
+        async with self._storage_lock.reader():
+            return set(keys) - set(self._data.keys())
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        """
+        Importance notes for in-memory storage:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. update flags to notify other processes that data persistence is needed
+        """
+        if not data:
+            return
+        logger.debug(f"Inserting {len(data)} records to {self.namespace}")
+        async with self._storage_lock:
+            dirty_keys, dirty_fields = {}, {}
+            for key, value in data.items():
+                old = self._data.get(key) if self._field_level else None
+                if (
+                    isinstance(old, dict)
+                    and isinstance(value, dict)
+                    and key not in self._dirty_keys
+                ):
+                    # Log only the cache entries that changed
+                    for field, entry in value.items():
+                        if field not in old or old[field] != entry:
+                            dirty_fields[(key, field)] = True
+                    for field in old.keys() - value.keys():
+                        dirty_fields[(key, field)] = True
+                else:
+                    dirty_keys[key] = True
+            self._data.update(data)
+            self._dirty_keys.update(dirty_keys)
+            self._dirty_fields.update(dirty_fields)
+            await set_all_update_flags(self.namespace)
+
+    async def delete(self, ids: list[str]) -> None:
+        """Delete specific records from storage by their IDs
+
+        Importance notes for in-memory storage:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. update flags to notify other processes that data persistence is needed
+
+        Args:
+            ids (list[str]): List of document IDs to be deleted from storage
+
+        Returns:
+            None
+        """
+        async with self._storage_lock:
+            any_deleted = False
+            for doc_id in ids:
+                result = self._data.pop(doc_id, None)
+                if result is not None:
+                    self._dirty_keys[doc_id] = True
+                    any_deleted = True
+
+            if any_deleted:
+                await set_all_update_flags(self.namespace)
+
+    async def delete_cache_entries(self, mode: str, cache_ids: list[str]) -> None:
+        """Delete single entries of an LLM cache mode, only the deletions are logged
+
+        Importance notes for in-memory storage:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. update flags to notify other processes that data persistence is needed
+        """
+        async with self._storage_lock:
+            mode_cache = self._data.get(mode)
+            if not isinstance(mode_cache, dict):
+                return
+            deleted = [
+                cache_id
+                for cache_id in cache_ids
+                if mode_cache.pop(cache_id, None) is not None
+            ]
+            if not deleted:
+                return
+            # Values of a Manager dict are copies, write the mode back
+            self._data[mode] = mode_cache
+            if self._field_level and mode not in self._dirty_keys:
+                self._dirty_fields.update(
+                    {(mode, cache_id): True for cache_id in deleted}
+                )
+            else:
+                self._dirty_keys[mode] = True
+            await set_all_update_flags(self.namespace)
+
+    async def drop_cache_by_modes(self, modes: list[str] | None = None) -> bool:
+        """Delete specific records from storage by by cache mode
+
+        Importance notes for in-memory storage:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. update flags to notify other processes that data persistence is needed
+
+        Args:
+            ids (list[str]): List of cache mode to be drop from storage
+
+        Returns:
+             True: if the cache drop successfully
+             False: if the cache drop failed
+        """
+        if not modes:
+            return False
+
+        try:
+            await self.delete(modes)
+            return True
+        except Exception:
+            return False
+
+    async def drop(self) -> dict[str, str]:
+        """Drop all data from storage and clean up resources
+           This action will persistent the data to disk immediately.
+
+        This method will:
+        1. Clear all data from memory
+        2. Truncate the log file
+        3. Update flags to notify other processes
+
+        Returns:
+            dict[str, str]: Operation status and message
+            - On success: {"status": "success", "message": "data dropped"}
+            - On failure: {"status": "error", "message": "<error details>"}
+        """
+        try:
+            async with self._storage_lock:
+                self._data.clear()
+                self._dirty_keys.clear()
+                self._dirty_fields.clear()
+                self._write_compacted_log({})
+                await set_all_update_flags(self.namespace)
+
+            logger.info(f"Process {os.getpid()} drop {self.namespace}")
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"Error dropping {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
@@ -1,6 +1,8 @@
 import asyncio
 import os
-from typing import Any, final
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, final
 from dataclasses import dataclass
 import numpy as np
 from lightrag.utils import logger, compute_mdhash_id
@@ -20,6 +22,11 @@ from pymilvus import MilvusClient  # type: ignore
 config = configparser.ConfigParser()
 config.read("config.ini", "utf-8")
 
+# Rows per upsert request and threads running the blocking client calls of a
+# storage, which bounds its requests in flight
+MILVUS_UPSERT_BATCH_SIZE = int(os.getenv("MILVUS_UPSERT_BATCH_SIZE", "256"))
+MILVUS_MAX_WORKERS = int(os.getenv("MILVUS_MAX_WORKERS", "4"))
+
 
 @final
 @dataclass
@@ -43,7 +50,18 @@ class MilvusVectorDBStorage(BaseVectorStorage):
             )
         self.cosine_better_than_threshold = cosine_threshold
 
-        self._client = MilvusClient(
+        self._client: MilvusClient | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._max_batch_size = self.global_config["embedding_batch_num"]
+
+    async def _run(self, func: Callable, /, *args, **kwargs) -> Any:
+        """Run a blocking client call on the storage's thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, partial(func, *args, **kwargs)
+        )
+
+    def _connect(self) -> MilvusClient:
+        client = MilvusClient(
             uri=os.environ.get(
                 "MILVUS_URI",
                 config.get(
@@ -67,12 +85,27 @@ class MilvusVectorDBStorage(BaseVectorStorage):
                 "MILVUS_DB_NAME", config.get("milvus", "db_name", fallback=None)
             ),
         )
-        self._max_batch_size = self.global_config["embedding_batch_num"]
         MilvusVectorDBStorage.create_collection_if_not_exist(
-            self._client,
+            client,
             self.namespace,
             dimension=self.embedding_func.embedding_dim,
         )
+        return client
+
+    async def initialize(self):
+        if self._client is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=MILVUS_MAX_WORKERS,
+                thread_name_prefix=f"milvus_{self.namespace}",
+            )
+            self._client = await self._run(self._connect)
+
+    async def finalize(self):
+        if self._client is not None:
+            await self._run(self._client.close)
+            self._client = None
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
         logger.info(f"Inserting {len(data)} to {self.namespace}")
@@ -98,16 +131,34 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         embeddings = np.concatenate(embeddings_list)
         for i, d in enumerate(list_data):
             d["vector"] = embeddings[i]
-        results = self._client.upsert(collection_name=self.namespace, data=list_data)
-        return results
+        # Milvus has no per-request wait flag, the batches run concurrently on
+        # the thread pool and the upsert returns once all of them are acknowledged
+        await asyncio.gather(
+            *(
+                self._run(
+                    self._client.upsert,
+                    collection_name=self.namespace,
+                    data=list_data[i : i + MILVUS_UPSERT_BATCH_SIZE],
+                )
+                for i in range(0, len(list_data), MILVUS_UPSERT_BATCH_SIZE)
+            )
+        )
 
     async def query(
         self, query: str, top_k: int, ids: list[str] | None = None
     ) -> list[dict[str, Any]]:
-        embedding = await self.embedding_func([query])
-        results = self._client.search(
+        return (await self.query_batch([query], top_k, ids))[0]
+
+    async def query_batch(
+        self, queries: list[str], top_k: int, ids: list[str] | None = None
+    ) -> list[list[dict[str, Any]]]:
+        if not queries:
+            return []
+        embeddings = await self.embedding_func(queries)
+        results = await self._run(
+            self._client.search,
             collection_name=self.namespace,
-            data=embedding,
+            data=embeddings,
             limit=top_k,
             output_fields=list(self.meta_fields),
             search_params={
@@ -115,10 +166,13 @@ class MilvusVectorDBStorage(BaseVectorStorage):
                 "params": {"radius": self.cosine_better_than_threshold},
             },
         )
-        print(results)
+        logger.debug(f"query result: {results}")
         return [
-            {**dp["entity"], "id": dp["id"], "distance": dp["distance"]}
-            for dp in results[0]
+            [
+                {**dp["entity"], "id": dp["id"], "distance": dp["distance"]}
+                for dp in hits
+            ]
+            for hits in results
         ]
 
     async def index_done_callback(self) -> None:
@@ -139,8 +193,8 @@ class MilvusVectorDBStorage(BaseVectorStorage):
             )
 
             # Delete the entity from Milvus collection
-            result = self._client.delete(
-                collection_name=self.namespace, pks=[entity_id]
+            result = await self._run(
+                self._client.delete, collection_name=self.namespace, pks=[entity_id]
             )
 
             if result and result.get("delete_count", 0) > 0:
@@ -162,8 +216,11 @@ class MilvusVectorDBStorage(BaseVectorStorage):
             expr = f'src_id == "{entity_name}" or tgt_id == "{entity_name}"'
 
             # Find all relations involving this entity
-            results = self._client.query(
-                collection_name=self.namespace, filter=expr, output_fields=["id"]
+            results = await self._run(
+                self._client.query,
+                collection_name=self.namespace,
+                filter=expr,
+                output_fields=["id"],
             )
 
             if not results or len(results) == 0:
@@ -178,8 +235,10 @@ class MilvusVectorDBStorage(BaseVectorStorage):
 
             # Delete the relations
             if relation_ids:
-                delete_result = self._client.delete(
-                    collection_name=self.namespace, pks=relation_ids
+                delete_result = await self._run(
+                    self._client.delete,
+                    collection_name=self.namespace,
+                    pks=relation_ids,
                 )
 
                 logger.debug(
@@ -197,7 +256,9 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Delete vectors by IDs
-            result = self._client.delete(collection_name=self.namespace, pks=ids)
+            result = await self._run(
+                self._client.delete, collection_name=self.namespace, pks=ids
+            )
 
             if result and result.get("delete_count", 0) > 0:
                 logger.debug(
@@ -221,7 +282,8 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         try:
             # Use Milvus query with expression to find IDs with the given prefix
             expression = f'id like "{prefix}%"'
-            results = self._client.query(
+            results = await self._run(
+                self._client.query,
                 collection_name=self.namespace,
                 filter=expression,
                 output_fields=list(self.meta_fields) + ["id"],
@@ -245,7 +307,8 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Query Milvus for a specific ID
-            result = self._client.query(
+            result = await self._run(
+                self._client.query,
                 collection_name=self.namespace,
                 filter=f'id == "{id}"',
                 output_fields=list(self.meta_fields) + ["id"],
@@ -277,7 +340,8 @@ class MilvusVectorDBStorage(BaseVectorStorage):
             filter_expr = f'id in ["{id_list}"]'
 
             # Query Milvus with the filter
-            result = self._client.query(
+            result = await self._run(
+                self._client.query,
                 collection_name=self.namespace,
                 filter=filter_expr,
                 output_fields=list(self.meta_fields) + ["id"],
@@ -300,11 +364,12 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Drop the collection and recreate it
-            if self._client.has_collection(self.namespace):
-                self._client.drop_collection(self.namespace)
+            if await self._run(self._client.has_collection, self.namespace):
+                await self._run(self._client.drop_collection, self.namespace)
 
             # Recreate the collection
-            MilvusVectorDBStorage.create_collection_if_not_exist(
+            await self._run(
+                MilvusVectorDBStorage.create_collection_if_not_exist,
                 self._client,
                 self.namespace,
                 dimension=self.embedding_func.embedding_dim,
@@ -0,0 +1,600 @@
+import asyncio
+import json
+import os
+from typing import Any, final
+from dataclasses import dataclass
+import numpy as np
+import time
+
+from lightrag.utils import (
+    logger,
+    compute_mdhash_id,
+)
+from lightrag.base import BaseVectorStorage
+
+from .shared_storage import (
+    get_namespace_lock,
+    get_update_flag,
+    set_all_update_flags,
+)
+
+# Compact the metadata log once it holds this many times more records than live vectors
+META_COMPACTION_RATIO = float(os.getenv("MMAP_VDB_COMPACTION_RATIO", "2.0"))
+# Never compact metadata logs with fewer records than this
+META_COMPACTION_MIN_RECORDS = int(os.getenv("MMAP_VDB_COMPACTION_MIN_RECORDS", "1000"))
+
+
+@final
+@dataclass
+class MmapVectorDBStorage(BaseVectorStorage):
+    """Vector storage backed by a memory-mapped `.npy` matrix.
+
+    Each namespace is stored in three files in the working directory:
+        - `vdb_<namespace>.vectors.npy`: normalized float32 vectors, one slot per
+          row, opened with mmap so startup does not parse anything and the pages
+          are shared between gunicorn workers
+        - `vdb_<namespace>.meta.jsonl`: append-only metadata log, one record per
+          upserted (with its slot) or deleted id, compacted when mostly stale
+        - `vdb_<namespace>.manifest.json`: dimension, capacity, number of used
+          slots, number of metadata records and the byte size of the committed
+          metadata log, replaced atomically on save
+
+    New vectors are always written to free slots, so the rows other processes
+    currently serve are never modified before the manifest is committed. Slots
+    freed by updates and deletions are only reused after the next save. A save
+    flushes the dirty pages of the mapping and appends the changed metadata, so
+    it costs O(changed rows) instead of re-encoding the whole matrix. Metadata
+    past the committed size, left by a save that crashed before its manifest
+    was written, is ignored on load and overwritten by the next save.
+
+    If no manifest exists yet but a `vdb_<namespace>.json` written by
+    NanoVectorDBStorage does, it is imported on first start.
+    """
+
+    def __post_init__(self):
+        # Initialize basic attributes
+        self._storage_lock = None
+        self.storage_updated = None
+
+        # Use global config value if specified, otherwise use default
+        kwargs = self.global_config.get("vector_db_storage_cls_kwargs", {})
+        cosine_threshold = kwargs.get("cosine_better_than_threshold")
+        if cosine_threshold is None:
+            raise ValueError(
+                "cosine_better_than_threshold must be specified in vector_db_storage_cls_kwargs"
+            )
+        self.cosine_better_than_threshold = cosine_threshold
+
+        working_dir = self.global_config["working_dir"]
+        self._vectors_file = os.path.join(
+            working_dir, f"vdb_{self.namespace}.vectors.npy"
+        )
+        self._meta_file = os.path.join(working_dir, f"vdb_{self.namespace}.meta.jsonl")
+        self._manifest_file = os.path.join(
+            working_dir, f"vdb_{self.namespace}.manifest.json"
+        )
+        self._nano_file_name = os.path.join(working_dir, f"vdb_{self.namespace}.json")
+        self._max_batch_size = self.global_config["embedding_batch_num"]
+        self._dim = self.embedding_func.embedding_dim
+
+        # Other workers may be saving while this one starts, the next save
+        # overwrites whatever is past the committed size anyway
+        self._load(truncate=False)
+
+    # --------------------------------------------------------------------------------
+    # Internal helper methods
+    # --------------------------------------------------------------------------------
+
+    def _reset(self):
+        self._vectors = None
+        self._capacity = 0
+        # Number of slots ever used, rows above it hold no data
+        self._rows = 0
+        self._meta_records = 0
+        # Size of the committed part of the metadata log in bytes
+        self._meta_bytes = 0
+        self._slot_of: dict[str, int] = {}
+        self._id_of_slot: dict[int, str] = {}
+        self._id_to_meta: dict[str, dict[str, Any]] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._free_slots: list[int] = []
+        # Slots freed since the last save, reusable once the save is committed
+        self._pending_free: list[int] = []
+        self._dirty_ids: set[str] = set()
+
+    def _open_vectors(self, capacity: int):
+        """Map the vector file, creating or growing it to the given capacity"""
+        if capacity <= self._capacity and self._vectors is not None:
+            return
+        tmp_file = self._vectors_file + ".tmp"
+        grown = np.lib.format.open_memmap(
+            tmp_file, mode="w+", dtype=np.float32, shape=(capacity, self._dim)
+        )
+        if self._vectors is not None and self._rows:
+            grown[: self._rows] = self._vectors[: self._rows]
+        grown.flush()
+        del grown
+        os.replace(tmp_file, self._vectors_file)
+        self._vectors = np.load(self._vectors_file, mmap_mode="r+")
+        self._capacity = capacity
+
+        live = np.zeros(capacity, dtype=bool)
+        live[: len(self._live)] = self._live
+        self._live = live
+
+    def _write_manifest(self):
+        manifest = {
+            "dim": self._dim,
+            "capacity": self._capacity,
+            "rows": self._rows,
+            "meta_records": self._meta_records,
+            "meta_bytes": self._meta_bytes,
+        }
+        tmp_file = self._manifest_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_file, self._manifest_file)
+
+    def _load(self, truncate: bool = True):
+        """Load the manifest, map the vectors and replay the metadata log
+
+        Args:
+            truncate: Cut uncommitted metadata off the log, only safe while
+                holding the storage lock as a concurrent save may be appending
+        """
+        self._reset()
+        if not os.path.exists(self._manifest_file):
+            if os.path.exists(self._nano_file_name):
+                self._import_nano_file()
+            return
+
+        with open(self._manifest_file, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["dim"] != self._dim:
+            raise ValueError(
+                f"Embedding dimension {self._dim} does not match {manifest['dim']} stored in {self._manifest_file}"
+            )
+
+        self._vectors = np.load(self._vectors_file, mmap_mode="r+")
+        self._capacity = self._vectors.shape[0]
+        self._rows = manifest["rows"]
+        self._live = np.zeros(self._capacity, dtype=bool)
+
+        # Only replay the records committed by the manifest, manifests written
+        # before the byte size was recorded only hold the number of records
+        committed = manifest.get("meta_bytes")
+        records = offset = 0
+        if os.path.exists(self._meta_file):
+            with open(self._meta_file, "rb") as f:
+                for line in f:
+                    if committed is not None and offset + len(line) > committed:
+                        break
+                    if committed is None and records >= manifest["meta_records"]:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(
+                            f"Skipping corrupted metadata record at byte {offset - len(line)} of {self._meta_file}"
+                        )
+                        continue
+                    records += 1
+                    old_slot = self._slot_of.pop(record["id"], None)
+                    if old_slot is not None:
+                        self._live[old_slot] = False
+                        self._id_of_slot.pop(old_slot, None)
+                    self._id_to_meta.pop(record["id"], None)
+                    if record["op"] == "put":
+                        self._slot_of[record["id"]] = record["slot"]
+                        self._id_of_slot[record["slot"]] = record["id"]
+                        self._id_to_meta[record["id"]] = record["meta"]
+                        self._live[record["slot"]] = True
+        self._meta_records = records
+        self._meta_bytes = offset
+        if (
+            truncate
+            and os.path.exists(self._meta_file)
+            and os.path.getsize(self._meta_file) > offset
+        ):
+            logger.warning(
+                f"Truncating uncommitted metadata at the end of {self._meta_file}"
+            )
+            with open(self._meta_file, "r+b") as f:
+                f.truncate(offset)
+        self._free_slots = np.flatnonzero(~self._live[: self._rows]).tolist()[::-1]
+
+        logger.info(
+            f"Process {os.getpid()} mmap vdb load {self.namespace} with {len(self._slot_of)} vectors"
+        )
+
+    def _import_nano_file(self):
+        """Import a vector database written by NanoVectorDBStorage"""
+        from nano_vectordb.dbs import load_storage
+
+        storage = load_storage(self._nano_file_name) or {}
+        data = storage.get("data", [])
+        if data:
+            self._insert(
+                [{k: v for k, v in dp.items() if k != "__vector__"} for dp in data],
+                storage["matrix"],
+            )
+        self._save()
+        logger.info(
+            f"Process {os.getpid()} imported {len(data)} vectors from {self._nano_file_name}"
+        )
+
+    def _insert(self, list_data: list[dict[str, Any]], embeddings: np.ndarray):
+        """Write vectors to free slots and stage their metadata for the next save"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+        reused = [
+            self._free_slots.pop()
+            for _ in range(min(len(list_data), len(self._free_slots)))
+        ]
+        new_count = len(list_data) - len(reused)
+        slots = reused + list(range(self._rows, self._rows + new_count))
+        if self._rows + new_count > self._capacity:
+            self._open_vectors(max(self._rows + new_count, 2 * self._capacity, 1024))
+        self._rows += new_count
+
+        self._vectors[slots] = embeddings
+        for slot, meta in zip(slots, list_data):
+            custom_id = meta["__id__"]
+            self._release(custom_id)
+            self._slot_of[custom_id] = slot
+            self._id_of_slot[slot] = custom_id
+            self._id_to_meta[custom_id] = meta
+            self._live[slot] = True
+            self._dirty_ids.add(custom_id)
+
+    def _release(self, custom_id: str) -> bool:
+        """Drop an id from the index, its slot stays reserved until the next save"""
+        slot = self._slot_of.pop(custom_id, None)
+        self._id_to_meta.pop(custom_id, None)
+        if slot is None:
+            return False
+        self._live[slot] = False
+        self._id_of_slot.pop(slot, None)
+        self._pending_free.append(slot)
+        self._dirty_ids.add(custom_id)
+        return True
+
+    def _save(self):
+        """Flush changed rows, append changed metadata and commit the manifest"""
+        if self._vectors is None:
+            self._open_vectors(1024)
+        self._vectors.flush()
+
+        live_count = len(self._slot_of)
+        records = self._meta_records + len(self._dirty_ids)
+        if (
+            records >= META_COMPACTION_MIN_RECORDS
+            and records > META_COMPACTION_RATIO * max(live_count, 1)
+        ):
+            tmp_file = self._meta_file + ".tmp"
+            with open(tmp_file, "wb") as f:
+                for custom_id, meta in self._id_to_meta.items():
+                    f.write(
+                        self._encode("put", custom_id, self._slot_of[custom_id], meta)
+                    )
+                f.flush()
+                os.fsync(f.fileno())
+                self._meta_bytes = f.tell()
+            os.replace(tmp_file, self._meta_file)
+            self._meta_records = live_count
+        elif self._dirty_ids:
+            # Append at the committed size, replacing anything an interrupted
+            # save left behind
+            mode = "r+b" if os.path.exists(self._meta_file) else "wb"
+            with open(self._meta_file, mode) as f:
+                f.seek(self._meta_bytes)
+                for custom_id in self._dirty_ids:
+                    if custom_id in self._slot_of:
+                        f.write(
+                            self._encode(
+                                "put",
+                                custom_id,
+                                self._slot_of[custom_id],
+                                self._id_to_meta[custom_id],
+                            )
+                        )
+                    else:
+                        f.write(self._encode("del", custom_id))
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+                self._meta_bytes = f.tell()
+            self._meta_records = records
+
+        self._write_manifest()
+        self._dirty_ids.clear()
+        self._free_slots.extend(self._pending_free)
+        self._pending_free.clear()
+
+    @staticmethod
+    def _encode(op: str, custom_id: str, slot: int | None = None, meta=None) -> bytes:
+        record = {"op": op, "id": custom_id}
+        if op == "put":
+            record["slot"] = slot
+            record["meta"] = meta
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _records(self, ids: list[str]) -> list[dict[str, Any]]:
+        return [
+            {**self._id_to_meta[id], "id": id} for id in ids if id in self._id_to_meta
+        ]
+
+    # --------------------------------------------------------------------------------
+
+    async def initialize(self):
+        """Initialize storage data"""
+        # Get the update flag for cross-process update notification
+        self.storage_updated = await get_update_flag(self.namespace)
+        # Get the storage lock for use in other methods
+        self._storage_lock = get_namespace_lock(self.namespace, enable_logging=False)
+
+    async def _check_reload(self):
+        """Check if the storage should be reloaded"""
+        # Readers share the lock, a reload needs it exclusively
+        async with self._storage_lock.reader():
+            if not self.storage_updated.value:
+                return
+        async with self._storage_lock:
+            # Check if data needs to be reloaded
+            if self.storage_updated.value:
+                logger.info(
+                    f"Process {os.getpid()} reloading {self.namespace} due to update by another process"
+                )
+                self._load()
+                # Reset update flag
+                self.storage_updated.value = False
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        """
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+        """
+
+        logger.debug(f"Inserting {len(data)} to {self.namespace}")
+        if not data:
+            return
+
+        current_time = time.time()
+        list_data = [
+            {
+                "__id__": k,
+                "__created_at__": current_time,
+                **{k1: v1 for k1, v1 in v.items() if k1 in self.meta_fields},
+            }
+            for k, v in data.items()
+        ]
+        contents = [v["content"] for v in data.values()]
+        batches = [
+            contents[i : i + self._max_batch_size]
+            for i in range(0, len(contents), self._max_batch_size)
+        ]
+
+        # Execute embedding outside of lock to avoid long lock times
+        embedding_tasks = [self.embedding_func(batch) for batch in batches]
+        embeddings_list = await asyncio.gather(*embedding_tasks)
+
+        embeddings = np.concatenate(embeddings_list)
+        if len(embeddings) == len(list_data):
+            await self._check_reload()
+            async with self._storage_lock:
+                self._insert(list_data, embeddings)
+            return [d["__id__"] for d in list_data]
+        else:
+            # sometimes the embedding is not returned correctly. just log it.
+            logger.error(
+                f"embedding is not 1-1 with data, {len(embeddings)} != {len(list_data)}"
+            )
+
+    async def query(
+        self, query: str, top_k: int, ids: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        # Execute embedding outside of lock to avoid long lock times
+        embedding = await self.embedding_func([query])
+        embedding = np.asarray(embedding[0], dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding = embedding / norm
+
+        await self._check_reload()
+        if not self._slot_of:
+            return []
+
+        scores = self._vectors[: self._rows] @ embedding
+        scores[~self._live[: self._rows]] = -np.inf
+        top_k = min(top_k, len(self._slot_of))
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        results = []
+        for slot in candidates:
+            score = float(scores[slot])
+            if score < self.cosine_better_than_threshold:
+                break
+            dp = self._id_to_meta[self._id_of_slot[int(slot)]]
+            results.append(
+                {
+                    **dp,
+                    "id": dp["__id__"],
+                    "distance": score,
+                    "created_at": dp.get("__created_at__"),
+                }
+            )
+        return results
+
+    @property
+    async def client_storage(self):
+        await self._check_reload()
+        return {"data": list(self._id_to_meta.values())}
+
+    async def delete(self, ids: list[str]):
+        """Delete vectors with specified IDs
+
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+
+        Args:
+            ids: List of vector IDs to be deleted
+        """
+        await self._check_reload()
+        async with self._storage_lock:
+            deleted = sum(self._release(id) for id in ids)
+        logger.debug(f"Successfully deleted {deleted} vectors from {self.namespace}")
+
+    async def delete_entity(self, entity_name: str) -> None:
+        """
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+        """
+        entity_id = compute_mdhash_id(entity_name, prefix="ent-")
+        logger.debug(f"Attempting to delete entity {entity_name} with ID {entity_id}")
+        await self.delete([entity_id])
+
+    async def delete_entity_relation(self, entity_name: str) -> None:
+        """
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+        """
+        await self._check_reload()
+        ids_to_delete = [
+            custom_id
+            for custom_id, dp in self._id_to_meta.items()
+            if dp.get("src_id") == entity_name or dp.get("tgt_id") == entity_name
+        ]
+        logger.debug(f"Found {len(ids_to_delete)} relations for entity {entity_name}")
+        if ids_to_delete:
+            await self.delete(ids_to_delete)
+
+    async def index_done_callback(self) -> bool:
+        """Save data to disk"""
+        async with self._storage_lock:
+            # Check if storage was updated by another process
+            if self.storage_updated.value:
+                # Storage was updated by another process, reload data instead of saving
+                logger.warning(
+                    f"Storage for {self.namespace} was updated by another process, reloading..."
+                )
+                self._load()
+                # Reset update flag
+                self.storage_updated.value = False
+                return False  # Return error
+
+        # Acquire lock and perform persistence
+        async with self._storage_lock:
+            try:
+                if not self._dirty_ids and os.path.exists(self._manifest_file):
+                    return True
+                self._save()
+                # Notify other processes that data has been updated
+                await set_all_update_flags(self.namespace)
+                # Reset own update flag to avoid self-reloading
+                self.storage_updated.value = False
+                return True  # Return success
+            except Exception as e:
+                logger.error(f"Error saving data for {self.namespace}: {e}")
+                return False  # Return error
+
+    async def search_by_prefix(self, prefix: str) -> list[dict[str, Any]]:
+        """Search for records with IDs starting with a specific prefix.
+
+        Args:
+            prefix: The prefix to search for in record IDs
+
+        Returns:
+            List of records with matching ID prefixes
+        """
+        await self._check_reload()
+        matching_records = self._records(
+            [id for id in self._id_to_meta if id.startswith(prefix)]
+        )
+        logger.debug(f"Found {len(matching_records)} records with prefix '{prefix}'")
+        return matching_records
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        """Get vector data by its ID
+
+        Args:
+            id: The unique identifier of the vector
+
+        Returns:
+            The vector data if found, or None if not found
+        """
+        await self._check_reload()
+        result = self._records([id])
+        if result:
+            return result[0]
+        return None
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        """Get multiple vector data by their IDs
+
+        Args:
+            ids: List of unique identifiers
+
+        Returns:
+            List of vector data objects that were found
+        """
+        if not ids:
+            return []
+
+        await self._check_reload()
+        return self._records(ids)
+
+    async def drop(self) -> dict[str, str]:
+        """Drop all vector data from storage and clean up resources
+
+        This method will:
+        1. Remove the vector, metadata and manifest files if they exist
+        2. Reset the in-memory index
+        3. Update flags to notify other processes
+        4. Changes is persisted to disk immediately
+
+        This method is intended for use in scenarios where all data needs to be removed,
+
+        Returns:
+            dict[str, str]: Operation status and message
+            - On success: {"status": "success", "message": "data dropped"}
+            - On failure: {"status": "error", "message": "<error details>"}
+        """
+        try:
+            async with self._storage_lock:
+                self._reset()
+                for file_name in (
+                    self._manifest_file,
+                    self._meta_file,
+                    self._vectors_file,
+                ):
+                    if os.path.exists(file_name):
+                        os.remove(file_name)
+
+                # Notify other processes that data has been updated
+                await set_all_update_flags(self.namespace)
+                # Reset own update flag to avoid self-reloading
+                self.storage_updated.value = False
+
+                logger.info(
+                    f"Process {os.getpid()} drop {self.namespace}(file:{self._vectors_file})"
+                )
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"Error dropping {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
@@ -274,7 +274,7 @@ class MongoDocStatusStorage(DocStatusStorage):
         result = await cursor.to_list()
         return {
             doc["_id"]: DocProcessingStatus(
-                content=doc["content"],
+                content=doc.get("content"),
                 content_summary=doc.get("content_summary"),
                 content_length=doc["content_length"],
                 status=doc["status"],
@@ -17,7 +17,7 @@ if not pm.is_installed("nano-vectordb"):
 
 from nano_vectordb import NanoVectorDB
 from .shared_storage import (
-    get_storage_lock,
+    get_namespace_lock,
     get_update_flag,
     set_all_update_flags,
 )
@@ -56,11 +56,14 @@ class NanoVectorDBStorage(BaseVectorStorage):
         # Get the update flag for cross-process update notification
         self.storage_updated = await get_update_flag(self.namespace)
         # Get the storage lock for use in other methods
-        self._storage_lock = get_storage_lock(enable_logging=False)
+        self._storage_lock = get_namespace_lock(self.namespace, enable_logging=False)
 
     async def _get_client(self):
         """Check if the storage should be reloaded"""
-        # Acquire lock to prevent concurrent read and write
+        # Readers share the lock, a reload needs it exclusively
+        async with self._storage_lock.reader():
+            if not self.storage_updated.value:
+                return self._client
         async with self._storage_lock:
             # Check if data needs to be reloaded
             if self.storage_updated.value:
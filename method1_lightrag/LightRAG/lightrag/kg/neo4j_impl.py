@@ -38,6 +38,8 @@ load_dotenv(dotenv_path=".env", override=False)
 
 # Get maximum number of graph nodes from environment variable, default is 1000
 MAX_GRAPH_NODES = int(os.getenv("MAX_GRAPH_NODES", 1000))
+# Number of nodes or edges written per UNWIND statement by the bulk upserts
+UPSERT_BATCH_SIZE = int(os.getenv("NEO4J_UPSERT_BATCH_SIZE", 500))
 
 config = configparser.ConfigParser()
 config.read("config.ini", "utf-8")
@@ -838,6 +840,117 @@ class Neo4JStorage(BaseGraphStorage):
             logger.error(f"Error during edge upsert: {str(e)}")
             raise
 
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_exception_type(
+            (
+                neo4jExceptions.ServiceUnavailable,
+                neo4jExceptions.TransientError,
+                neo4jExceptions.WriteServiceUnavailable,
+                neo4jExceptions.ClientError,
+            )
+        ),
+    )
+    async def upsert_nodes(self, nodes: dict[str, dict[str, str]]) -> None:
+        """
+        Upsert multiple nodes with UNWIND, one statement per entity type and batch,
+        all within a single write transaction.
+
+        Args:
+            nodes: Mapping of node entity_id to its node properties
+        """
+        if not nodes:
+            return
+
+        # Labels cannot be parameterized, so group the nodes by entity type
+        nodes_by_type: dict[str, list[dict]] = {}
+        for node_id, properties in nodes.items():
+            if "entity_id" not in properties:
+                raise ValueError(
+                    "Neo4j: node properties must contain an 'entity_id' field"
+                )
+            nodes_by_type.setdefault(properties["entity_type"], []).append(
+                {"entity_id": node_id, "properties": properties}
+            )
+
+        try:
+            async with self._driver.session(database=self._DATABASE) as session:
+
+                async def execute_upsert(tx: AsyncManagedTransaction):
+                    for entity_type, rows in nodes_by_type.items():
+                        query = (
+                            """
+                        UNWIND $rows AS row
+                        MERGE (n:base {entity_id: row.entity_id})
+                        SET n += row.properties
+                        SET n:`%s`
+                        """
+                            % entity_type
+                        )
+                        for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+                            result = await tx.run(
+                                query, rows=rows[i : i + UPSERT_BATCH_SIZE]
+                            )
+                            await result.consume()  # Ensure result is fully consumed
+
+                await session.execute_write(execute_upsert)
+                logger.debug(f"Upserted {len(nodes)} nodes")
+        except Exception as e:
+            logger.error(f"Error during bulk node upsert: {str(e)}")
+            raise
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_exception_type(
+            (
+                neo4jExceptions.ServiceUnavailable,
+                neo4jExceptions.TransientError,
+                neo4jExceptions.WriteServiceUnavailable,
+                neo4jExceptions.ClientError,
+            )
+        ),
+    )
+    async def upsert_edges(self, edges: dict[tuple[str, str], dict[str, str]]) -> None:
+        """
+        Upsert multiple edges with UNWIND in a single write transaction.
+        Edges whose source or target node does not exist are skipped.
+
+        Args:
+            edges: Mapping of (source entity_id, target entity_id) to edge properties
+        """
+        if not edges:
+            return
+
+        rows = [
+            {"source": source_node_id, "target": target_node_id, "properties": props}
+            for (source_node_id, target_node_id), props in edges.items()
+        ]
+        try:
+            async with self._driver.session(database=self._DATABASE) as session:
+
+                async def execute_upsert(tx: AsyncManagedTransaction):
+                    query = """
+                    UNWIND $rows AS row
+                    MATCH (source:base {entity_id: row.source})
+                    WITH source, row
+                    MATCH (target:base {entity_id: row.target})
+                    MERGE (source)-[r:DIRECTED]-(target)
+                    SET r += row.properties
+                    """
+                    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+                        result = await tx.run(
+                            query, rows=rows[i : i + UPSERT_BATCH_SIZE]
+                        )
+                        await result.consume()  # Ensure result is consumed
+
+                await session.execute_write(execute_upsert)
+                logger.debug(f"Upserted {len(edges)} edges")
+        except Exception as e:
+            logger.error(f"Error during bulk edge upsert: {str(e)}")
+            raise
+
     async def get_knowledge_graph(
         self,
         node_label: str,
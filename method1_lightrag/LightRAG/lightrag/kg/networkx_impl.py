@@ -1,4 +1,7 @@
 import os
+import pickle
+import struct
+import zlib
 from dataclasses import dataclass
 from typing import final
 
@@ -16,10 +19,12 @@ if not pm.is_installed("graspologic"):
 
 import networkx as nx
 from .shared_storage import (
-    get_storage_lock,
+    get_data_init_lock,
+    get_namespace_lock,
     get_update_flag,
     set_all_update_flags,
 )
+from .shared_memory import get_shared_snapshot
 
 from dotenv import load_dotenv
 
@@ -29,11 +34,66 @@ from dotenv import load_dotenv
 load_dotenv(dotenv_path=".env", override=False)
 
 MAX_GRAPH_NODES = int(os.getenv("MAX_GRAPH_NODES", 1000))
+# Compact the journal once it is this many times larger than the snapshot
+GRAPH_JOURNAL_COMPACTION_RATIO = float(
+    os.getenv("GRAPH_JOURNAL_COMPACTION_RATIO", "1.0")
+)
+# Never compact journals smaller than this many bytes
+GRAPH_JOURNAL_COMPACTION_MIN_BYTES = int(
+    os.getenv("GRAPH_JOURNAL_COMPACTION_MIN_BYTES", str(16 * 1024 * 1024))
+)
+# Also keep graph_<namespace>.graphml up to date, refreshed on compaction and finalize
+GRAPHML_EXPORT = os.getenv("GRAPHML_EXPORT", "false").lower() == "true"
+
+_SNAPSHOT_MAGIC = b"LRGS"
+_JOURNAL_MAGIC = b"LRGJ"
+# magic and generation
+_FILE_HEADER = struct.Struct("<4sQ")
+# payload length and crc32
+_RECORD_HEADER = struct.Struct("<II")
+
+_UPSERT_NODE, _UPSERT_EDGE, _DELETE_NODE, _DELETE_EDGE = range(4)
+
+
+def _apply_ops(graph: nx.Graph, ops: list[tuple]) -> None:
+    for op in ops:
+        kind = op[0]
+        if kind == _UPSERT_NODE:
+            graph.add_node(op[1], **op[2])
+        elif kind == _UPSERT_EDGE:
+            graph.add_edge(op[1], op[2], **op[3])
+        elif kind == _DELETE_NODE:
+            if graph.has_node(op[1]):
+                graph.remove_node(op[1])
+        elif kind == _DELETE_EDGE:
+            if graph.has_edge(op[1], op[2]):
+                graph.remove_edge(op[1], op[2])
 
 
 @final
 @dataclass
 class NetworkXStorage(BaseGraphStorage):
+    """NetworkX graph persisted as a snapshot plus a journal of changes.
+
+    `graph_<namespace>.snapshot` holds the pickled graph and
+    `graph_<namespace>.journal` the changes made since, one binary record per
+    `index_done_callback`: payload length, crc32 and the pickled list of node
+    and edge upserts and deletions. Both files start with the generation of
+    the snapshot, a journal of an older generation was already folded into
+    the snapshot and is ignored, and a torn trailing record left by a crash is
+    dropped. Once the journal grows GRAPH_JOURNAL_COMPACTION_RATIO times
+    larger than the snapshot it is compacted into a new snapshot generation.
+
+    Workers remember the generation and journal offset their graph reflects
+    and, when another process persisted changes, apply only the records
+    appended since. After a compaction they load the new snapshot, from shared
+    memory when the namespace is in SHARED_MEMORY_NAMESPACES.
+
+    An existing `graph_<namespace>.graphml` is imported on first start.
+    GraphML stays available through `export_graphml`, and is kept up to date
+    automatically with GRAPHML_EXPORT=true.
+    """
+
     @staticmethod
     def load_nx_graph(file_name) -> nx.Graph:
         if os.path.exists(file_name):
@@ -48,33 +108,198 @@ class NetworkXStorage(BaseGraphStorage):
         nx.write_graphml(graph, file_name)
 
     def __post_init__(self):
+        working_dir = self.global_config["working_dir"]
         self._graphml_xml_file = os.path.join(
-            self.global_config["working_dir"], f"graph_{self.namespace}.graphml"
+            working_dir, f"graph_{self.namespace}.graphml"
+        )
+        self._snapshot_file = os.path.join(
+            working_dir, f"graph_{self.namespace}.snapshot"
+        )
+        self._journal_file = os.path.join(
+            working_dir, f"graph_{self.namespace}.journal"
         )
         self._storage_lock = None
         self.storage_updated = None
         self._graph = None
+        # Snapshot generation and journal offset the in-memory graph reflects
+        self._generation = 0
+        self._journal_offset = _FILE_HEADER.size
+        # Changes not yet appended to the journal
+        self._pending_ops: list[tuple] = []
+        # Workers load new snapshot generations from shared memory in multiprocess mode
+        self._snapshot = None
 
         # Load initial graph
-        preloaded_graph = NetworkXStorage.load_nx_graph(self._graphml_xml_file)
-        if preloaded_graph is not None:
+        if os.path.exists(self._snapshot_file) or os.path.exists(self._journal_file):
+            self._graph = self._load_graph()
             logger.info(
-                f"Loaded graph from {self._graphml_xml_file} with {preloaded_graph.number_of_nodes()} nodes, {preloaded_graph.number_of_edges()} edges"
+                f"Loaded graph from {self._snapshot_file} with {self._graph.number_of_nodes()} nodes, {self._graph.number_of_edges()} edges"
             )
         else:
-            logger.info("Created new empty graph")
-        self._graph = preloaded_graph or nx.Graph()
+            preloaded_graph = NetworkXStorage.load_nx_graph(self._graphml_xml_file)
+            if preloaded_graph is not None:
+                logger.info(
+                    f"Imported graph from {self._graphml_xml_file} with {preloaded_graph.number_of_nodes()} nodes, {preloaded_graph.number_of_edges()} edges"
+                )
+                self._graph = preloaded_graph
+                self._compact()
+            else:
+                logger.info("Created new empty graph")
+                self._graph = nx.Graph()
 
     async def initialize(self):
         """Initialize storage data"""
         # Get the update flag for cross-process update notification
         self.storage_updated = await get_update_flag(self.namespace)
         # Get the storage lock for use in other methods
-        self._storage_lock = get_storage_lock()
+        self._storage_lock = get_namespace_lock(self.namespace)
+        async with get_data_init_lock():
+            self._snapshot = get_shared_snapshot(self.namespace)
+
+    @staticmethod
+    def _read_header(f, magic: bytes) -> int | None:
+        """Generation stored in the file header, None for a missing or foreign header"""
+        header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            return None
+        file_magic, generation = _FILE_HEADER.unpack(header)
+        return generation if file_magic == magic else None
+
+    def _read_snapshot(self) -> tuple[int, nx.Graph]:
+        if not os.path.exists(self._snapshot_file):
+            return 0, nx.Graph()
+        with open(self._snapshot_file, "rb") as f:
+            generation = self._read_header(f, _SNAPSHOT_MAGIC)
+            if generation is None:
+                raise ValueError(f"{self._snapshot_file} is not a graph snapshot")
+            buffer = self._snapshot.buffer() if self._snapshot is not None else None
+            if buffer is not None and _FILE_HEADER.unpack_from(buffer)[1] == generation:
+                return generation, pickle.loads(buffer[_FILE_HEADER.size :])
+            return generation, pickle.load(f)
+
+    def _read_journal(self, generation: int, offset: int) -> tuple[list[tuple], int]:
+        """Changes appended to the journal of the generation after offset
+
+        Returns:
+            The operations and the offset of the end of the last valid record
+        """
+        ops: list[tuple] = []
+        if not os.path.exists(self._journal_file):
+            return ops, _FILE_HEADER.size
+        with open(self._journal_file, "rb") as f:
+            if self._read_header(f, _JOURNAL_MAGIC) != generation:
+                # Written before the snapshot was compacted, already part of it
+                return ops, _FILE_HEADER.size
+            f.seek(offset)
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                length, crc = _RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    logger.warning(
+                        f"Ignoring torn record at offset {offset} of {self._journal_file}"
+                    )
+                    break
+                ops.extend(pickle.loads(payload))
+                offset += _RECORD_HEADER.size + length
+        return ops, offset
+
+    def _load_graph(self) -> nx.Graph:
+        """Load the snapshot and replay the journal on top of it"""
+        generation, graph = self._read_snapshot()
+        ops, offset = self._read_journal(generation, _FILE_HEADER.size)
+        _apply_ops(graph, ops)
+        self._generation, self._journal_offset = generation, offset
+        self._pending_ops = []
+        return graph
+
+    def _reload_graph(self) -> nx.Graph:
+        """Catch up with the changes persisted by another process"""
+        if not self._pending_ops and os.path.exists(self._journal_file):
+            with open(self._journal_file, "rb") as f:
+                journal_generation = self._read_header(f, _JOURNAL_MAGIC)
+            if journal_generation == self._generation:
+                # Same snapshot, only apply the records appended since
+                ops, self._journal_offset = self._read_journal(
+                    self._generation, self._journal_offset
+                )
+                _apply_ops(self._graph, ops)
+                logger.info(
+                    f"Process {os.getpid()} applied {len(ops)} graph changes to {self.namespace}"
+                )
+                return self._graph
+        return self._load_graph()
+
+    @staticmethod
+    def _write_file(file_name: str, parts: list[bytes]) -> None:
+        tmp_file = f"{file_name}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f:
+            for part in parts:
+                f.write(part)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, file_name)
+
+    def _compact(self) -> None:
+        """Write the graph as the next snapshot generation and start an empty journal"""
+        generation = self._generation + 1
+        header = _FILE_HEADER.pack(_SNAPSHOT_MAGIC, generation)
+        data = pickle.dumps(self._graph, protocol=pickle.HIGHEST_PROTOCOL)
+        # The snapshot goes first, a crash in between leaves an older journal that is ignored
+        self._write_file(self._snapshot_file, [header, data])
+        self._write_file(
+            self._journal_file, [_FILE_HEADER.pack(_JOURNAL_MAGIC, generation)]
+        )
+        self._generation, self._journal_offset = generation, _FILE_HEADER.size
+        self._pending_ops = []
+        if self._snapshot is not None:
+            self._snapshot.publish([header, data])
+        if GRAPHML_EXPORT:
+            NetworkXStorage.write_nx_graph(self._graph, self._graphml_xml_file)
+
+    def _append_journal(self) -> None:
+        payload = pickle.dumps(self._pending_ops, protocol=pickle.HIGHEST_PROTOCOL)
+        journal_generation = None
+        if os.path.exists(self._journal_file):
+            with open(self._journal_file, "rb") as f:
+                journal_generation = self._read_header(f, _JOURNAL_MAGIC)
+        if journal_generation != self._generation:
+            self._write_file(
+                self._journal_file,
+                [_FILE_HEADER.pack(_JOURNAL_MAGIC, self._generation)],
+            )
+            self._journal_offset = _FILE_HEADER.size
+        with open(self._journal_file, "r+b") as f:
+            # Drop a torn record left behind by a crash
+            f.truncate(self._journal_offset)
+            f.seek(self._journal_offset)
+            f.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_offset += _RECORD_HEADER.size + len(payload)
+        self._pending_ops = []
+
+    def _needs_compaction(self) -> bool:
+        journal_size = self._journal_offset - _FILE_HEADER.size
+        snapshot_size = (
+            os.path.getsize(self._snapshot_file)
+            if os.path.exists(self._snapshot_file)
+            else 0
+        )
+        return (
+            journal_size >= GRAPH_JOURNAL_COMPACTION_MIN_BYTES
+            and journal_size > GRAPH_JOURNAL_COMPACTION_RATIO * snapshot_size
+        )
 
     async def _get_graph(self):
         """Check if the storage should be reloaded"""
-        # Acquire lock to prevent concurrent read and write
+        # Readers share the lock, a reload needs it exclusively
+        async with self._storage_lock.reader():
+            if not self.storage_updated.value:
+                return self._graph
         async with self._storage_lock:
             # Check if data needs to be reloaded
             if self.storage_updated.value:
@@ -82,9 +307,7 @@ class NetworkXStorage(BaseGraphStorage):
                     f"Process {os.getpid()} reloading graph {self.namespace} due to update by another process"
                 )
                 # Reload data
-                self._graph = (
-                    NetworkXStorage.load_nx_graph(self._graphml_xml_file) or nx.Graph()
-                )
+                self._graph = self._reload_graph()
                 # Reset update flag
                 self.storage_updated.value = False
 
@@ -131,6 +354,7 @@ class NetworkXStorage(BaseGraphStorage):
         """
         graph = await self._get_graph()
         graph.add_node(node_id, **node_data)
+        self._pending_ops.append((_UPSERT_NODE, node_id, dict(node_data)))
 
     async def upsert_edge(
         self, source_node_id: str, target_node_id: str, edge_data: dict[str, str]
@@ -143,6 +367,40 @@ class NetworkXStorage(BaseGraphStorage):
         """
         graph = await self._get_graph()
         graph.add_edge(source_node_id, target_node_id, **edge_data)
+        self._pending_ops.append(
+            (_UPSERT_EDGE, source_node_id, target_node_id, dict(edge_data))
+        )
+
+    async def upsert_nodes(self, nodes: dict[str, dict[str, str]]) -> None:
+        """
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+        """
+        graph = await self._get_graph()
+        graph.add_nodes_from(nodes.items())
+        self._pending_ops.extend(
+            (_UPSERT_NODE, node_id, dict(node_data))
+            for node_id, node_data in nodes.items()
+        )
+
+    async def upsert_edges(self, edges: dict[tuple[str, str], dict[str, str]]) -> None:
+        """
+        Importance notes:
+        1. Changes will be persisted to disk during the next index_done_callback
+        2. Only one process should updating the storage at a time before index_done_callback,
+           KG-storage-log should be used to avoid data corruption
+        """
+        graph = await self._get_graph()
+        graph.add_edges_from(
+            (source_node_id, target_node_id, edge_data)
+            for (source_node_id, target_node_id), edge_data in edges.items()
+        )
+        self._pending_ops.extend(
+            (_UPSERT_EDGE, source_node_id, target_node_id, dict(edge_data))
+            for (source_node_id, target_node_id), edge_data in edges.items()
+        )
 
     async def delete_node(self, node_id: str) -> None:
         """
@@ -154,6 +412,7 @@ class NetworkXStorage(BaseGraphStorage):
         graph = await self._get_graph()
         if graph.has_node(node_id):
             graph.remove_node(node_id)
+            self._pending_ops.append((_DELETE_NODE, node_id))
             logger.debug(f"Node {node_id} deleted from the graph.")
         else:
             logger.warning(f"Node {node_id} not found in the graph for deletion.")
@@ -173,6 +432,7 @@ class NetworkXStorage(BaseGraphStorage):
         for node in nodes:
             if graph.has_node(node):
                 graph.remove_node(node)
+                self._pending_ops.append((_DELETE_NODE, node))
 
     async def remove_edges(self, edges: list[tuple[str, str]]):
         """Delete multiple edges
@@ -189,6 +449,7 @@ class NetworkXStorage(BaseGraphStorage):
         for source, target in edges:
             if graph.has_edge(source, target):
                 graph.remove_edge(source, target)
+                self._pending_ops.append((_DELETE_EDGE, source, target))
 
     async def get_all_labels(self) -> list[str]:
         """
@@ -366,9 +627,7 @@ class NetworkXStorage(BaseGraphStorage):
                 logger.info(
                     f"Graph for {self.namespace} was updated by another process, reloading..."
                 )
-                self._graph = (
-                    NetworkXStorage.load_nx_graph(self._graphml_xml_file) or nx.Graph()
-                )
+                self._graph = self._reload_graph()
                 # Reset update flag
                 self.storage_updated.value = False
                 return False  # Return error
@@ -376,8 +635,18 @@ class NetworkXStorage(BaseGraphStorage):
         # Acquire lock and perform persistence
         async with self._storage_lock:
             try:
-                # Save data to disk
-                NetworkXStorage.write_nx_graph(self._graph, self._graphml_xml_file)
+                if not self._pending_ops:
+                    return True
+                # Save the changes to disk
+                logger.info(
+                    f"Process {os.getpid()} journaling {len(self._pending_ops)} graph changes of {self.namespace}"
+                )
+                self._append_journal()
+                if self._needs_compaction():
+                    logger.info(
+                        f"Process {os.getpid()} compacting graph {self.namespace}: {self._graph.number_of_nodes()} nodes, {self._graph.number_of_edges()} edges"
+                    )
+                    self._compact()
                 # Notify other processes that data has been updated
                 await set_all_update_flags(self.namespace)
                 # Reset own update flag to avoid self-reloading
@@ -389,12 +658,31 @@ class NetworkXStorage(BaseGraphStorage):
 
         return True
 
+    async def export_graphml(self, file_name: str | None = None) -> str:
+        """Write the current graph as GraphML
+
+        Args:
+            file_name: Target file, graph_<namespace>.graphml in the working directory by default
+
+        Returns:
+            The path of the written file
+        """
+        file_name = file_name or self._graphml_xml_file
+        graph = await self._get_graph()
+        async with self._storage_lock.reader():
+            NetworkXStorage.write_nx_graph(graph, file_name)
+        return file_name
+
+    async def finalize(self):
+        if GRAPHML_EXPORT and self._graph is not None:
+            await self.export_graphml()
+
     async def drop(self) -> dict[str, str]:
         """Drop all graph data from storage and clean up resources
 
         This method will:
-        1. Remove the graph storage file if it exists
-        2. Reset the graph to an empty state
+        1. Remove the GraphML export if it exists
+        2. Reset the graph to an empty state and persist it as a new snapshot
         3. Update flags to notify other processes
         4. Changes is persisted to disk immediately
 
@@ -405,10 +693,11 @@ class NetworkXStorage(BaseGraphStorage):
         """
         try:
             async with self._storage_lock:
-                # delete _client_file_name
                 if os.path.exists(self._graphml_xml_file):
                     os.remove(self._graphml_xml_file)
                 self._graph = nx.Graph()
+                # A new empty generation, other processes reload instead of replaying
+                self._compact()
                 # Notify other processes that data has been updated
                 await set_all_update_flags(self.namespace)
                 # Reset own update flag to avoid self-reloading
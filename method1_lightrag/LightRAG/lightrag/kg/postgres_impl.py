@@ -1,6 +1,7 @@
 import asyncio
 import json
 import os
+import struct
 import time
 from dataclasses import dataclass, field
 from typing import Any, Union, final
@@ -44,6 +45,29 @@ load_dotenv(dotenv_path=".env", override=False)
 
 # Get maximum number of graph nodes from environment variable, default is 1000
 MAX_GRAPH_NODES = int(os.getenv("MAX_GRAPH_NODES", 1000))
+VECTOR_INDEX_TYPES = ("hnsw", "ivfflat", "none")
+# Upsert batches with at least this many rows are copied into a staging table
+# and merged, smaller ones are sent as one pipelined executemany
+POSTGRES_COPY_MIN_ROWS = int(os.getenv("POSTGRES_COPY_MIN_ROWS", 200))
+
+
+def _encode_vector(value: Any) -> bytes:
+    """pgvector binary format: dimension, unused, big-endian float32 values"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    vector = np.asarray(value, dtype=">f4")
+    return struct.pack(">HH", len(vector), 0) + vector.tobytes()
+
+
+def _decode_vector(data: bytes) -> list[float]:
+    dim = struct.unpack_from(">H", data)[0]
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).tolist()
+
+
+def _decode_chunk_index(row: dict[str, Any]) -> dict[str, Any]:
+    """asyncpg returns JSONB columns as text"""
+    chunks = row["chunks"]
+    return {**row, "chunks": json.loads(chunks) if isinstance(chunks, str) else chunks}
 
 
 class PostgreSQLDB:
@@ -54,6 +78,23 @@ class PostgreSQLDB:
         self.password = config.get("password", None)
         self.database = config.get("database", "postgres")
         self.workspace = config.get("workspace", "default")
+        # ANN index of the vector tables: hnsw, ivfflat or none
+        self.vector_index_type = str(config.get("vector_index_type") or "hnsw").lower()
+        if self.vector_index_type not in VECTOR_INDEX_TYPES:
+            raise ValueError(
+                f"Unknown vector index type {self.vector_index_type}, expected one of {VECTOR_INDEX_TYPES}"
+            )
+        self.hnsw_m = int(config.get("hnsw_m") or 16)
+        self.hnsw_ef_construction = int(config.get("hnsw_ef_construction") or 64)
+        self.hnsw_ef_search = int(config.get("hnsw_ef_search") or 100)
+        self.ivfflat_lists = int(config.get("ivfflat_lists") or 100)
+        self.ivfflat_probes = int(config.get("ivfflat_probes") or 10)
+        # How a document filter is combined with the ANN search: post or pre
+        self.vector_filter_mode = str(config.get("vector_filter_mode") or "post")
+        # Candidates fetched per requested result before post-filtering
+        self.vector_postfilter_factor = int(
+            config.get("vector_postfilter_factor") or 10
+        )
         self.max = 12
         self.increment = 1
         self.pool: Pool | None = None
@@ -71,6 +112,7 @@ class PostgreSQLDB:
                 port=self.port,
                 min_size=1,
                 max_size=self.max,
+                init=self._init_connection,
             )
 
             logger.info(
@@ -82,6 +124,25 @@ class PostgreSQLDB:
             )
             raise
 
+    @staticmethod
+    async def _init_connection(connection: asyncpg.Connection) -> None:
+        """Exchange pgvector values in the binary format instead of as text"""
+        schema = await connection.fetchval(
+            """SELECT n.nspname FROM pg_type t
+               JOIN pg_namespace n ON n.oid = t.typnamespace
+               WHERE t.typname = 'vector'"""
+        )
+        if schema is None:
+            # The vector extension is not installed
+            return
+        await connection.set_type_codec(
+            "vector",
+            schema=schema,
+            encoder=_encode_vector,
+            decoder=_decode_vector,
+            format="binary",
+        )
+
     @staticmethod
     async def configure_age(connection: asyncpg.Connection, graph_name: str) -> None:
         """Set the Apache AGE environment and creates a graph if it does not exist.
@@ -217,6 +278,170 @@ class PostgreSQLDB:
             logger.error(f"PostgreSQL database,\nsql:{sql},\ndata:{data},\nerror:{e}")
             raise
 
+    @staticmethod
+    def upsert_sql(table: str, source: str | None = None) -> str:
+        """INSERT ... ON CONFLICT DO UPDATE statement for a table of BULK_UPSERTS
+
+        Args:
+            table: Target table
+            source: Query producing the rows, a single row of parameters by default
+        """
+        spec = BULK_UPSERTS[table]
+        columns = spec["columns"]
+        if source is None:
+            placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+            source = f"VALUES ({placeholders})"
+        updates = ", ".join(
+            f"{column}=EXCLUDED.{column}"
+            for column in columns
+            if column not in spec["conflict"]
+        )
+        return f"""INSERT INTO {table} ({", ".join(columns)}) {source}
+                   ON CONFLICT ({", ".join(spec["conflict"])}) DO UPDATE
+                   SET {updates}, {spec["timestamp"]} = CURRENT_TIMESTAMP"""
+
+    def _vector_index_options(self) -> dict[str, int]:
+        if self.vector_index_type == "hnsw":
+            return {"m": self.hnsw_m, "ef_construction": self.hnsw_ef_construction}
+        return {"lists": self.ivfflat_lists}
+
+    async def ensure_vector_index(self, table: str, dim: int) -> None:
+        """Create, rebuild or drop the ANN index of a vector table to match the config
+
+        The index is named idx_<table>_vector_<type>. An index of the other type
+        is dropped and one built with different parameters is rebuilt. ANN
+        indexes need a fixed dimension, so an unconstrained content_vector column
+        is changed to VECTOR(dim) first. IVFFlat computes its list centroids from
+        the rows present when it is built, so it is best created after the initial
+        import (drop it to have it rebuilt on the next start).
+        """
+        prefix = f"idx_{table.lower()}_vector"
+        for index_type in VECTOR_INDEX_TYPES:
+            if index_type not in ("none", self.vector_index_type):
+                await self.execute(f"DROP INDEX IF EXISTS {prefix}_{index_type}")
+        if self.vector_index_type == "none":
+            return
+
+        index_name = f"{prefix}_{self.vector_index_type}"
+        options = self._vector_index_options()
+        try:
+            existing = await self.query(
+                "SELECT reloptions FROM pg_class WHERE relname = $1",
+                {"relname": index_name},
+            )
+            wanted = sorted(f"{key}={value}" for key, value in options.items())
+            if existing is not None:
+                if sorted(existing["reloptions"] or []) == wanted:
+                    return
+                logger.info(f"PostgreSQL, Rebuilding {index_name} with {wanted}")
+                await self.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+            column = await self.query(
+                """SELECT a.atttypmod FROM pg_attribute a
+                   JOIN pg_class c ON c.oid = a.attrelid
+                   WHERE c.relname = $1 AND a.attname = 'content_vector'""",
+                {"table": table.lower()},
+            )
+            if column is not None and column["atttypmod"] != dim:
+                logger.info(
+                    f"PostgreSQL, Setting dimension of {table}.content_vector to {dim}"
+                )
+                await self.execute(
+                    f"ALTER TABLE {table} ALTER COLUMN content_vector TYPE VECTOR({dim})"
+                )
+            logger.info(
+                f"PostgreSQL, Creating {self.vector_index_type} index {index_name} on {table}"
+            )
+            with_options = ", ".join(
+                f"{key} = {value}" for key, value in options.items()
+            )
+            await self.execute(
+                f"""CREATE INDEX IF NOT EXISTS {index_name} ON {table}
+                    USING {self.vector_index_type} (content_vector vector_cosine_ops)
+                    WITH ({with_options})"""
+            )
+        except Exception as e:
+            # Queries still work without the index, as exact scans
+            logger.error(
+                f"PostgreSQL, Failed to create vector index on {table}, Got: {e}"
+            )
+
+    async def vector_search(
+        self,
+        sql: str,
+        params: dict[str, Any],
+        candidates: int,
+        settings: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Run a similarity query with the ANN search parameters of the index
+
+        Args:
+            sql: Query ordering by distance
+            params: Query parameters
+            candidates: Rows the index scan has to produce, HNSW returns at most ef_search
+            settings: Extra settings for this query only, e.g. {"enable_indexscan": "off"}
+        """
+        local_settings = {}
+        if self.vector_index_type == "hnsw":
+            # pgvector caps ef_search at 1000
+            local_settings["hnsw.ef_search"] = min(
+                max(self.hnsw_ef_search, candidates), 1000
+            )
+        elif self.vector_index_type == "ivfflat":
+            local_settings["ivfflat.probes"] = self.ivfflat_probes
+        local_settings.update(settings or {})
+        async with self.pool.acquire() as connection:  # type: ignore
+            try:
+                async with connection.transaction():
+                    for name, value in local_settings.items():
+                        await connection.execute(f"SET LOCAL {name} = {value}")
+                    rows = await connection.fetch(sql, *params.values())
+                return [dict(row) for row in rows]
+            except Exception as e:
+                logger.error(f"PostgreSQL database, error:{e}")
+                raise
+
+    async def upsert_many(self, table: str, rows: list[tuple]) -> None:
+        """Insert or update rows of a table of BULK_UPSERTS in a single round trip
+
+        Batches of POSTGRES_COPY_MIN_ROWS rows or more are streamed with COPY
+        into a temporary staging table and merged with one INSERT ... SELECT,
+        smaller ones are sent as one pipelined executemany.
+
+        Args:
+            table: Target table
+            rows: Values in the order of the columns of the table spec
+        """
+        if not rows:
+            return
+        try:
+            async with self.pool.acquire() as connection:  # type: ignore
+                if len(rows) < POSTGRES_COPY_MIN_ROWS:
+                    await connection.executemany(self.upsert_sql(table), rows)
+                    return
+
+                columns = BULK_UPSERTS[table]["columns"]
+                staging = f"staging_{table.lower()}"
+                async with connection.transaction():
+                    # Kept for the lifetime of the pooled connection, emptied on commit
+                    await connection.execute(
+                        f"""CREATE TEMP TABLE IF NOT EXISTS {staging}
+                            (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"""
+                    )
+                    await connection.copy_records_to_table(
+                        staging, records=rows, columns=columns
+                    )
+                    await connection.execute(
+                        self.upsert_sql(
+                            table, f"SELECT {', '.join(columns)} FROM {staging}"
+                        )
+                    )
+        except Exception as e:
+            logger.error(
+                f"PostgreSQL database, bulk upsert of {len(rows)} rows into {table} failed, error:{e}"
+            )
+            raise
+
 
 class ClientManager:
     _instances: dict[str, Any] = {"db": None, "ref_count": 0}
@@ -250,6 +475,22 @@ class ClientManager:
                 "POSTGRES_WORKSPACE",
                 config.get("postgres", "workspace", fallback="default"),
             ),
+            **{
+                key: os.environ.get(
+                    f"POSTGRES_{key.upper()}",
+                    config.get("postgres", key, fallback=None),
+                )
+                for key in (
+                    "vector_index_type",
+                    "hnsw_m",
+                    "hnsw_ef_construction",
+                    "hnsw_ef_search",
+                    "ivfflat_lists",
+                    "ivfflat_probes",
+                    "vector_filter_mode",
+                    "vector_postfilter_factor",
+                )
+            },
         }
 
     @classmethod
@@ -322,6 +563,8 @@ class PGKVStorage(BaseKVStorage):
                         result_dict[mode] = {}
                     result_dict[mode][row["id"]] = row
                 return result_dict
+            elif is_namespace(self.namespace, NameSpace.KV_STORE_CHUNK_INDEX):
+                return {row["id"]: _decode_chunk_index(row) for row in results}
             else:
                 return {row["id"]: row for row in results}
         except Exception as e:
@@ -338,6 +581,9 @@ class PGKVStorage(BaseKVStorage):
             for row in array_res:
                 res[row["id"]] = row
             return res if res else None
+        elif is_namespace(self.namespace, NameSpace.KV_STORE_CHUNK_INDEX):
+            response = await self.db.query(sql, params)
+            return _decode_chunk_index(response) if response else None
         else:
             response = await self.db.query(sql, params)
             return response if response else None
@@ -374,6 +620,9 @@ class PGKVStorage(BaseKVStorage):
             for row in array_res:
                 dict_res[row["mode"]][row["id"]] = row
             return [{k: v} for k, v in dict_res.items()]
+        elif is_namespace(self.namespace, NameSpace.KV_STORE_CHUNK_INDEX):
+            rows = await self.db.query(sql, params, multirows=True)
+            return [_decode_chunk_index(row) for row in rows or []]
         else:
             return await self.db.query(sql, params, multirows=True)
 
@@ -413,27 +662,27 @@ class PGKVStorage(BaseKVStorage):
         if is_namespace(self.namespace, NameSpace.KV_STORE_TEXT_CHUNKS):
             pass
         elif is_namespace(self.namespace, NameSpace.KV_STORE_FULL_DOCS):
-            for k, v in data.items():
-                upsert_sql = SQL_TEMPLATES["upsert_doc_full"]
-                _data = {
-                    "id": k,
-                    "content": v["content"],
-                    "workspace": self.db.workspace,
-                }
-                await self.db.execute(upsert_sql, _data)
+            await self.db.upsert_many(
+                "LIGHTRAG_DOC_FULL",
+                [(self.db.workspace, k, v["content"]) for k, v in data.items()],
+            )
         elif is_namespace(self.namespace, NameSpace.KV_STORE_LLM_RESPONSE_CACHE):
-            for mode, items in data.items():
-                for k, v in items.items():
-                    upsert_sql = SQL_TEMPLATES["upsert_llm_response_cache"]
-                    _data = {
-                        "workspace": self.db.workspace,
-                        "id": k,
-                        "original_prompt": v["original_prompt"],
-                        "return_value": v["return"],
-                        "mode": mode,
-                    }
-
-                    await self.db.execute(upsert_sql, _data)
+            await self.db.upsert_many(
+                "LIGHTRAG_LLM_CACHE",
+                [
+                    (self.db.workspace, k, mode, v["original_prompt"], v["return"])
+                    for mode, items in data.items()
+                    for k, v in items.items()
+                ],
+            )
+        elif is_namespace(self.namespace, NameSpace.KV_STORE_CHUNK_INDEX):
+            await self.db.upsert_many(
+                "LIGHTRAG_CHUNK_INDEX",
+                [
+                    (self.db.workspace, k, json.dumps(v["chunks"], ensure_ascii=False))
+                    for k, v in data.items()
+                ],
+            )
 
     async def index_done_callback(self) -> None:
         # PG handles persistence automatically
@@ -468,6 +717,27 @@ class PGKVStorage(BaseKVStorage):
         except Exception as e:
             logger.error(f"Error while deleting records from {self.namespace}: {e}")
 
+    async def delete_cache_entries(self, mode: str, cache_ids: list[str]) -> None:
+        """Delete single entries of an LLM cache mode
+
+        Args:
+            mode (str): Cache mode of the entries
+            cache_ids (list[str]): Ids of the entries to delete
+        """
+        if not cache_ids or not is_namespace(
+            self.namespace, NameSpace.KV_STORE_LLM_RESPONSE_CACHE
+        ):
+            return
+
+        sql = """DELETE FROM LIGHTRAG_LLM_CACHE
+                 WHERE workspace=$1 AND mode=$2 AND id = ANY($3)"""
+        params = {"workspace": self.db.workspace, "mode": mode, "ids": cache_ids}
+        try:
+            await self.db.execute(sql, params)
+        except Exception as e:
+            logger.error(f"Error deleting cache entries of mode {mode}: {e}")
+            raise
+
     async def drop_cache_by_modes(self, modes: list[str] | None = None) -> bool:
         """Delete specific records from storage by cache mode
 
@@ -538,71 +808,62 @@ class PGVectorStorage(BaseVectorStorage):
     async def initialize(self):
         if self.db is None:
             self.db = await ClientManager.get_client()
+        await self.db.ensure_vector_index(
+            namespace_to_table_name(self.namespace), self.embedding_func.embedding_dim
+        )
 
     async def finalize(self):
         if self.db is not None:
             await ClientManager.release_client(self.db)
             self.db = None
 
-    def _upsert_chunks(self, item: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    def _upsert_chunks(self, item: dict[str, Any]) -> tuple:
         try:
-            upsert_sql = SQL_TEMPLATES["upsert_chunk"]
-            data: dict[str, Any] = {
-                "workspace": self.db.workspace,
-                "id": item["__id__"],
-                "tokens": item["tokens"],
-                "chunk_order_index": item["chunk_order_index"],
-                "full_doc_id": item["full_doc_id"],
-                "content": item["content"],
-                "content_vector": json.dumps(item["__vector__"].tolist()),
-                "file_path": item["file_path"],
-            }
+            return (
+                self.db.workspace,
+                item["__id__"],
+                item["tokens"],
+                item["chunk_order_index"],
+                item["full_doc_id"],
+                item["content"],
+                item["__vector__"],
+                item["file_path"],
+            )
         except Exception as e:
             logger.error(f"Error to prepare upsert,\nsql: {e}\nitem: {item}")
             raise
 
-        return upsert_sql, data
-
-    def _upsert_entities(self, item: dict[str, Any]) -> tuple[str, dict[str, Any]]:
-        upsert_sql = SQL_TEMPLATES["upsert_entity"]
-        source_id = item["source_id"]
-        if isinstance(source_id, str) and "<SEP>" in source_id:
-            chunk_ids = source_id.split("<SEP>")
-        else:
-            chunk_ids = [source_id]
-
-        data: dict[str, Any] = {
-            "workspace": self.db.workspace,
-            "id": item["__id__"],
-            "entity_name": item["entity_name"],
-            "content": item["content"],
-            "content_vector": json.dumps(item["__vector__"].tolist()),
-            "chunk_ids": chunk_ids,
-            "file_path": item["file_path"],
-            # TODO: add document_id
-        }
-        return upsert_sql, data
-
-    def _upsert_relationships(self, item: dict[str, Any]) -> tuple[str, dict[str, Any]]:
-        upsert_sql = SQL_TEMPLATES["upsert_relationship"]
+    @staticmethod
+    def _chunk_ids(item: dict[str, Any]) -> list[str]:
         source_id = item["source_id"]
         if isinstance(source_id, str) and "<SEP>" in source_id:
-            chunk_ids = source_id.split("<SEP>")
-        else:
-            chunk_ids = [source_id]
+            return source_id.split("<SEP>")
+        return [source_id]
+
+    def _upsert_entities(self, item: dict[str, Any]) -> tuple:
+        # TODO: add document_id
+        return (
+            self.db.workspace,
+            item["__id__"],
+            item["entity_name"],
+            item["content"],
+            item["__vector__"],
+            self._chunk_ids(item),
+            item["file_path"],
+        )
 
-        data: dict[str, Any] = {
-            "workspace": self.db.workspace,
-            "id": item["__id__"],
-            "source_id": item["src_id"],
-            "target_id": item["tgt_id"],
-            "content": item["content"],
-            "content_vector": json.dumps(item["__vector__"].tolist()),
-            "chunk_ids": chunk_ids,
-            "file_path": item["file_path"],
-            # TODO: add document_id
-        }
-        return upsert_sql, data
+    def _upsert_relationships(self, item: dict[str, Any]) -> tuple:
+        # TODO: add document_id
+        return (
+            self.db.workspace,
+            item["__id__"],
+            item["src_id"],
+            item["tgt_id"],
+            item["content"],
+            item["__vector__"],
+            self._chunk_ids(item),
+            item["file_path"],
+        )
 
     async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
         logger.debug(f"Inserting {len(data)} to {self.namespace}")
@@ -630,35 +891,52 @@ class PGVectorStorage(BaseVectorStorage):
         embeddings = np.concatenate(embeddings_list)
         for i, d in enumerate(list_data):
             d["__vector__"] = embeddings[i]
-        for item in list_data:
-            if is_namespace(self.namespace, NameSpace.VECTOR_STORE_CHUNKS):
-                upsert_sql, data = self._upsert_chunks(item)
-            elif is_namespace(self.namespace, NameSpace.VECTOR_STORE_ENTITIES):
-                upsert_sql, data = self._upsert_entities(item)
-            elif is_namespace(self.namespace, NameSpace.VECTOR_STORE_RELATIONSHIPS):
-                upsert_sql, data = self._upsert_relationships(item)
-            else:
-                raise ValueError(f"{self.namespace} is not supported")
+        if is_namespace(self.namespace, NameSpace.VECTOR_STORE_CHUNKS):
+            to_row = self._upsert_chunks
+        elif is_namespace(self.namespace, NameSpace.VECTOR_STORE_ENTITIES):
+            to_row = self._upsert_entities
+        elif is_namespace(self.namespace, NameSpace.VECTOR_STORE_RELATIONSHIPS):
+            to_row = self._upsert_relationships
+        else:
+            raise ValueError(f"{self.namespace} is not supported")
 
-            await self.db.execute(upsert_sql, data)
+        # Vectors are sent as binary pgvector values, see PostgreSQLDB._init_connection
+        await self.db.upsert_many(
+            namespace_to_table_name(self.namespace),
+            [to_row(item) for item in list_data],
+        )
 
     #################### query method ###############
     async def query(
         self, query: str, top_k: int, ids: list[str] | None = None
     ) -> list[dict[str, Any]]:
         embeddings = await self.embedding_func([query])
-        embedding = embeddings[0]
-        embedding_string = ",".join(map(str, embedding))
-        # Use parameterized document IDs (None means search across all documents)
-        sql = SQL_TEMPLATES[self.namespace].format(embedding_string=embedding_string)
+        # The nearest rows come from the ANN index (ORDER BY distance LIMIT),
+        # the similarity threshold and the document filter are applied to them
+        prefilter = postfilter = ""
+        candidates = top_k
         params = {
             "workspace": self.db.workspace,
-            "doc_ids": ids,
+            "embedding": embeddings[0],
             "better_than_threshold": self.cosine_better_than_threshold,
+            "candidates": top_k,
             "top_k": top_k,
         }
-        results = await self.db.query(sql, params=params, multirows=True)
-        return results
+        if ids is not None:
+            doc_filter = "AND " + SQL_TEMPLATES[f"{self.namespace}_doc_filter"]
+            params["doc_ids"] = ids
+            if self.db.vector_filter_mode == "pre":
+                # Restrict the rows first, exact when the planner skips the index
+                prefilter = doc_filter
+            else:
+                # Over-fetch nearest rows and keep those of the documents
+                postfilter = doc_filter
+                candidates = top_k * self.db.vector_postfilter_factor
+                params["candidates"] = candidates
+        sql = SQL_TEMPLATES[self.namespace].format(
+            prefilter=prefilter, postfilter=postfilter
+        )
+        return await self.db.vector_search(sql, params, candidates)
 
     async def index_done_callback(self) -> None:
         # PG handles persistence automatically
@@ -936,7 +1214,7 @@ class PGDocStatusStorage(DocStatusStorage):
         result = await self.db.query(sql, params, True)
         docs_by_status = {
             element["id"]: DocProcessingStatus(
-                content=element["content"],
+                content=element.get("content"),
                 content_summary=element["content_summary"],
                 content_length=element["content_length"],
                 status=element["status"],
@@ -992,31 +1270,23 @@ class PGDocStatusStorage(DocStatusStorage):
         if not data:
             return
 
-        sql = """insert into LIGHTRAG_DOC_STATUS(workspace,id,content,content_summary,content_length,chunks_count,status,file_path)
-                 values($1,$2,$3,$4,$5,$6,$7,$8)
-                  on conflict(id,workspace) do update set
-                  content = EXCLUDED.content,
-                  content_summary = EXCLUDED.content_summary,
-                  content_length = EXCLUDED.content_length,
-                  chunks_count = EXCLUDED.chunks_count,
-                  status = EXCLUDED.status,
-                  file_path = EXCLUDED.file_path,
-                  updated_at = CURRENT_TIMESTAMP"""
-        for k, v in data.items():
-            # chunks_count is optional
-            await self.db.execute(
-                sql,
-                {
-                    "workspace": self.db.workspace,
-                    "id": k,
-                    "content": v["content"],
-                    "content_summary": v["content_summary"],
-                    "content_length": v["content_length"],
-                    "chunks_count": v["chunks_count"] if "chunks_count" in v else -1,
-                    "status": v["status"],
-                    "file_path": v["file_path"],
-                },
-            )
+        # chunks_count is optional
+        await self.db.upsert_many(
+            "LIGHTRAG_DOC_STATUS",
+            [
+                (
+                    self.db.workspace,
+                    k,
+                    v.get("content"),
+                    v["content_summary"],
+                    v["content_length"],
+                    v["chunks_count"] if "chunks_count" in v else -1,
+                    v["status"],
+                    v["file_path"],
+                )
+                for k, v in data.items()
+            ],
+        )
 
     async def drop(self) -> dict[str, str]:
         """Drop the storage"""
@@ -2177,6 +2447,7 @@ NAMESPACE_TABLE_MAP = {
     NameSpace.VECTOR_STORE_RELATIONSHIPS: "LIGHTRAG_VDB_RELATION",
     NameSpace.DOC_STATUS: "LIGHTRAG_DOC_STATUS",
     NameSpace.KV_STORE_LLM_RESPONSE_CACHE: "LIGHTRAG_LLM_CACHE",
+    NameSpace.KV_STORE_CHUNK_INDEX: "LIGHTRAG_CHUNK_INDEX",
 }
 
 
@@ -2270,6 +2541,92 @@ TABLES = {
 	               CONSTRAINT LIGHTRAG_DOC_STATUS_PK PRIMARY KEY (workspace, id)
 	              )"""
     },
+    "LIGHTRAG_CHUNK_INDEX": {
+        "ddl": """CREATE TABLE LIGHTRAG_CHUNK_INDEX (
+                    workspace VARCHAR(255),
+                    id VARCHAR(255),
+                    chunks JSONB,
+                    create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    update_time TIMESTAMP,
+                    CONSTRAINT LIGHTRAG_CHUNK_INDEX_PK PRIMARY KEY (workspace, id)
+                    )"""
+    },
+}
+
+
+# Column order of the rows passed to PostgreSQLDB.upsert_many, the conflict
+# target and the column stamped on update for every table written in bulk
+BULK_UPSERTS = {
+    "LIGHTRAG_DOC_FULL": {
+        "columns": ["workspace", "id", "content"],
+        "conflict": ["workspace", "id"],
+        "timestamp": "update_time",
+    },
+    "LIGHTRAG_LLM_CACHE": {
+        "columns": ["workspace", "id", "mode", "original_prompt", "return_value"],
+        "conflict": ["workspace", "mode", "id"],
+        "timestamp": "update_time",
+    },
+    "LIGHTRAG_DOC_CHUNKS": {
+        "columns": [
+            "workspace",
+            "id",
+            "tokens",
+            "chunk_order_index",
+            "full_doc_id",
+            "content",
+            "content_vector",
+            "file_path",
+        ],
+        "conflict": ["workspace", "id"],
+        "timestamp": "update_time",
+    },
+    "LIGHTRAG_VDB_ENTITY": {
+        "columns": [
+            "workspace",
+            "id",
+            "entity_name",
+            "content",
+            "content_vector",
+            "chunk_ids",
+            "file_path",
+        ],
+        "conflict": ["workspace", "id"],
+        "timestamp": "update_time",
+    },
+    "LIGHTRAG_VDB_RELATION": {
+        "columns": [
+            "workspace",
+            "id",
+            "source_id",
+            "target_id",
+            "content",
+            "content_vector",
+            "chunk_ids",
+            "file_path",
+        ],
+        "conflict": ["workspace", "id"],
+        "timestamp": "update_time",
+    },
+    "LIGHTRAG_DOC_STATUS": {
+        "columns": [
+            "workspace",
+            "id",
+            "content",
+            "content_summary",
+            "content_length",
+            "chunks_count",
+            "status",
+            "file_path",
+        ],
+        "conflict": ["workspace", "id"],
+        "timestamp": "updated_at",
+    },
+    "LIGHTRAG_CHUNK_INDEX": {
+        "columns": ["workspace", "id", "chunks"],
+        "conflict": ["workspace", "id"],
+        "timestamp": "update_time",
+    },
 }
 
 
@@ -2298,107 +2655,58 @@ SQL_TEMPLATES = {
     "get_by_ids_llm_response_cache": """SELECT id, original_prompt, COALESCE(return_value, '') as "return", mode
                                  FROM LIGHTRAG_LLM_CACHE WHERE workspace=$1 AND mode= IN ({ids})
                                 """,
+    "get_by_id_chunk_index": """SELECT id, chunks FROM LIGHTRAG_CHUNK_INDEX
+                                 WHERE workspace=$1 AND id=$2
+                              """,
+    "get_by_ids_chunk_index": """SELECT id, chunks FROM LIGHTRAG_CHUNK_INDEX
+                                  WHERE workspace=$1 AND id IN ({ids})
+                               """,
     "filter_keys": "SELECT id FROM {table_name} WHERE workspace=$1 AND id IN ({ids})",
-    "upsert_doc_full": """INSERT INTO LIGHTRAG_DOC_FULL (id, content, workspace)
-                        VALUES ($1, $2, $3)
-                        ON CONFLICT (workspace,id) DO UPDATE
-                           SET content = $2, update_time = CURRENT_TIMESTAMP
-                       """,
-    "upsert_llm_response_cache": """INSERT INTO LIGHTRAG_LLM_CACHE(workspace,id,original_prompt,return_value,mode)
-                                      VALUES ($1, $2, $3, $4, $5)
-                                      ON CONFLICT (workspace,mode,id) DO UPDATE
-                                      SET original_prompt = EXCLUDED.original_prompt,
-                                      return_value=EXCLUDED.return_value,
-                                      mode=EXCLUDED.mode,
-                                      update_time = CURRENT_TIMESTAMP
-                                     """,
-    "upsert_chunk": """INSERT INTO LIGHTRAG_DOC_CHUNKS (workspace, id, tokens,
-                      chunk_order_index, full_doc_id, content, content_vector, file_path)
-                      VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                      ON CONFLICT (workspace,id) DO UPDATE
-                      SET tokens=EXCLUDED.tokens,
-                      chunk_order_index=EXCLUDED.chunk_order_index,
-                      full_doc_id=EXCLUDED.full_doc_id,
-                      content = EXCLUDED.content,
-                      content_vector=EXCLUDED.content_vector,
-                      file_path=EXCLUDED.file_path,
-                      update_time = CURRENT_TIMESTAMP
-                     """,
     # SQL for VectorStorage
-    "upsert_entity": """INSERT INTO LIGHTRAG_VDB_ENTITY (workspace, id, entity_name, content,
-                      content_vector, chunk_ids, file_path)
-                      VALUES ($1, $2, $3, $4, $5, $6::varchar[], $7)
-                      ON CONFLICT (workspace,id) DO UPDATE
-                      SET entity_name=EXCLUDED.entity_name,
-                      content=EXCLUDED.content,
-                      content_vector=EXCLUDED.content_vector,
-                      chunk_ids=EXCLUDED.chunk_ids,
-                      file_path=EXCLUDED.file_path,
-                      update_time=CURRENT_TIMESTAMP
-                     """,
-    "upsert_relationship": """INSERT INTO LIGHTRAG_VDB_RELATION (workspace, id, source_id,
-                      target_id, content, content_vector, chunk_ids, file_path)
-                      VALUES ($1, $2, $3, $4, $5, $6, $7::varchar[], $8)
-                      ON CONFLICT (workspace,id) DO UPDATE
-                      SET source_id=EXCLUDED.source_id,
-                      target_id=EXCLUDED.target_id,
-                      content=EXCLUDED.content,
-                      content_vector=EXCLUDED.content_vector,
-                      chunk_ids=EXCLUDED.chunk_ids,
-                      file_path=EXCLUDED.file_path,
-                      update_time = CURRENT_TIMESTAMP
-                     """,
-    "relationships": """
-    WITH relevant_chunks AS (
-        SELECT id as chunk_id
-        FROM LIGHTRAG_DOC_CHUNKS
-        WHERE $2::varchar[] IS NULL OR full_doc_id = ANY($2::varchar[])
-    )
-    SELECT source_id as src_id, target_id as tgt_id
-    FROM (
-        SELECT r.id, r.source_id, r.target_id, 1 - (r.content_vector <=> '[{embedding_string}]'::vector) as distance
-        FROM LIGHTRAG_VDB_RELATION r
-        JOIN relevant_chunks c ON c.chunk_id = ANY(r.chunk_ids)
-        WHERE r.workspace=$1
-    ) filtered
-    WHERE distance>$3
-    ORDER BY distance DESC
-    LIMIT $4
+    # $1 workspace, $2 query vector, $3 similarity threshold, $4 rows taken from
+    # the index, $5 top_k, $6 document ids used by the *_doc_filter conditions
+    "relationships": """SELECT src_id, tgt_id FROM (
+            SELECT source_id AS src_id, target_id AS tgt_id, chunk_ids,
+                   content_vector <=> $2::vector AS distance
+            FROM LIGHTRAG_VDB_RELATION
+            WHERE workspace=$1 {prefilter}
+            ORDER BY content_vector <=> $2::vector
+            LIMIT $4
+        ) candidates
+        WHERE 1 - distance > $3 {postfilter}
+        ORDER BY distance
+        LIMIT $5
     """,
-    "entities": """
-        WITH relevant_chunks AS (
-            SELECT id as chunk_id
-            FROM LIGHTRAG_DOC_CHUNKS
-            WHERE $2::varchar[] IS NULL OR full_doc_id = ANY($2::varchar[])
-        )
-        SELECT entity_name FROM
-            (
-                SELECT e.id, e.entity_name, 1 - (e.content_vector <=> '[{embedding_string}]'::vector) as distance
-                FROM LIGHTRAG_VDB_ENTITY e
-                JOIN relevant_chunks c ON c.chunk_id = ANY(e.chunk_ids)
-                WHERE e.workspace=$1
-            ) as chunk_distances
-            WHERE distance>$3
-            ORDER BY distance DESC
+    "entities": """SELECT entity_name FROM (
+            SELECT entity_name, chunk_ids, content_vector <=> $2::vector AS distance
+            FROM LIGHTRAG_VDB_ENTITY
+            WHERE workspace=$1 {prefilter}
+            ORDER BY content_vector <=> $2::vector
             LIMIT $4
+        ) candidates
+        WHERE 1 - distance > $3 {postfilter}
+        ORDER BY distance
+        LIMIT $5
     """,
-    "chunks": """
-        WITH relevant_chunks AS (
-            SELECT id as chunk_id
+    "chunks": """SELECT id, content, file_path FROM (
+            SELECT id, content, file_path, full_doc_id,
+                   content_vector <=> $2::vector AS distance
             FROM LIGHTRAG_DOC_CHUNKS
-            WHERE $2::varchar[] IS NULL OR full_doc_id = ANY($2::varchar[])
-        )
-        SELECT id, content, file_path FROM
-            (
-                SELECT id, content, file_path, 1 - (content_vector <=> '[{embedding_string}]'::vector) as distance
-                FROM LIGHTRAG_DOC_CHUNKS
-                WHERE workspace=$1
-                AND id IN (SELECT chunk_id FROM relevant_chunks)
-            ) as chunk_distances
-            WHERE distance>$3
-            ORDER BY distance DESC
+            WHERE workspace=$1 {prefilter}
+            ORDER BY content_vector <=> $2::vector
             LIMIT $4
+        ) candidates
+        WHERE 1 - distance > $3 {postfilter}
+        ORDER BY distance
+        LIMIT $5
     """,
+    "relationships_doc_filter": """chunk_ids && ARRAY(
+            SELECT id FROM LIGHTRAG_DOC_CHUNKS
+            WHERE workspace=$1 AND full_doc_id = ANY($6::varchar[]))""",
+    "entities_doc_filter": """chunk_ids && ARRAY(
+            SELECT id FROM LIGHTRAG_DOC_CHUNKS
+            WHERE workspace=$1 AND full_doc_id = ANY($6::varchar[]))""",
+    "chunks_doc_filter": "full_doc_id = ANY($6::varchar[])",
     # DROP tables
     "drop_specifiy_table_workspace": """
         DELETE FROM {table_name} WHERE workspace=$1
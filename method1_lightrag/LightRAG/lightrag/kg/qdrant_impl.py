@@ -13,11 +13,15 @@ import pipmaster as pm
 if not pm.is_installed("qdrant-client"):
     pm.install("qdrant-client")
 
-from qdrant_client import QdrantClient, models  # type: ignore
+from qdrant_client import AsyncQdrantClient, models  # type: ignore
 
 config = configparser.ConfigParser()
 config.read("config.ini", "utf-8")
 
+# Points per upsert request and upsert requests in flight at once
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+QDRANT_UPSERT_CONCURRENCY = int(os.getenv("QDRANT_UPSERT_CONCURRENCY", "4"))
+
 
 def compute_mdhash_id_for_qdrant(
     content: str, prefix: str = "", style: str = "simple"
@@ -51,12 +55,12 @@ def compute_mdhash_id_for_qdrant(
 @dataclass
 class QdrantVectorDBStorage(BaseVectorStorage):
     @staticmethod
-    def create_collection_if_not_exist(
-        client: QdrantClient, collection_name: str, **kwargs
+    async def create_collection_if_not_exist(
+        client: AsyncQdrantClient, collection_name: str, **kwargs
     ):
-        if client.collection_exists(collection_name):
+        if await client.collection_exists(collection_name):
             return
-        client.create_collection(collection_name, **kwargs)
+        await client.create_collection(collection_name, **kwargs)
 
     def __post_init__(self):
         kwargs = self.global_config.get("vector_db_storage_cls_kwargs", {})
@@ -67,23 +71,35 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             )
         self.cosine_better_than_threshold = cosine_threshold
 
-        self._client = QdrantClient(
-            url=os.environ.get(
-                "QDRANT_URL", config.get("qdrant", "uri", fallback=None)
-            ),
-            api_key=os.environ.get(
-                "QDRANT_API_KEY", config.get("qdrant", "apikey", fallback=None)
-            ),
-        )
+        self._client: AsyncQdrantClient | None = None
+        self._upsert_slots: asyncio.Semaphore | None = None
         self._max_batch_size = self.global_config["embedding_batch_num"]
-        QdrantVectorDBStorage.create_collection_if_not_exist(
-            self._client,
-            self.namespace,
-            vectors_config=models.VectorParams(
-                size=self.embedding_func.embedding_dim, distance=models.Distance.COSINE
-            ),
+
+    def _vectors_config(self) -> models.VectorParams:
+        return models.VectorParams(
+            size=self.embedding_func.embedding_dim, distance=models.Distance.COSINE
         )
 
+    async def initialize(self):
+        if self._client is None:
+            self._client = AsyncQdrantClient(
+                url=os.environ.get(
+                    "QDRANT_URL", config.get("qdrant", "uri", fallback=None)
+                ),
+                api_key=os.environ.get(
+                    "QDRANT_API_KEY", config.get("qdrant", "apikey", fallback=None)
+                ),
+            )
+            self._upsert_slots = asyncio.Semaphore(QDRANT_UPSERT_CONCURRENCY)
+            await QdrantVectorDBStorage.create_collection_if_not_exist(
+                self._client, self.namespace, vectors_config=self._vectors_config()
+            )
+
+    async def finalize(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
     async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
         logger.info(f"Inserting {len(data)} to {self.namespace}")
         if not data:
@@ -111,31 +127,58 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             list_points.append(
                 models.PointStruct(
                     id=compute_mdhash_id_for_qdrant(d["id"]),
-                    vector=embeddings[i],
+                    vector=embeddings[i].tolist(),
                     payload=d,
                 )
             )
 
-        results = self._client.upsert(
-            collection_name=self.namespace, points=list_points, wait=True
+        batches = [
+            list_points[i : i + QDRANT_UPSERT_BATCH_SIZE]
+            for i in range(0, len(list_points), QDRANT_UPSERT_BATCH_SIZE)
+        ]
+        # Qdrant applies the updates of a collection in the order it accepted
+        # them, so once the last batch is applied the earlier ones are as well
+        await asyncio.gather(
+            *(self._upsert_points(batch, wait=False) for batch in batches[:-1])
         )
-        return results
+        await self._upsert_points(batches[-1], wait=True)
+
+    async def _upsert_points(self, points: list[models.PointStruct], wait: bool):
+        async with self._upsert_slots:
+            await self._client.upsert(
+                collection_name=self.namespace, points=points, wait=wait
+            )
 
     async def query(
         self, query: str, top_k: int, ids: list[str] | None = None
     ) -> list[dict[str, Any]]:
-        embedding = await self.embedding_func([query])
-        results = self._client.search(
+        return (await self.query_batch([query], top_k, ids))[0]
+
+    async def query_batch(
+        self, queries: list[str], top_k: int, ids: list[str] | None = None
+    ) -> list[list[dict[str, Any]]]:
+        if not queries:
+            return []
+        embeddings = await self.embedding_func(queries)
+        responses = await self._client.query_batch_points(
             collection_name=self.namespace,
-            query_vector=embedding[0],
-            limit=top_k,
-            with_payload=True,
-            score_threshold=self.cosine_better_than_threshold,
+            requests=[
+                models.QueryRequest(
+                    query=embedding.tolist(),
+                    limit=top_k,
+                    with_payload=True,
+                    score_threshold=self.cosine_better_than_threshold,
+                )
+                for embedding in embeddings
+            ],
         )
 
-        logger.debug(f"query result: {results}")
+        logger.debug(f"query result: {responses}")
 
-        return [{**dp.payload, "distance": dp.score} for dp in results]
+        return [
+            [{**dp.payload, "distance": dp.score} for dp in response.points]
+            for response in responses
+        ]
 
     async def index_done_callback(self) -> None:
         # Qdrant handles persistence automatically
@@ -151,7 +194,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             # Convert regular ids to Qdrant compatible ids
             qdrant_ids = [compute_mdhash_id_for_qdrant(id) for id in ids]
             # Delete points from the collection
-            self._client.delete(
+            await self._client.delete(
                 collection_name=self.namespace,
                 points_selector=models.PointIdsList(
                     points=qdrant_ids,
@@ -178,7 +221,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             )
 
             # Delete the entity point from the collection
-            self._client.delete(
+            await self._client.delete(
                 collection_name=self.namespace,
                 points_selector=models.PointIdsList(
                     points=[entity_id],
@@ -197,7 +240,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Find relations where the entity is either source or target
-            results = self._client.scroll(
+            results = await self._client.scroll(
                 collection_name=self.namespace,
                 scroll_filter=models.Filter(
                     should=[
@@ -219,7 +262,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
 
             if ids_to_delete:
                 # Delete the relations
-                self._client.delete(
+                await self._client.delete(
                     collection_name=self.namespace,
                     points_selector=models.PointIdsList(
                         points=ids_to_delete,
@@ -245,7 +288,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Use scroll method to find records with IDs starting with the prefix
-            results = self._client.scroll(
+            results = await self._client.scroll(
                 collection_name=self.namespace,
                 scroll_filter=models.Filter(
                     must=[
@@ -288,7 +331,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             qdrant_id = compute_mdhash_id_for_qdrant(id)
 
             # Retrieve the point by ID
-            result = self._client.retrieve(
+            result = await self._client.retrieve(
                 collection_name=self.namespace,
                 ids=[qdrant_id],
                 with_payload=True,
@@ -319,7 +362,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             qdrant_ids = [compute_mdhash_id_for_qdrant(id) for id in ids]
 
             # Retrieve the points by IDs
-            results = self._client.retrieve(
+            results = await self._client.retrieve(
                 collection_name=self.namespace,
                 ids=qdrant_ids,
                 with_payload=True,
@@ -342,17 +385,12 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Delete the collection and recreate it
-            if self._client.collection_exists(self.namespace):
-                self._client.delete_collection(self.namespace)
+            if await self._client.collection_exists(self.namespace):
+                await self._client.delete_collection(self.namespace)
 
             # Recreate the collection
-            QdrantVectorDBStorage.create_collection_if_not_exist(
-                self._client,
-                self.namespace,
-                vectors_config=models.VectorParams(
-                    size=self.embedding_func.embedding_dim,
-                    distance=models.Distance.COSINE,
-                ),
+            await QdrantVectorDBStorage.create_collection_if_not_exist(
+                self._client, self.namespace, vectors_config=self._vectors_config()
             )
 
             logger.info(
@@ -0,0 +1,278 @@
+"""Versioned snapshots of storage namespaces in shared memory
+
+With several gunicorn workers the namespace data of the JSON KV storages
+lives in a Manager dict, so every lookup is a round trip to the manager
+process, and the graph storage reparses its GraphML file in every worker
+after an update. For the namespaces in SHARED_MEMORY_NAMESPACES the worker
+that persists a namespace also publishes a snapshot of it into a shared
+memory segment, which the other workers map directly.
+
+Every namespace has a small control block with three counters: the write
+generation (bumped by each change), the generation the latest snapshot
+reflects and the snapshot version. Snapshot `n` of a namespace is the
+segment `<prefix>_<namespace hash>_<n>`; publishing version `n + 1`
+unlinks version `n`, workers that still map it keep a valid mapping until
+they move on. Readers only use a snapshot while it is current, i.e. no
+change happened since it was published. Publishing and reading happen under
+the namespace lock, writers hold it exclusively.
+
+The segments are not tracked by the multiprocessing resource tracker, so a
+restarting worker does not remove them; finalize_share_data unlinks them,
+and initialize_share_data unlinks the ones left by a process that crashed.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Iterable
+
+import numpy as np
+
+try:
+    import _posixshmem
+except ImportError:  # Windows frees a segment with its last handle
+    _posixshmem = None
+
+from . import shared_storage
+
+SHARED_MEMORY_NAMESPACES = [
+    namespace.strip()
+    for namespace in os.getenv(
+        "SHARED_MEMORY_NAMESPACES", "text_chunks,full_docs,chunk_entity_relation"
+    ).split(",")
+    if namespace.strip()
+]
+
+_SEGMENT_DIR = "/dev/shm"
+_KV_MAGIC = b"LRKV"
+_LENGTH_HEADER = 8
+# write generation, snapshot generation, snapshot version
+_CTL_FORMAT = "<3q"
+
+
+def _untrack(shm: SharedMemory) -> SharedMemory:
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _create_segment(name: str, size: int) -> SharedMemory:
+    return _untrack(SharedMemory(name=name, create=True, size=max(size, 1)))
+
+
+def _attach_segment(name: str) -> SharedMemory:
+    return _untrack(SharedMemory(name=name))
+
+
+def unlink_segment(name: str) -> None:
+    if _posixshmem is None:
+        return
+    try:
+        _posixshmem.shm_unlink(f"/{name}")
+    except FileNotFoundError:
+        pass
+
+
+def _segment_names() -> list[str]:
+    if _posixshmem is None or not os.path.isdir(_SEGMENT_DIR):
+        return []
+    return [name for name in os.listdir(_SEGMENT_DIR) if name.startswith("lightrag_")]
+
+
+def unlink_segments(prefix: str) -> None:
+    """Unlink all segments of a prefix, including ones no worker recorded"""
+    for name in _segment_names():
+        if name.startswith(f"{prefix}_"):
+            unlink_segment(name)
+
+
+def unlink_stale_segments() -> None:
+    """Unlink the segments left behind by LightRAG processes that are gone
+
+    A prefix is `lightrag_<pid>` of the process that set up the shared data,
+    segments of a process that still runs are left alone.
+    """
+    for name in _segment_names():
+        owner = name.split("_")[1]
+        if owner.isdigit() and not shared_storage._pid_alive(int(owner)):
+            unlink_segment(name)
+
+
+class SharedSnapshot:
+    """Control block and versioned snapshot segments of one namespace"""
+
+    def __init__(self, namespace: str, prefix: str):
+        self.namespace = namespace
+        self._base = f"{prefix}_{hashlib.sha1(namespace.encode()).hexdigest()[:12]}"
+        try:
+            self._ctl_segment = _create_segment(
+                f"{self._base}_ctl", struct.calcsize(_CTL_FORMAT)
+            )
+            shared_storage._shared_memory_segments[namespace] = [self._ctl_segment.name]
+        except FileExistsError:
+            self._ctl_segment = _attach_segment(f"{self._base}_ctl")
+        self._segment: SharedMemory | None = None
+        self._segment_version = 0
+        # Older segments still referenced by arrays, closed once they are released
+        self._retired: list[SharedMemory] = []
+
+    def _read_ctl(self) -> tuple[int, int, int]:
+        return struct.unpack_from(_CTL_FORMAT, self._ctl_segment.buf)
+
+    def _write_ctl(self, write_gen: int, snapshot_gen: int, version: int) -> None:
+        struct.pack_into(
+            _CTL_FORMAT, self._ctl_segment.buf, 0, write_gen, snapshot_gen, version
+        )
+
+    @property
+    def version(self) -> int:
+        return self._read_ctl()[2]
+
+    @property
+    def is_current(self) -> bool:
+        write_gen, snapshot_gen, version = self._read_ctl()
+        return version > 0 and write_gen == snapshot_gen
+
+    def mark_dirty(self) -> None:
+        """Record a change, the snapshot is not used until the next publish"""
+        write_gen, snapshot_gen, version = self._read_ctl()
+        self._write_ctl(write_gen + 1, snapshot_gen, version)
+
+    def publish(self, parts: Iterable[bytes]) -> None:
+        """Write the concatenated parts as the next snapshot version"""
+        parts = list(parts)
+        size = sum(len(part) for part in parts)
+        version = self.version + 1
+        segment = _create_segment(f"{self._base}_{version}", _LENGTH_HEADER + size)
+        segment.buf[:_LENGTH_HEADER] = size.to_bytes(_LENGTH_HEADER, "little")
+        offset = _LENGTH_HEADER
+        for part in parts:
+            segment.buf[offset : offset + len(part)] = part
+            offset += len(part)
+
+        write_gen, _, previous = self._read_ctl()
+        self._write_ctl(write_gen, write_gen, version)
+        shared_storage._shared_memory_segments[self.namespace] = [
+            self._ctl_segment.name,
+            segment.name,
+        ]
+        if previous:
+            unlink_segment(f"{self._base}_{previous}")
+        self._switch(segment, version)
+
+    def _switch(self, segment: SharedMemory, version: int) -> None:
+        if self._segment is not None:
+            self._retired.append(self._segment)
+        self._segment, self._segment_version = segment, version
+        still_used = []
+        for retired in self._retired:
+            try:
+                retired.close()
+            except BufferError:
+                still_used.append(retired)
+        self._retired = still_used
+
+    def buffer(self) -> memoryview | None:
+        """Contents of the current snapshot, None while there is no current one"""
+        if not self.is_current:
+            return None
+        version = self.version
+        if self._segment_version != version:
+            self._switch(_attach_segment(f"{self._base}_{version}"), version)
+        size = int.from_bytes(self._segment.buf[:_LENGTH_HEADER], "little")
+        return self._segment.buf[_LENGTH_HEADER : _LENGTH_HEADER + size]
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(key.encode(), digest_size=8).digest(), "little"
+    )
+
+
+class SharedKVSnapshot:
+    """Key-value snapshot looked up in place
+
+    Layout: magic, record count, the sorted uint64 hashes of the keys, the
+    record offsets and the records, each a JSON `[key, value]` pair. A
+    lookup is a binary search in the mapped hashes and decodes only the
+    records of the requested keys.
+    """
+
+    def __init__(self, snapshot: SharedSnapshot):
+        self._snapshot = snapshot
+        self._version = 0
+        self._hashes = self._offsets = self._records = None
+
+    def __del__(self):
+        # The arrays map the segment, drop them before the segment is closed
+        self._release()
+
+    def mark_dirty(self) -> None:
+        self._snapshot.mark_dirty()
+
+    def _release(self) -> None:
+        self._version = 0
+        self._hashes = self._offsets = self._records = None
+
+    def publish(self, data: dict[str, Any]) -> None:
+        self._release()
+        keys = list(data)
+        hashes = np.fromiter((_key_hash(key) for key in keys), np.uint64, len(keys))
+        order = np.argsort(hashes, kind="stable")
+        records = [
+            json.dumps([keys[i], data[keys[i]]], ensure_ascii=False).encode()
+            for i in order
+        ]
+        offsets = np.zeros(len(records) + 1, dtype=np.uint64)
+        np.cumsum([len(record) for record in records], out=offsets[1:])
+        header = _KV_MAGIC + b"\0" * 4 + len(records).to_bytes(8, "little")
+        self._snapshot.publish(
+            [header, hashes[order].tobytes(), offsets.tobytes(), *records]
+        )
+
+    def _load(self) -> bool:
+        if self._version != self._snapshot.version:
+            # Let go of the previous snapshot before switching to the next
+            self._release()
+        buffer = self._snapshot.buffer()
+        if buffer is None:
+            return False
+        if self._version != self._snapshot.version:
+            if bytes(buffer[:4]) != _KV_MAGIC:
+                raise ValueError(f"{self._snapshot.namespace} is not a KV snapshot")
+            count = int.from_bytes(buffer[8:16], "little")
+            self._hashes = np.frombuffer(buffer, np.uint64, count, 16)
+            self._offsets = np.frombuffer(buffer, np.uint64, count + 1, 16 + 8 * count)
+            self._records = buffer[16 + 16 * count + 8 :]
+            self._version = self._snapshot.version
+        return True
+
+    def _find(self, key: str) -> Any:
+        key_hash = np.uint64(_key_hash(key))
+        i = int(np.searchsorted(self._hashes, key_hash))
+        # Keys with the same hash are adjacent
+        while i < len(self._hashes) and self._hashes[i] == key_hash:
+            stored_key, value = json.loads(
+                bytes(self._records[int(self._offsets[i]) : int(self._offsets[i + 1])])
+            )
+            if stored_key == key:
+                return value
+            i += 1
+        return None
+
+    def get_many(self, keys: Iterable[str]) -> list[Any] | None:
+        """Values of the keys (None for missing ones), or None without a current snapshot"""
+        if not self._load():
+            return None
+        return [self._find(key) for key in keys]
+
+
+def get_shared_snapshot(namespace: str) -> SharedSnapshot | None:
+    """The snapshot of a namespace, None in single process mode or if the namespace is not shared"""
+    if not shared_storage._is_multiprocess or not any(
+        namespace.endswith(shared) for shared in SHARED_MEMORY_NAMESPACES
+    ):
+        return None
+    return SharedSnapshot(namespace, shared_storage._shared_memory_prefix)
@@ -1,6 +1,8 @@
 import os
 import sys
+import time
 import asyncio
+from contextlib import asynccontextmanager
 from multiprocessing.synchronize import Lock as ProcessLock
 from multiprocessing import Manager
 from typing import Any, Dict, Optional, Union, TypeVar, Generic
@@ -44,6 +46,23 @@ _data_init_lock: Optional[LockType] = None
 # async locks for coroutine synchronization in multiprocess mode
 _async_locks: Optional[Dict[str, asyncio.Lock]] = None
 
+# per-namespace reader-writer locks
+_namespace_locks: Optional[Dict[str, Any]] = None  # single process: namespace -> lock
+# multiprocess: namespace -> (readers, writer, waiting_writers), readers and
+# waiting_writers map the pid of a worker to its count, writer is a pid or 0
+_namespace_lock_states: Optional[Dict[str, tuple]] = None
+_namespace_lock_guard: Optional[LockType] = None
+
+# shared memory snapshots of namespaces in multiprocess mode, see shared_memory.py
+_shared_memory_prefix: Optional[str] = None
+_shared_memory_segments: Optional[Dict[str, list]] = None  # namespace -> segment names
+
+# lock wait times of this process: group -> lock name -> mode -> totals
+_lock_wait_stats: Dict[str, Dict[str, Dict[str, Dict[str, float]]]] = {
+    "namespaces": {},
+    "locks": {},
+}
+
 
 class UnifiedLock(Generic[T]):
     """Provide a unified lock interface type for asyncio.Lock and multiprocessing.Lock"""
@@ -69,6 +88,7 @@ class UnifiedLock(Generic[T]):
                 f"== Lock == Process {self._pid}: Acquiring lock '{self._name}' (async={self._is_async})",
                 enable_output=self._enable_logging,
             )
+            started = time.perf_counter()
 
             # If in multiprocess mode and async lock exists, acquire it first
             if not self._is_async and self._async_lock is not None:
@@ -87,6 +107,11 @@ class UnifiedLock(Generic[T]):
                 await self._lock.acquire()
             else:
                 self._lock.acquire()
+            _record_lock_wait(
+                _lock_wait_stats["locks"].setdefault(self._name, {}),
+                "exclusive",
+                time.perf_counter() - started,
+            )
 
             direct_log(
                 f"== Lock == Process {self._pid}: Lock '{self._name}' acquired (async={self._is_async})",
@@ -229,7 +254,7 @@ def get_internal_lock(enable_logging: bool = False) -> UnifiedLock:
 
 
 def get_storage_lock(enable_logging: bool = False) -> UnifiedLock:
-    """return unified storage lock for data consistency"""
+    """return the unified storage lock shared by all namespaces, storages use get_namespace_lock"""
     async_lock = _async_locks.get("storage_lock") if _is_multiprocess else None
     return UnifiedLock(
         lock=_storage_lock,
@@ -276,6 +301,295 @@ def get_data_init_lock(enable_logging: bool = False) -> UnifiedLock:
     )
 
 
+# Polling interval bounds of namespace locks shared between processes
+_NAMESPACE_LOCK_POLL_MIN = 0.001
+_NAMESPACE_LOCK_POLL_MAX = 0.05
+
+
+class _AsyncRWLock:
+    """Reader-writer lock for coroutines of one process, writers are preferred"""
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    async def acquire(self, write: bool) -> None:
+        async with self._cond:
+            if not write:
+                await self._cond.wait_for(
+                    lambda: not self._writer and not self._waiting_writers
+                )
+                self._readers += 1
+                return
+            self._waiting_writers += 1
+            try:
+                await self._cond.wait_for(
+                    lambda: not self._writer and not self._readers
+                )
+            finally:
+                self._waiting_writers -= 1
+                if not self._waiting_writers:
+                    # Readers held back by this writer may go on if it gave up
+                    self._cond.notify_all()
+            self._writer = True
+
+    async def release(self, write: bool) -> None:
+        async with self._cond:
+            if write:
+                self._writer = False
+            else:
+                self._readers -= 1
+            self._cond.notify_all()
+
+
+class NamespaceLock:
+    """Reader-writer lock of one storage namespace
+
+    `async with lock.reader()` may be held by any number of coroutines (and
+    worker processes) at once, `async with lock.writer()` or `async with lock`
+    is exclusive. A waiting writer holds back new readers, so persisting a
+    namespace is not starved by a steady stream of queries.
+
+    In single process mode the lock is an asyncio reader-writer lock. In
+    multiprocess mode the reader and writer counts of every namespace live in
+    a Manager dict, guarded by a Manager lock that is only held to update
+    them; a waiting coroutine polls instead of blocking the event loop. The
+    counts are kept per worker pid, so a blocked worker can release the lock
+    of a worker that died while holding it.
+
+    Wait times are recorded per namespace and mode, see get_lock_wait_stats.
+    """
+
+    def __init__(self, namespace: str, enable_logging: bool = False):
+        self._namespace = namespace
+        self._pid = os.getpid()  # for debug only
+        self._enable_logging = enable_logging  # for debug only
+        self._local = None
+        if not _is_multiprocess:
+            if namespace not in _namespace_locks:
+                _namespace_locks[namespace] = _AsyncRWLock()
+            self._local = _namespace_locks[namespace]
+
+    @asynccontextmanager
+    async def reader(self):
+        await self._acquire(write=False)
+        try:
+            yield self
+        finally:
+            await self._release(write=False)
+
+    @asynccontextmanager
+    async def writer(self):
+        await self._acquire(write=True)
+        try:
+            yield self
+        finally:
+            await self._release(write=True)
+
+    async def __aenter__(self) -> "NamespaceLock":
+        await self._acquire(write=True)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._release(write=True)
+
+    async def _acquire(self, write: bool) -> None:
+        mode = "write" if write else "read"
+        direct_log(
+            f"== Lock == Process {self._pid}: Acquiring {mode} lock of namespace '{self._namespace}'",
+            enable_output=self._enable_logging,
+        )
+        started = time.perf_counter()
+        if self._local is not None:
+            await self._local.acquire(write)
+        else:
+            await self._acquire_shared(write)
+        _record_lock_wait(
+            _lock_wait_stats["namespaces"].setdefault(self._namespace, {}),
+            mode,
+            time.perf_counter() - started,
+        )
+        direct_log(
+            f"== Lock == Process {self._pid}: {mode.capitalize()} lock of namespace '{self._namespace}' acquired",
+            enable_output=self._enable_logging,
+        )
+
+    async def _release(self, write: bool) -> None:
+        if self._local is not None:
+            await self._local.release(write)
+        else:
+            pid = os.getpid()
+            with _namespace_lock_guard:
+                readers, writer, waiting_writers = _namespace_lock_states[
+                    self._namespace
+                ]
+                if write:
+                    writer = 0
+                else:
+                    _discount_pid(readers, pid)
+                _namespace_lock_states[self._namespace] = (
+                    readers,
+                    writer,
+                    waiting_writers,
+                )
+        direct_log(
+            f"== Lock == Process {self._pid}: {'Write' if write else 'Read'} lock of namespace '{self._namespace}' released",
+            enable_output=self._enable_logging,
+        )
+
+    async def _acquire_shared(self, write: bool) -> None:
+        pid = os.getpid()
+        delay = _NAMESPACE_LOCK_POLL_MIN
+        registered = False
+        try:
+            while True:
+                with _namespace_lock_guard:
+                    readers, writer, waiting_writers = _namespace_lock_states.get(
+                        self._namespace, ({}, 0, {})
+                    )
+                    if not _can_acquire(write, readers, writer, waiting_writers):
+                        readers, writer, waiting_writers = _without_dead_holders(
+                            self._namespace, readers, writer, waiting_writers
+                        )
+                    if _can_acquire(write, readers, writer, waiting_writers):
+                        if write:
+                            if registered:
+                                _discount_pid(waiting_writers, pid)
+                                registered = False
+                            writer = pid
+                        else:
+                            readers[pid] = readers.get(pid, 0) + 1
+                        _namespace_lock_states[self._namespace] = (
+                            readers,
+                            writer,
+                            waiting_writers,
+                        )
+                        return
+                    if write and not registered:
+                        waiting_writers[pid] = waiting_writers.get(pid, 0) + 1
+                        registered = True
+                    _namespace_lock_states[self._namespace] = (
+                        readers,
+                        writer,
+                        waiting_writers,
+                    )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _NAMESPACE_LOCK_POLL_MAX)
+        finally:
+            if registered:
+                # Cancelled while waiting as a writer
+                with _namespace_lock_guard:
+                    readers, writer, waiting_writers = _namespace_lock_states[
+                        self._namespace
+                    ]
+                    _discount_pid(waiting_writers, pid)
+                    _namespace_lock_states[self._namespace] = (
+                        readers,
+                        writer,
+                        waiting_writers,
+                    )
+
+
+def _can_acquire(
+    write: bool, readers: Dict[int, int], writer: int, waiting_writers: Dict[int, int]
+) -> bool:
+    if write:
+        return not writer and not readers
+    return not writer and not waiting_writers
+
+
+def _discount_pid(counts: Dict[int, int], pid: int) -> None:
+    if counts.get(pid, 0) > 1:
+        counts[pid] -= 1
+    else:
+        counts.pop(pid, None)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _without_dead_holders(
+    namespace: str,
+    readers: Dict[int, int],
+    writer: int,
+    waiting_writers: Dict[int, int],
+) -> tuple:
+    """Drop the holders and waiting writers of a namespace lock whose process is gone
+
+    A worker that dies while holding a namespace lock would otherwise block
+    every other worker forever.
+    """
+    dead = {
+        pid
+        for pid in {*readers, *waiting_writers, writer}
+        if pid and not _pid_alive(pid)
+    }
+    if not dead:
+        return readers, writer, waiting_writers
+    direct_log(
+        f"Process {os.getpid()} releasing namespace lock '{namespace}' held by dead process(es) {sorted(dead)}",
+        level="WARNING",
+    )
+    return (
+        {pid: n for pid, n in readers.items() if pid not in dead},
+        0 if writer in dead else writer,
+        {pid: n for pid, n in waiting_writers.items() if pid not in dead},
+    )
+
+
+def get_namespace_lock(namespace: str, enable_logging: bool = False) -> NamespaceLock:
+    """return the reader-writer lock of a storage namespace"""
+    return NamespaceLock(namespace, enable_logging=enable_logging)
+
+
+def _record_lock_wait(stats: Dict[str, Dict[str, float]], mode: str, waited: float):
+    entry = stats.setdefault(mode, {"acquired": 0, "total_wait": 0.0, "max_wait": 0.0})
+    entry["acquired"] += 1
+    entry["total_wait"] += waited
+    entry["max_wait"] = max(entry["max_wait"], waited)
+
+
+def get_lock_wait_stats(reset: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the lock wait times of this process.
+
+    Returns:
+        Dict with "namespaces" (namespace locks by namespace and read/write mode)
+        and "locks" (global locks by name), each entry holding the number of
+        acquisitions and the average, maximum and total wait in milliseconds
+    """
+    result = {
+        group: {
+            name: {
+                mode: {
+                    "acquired": entry["acquired"],
+                    "avg_wait_ms": round(
+                        entry["total_wait"] * 1000 / entry["acquired"], 3
+                    ),
+                    "max_wait_ms": round(entry["max_wait"] * 1000, 3),
+                    "total_wait_ms": round(entry["total_wait"] * 1000, 3),
+                }
+                for mode, entry in modes.items()
+            }
+            for name, modes in names.items()
+        }
+        for group, names in _lock_wait_stats.items()
+    }
+    if reset:
+        for names in _lock_wait_stats.values():
+            names.clear()
+    return result
+
+
 def initialize_share_data(workers: int = 1):
     """
     Initialize shared storage data for single or multi-process mode.
@@ -307,7 +621,12 @@ def initialize_share_data(workers: int = 1):
         _init_flags, \
         _initialized, \
         _update_flags, \
-        _async_locks
+        _async_locks, \
+        _namespace_locks, \
+        _namespace_lock_states, \
+        _namespace_lock_guard, \
+        _shared_memory_prefix, \
+        _shared_memory_segments
 
     # Check if already initialized
     if _initialized:
@@ -329,6 +648,13 @@ def initialize_share_data(workers: int = 1):
         _shared_dicts = _manager.dict()
         _init_flags = _manager.dict()
         _update_flags = _manager.dict()
+        _namespace_lock_states = _manager.dict()
+        _namespace_lock_guard = _manager.Lock()
+        _shared_memory_prefix = f"lightrag_{os.getpid()}"
+        _shared_memory_segments = _manager.dict()
+        from .shared_memory import unlink_stale_segments
+
+        unlink_stale_segments()
 
         # Initialize async locks for multiprocess mode
         _async_locks = {
@@ -353,6 +679,7 @@ def initialize_share_data(workers: int = 1):
         _init_flags = {}
         _update_flags = {}
         _async_locks = None  # No need for async locks in single process mode
+        _namespace_locks = {}
         direct_log(f"Process {os.getpid()} Shared-Data created for Single Process")
 
     # Mark as initialized
@@ -385,6 +712,7 @@ async def initialize_pipeline_status():
                 "request_pending": False,  # Flag for pending request for processing
                 "latest_message": "",  # Latest message from pipeline processing
                 "history_messages": history_messages,  # 使用共享列表对象
+                "stages": {},  # Throughput and backlog of each ingestion pipeline stage
             }
         )
         direct_log(f"Process {os.getpid()} Pipeline namespace initialized")
@@ -540,7 +868,12 @@ def finalize_share_data():
         _init_flags, \
         _initialized, \
         _update_flags, \
-        _async_locks
+        _async_locks, \
+        _namespace_locks, \
+        _namespace_lock_states, \
+        _namespace_lock_guard, \
+        _shared_memory_prefix, \
+        _shared_memory_segments
 
     # Check if already initialized
     if not _initialized:
@@ -568,6 +901,16 @@ def finalize_share_data():
                 _shared_dicts.clear()
             if _init_flags is not None:
                 _init_flags.clear()
+            if _namespace_lock_states is not None:
+                _namespace_lock_states.clear()
+            if _shared_memory_segments is not None:
+                from .shared_memory import unlink_segment, unlink_segments
+
+                for names in _shared_memory_segments.values():
+                    for name in names:
+                        unlink_segment(name)
+                unlink_segments(_shared_memory_prefix)
+                _shared_memory_segments.clear()
             if _update_flags is not None:
                 # Clear each namespace's update flags list and Value objects
                 try:
@@ -606,5 +949,12 @@ def finalize_share_data():
     _data_init_lock = None
     _update_flags = None
     _async_locks = None
+    _namespace_locks = None
+    _namespace_lock_states = None
+    _namespace_lock_guard = None
+    _shared_memory_prefix = None
+    _shared_memory_segments = None
+    for names in _lock_wait_stats.values():
+        names.clear()
 
     direct_log(f"Process {os.getpid()} storage data finalization complete")
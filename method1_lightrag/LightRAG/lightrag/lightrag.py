@@ -5,9 +5,12 @@ import asyncio
 import configparser
 import os
 import warnings
-from dataclasses import asdict, dataclass, field
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime
 from functools import partial
+from itertools import islice
 from typing import (
     Any,
     AsyncIterator,
@@ -27,6 +30,7 @@ from lightrag.kg import (
 )
 
 from lightrag.kg.shared_storage import (
+    get_graph_db_lock,
     get_namespace_data,
     get_pipeline_status_lock,
 )
@@ -42,15 +46,26 @@ from .base import (
     StorageNameSpace,
     StoragesStatus,
 )
+from .llm.client_pool import close_pooled_clients
 from .namespace import NameSpace, make_namespace
 from .operate import (
+    _BatchedVectorQueries,
+    _QueryScopedChunkView,
+    _QueryScopedGraphView,
     chunking_by_token_size,
+    extract_chunk_entities,
+    entity_vdb_data,
     extract_entities,
+    index_chunk_entities,
+    iter_chunks_by_token_size,
     kg_query,
+    merge_extracted_entities,
     mix_kg_vector_query,
     naive_query,
     query_with_keywords,
+    relationship_vdb_data,
 )
+from .pipeline import DocumentJob, PipelineStage
 from .prompt import GRAPH_FIELD_SEP, PROMPTS
 from .utils import (
     Tokenizer,
@@ -65,6 +80,7 @@ from .utils import (
     clean_text,
     check_storage_env_vars,
     logger,
+    SemanticCacheIndex,
 )
 from .types import KnowledgeGraph
 from dotenv import load_dotenv
@@ -175,6 +191,12 @@ class LightRAG:
     Defaults to `chunking_by_token_size` if not specified.
     """
 
+    chunk_tokenize_workers: int = field(
+        default=int(os.getenv("CHUNK_TOKENIZE_WORKERS", 0))
+    )
+    """Number of worker processes tokenizing the `split_by_character` segments of a document
+    with the default chunking function. 0 tokenizes in the inserting process."""
+
     # Embedding
     # ---
 
@@ -242,6 +264,19 @@ class LightRAG:
     max_parallel_insert: int = field(default=int(os.getenv("MAX_PARALLEL_INSERT", 2)))
     """Maximum number of parallel insert operations."""
 
+    pipeline_queue_size: int = field(default=int(os.getenv("PIPELINE_QUEUE_SIZE", 4)))
+    """Maximum number of documents waiting in front of each stage of the ingestion pipeline."""
+
+    insert_persist_batch_size: int = field(
+        default=int(os.getenv("INSERT_PERSIST_BATCH_SIZE", 8))
+    )
+    """Number of inserted documents whose storages are persisted together."""
+
+    insert_persist_interval: float = field(
+        default=float(os.getenv("INSERT_PERSIST_INTERVAL", 10))
+    )
+    """Maximum number of seconds an inserted document waits for its persist batch to fill up."""
+
     addon_params: dict[str, Any] = field(
         default_factory=lambda: {
             "language": os.getenv("SUMMARY_LANGUAGE", PROMPTS["DEFAULT_LANGUAGE"])
@@ -323,6 +358,9 @@ class LightRAG:
             **self.vector_db_storage_cls_kwargs,
         }
 
+        # Process pool of chunk_tokenize_workers, created on first use
+        self._tokenize_executor: ProcessPoolExecutor | None = None
+
         # Init Tokenizer
         # Post-initialization hook to handle backward compatabile tokenizer initialization based on provided parameters
         if self.tokenizer is None:
@@ -386,6 +424,13 @@ class LightRAG:
             ),
             embedding_func=self.embedding_func,
         )
+        # Chunks of each document and the entities and relations they produced
+        self.chunk_index: BaseKVStorage = self.key_string_value_json_storage_cls(  # type: ignore
+            namespace=make_namespace(
+                self.namespace_prefix, NameSpace.KV_STORE_CHUNK_INDEX
+            ),
+            embedding_func=self.embedding_func,
+        )
         self.chunk_entity_relation_graph: BaseGraphStorage = self.graph_storage_cls(  # type: ignore
             namespace=make_namespace(
                 self.namespace_prefix, NameSpace.GRAPH_STORE_CHUNK_ENTITY_RELATION
@@ -469,6 +514,7 @@ class LightRAG:
             for storage in (
                 self.full_docs,
                 self.text_chunks,
+                self.chunk_index,
                 self.entities_vdb,
                 self.relationships_vdb,
                 self.chunks_vdb,
@@ -492,6 +538,7 @@ class LightRAG:
             for storage in (
                 self.full_docs,
                 self.text_chunks,
+                self.chunk_index,
                 self.entities_vdb,
                 self.relationships_vdb,
                 self.chunks_vdb,
@@ -507,6 +554,13 @@ class LightRAG:
             self._storages_status = StoragesStatus.FINALIZED
             logger.debug("Finalized Storages")
 
+        # Release the keep-alive connections of the pooled LLM/embedding clients
+        await close_pooled_clients()
+
+        if self._tokenize_executor is not None:
+            self._tokenize_executor.shutdown(wait=False, cancel_futures=True)
+            self._tokenize_executor = None
+
     async def get_graph_labels(self):
         text = await self.chunk_entity_relation_graph.get_all_labels()
         return text
@@ -752,7 +806,6 @@ class LightRAG:
         new_docs: dict[str, Any] = {
             id_: {
                 "status": DocStatus.PENDING,
-                "content": content_data["content"],
                 "content_summary": get_content_summary(content_data["content"]),
                 "content_length": len(content_data["content"]),
                 "created_at": datetime.now().isoformat(),
@@ -792,7 +845,12 @@ class LightRAG:
             logger.info("No new unique documents were found.")
             return
 
-        # 5. Store status document
+        # 5. Store the content and the status document, the status only keeps
+        # a summary and the pipeline reads the content back from full_docs
+        await self.full_docs.upsert(
+            {doc_id: {"content": contents[doc_id]["content"]} for doc_id in new_docs}
+        )
+        await self.full_docs.index_done_callback()
         await self.doc_status.upsert(new_docs)
         logger.info(f"Stored {len(new_docs)} new unique documents")
 
@@ -810,6 +868,8 @@ class LightRAG:
         2. Split document content into chunks
         3. Process each chunk for entity and relation extraction
         4. Update the document status
+
+        The documents go through the stages of `_run_ingestion_pipeline`.
         """
 
         # Get pipeline status shared data and lock
@@ -845,6 +905,7 @@ class LightRAG:
                         "cur_batch": 0,  # Number of files already processed
                         "request_pending": False,  # Clear any previous request
                         "latest_message": "",
+                        "stages": {},
                     }
                 )
                 # Cleaning history_messages without breaking it as a shared list object
@@ -887,180 +948,13 @@ class LightRAG:
                 job_name = f"{path_prefix}[{total_files} files]"
                 pipeline_status["job_name"] = job_name
 
-                # Create a counter to track the number of processed files
-                processed_count = 0
-                # Create a semaphore to limit the number of concurrent file processing
-                semaphore = asyncio.Semaphore(self.max_parallel_insert)
-
-                async def process_document(
-                    doc_id: str,
-                    status_doc: DocProcessingStatus,
-                    split_by_character: str | None,
-                    split_by_character_only: bool,
-                    pipeline_status: dict,
-                    pipeline_status_lock: asyncio.Lock,
-                    semaphore: asyncio.Semaphore,
-                ) -> None:
-                    """Process single document"""
-                    async with semaphore:
-                        nonlocal processed_count
-                        current_file_number = 0
-                        try:
-                            # Get file path from status document
-                            file_path = getattr(
-                                status_doc, "file_path", "unknown_source"
-                            )
-
-                            async with pipeline_status_lock:
-                                # Update processed file count and save current file number
-                                processed_count += 1
-                                current_file_number = (
-                                    processed_count  # Save the current file number
-                                )
-                                pipeline_status["cur_batch"] = processed_count
-
-                                log_message = f"Processing file ({current_file_number}/{total_files}): {file_path}"
-                                logger.info(log_message)
-                                pipeline_status["history_messages"].append(log_message)
-                                log_message = f"Processing d-id: {doc_id}"
-                                logger.info(log_message)
-                                pipeline_status["latest_message"] = log_message
-                                pipeline_status["history_messages"].append(log_message)
-
-                            # Generate chunks from document
-                            chunks: dict[str, Any] = {
-                                compute_mdhash_id(dp["content"], prefix="chunk-"): {
-                                    **dp,
-                                    "full_doc_id": doc_id,
-                                    "file_path": file_path,  # Add file path to each chunk
-                                }
-                                for dp in self.chunking_func(
-                                    self.tokenizer,
-                                    status_doc.content,
-                                    split_by_character,
-                                    split_by_character_only,
-                                    self.chunk_overlap_token_size,
-                                    self.chunk_token_size,
-                                )
-                            }
-
-                            # Process document (text chunks and full docs) in parallel
-                            # Create tasks with references for potential cancellation
-                            doc_status_task = asyncio.create_task(
-                                self.doc_status.upsert(
-                                    {
-                                        doc_id: {
-                                            "status": DocStatus.PROCESSING,
-                                            "chunks_count": len(chunks),
-                                            "content": status_doc.content,
-                                            "content_summary": status_doc.content_summary,
-                                            "content_length": status_doc.content_length,
-                                            "created_at": status_doc.created_at,
-                                            "updated_at": datetime.now().isoformat(),
-                                            "file_path": file_path,
-                                        }
-                                    }
-                                )
-                            )
-                            chunks_vdb_task = asyncio.create_task(
-                                self.chunks_vdb.upsert(chunks)
-                            )
-                            entity_relation_task = asyncio.create_task(
-                                self._process_entity_relation_graph(
-                                    chunks, pipeline_status, pipeline_status_lock
-                                )
-                            )
-                            full_docs_task = asyncio.create_task(
-                                self.full_docs.upsert(
-                                    {doc_id: {"content": status_doc.content}}
-                                )
-                            )
-                            text_chunks_task = asyncio.create_task(
-                                self.text_chunks.upsert(chunks)
-                            )
-                            tasks = [
-                                doc_status_task,
-                                chunks_vdb_task,
-                                entity_relation_task,
-                                full_docs_task,
-                                text_chunks_task,
-                            ]
-                            await asyncio.gather(*tasks)
-                            await self.doc_status.upsert(
-                                {
-                                    doc_id: {
-                                        "status": DocStatus.PROCESSED,
-                                        "chunks_count": len(chunks),
-                                        "content": status_doc.content,
-                                        "content_summary": status_doc.content_summary,
-                                        "content_length": status_doc.content_length,
-                                        "created_at": status_doc.created_at,
-                                        "updated_at": datetime.now().isoformat(),
-                                        "file_path": file_path,
-                                    }
-                                }
-                            )
-
-                            # Call _insert_done after processing each file
-                            await self._insert_done()
-
-                            async with pipeline_status_lock:
-                                log_message = f"Completed processing file {current_file_number}/{total_files}: {file_path}"
-                                logger.info(log_message)
-                                pipeline_status["latest_message"] = log_message
-                                pipeline_status["history_messages"].append(log_message)
-
-                        except Exception as e:
-                            # Log error and update pipeline status
-                            error_msg = f"Failed to process document {doc_id}: {traceback.format_exc()}"
-
-                            logger.error(error_msg)
-                            async with pipeline_status_lock:
-                                pipeline_status["latest_message"] = error_msg
-                                pipeline_status["history_messages"].append(error_msg)
-
-                                # Cancel other tasks as they are no longer meaningful
-                                for task in [
-                                    chunks_vdb_task,
-                                    entity_relation_task,
-                                    full_docs_task,
-                                    text_chunks_task,
-                                ]:
-                                    if not task.done():
-                                        task.cancel()
-                            # Update document status to failed
-                            await self.doc_status.upsert(
-                                {
-                                    doc_id: {
-                                        "status": DocStatus.FAILED,
-                                        "error": str(e),
-                                        "content": status_doc.content,
-                                        "content_summary": status_doc.content_summary,
-                                        "content_length": status_doc.content_length,
-                                        "created_at": status_doc.created_at,
-                                        "updated_at": datetime.now().isoformat(),
-                                        "file_path": file_path,
-                                    }
-                                }
-                            )
-
-                # Create processing tasks for all documents
-                doc_tasks = []
-                for doc_id, status_doc in to_process_docs.items():
-                    doc_tasks.append(
-                        process_document(
-                            doc_id,
-                            status_doc,
-                            split_by_character,
-                            split_by_character_only,
-                            pipeline_status,
-                            pipeline_status_lock,
-                            semaphore,
-                        )
-                    )
-
-                # Wait for all document processing to complete
-                await asyncio.gather(*doc_tasks)
+                await self._run_ingestion_pipeline(
+                    to_process_docs,
+                    split_by_character,
+                    split_by_character_only,
+                    pipeline_status,
+                    pipeline_status_lock,
+                )
 
                 # Check if there's a pending request to process more documents (with lock)
                 has_pending_request = False
@@ -1099,8 +993,332 @@ class LightRAG:
                 pipeline_status["latest_message"] = log_message
                 pipeline_status["history_messages"].append(log_message)
 
+    async def _run_ingestion_pipeline(
+        self,
+        to_process_docs: dict[str, DocProcessingStatus],
+        split_by_character: str | None,
+        split_by_character_only: bool,
+        pipeline_status: dict,
+        pipeline_status_lock: asyncio.Lock,
+    ) -> None:
+        """Index documents with a pipeline of concurrent stages
+
+        chunk -> extract -> merge -> persist, with embed running next to extract:
+
+        - chunk: splits a document and streams its chunks to the extraction
+        - extract: extracts the entities and relations of the chunks with the LLM
+        - embed: upserts the chunks and the full document
+        - merge: merges the extraction into the graph once the chunks are stored
+        - persist: persists all storages for a batch of documents and marks them processed
+
+        Every stage works on several documents at once and hands them over
+        through a bounded queue, so a document can be extracted while the next
+        one is chunked and the previous one merged. The statistics of each
+        stage are published in pipeline_status["stages"].
+        """
+        total_files = len(to_process_docs)
+        started_files = 0
+        global_config = asdict(self)
+
+        async def log_status(log_message: str, error: bool = False) -> None:
+            (logger.error if error else logger.info)(log_message)
+            async with pipeline_status_lock:
+                pipeline_status["latest_message"] = log_message
+                pipeline_status["history_messages"].append(log_message)
+
+        def status_record(job: DocumentJob, status: DocStatus, **extra) -> dict:
+            if job.content is None and job.status_doc.content is not None:
+                # Not moved to full_docs yet, keep it in the status
+                extra["content"] = job.status_doc.content
+            return {
+                "status": status,
+                **extra,
+                "content_summary": job.status_doc.content_summary,
+                "content_length": job.status_doc.content_length,
+                "created_at": job.status_doc.created_at,
+                "updated_at": datetime.now().isoformat(),
+                "file_path": job.file_path,
+            }
+
+        async def fail(job: DocumentJob, e: Exception) -> None:
+            # Only the first failure of a document is recorded, the later
+            # stages skip it
+            if job.failed:
+                return
+            job.error = e
+            job.chunking_finished()
+            job.embedded.set()
+            await log_status(
+                f"Failed to process document {job.doc_id}: {traceback.format_exc()}",
+                error=True,
+            )
+            await self.doc_status.upsert(
+                {job.doc_id: status_record(job, DocStatus.FAILED, error=str(e))}
+            )
+            # Record the chunks stored so far, deleting the document then
+            # does not rebuild the chunk index
+            try:
+                await index_chunk_entities(
+                    self.chunk_index,
+                    job.chunks,
+                    *(job.extracted or ({}, {})),
+                    doc_ids=[job.doc_id],
+                )
+            except Exception as index_error:
+                logger.warning(
+                    f"Failed to index the chunks of document {job.doc_id}: {index_error}"
+                )
+
+        async def chunk(job: DocumentJob) -> bool:
+            nonlocal started_files
+            async with pipeline_status_lock:
+                started_files += 1
+                job.number = started_files
+                pipeline_status["cur_batch"] = started_files
+                log_message = (
+                    f"Processing file ({job.number}/{total_files}): {job.file_path}"
+                )
+                logger.info(log_message)
+                pipeline_status["history_messages"].append(log_message)
+                log_message = f"Processing d-id: {job.doc_id}"
+                logger.info(log_message)
+                pipeline_status["latest_message"] = log_message
+                pipeline_status["history_messages"].append(log_message)
+
+            # The extraction consumes the chunks while they are produced
+            handed_over = asyncio.create_task(extract_stage.put(job))
+            try:
+                job.content = await self._document_content(job.doc_id, job.status_doc)
+                async for chunk_id, dp in self._stream_document_chunks(
+                    job.doc_id,
+                    job.file_path,
+                    job.content,
+                    split_by_character,
+                    split_by_character_only,
+                ):
+                    if job.failed:
+                        break
+                    job.add_chunk(chunk_id, dp)
+                job.chunking_finished()
+                if not job.failed:
+                    await self.doc_status.upsert(
+                        {
+                            job.doc_id: status_record(
+                                job,
+                                DocStatus.PROCESSING,
+                                chunks_count=len(job.chunks),
+                            )
+                        }
+                    )
+            except Exception as e:
+                await fail(job, e)
+            finally:
+                await handed_over
+            await embed_stage.put(job)
+            return not job.failed
+
+        async def extract(job: DocumentJob) -> bool:
+            try:
+                job.extracted = await extract_chunk_entities(
+                    job.stream_chunks(),
+                    global_config,
+                    pipeline_status,
+                    pipeline_status_lock,
+                    self.llm_response_cache,
+                )
+            except Exception as e:
+                await fail(job, e)
+                return False
+            await merge_stage.put(job)
+            return True
+
+        async def embed(job: DocumentJob) -> bool | None:
+            if job.failed:
+                job.embedded.set()
+                return None
+            try:
+                await asyncio.gather(
+                    self.chunks_vdb.upsert(job.chunks),
+                    self.text_chunks.upsert(job.chunks),
+                )
+            except Exception as e:
+                await fail(job, e)
+                return False
+            finally:
+                job.embedded.set()
+            return True
+
+        async def merge(job: DocumentJob) -> bool | None:
+            await job.embedded.wait()
+            if job.failed:
+                return None
+            try:
+                await merge_extracted_entities(
+                    *job.extracted,
+                    knowledge_graph_inst=self.chunk_entity_relation_graph,
+                    entity_vdb=self.entities_vdb,
+                    relationships_vdb=self.relationships_vdb,
+                    global_config=global_config,
+                    pipeline_status=pipeline_status,
+                    pipeline_status_lock=pipeline_status_lock,
+                    llm_response_cache=self.llm_response_cache,
+                )
+                await index_chunk_entities(
+                    self.chunk_index, job.chunks, *job.extracted, doc_ids=[job.doc_id]
+                )
+            except Exception as e:
+                await fail(job, e)
+                return False
+            job.extracted = None
+            await persist_stage.put(job)
+            return True
+
+        async def persist(jobs: list[DocumentJob]) -> bool:
+            try:
+                await self._insert_done()
+                await self.doc_status.upsert(
+                    {
+                        job.doc_id: status_record(
+                            job, DocStatus.PROCESSED, chunks_count=len(job.chunks)
+                        )
+                        for job in jobs
+                    }
+                )
+            except Exception as e:
+                for job in jobs:
+                    await fail(job, e)
+                return False
+            for job in jobs:
+                await log_status(
+                    f"Completed processing file {job.number}/{total_files}: {job.file_path}"
+                )
+            return True
+
+        def report(_stage: PipelineStage | None = None) -> None:
+            # Assign a new dict, nested changes of a shared dict are not propagated
+            pipeline_status["stages"] = {stage.name: stage.stats() for stage in stages}
+
+        workers = self.max_parallel_insert
+        queue_size = self.pipeline_queue_size
+        chunk_stage = PipelineStage(
+            "chunk", chunk, workers, queue_size, on_stats=report
+        )
+        extract_stage = PipelineStage(
+            "extract", extract, workers, queue_size, on_stats=report
+        )
+        embed_stage = PipelineStage(
+            "embed", embed, workers, queue_size, on_stats=report
+        )
+        # The graph is merged under a global lock, one merging worker is enough
+        merge_stage = PipelineStage("merge", merge, 1, queue_size, on_stats=report)
+        persist_stage = PipelineStage(
+            "persist",
+            persist,
+            1,
+            batch_size=self.insert_persist_batch_size,
+            batch_timeout=self.insert_persist_interval,
+            on_stats=report,
+        )
+        stages = [chunk_stage, extract_stage, embed_stage, merge_stage, persist_stage]
+
+        for stage in stages:
+            stage.start()
+        try:
+            for doc_id, status_doc in to_process_docs.items():
+                await chunk_stage.put(
+                    DocumentJob(
+                        doc_id,
+                        status_doc,
+                        getattr(status_doc, "file_path", "unknown_source"),
+                    )
+                )
+            # Close in stage order so every stage sees all documents of the one before
+            await chunk_stage.close()
+            await asyncio.gather(extract_stage.close(), embed_stage.close())
+            await merge_stage.close()
+            await persist_stage.close()
+        finally:
+            for stage in stages:
+                stage.cancel()
+            report()
+
+    def _get_tokenize_executor(self) -> ProcessPoolExecutor | None:
+        if self.chunk_tokenize_workers <= 0:
+            return None
+        if self._tokenize_executor is None:
+            self._tokenize_executor = ProcessPoolExecutor(
+                max_workers=self.chunk_tokenize_workers
+            )
+        return self._tokenize_executor
+
+    async def _document_content(
+        self, doc_id: str, status_doc: DocProcessingStatus
+    ) -> str:
+        """Content of an enqueued document
+
+        Documents enqueued by older versions keep their content in the status
+        record, it is moved to full_docs on first access. full_docs is flushed
+        right away, before a status record without the content is written.
+        """
+        stored = await self.full_docs.get_by_id(doc_id)
+        if stored is not None:
+            return stored["content"]
+        if status_doc.content is None:
+            raise ValueError(f"Content of document {doc_id} not found in full_docs")
+        await self.full_docs.upsert({doc_id: {"content": status_doc.content}})
+        await self.full_docs.index_done_callback()
+        return status_doc.content
+
+    async def _stream_document_chunks(
+        self,
+        doc_id: str,
+        file_path: str,
+        content: str,
+        split_by_character: str | None,
+        split_by_character_only: bool,
+        batch_size: int = 32,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Chunk a document off the event loop and yield (chunk_id, chunk) pairs as they are produced"""
+        if self.chunking_func is chunking_by_token_size:
+            produced = iter_chunks_by_token_size(
+                self.tokenizer,
+                content,
+                split_by_character,
+                split_by_character_only,
+                self.chunk_overlap_token_size,
+                self.chunk_token_size,
+                executor=self._get_tokenize_executor(),
+            )
+        else:
+            produced = iter(
+                await asyncio.to_thread(
+                    self.chunking_func,
+                    self.tokenizer,
+                    content,
+                    split_by_character,
+                    split_by_character_only,
+                    self.chunk_overlap_token_size,
+                    self.chunk_token_size,
+                )
+            )
+
+        while batch := await asyncio.to_thread(list, islice(produced, batch_size)):
+            for dp in batch:
+                chunk_id = compute_mdhash_id(dp["content"], prefix="chunk-")
+                yield (
+                    chunk_id,
+                    {
+                        **dp,
+                        "full_doc_id": doc_id,
+                        "file_path": file_path,  # Add file path to each chunk
+                    },
+                )
+
     async def _process_entity_relation_graph(
-        self, chunk: dict[str, Any], pipeline_status=None, pipeline_status_lock=None
+        self,
+        chunk: dict[str, Any] | AsyncIterator[tuple[str, dict[str, Any]]],
+        pipeline_status=None,
+        pipeline_status_lock=None,
     ) -> None:
         try:
             await extract_entities(
@@ -1112,6 +1330,7 @@ class LightRAG:
                 pipeline_status=pipeline_status,
                 pipeline_status_lock=pipeline_status_lock,
                 llm_response_cache=self.llm_response_cache,
+                chunk_index=self.chunk_index,
             )
         except Exception as e:
             error_msg = f"Failed to extract entities and relationships: {str(e)}"
@@ -1129,6 +1348,7 @@ class LightRAG:
             for storage_inst in [  # type: ignore
                 self.full_docs,
                 self.text_chunks,
+                self.chunk_index,
                 self.llm_response_cache,
                 self.entities_vdb,
                 self.relationships_vdb,
@@ -1216,6 +1436,7 @@ class LightRAG:
                     "entity_id": entity_name,
                     "entity_type": entity_type,
                     "description": description,
+                    "description_tokens": self.tokenizer.count_tokens(description),
                     "source_id": source_id,
                 }
                 # Insert node data into the knowledge graph
@@ -1265,6 +1486,7 @@ class LightRAG:
                     edge_data={
                         "weight": weight,
                         "description": description,
+                        "description_tokens": self.tokenizer.count_tokens(description),
                         "keywords": keywords,
                         "source_id": source_id,
                     },
@@ -1310,6 +1532,17 @@ class LightRAG:
             }
             await self.relationships_vdb.upsert(data_for_vdb)
 
+            # Record what every chunk produced for deleting its document
+            custom_nodes: dict[str, list[dict]] = defaultdict(list)
+            for dp in all_entities_data:
+                custom_nodes[dp["entity_name"]].append(dp)
+            custom_edges: dict[tuple[str, str], list[dict]] = defaultdict(list)
+            for dp in all_relationships_data:
+                custom_edges[(dp["src_id"], dp["tgt_id"])].append(dp)
+            await index_chunk_entities(
+                self.chunk_index, all_chunks_data, custom_nodes, custom_edges
+            )
+
         except Exception as e:
             logger.error(f"Error in ainsert_custom_kg: {e}")
             raise
@@ -1356,16 +1589,128 @@ class LightRAG:
         Returns:
             str: The result of the query execution.
         """
-        # If a custom model is provided in param, temporarily update global config
+        response = await self._run_query(
+            query,
+            param,
+            system_prompt,
+            self.chunk_entity_relation_graph,
+            self.text_chunks,
+        )
+        await self._query_done()
+        return response
+
+    async def aquery_batch(
+        self,
+        queries: list[str],
+        param: QueryParam = QueryParam(),
+        system_prompt: str | None = None,
+        max_concurrency: int | None = None,
+        on_result: Callable[[int, Any, Exception | None], Any] | None = None,
+    ) -> list[str | AsyncIterator[str] | Exception]:
+        """
+        Answer a batch of queries concurrently.
+
+        Up to max_concurrency queries run through the same pipeline as aquery at
+        once. Within the batch, graph and text chunk lookups are shared between
+        queries, vector searches that run at the same time are sent to the
+        vector storages as one query_batch call, identical queries are answered
+        only once, and the LLM response cache is persisted once at the end
+        instead of after every query.
+
+        Args:
+            queries (list[str]): The queries to be executed.
+            param (QueryParam): Configuration parameters, copied for every query.
+            system_prompt (Optional[str]): Custom system prompt, see aquery.
+            max_concurrency (Optional[int]): Max number of queries in flight.
+                Defaults to llm_model_max_async.
+            on_result (Optional[Callable]): Called with (index, response, error) as
+                soon as a query finishes, for example to checkpoint results. May be
+                a coroutine function.
+
+        Returns:
+            list: The response of every query in input order, or the exception
+                raised while answering it.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.llm_model_max_async)
         global_config = asdict(self)
+        # Batch-wide read-through views, the per query views are layered on top
+        graph = _QueryScopedGraphView(self.chunk_entity_relation_graph)
+        text_chunks = _QueryScopedChunkView(self.text_chunks)
+        # Concurrent vector searches of the batch go out as one query_batch call
+        vector_storages = {
+            "entities_vdb": _BatchedVectorQueries(self.entities_vdb),
+            "relationships_vdb": _BatchedVectorQueries(self.relationships_vdb),
+            "chunks_vdb": _BatchedVectorQueries(self.chunks_vdb),
+        }
+
+        indices_by_query: dict[str, list[int]] = {}
+        for index, query in enumerate(queries):
+            indices_by_query.setdefault(query.strip(), []).append(index)
+
+        results: list[Any] = [None] * len(queries)
+
+        async def answer(query: str, indices: list[int]) -> None:
+            error = None
+            async with semaphore:
+                try:
+                    response = await self._run_query(
+                        query,
+                        replace(param),
+                        system_prompt,
+                        graph,
+                        text_chunks,
+                        global_config,
+                        **vector_storages,
+                    )
+                except Exception as e:
+                    logger.error(f"Batch query failed: {query[:100]}: {e}")
+                    response, error = e, e
+            for index in indices:
+                results[index] = response
+                if on_result is not None:
+                    callback_result = on_result(
+                        index, None if error else response, error
+                    )
+                    if asyncio.iscoroutine(callback_result):
+                        await callback_result
+
+        try:
+            await asyncio.gather(
+                *(answer(query, indices) for query, indices in indices_by_query.items())
+            )
+        finally:
+            await self._query_done()
+        return results
+
+    async def _run_query(
+        self,
+        query: str,
+        param: QueryParam,
+        system_prompt: str | None,
+        knowledge_graph_inst: BaseGraphStorage,
+        text_chunks_db: BaseKVStorage,
+        global_config: dict[str, Any] | None = None,
+        entities_vdb: BaseVectorStorage | None = None,
+        relationships_vdb: BaseVectorStorage | None = None,
+        chunks_vdb: BaseVectorStorage | None = None,
+    ) -> str | AsyncIterator[str]:
+        """Dispatch a query to the pipeline of its mode without persisting the cache"""
+        if global_config is None:
+            global_config = asdict(self)
+        if entities_vdb is None:
+            entities_vdb = self.entities_vdb
+        if relationships_vdb is None:
+            relationships_vdb = self.relationships_vdb
+        if chunks_vdb is None:
+            chunks_vdb = self.chunks_vdb
 
         if param.mode in ["local", "global", "hybrid"]:
             response = await kg_query(
                 query.strip(),
-                self.chunk_entity_relation_graph,
-                self.entities_vdb,
-                self.relationships_vdb,
-                self.text_chunks,
+                knowledge_graph_inst,
+                entities_vdb,
+                relationships_vdb,
+                text_chunks_db,
                 param,
                 global_config,
                 hashing_kv=self.llm_response_cache,  # Directly use llm_response_cache
@@ -1374,8 +1719,8 @@ class LightRAG:
         elif param.mode == "naive":
             response = await naive_query(
                 query.strip(),
-                self.chunks_vdb,
-                self.text_chunks,
+                chunks_vdb,
+                text_chunks_db,
                 param,
                 global_config,
                 hashing_kv=self.llm_response_cache,  # Directly use llm_response_cache
@@ -1384,11 +1729,11 @@ class LightRAG:
         elif param.mode == "mix":
             response = await mix_kg_vector_query(
                 query.strip(),
-                self.chunk_entity_relation_graph,
-                self.entities_vdb,
-                self.relationships_vdb,
-                self.chunks_vdb,
-                self.text_chunks,
+                knowledge_graph_inst,
+                entities_vdb,
+                relationships_vdb,
+                chunks_vdb,
+                text_chunks_db,
                 param,
                 global_config,
                 hashing_kv=self.llm_response_cache,  # Directly use llm_response_cache
@@ -1406,7 +1751,6 @@ class LightRAG:
             )
         else:
             raise ValueError(f"Unknown mode {param.mode}")
-        await self._query_done()
         return response
 
     def query_with_separate_keyword_extraction(
@@ -1492,6 +1836,12 @@ class LightRAG:
             raise ValueError(f"Invalid mode. Valid modes are: {valid_modes}")
 
         try:
+            # Forget the embeddings indexed for semantic cache lookups
+            semantic_index = SemanticCacheIndex.for_storage(self.llm_response_cache)
+            if semantic_index is not None:
+                for mode in modes or valid_modes:
+                    await semantic_index.remove(mode)
+
             # Reset the cache storage for specified mode
             if modes:
                 success = await self.llm_response_cache.drop_cache_by_modes(modes)
@@ -1516,6 +1866,81 @@ class LightRAG:
         """Synchronous version of aclear_cache."""
         return always_get_an_event_loop().run_until_complete(self.aclear_cache(modes))
 
+    async def aclear_cache_entries(
+        self,
+        modes: list[str] | None = None,
+        cache_types: list[str] | None = None,
+        models: list[str] | None = None,
+        max_age: float | None = None,
+    ) -> int:
+        """Selectively drop entries from the LLM response cache.
+
+        Entries are dropped only when they match every given filter, so other
+        cached answers stay reusable, e.g. across a parameter sweep. Only the
+        matching entries are deleted from the storage; JsonKVStorage still
+        rewrites its whole file when the change is persisted, LogKVStorage and
+        the database backends only write the deletions.
+
+        Args:
+            modes (list[str] | None): Modes to look into. Options: ["default", "naive", "local", "global", "hybrid", "mix"].
+                             If None, looks into all modes.
+            cache_types (list[str] | None): Cache types to drop, e.g. ["query", "keywords", "extract"].
+            models (list[str] | None): Drop entries produced by these LLM model names.
+            max_age (float | None): Drop entries older than this many seconds.
+
+        Returns:
+            int: Number of dropped cache entries
+
+        Example:
+            # Drop hybrid answers of an old model, keeping extracted keywords
+            await rag.aclear_cache_entries(
+                modes=["hybrid"], cache_types=["query"], models=["gpt-4o-mini"]
+            )
+
+            # Drop all query cache entries older than one day
+            await rag.aclear_cache_entries(max_age=24 * 3600)
+        """
+        if not self.llm_response_cache:
+            logger.warning("No cache storage configured")
+            return 0
+
+        valid_modes = ["default", "naive", "local", "global", "hybrid", "mix"]
+        if modes and not all(mode in valid_modes for mode in modes):
+            raise ValueError(f"Invalid mode. Valid modes are: {valid_modes}")
+
+        older_than = (
+            datetime.now().timestamp() - max_age if max_age is not None else None
+        )
+        dropped = await self.llm_response_cache.drop_cache_entries(
+            modes or valid_modes,
+            cache_types=cache_types,
+            models=models,
+            older_than=older_than,
+        )
+
+        semantic_index = SemanticCacheIndex.for_storage(self.llm_response_cache)
+        if semantic_index is not None:
+            for mode, cache_ids in dropped.items():
+                await semantic_index.remove(mode, cache_ids)
+
+        count = sum(len(cache_ids) for cache_ids in dropped.values())
+        if count:
+            await self.llm_response_cache.index_done_callback()
+        logger.info(f"Dropped {count} LLM cache entries")
+        return count
+
+    def clear_cache_entries(
+        self,
+        modes: list[str] | None = None,
+        cache_types: list[str] | None = None,
+        models: list[str] | None = None,
+        max_age: float | None = None,
+    ) -> int:
+        """Synchronous version of aclear_cache_entries."""
+        return always_get_an_event_loop().run_until_complete(
+            self.aclear_cache_entries(modes, cache_types, models, max_age)
+        )
+
     async def get_docs_by_status(
         self, status: DocStatus
     ) -> dict[str, DocProcessingStatus]:
@@ -1526,6 +1951,20 @@ class LightRAG:
         """
         return await self.doc_status.get_docs_by_status(status)
 
+    async def get_docs_paginated(
+        self,
+        status: DocStatus | None = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> tuple[dict[str, DocProcessingStatus], str | None]:
+        """Get a page of documents ordered by creation time
+
+        Returns:
+            Dict of the documents in the page and the cursor of the next page, None after the last page
+        """
+        return await self.doc_status.get_docs_paginated(status, limit, offset, cursor)
+
     async def aget_docs_by_ids(
         self, ids: str | list[str]
     ) -> dict[str, DocProcessingStatus]:
@@ -1592,9 +2031,61 @@ class LightRAG:
 
     # TODO: Deprecated (Deleting documents can cause hallucinations in RAG.)
     # Document delete is not working properly for most of the storage implementations.
+    async def arebuild_chunk_index(self) -> None:
+        """Rebuild the chunk index from the stored chunks and the graph
+
+        Indexes documents inserted before the chunk index existed and repairs
+        it after the graph was edited directly, e.g. after renaming or merging
+        entities. Reads all chunks and the whole graph.
+        """
+        all_chunks = await self.text_chunks.get_all()
+        chunks = {
+            chunk_id: chunk
+            for chunk_id, chunk in all_chunks.items()
+            if isinstance(chunk, dict) and chunk.get("full_doc_id")
+        }
+
+        graph = self.chunk_entity_relation_graph
+        labels = await graph.get_all_labels()
+        nodes, nodes_edges = await asyncio.gather(
+            graph.get_nodes_batch(labels), graph.get_nodes_edges_batch(labels)
+        )
+        edge_keys = dict.fromkeys(
+            tuple(sorted(edge)) for edges in nodes_edges.values() for edge in edges
+        )
+        edges = await graph.get_edges_batch(
+            [{"src": src, "tgt": tgt} for src, tgt in edge_keys]
+        )
+
+        # Shaped like the output of extract_chunk_entities
+        all_nodes = {
+            entity_name: [
+                {"source_id": source_id}
+                for source_id in (node.get("source_id") or "").split(GRAPH_FIELD_SEP)
+            ]
+            for entity_name, node in nodes.items()
+        }
+        all_edges = {
+            edge_key: [
+                {"source_id": source_id}
+                for source_id in (edge.get("source_id") or "").split(GRAPH_FIELD_SEP)
+            ]
+            for edge_key, edge in edges.items()
+        }
+
+        await self.chunk_index.drop()
+        await index_chunk_entities(self.chunk_index, chunks, all_nodes, all_edges)
+        await self.chunk_index.index_done_callback()
+        logger.info(f"Rebuilt the chunk index of {len(chunks)} chunks")
+
     async def adelete_by_doc_id(self, doc_id: str) -> None:
         """Delete a document and all its related data
 
+        The chunks of the document and the entities and relations extracted
+        from them are looked up in the chunk index, so only those records are
+        read and changed. A document missing from the index (inserted before
+        it existed) triggers arebuild_chunk_index first.
+
         Args:
             doc_id: Document ID to delete
         """
@@ -1606,245 +2097,177 @@ class LightRAG:
 
             logger.debug(f"Starting deletion for document {doc_id}")
 
-            # 2. Get all chunks related to this document
-            # Find all chunks where full_doc_id equals the current doc_id
-            all_chunks = await self.text_chunks.get_all()
-            related_chunks = {
-                chunk_id: chunk_data
-                for chunk_id, chunk_data in all_chunks.items()
-                if isinstance(chunk_data, dict)
-                and chunk_data.get("full_doc_id") == doc_id
-            }
+            # 2. Get the chunks of the document and what they produced
+            record = await self.chunk_index.get_by_id(doc_id)
+            if record is None:
+                logger.info(
+                    f"Document {doc_id} is not in the chunk index, rebuilding it"
+                )
+                await self.arebuild_chunk_index()
+                record = await self.chunk_index.get_by_id(doc_id)
+            indexed_chunks = (record or {}).get("chunks") or {}
 
-            if not related_chunks:
+            if not indexed_chunks:
                 logger.warning(f"No chunks found for document {doc_id}")
                 return
 
-            # Get all related chunk IDs
-            chunk_ids = set(related_chunks.keys())
-            logger.debug(f"Found {len(chunk_ids)} chunks to delete")
-
-            # TODO: self.entities_vdb.client_storage only works for local storage, need to fix this
-
-            # 3. Before deleting, check the related entities and relationships for these chunks
-            for chunk_id in chunk_ids:
-                # Check entities
-                entities_storage = await self.entities_vdb.client_storage
-                entities = [
-                    dp
-                    for dp in entities_storage["data"]
-                    if chunk_id in dp.get("source_id")
-                ]
-                logger.debug(f"Chunk {chunk_id} has {len(entities)} related entities")
-
-                # Check relationships
-                relationships_storage = await self.relationships_vdb.client_storage
-                relations = [
-                    dp
-                    for dp in relationships_storage["data"]
-                    if chunk_id in dp.get("source_id")
-                ]
-                logger.debug(f"Chunk {chunk_id} has {len(relations)} related relations")
-
-            # Continue with the original deletion process...
-
-            # 4. Delete chunks from vector database
-            if chunk_ids:
-                await self.chunks_vdb.delete(chunk_ids)
-                await self.text_chunks.delete(chunk_ids)
-
-            # 5. Find and process entities and relationships that have these chunks as source
-            # Get all nodes and edges from the graph storage using storage-agnostic methods
-            entities_to_delete = set()
-            entities_to_update = {}  # entity_name -> new_source_id
-            relationships_to_delete = set()
-            relationships_to_update = {}  # (src, tgt) -> new_source_id
-
-            # Process entities - use storage-agnostic methods
-            all_labels = await self.chunk_entity_relation_graph.get_all_labels()
-            for node_label in all_labels:
-                node_data = await self.chunk_entity_relation_graph.get_node(node_label)
-                if node_data and "source_id" in node_data:
-                    # Split source_id using GRAPH_FIELD_SEP
-                    sources = set(node_data["source_id"].split(GRAPH_FIELD_SEP))
-                    sources.difference_update(chunk_ids)
+            chunk_ids = set(indexed_chunks)
+            entity_names = sorted(
+                {name for refs in indexed_chunks.values() for name in refs["entities"]}
+            )
+            edge_keys = sorted(
+                {
+                    tuple(edge)
+                    for refs in indexed_chunks.values()
+                    for edge in refs["relations"]
+                }
+            )
+            logger.debug(
+                f"Found {len(chunk_ids)} chunks referenced by {len(entity_names)} entities "
+                f"and {len(edge_keys)} relationships"
+            )
+
+            # 3. Delete chunks from vector database
+            await asyncio.gather(
+                self.chunks_vdb.delete(list(chunk_ids)),
+                self.text_chunks.delete(list(chunk_ids)),
+            )
+
+            # 4. Remove the chunks from the sources of the entities and
+            # relationships, the ones without remaining sources are deleted
+            def remaining_sources(data: dict | None) -> list[str] | None:
+                if not data or "source_id" not in data:
+                    return None
+                sources = data["source_id"].split(GRAPH_FIELD_SEP)
+                remaining = [source for source in sources if source not in chunk_ids]
+                return None if len(remaining) == len(sources) else remaining
+
+            graph = self.chunk_entity_relation_graph
+            graph_db_lock = get_graph_db_lock(enable_logging=False)
+            async with graph_db_lock:
+                nodes, edges = await asyncio.gather(
+                    graph.get_nodes_batch(entity_names),
+                    graph.get_edges_batch(
+                        [{"src": src, "tgt": tgt} for src, tgt in edge_keys]
+                    ),
+                )
+
+                entities_to_delete = set()
+                entities_to_update = {}  # entity_name -> node data
+                for entity_name, node_data in nodes.items():
+                    sources = remaining_sources(node_data)
+                    if sources is None:
+                        continue
                     if not sources:
-                        entities_to_delete.add(node_label)
+                        entities_to_delete.add(entity_name)
                         logger.debug(
-                            f"Entity {node_label} marked for deletion - no remaining sources"
+                            f"Entity {entity_name} marked for deletion - no remaining sources"
                         )
                     else:
-                        new_source_id = GRAPH_FIELD_SEP.join(sources)
-                        entities_to_update[node_label] = new_source_id
+                        entities_to_update[entity_name] = {
+                            **node_data,
+                            "source_id": GRAPH_FIELD_SEP.join(sources),
+                        }
+
+                relationships_to_delete = set()
+                relationships_to_update = {}  # (src, tgt) -> edge data
+                # Removing an entity removes all its edges from the graph,
+                # also the ones other documents still refer to
+                removed_with_nodes = set()
+                if entities_to_delete:
+                    nodes_edges = await graph.get_nodes_edges_batch(
+                        list(entities_to_delete)
+                    )
+                    removed_with_nodes = {
+                        tuple(edge)
+                        for node_edges in nodes_edges.values()
+                        for edge in node_edges or []
+                    }
+                for (src, tgt), edge_data in edges.items():
+                    sources = remaining_sources(edge_data)
+                    if sources is None:
+                        continue
+                    if not sources or entities_to_delete.intersection((src, tgt)):
+                        relationships_to_delete.add((src, tgt))
                         logger.debug(
-                            f"Entity {node_label} will be updated with new source_id: {new_source_id}"
+                            f"Relationship {src}-{tgt} marked for deletion - no remaining sources"
                         )
-
-            # Process relationships
-            for node_label in all_labels:
-                node_edges = await self.chunk_entity_relation_graph.get_node_edges(
-                    node_label
-                )
-                if node_edges:
-                    for src, tgt in node_edges:
-                        edge_data = await self.chunk_entity_relation_graph.get_edge(
-                            src, tgt
-                        )
-                        if edge_data and "source_id" in edge_data:
-                            # Split source_id using GRAPH_FIELD_SEP
-                            sources = set(edge_data["source_id"].split(GRAPH_FIELD_SEP))
-                            sources.difference_update(chunk_ids)
-                            if not sources:
-                                relationships_to_delete.add((src, tgt))
-                                logger.debug(
-                                    f"Relationship {src}-{tgt} marked for deletion - no remaining sources"
-                                )
-                            else:
-                                new_source_id = GRAPH_FIELD_SEP.join(sources)
-                                relationships_to_update[(src, tgt)] = new_source_id
-                                logger.debug(
-                                    f"Relationship {src}-{tgt} will be updated with new source_id: {new_source_id}"
-                                )
-
-            # Delete entities
-            if entities_to_delete:
-                for entity in entities_to_delete:
-                    await self.entities_vdb.delete_entity(entity)
-                    logger.debug(f"Deleted entity {entity} from vector DB")
-                await self.chunk_entity_relation_graph.remove_nodes(
-                    list(entities_to_delete)
-                )
-                logger.debug(f"Deleted {len(entities_to_delete)} entities from graph")
-
-            # Update entities
-            for entity, new_source_id in entities_to_update.items():
-                node_data = await self.chunk_entity_relation_graph.get_node(entity)
-                if node_data:
-                    node_data["source_id"] = new_source_id
-                    await self.chunk_entity_relation_graph.upsert_node(
-                        entity, node_data
+                    else:
+                        relationships_to_update[(src, tgt)] = {
+                            **edge_data,
+                            "source_id": GRAPH_FIELD_SEP.join(sources),
+                        }
+
+                # Delete entities
+                if entities_to_delete:
+                    await self.entities_vdb.delete(
+                        [
+                            compute_mdhash_id(entity, prefix="ent-")
+                            for entity in entities_to_delete
+                        ]
                     )
+                    await graph.remove_nodes(list(entities_to_delete))
                     logger.debug(
-                        f"Updated entity {entity} with new source_id: {new_source_id}"
+                        f"Deleted {len(entities_to_delete)} entities from graph"
                     )
 
-            # Delete relationships
-            if relationships_to_delete:
-                for src, tgt in relationships_to_delete:
-                    rel_id_0 = compute_mdhash_id(src + tgt, prefix="rel-")
-                    rel_id_1 = compute_mdhash_id(tgt + src, prefix="rel-")
-                    await self.relationships_vdb.delete([rel_id_0, rel_id_1])
-                    logger.debug(f"Deleted relationship {src}-{tgt} from vector DB")
-                await self.chunk_entity_relation_graph.remove_edges(
-                    list(relationships_to_delete)
-                )
-                logger.debug(
-                    f"Deleted {len(relationships_to_delete)} relationships from graph"
-                )
-
-            # Update relationships
-            for (src, tgt), new_source_id in relationships_to_update.items():
-                edge_data = await self.chunk_entity_relation_graph.get_edge(src, tgt)
-                if edge_data:
-                    edge_data["source_id"] = new_source_id
-                    await self.chunk_entity_relation_graph.upsert_edge(
-                        src, tgt, edge_data
+                # Delete relationships, with the vector records of the edges
+                # removed together with their entities
+                if relationships_to_delete or removed_with_nodes:
+                    await self.relationships_vdb.delete(
+                        [
+                            compute_mdhash_id(a + b, prefix="rel-")
+                            for src, tgt in relationships_to_delete | removed_with_nodes
+                            for a, b in ((src, tgt), (tgt, src))
+                        ]
                     )
+                if relationships_to_delete:
+                    await graph.remove_edges(list(relationships_to_delete))
                     logger.debug(
-                        f"Updated relationship {src}-{tgt} with new source_id: {new_source_id}"
+                        f"Deleted {len(relationships_to_delete)} relationships from graph"
+                    )
+
+                # Update the sources in the graph and the vector databases
+                if entities_to_update:
+                    await graph.upsert_nodes(entities_to_update)
+                    await self.entities_vdb.upsert(
+                        entity_vdb_data(
+                            [
+                                {**node_data, "entity_name": entity_name}
+                                for entity_name, node_data in entities_to_update.items()
+                            ]
+                        )
+                    )
+                if relationships_to_update:
+                    await graph.upsert_edges(relationships_to_update)
+                    await self.relationships_vdb.upsert(
+                        relationship_vdb_data(
+                            [
+                                {**edge_data, "src_id": src, "tgt_id": tgt}
+                                for (
+                                    src,
+                                    tgt,
+                                ), edge_data in relationships_to_update.items()
+                            ]
+                        )
                     )
 
-            # 6. Delete original document and status
-            await self.full_docs.delete([doc_id])
-            await self.doc_status.delete([doc_id])
+            # 5. Delete original document, status and index record
+            await asyncio.gather(
+                self.full_docs.delete([doc_id]),
+                self.doc_status.delete([doc_id]),
+                self.chunk_index.delete([doc_id]),
+            )
 
-            # 7. Ensure all indexes are updated
+            # 6. Ensure all indexes are updated
             await self._insert_done()
 
             logger.info(
                 f"Successfully deleted document {doc_id} and related data. "
-                f"Deleted {len(entities_to_delete)} entities and {len(relationships_to_delete)} relationships. "
+                f"Deleted {len(entities_to_delete)} entities and {len(relationships_to_delete | removed_with_nodes)} relationships. "
                 f"Updated {len(entities_to_update)} entities and {len(relationships_to_update)} relationships."
             )
 
-            async def process_data(data_type, vdb, chunk_id):
-                # Check data (entities or relationships)
-                storage = await vdb.client_storage
-                data_with_chunk = [
-                    dp
-                    for dp in storage["data"]
-                    if chunk_id in (dp.get("source_id") or "").split(GRAPH_FIELD_SEP)
-                ]
-
-                data_for_vdb = {}
-                if data_with_chunk:
-                    logger.warning(
-                        f"found {len(data_with_chunk)} {data_type} still referencing chunk {chunk_id}"
-                    )
-
-                    for item in data_with_chunk:
-                        old_sources = item["source_id"].split(GRAPH_FIELD_SEP)
-                        new_sources = [src for src in old_sources if src != chunk_id]
-
-                        if not new_sources:
-                            logger.info(
-                                f"{data_type} {item.get('entity_name', 'N/A')} is deleted because source_id is not exists"
-                            )
-                            await vdb.delete_entity(item)
-                        else:
-                            item["source_id"] = GRAPH_FIELD_SEP.join(new_sources)
-                            item_id = item["__id__"]
-                            data_for_vdb[item_id] = item.copy()
-                            if data_type == "entities":
-                                data_for_vdb[item_id]["content"] = data_for_vdb[
-                                    item_id
-                                ].get("content") or (
-                                    item.get("entity_name", "")
-                                    + (item.get("description") or "")
-                                )
-                            else:  # relationships
-                                data_for_vdb[item_id]["content"] = data_for_vdb[
-                                    item_id
-                                ].get("content") or (
-                                    (item.get("keywords") or "")
-                                    + (item.get("src_id") or "")
-                                    + (item.get("tgt_id") or "")
-                                    + (item.get("description") or "")
-                                )
-
-                    if data_for_vdb:
-                        await vdb.upsert(data_for_vdb)
-                        logger.info(f"Successfully updated {data_type} in vector DB")
-
-            # Add verification step
-            async def verify_deletion():
-                # Verify if the document has been deleted
-                if await self.full_docs.get_by_id(doc_id):
-                    logger.warning(f"Document {doc_id} still exists in full_docs")
-
-                # Verify if chunks have been deleted
-                all_remaining_chunks = await self.text_chunks.get_all()
-                remaining_related_chunks = {
-                    chunk_id: chunk_data
-                    for chunk_id, chunk_data in all_remaining_chunks.items()
-                    if isinstance(chunk_data, dict)
-                    and chunk_data.get("full_doc_id") == doc_id
-                }
-
-                if remaining_related_chunks:
-                    logger.warning(
-                        f"Found {len(remaining_related_chunks)} remaining chunks"
-                    )
-
-                # Verify entities and relationships
-                for chunk_id in chunk_ids:
-                    await process_data("entities", self.entities_vdb, chunk_id)
-                    await process_data(
-                        "relationships", self.relationships_vdb, chunk_id
-                    )
-
-            await verify_deletion()
-
         except Exception as e:
             logger.error(f"Error while deleting document {doc_id}: {e}")
 
@@ -0,0 +1,115 @@
+"""
+Registry of reusable HTTP clients for the LLM and embedding bindings.
+
+Creating a client per request throws away its connection pool, so every call
+pays for a fresh TCP (and TLS) handshake. The bindings instead look their
+client up here by binding name and connection settings (base url, api key,
+client configs, ...), and the same keep-alive pool is reused across calls.
+
+Async clients are bound to the event loop they were created on, so they are
+registered per running loop and dropped together with it. Clients are closed
+by `close_pooled_clients`, which `LightRAG.finalize_storages` calls; the next
+call through a binding transparently creates a new client.
+
+Pool limits can be tuned with the following environment variables:
+    LLM_HTTP_MAX_CONNECTIONS: maximum number of concurrent connections per client
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: maximum number of idle keep-alive connections
+    LLM_HTTP_KEEPALIVE_EXPIRY: seconds an idle connection is kept open
+    LLM_HTTP_TIMEOUT: default request timeout in seconds (library default if unset)
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import threading
+import weakref
+from typing import Any, Callable, TypeVar
+
+from lightrag.utils import logger
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+)
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_TIMEOUT = (
+    float(os.environ["LLM_HTTP_TIMEOUT"]) if os.getenv("LLM_HTTP_TIMEOUT") else None
+)
+
+T = TypeVar("T")
+
+# event loop -> {client key: (client, closer)}
+_loop_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# clients that are not tied to an event loop (synchronous SDK clients)
+_shared_clients: dict[tuple[str, str], tuple[Any, Callable[[Any], Any]]] = {}
+_registry_lock = threading.Lock()
+
+
+def make_client_key(binding: str, **settings: Any) -> tuple[str, str]:
+    """Build a hashable registry key from a binding name and its connection settings"""
+    return binding, json.dumps(settings, sort_keys=True, default=repr)
+
+
+def httpx_limits():
+    """Connection pool limits for httpx based clients"""
+    import httpx
+
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_pooled_client(
+    key: tuple[str, str],
+    factory: Callable[[], T],
+    closer: Callable[[T], Any],
+    loop_bound: bool = True,
+) -> T:
+    """Return the client registered under `key`, creating it with `factory` on first use.
+
+    Args:
+        key: Registry key, see `make_client_key`
+        factory: Creates a new client
+        closer: Releases a client's connections, may return an awaitable
+        loop_bound: Register the client for the running event loop only.
+            Must be called from a coroutine when True.
+    """
+    with _registry_lock:
+        if loop_bound:
+            clients = _loop_clients.setdefault(asyncio.get_running_loop(), {})
+        else:
+            clients = _shared_clients
+        entry = clients.get(key)
+        if entry is None:
+            entry = (factory(), closer)
+            clients[key] = entry
+            logger.debug(f"Created pooled HTTP client for {key[0]}")
+        return entry[0]
+
+
+async def close_pooled_clients() -> None:
+    """Close all pooled clients owned by the running event loop and the shared clients.
+
+    Clients registered for other event loops cannot be closed from here; the
+    entries of closed loops are simply dropped.
+    """
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        entries = list(_loop_clients.pop(loop, {}).items())
+        entries.extend(_shared_clients.items())
+        _shared_clients.clear()
+        for other_loop in [lp for lp in _loop_clients if lp.is_closed()]:
+            _loop_clients.pop(other_loop, None)
+
+    for (binding, _), (client, closer) in entries:
+        try:
+            result = closer(client)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.warning(f"Failed to close pooled HTTP client for {binding}: {e}")
+    if entries:
+        logger.debug(f"Closed {len(entries)} pooled HTTP clients")
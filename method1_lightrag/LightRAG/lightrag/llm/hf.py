@@ -1,5 +1,8 @@
+import asyncio
 import copy
 import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from dotenv import load_dotenv
 
@@ -17,7 +20,12 @@ if not pm.is_installed("numpy"):
 if not pm.is_installed("tenacity"):
     pm.install("tenacity")
 
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
+from transformers import (
+    AutoModel,
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    BitsAndBytesConfig,
+)
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -31,55 +39,86 @@ from lightrag.exceptions import (
 )
 from lightrag.utils import (
     locate_json_string_body_from_string,
+    logger,
 )
 import torch
 import numpy as np
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Max number of prompts generated together in one batch
+HF_MAX_BATCH_SIZE = int(os.getenv("HF_MAX_BATCH_SIZE", 8))
+# Max time the first prompt of a batch waits for concurrent prompts to join it
+HF_BATCH_WAIT_MS = float(os.getenv("HF_BATCH_WAIT_MS", 20))
+# A prompt starts a new batch once it is this many times longer than the
+# shortest prompt of the current one, to limit the padding in a batch
+HF_PADDING_RATIO = float(os.getenv("HF_PADDING_RATIO", 1.5))
+HF_MAX_NEW_TOKENS = int(os.getenv("HF_MAX_NEW_TOKENS", 512))
+
+# All model loading and inference runs on this thread, so the event loop is
+# never blocked and the models are never used by two threads at once
+_hf_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hf")
+
+
+def _hf_device():
+    """The device set in env DEVICE, otherwise the best available one"""
+    if os.getenv("DEVICE"):
+        return torch.device(os.getenv("DEVICE"))
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    if torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
 
-@lru_cache(maxsize=1)
+async def _run_on_hf_worker(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hf_executor, func, *args)
+
+
+@lru_cache(maxsize=None)
 def initialize_hf_model(model_name):
-    hf_token = os.getenv("HF_TOKEN")  
-    quant_config = BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_compute_dtype="bfloat16")
+    hf_token = os.getenv("HF_TOKEN")
     if not hf_token:
         raise ValueError("Missing env 'HF_TOKEN'.")
+    # 4-bit quantization needs bitsandbytes on a CUDA device
+    quant_config = (
+        BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_compute_dtype="bfloat16")
+        if torch.cuda.is_available()
+        else None
+    )
     hf_tokenizer = AutoTokenizer.from_pretrained(
-        model_name, device_map=os.getenv("DEVICE"), trust_remote_code=True, 
-        token=hf_token
+        model_name,
+        device_map=os.getenv("DEVICE"),
+        trust_remote_code=True,
+        token=hf_token,
     )
     hf_model = AutoModelForCausalLM.from_pretrained(
-        model_name, device_map=os.getenv("DEVICE"), trust_remote_code=True, quantization_config=quant_config,
-        token=hf_token
+        model_name,
+        device_map=os.getenv("DEVICE"),
+        trust_remote_code=True,
+        quantization_config=quant_config,
+        token=hf_token,
     )
     if hf_tokenizer.pad_token is None:
         hf_tokenizer.pad_token = hf_tokenizer.eos_token
+    # Decoder-only models must be left padded for batched generation
+    hf_tokenizer.padding_side = "left"
+    hf_model.eval()
+    logger.info(f"Loaded HF model {model_name} on {hf_model.device}")
 
     return hf_model, hf_tokenizer
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type(
-        (RateLimitError, APIConnectionError, APITimeoutError)
-    ),
-)
-async def hf_model_if_cache(
-    model,
-    prompt,
-    system_prompt=None,
-    history_messages=[],
-    **kwargs,
-) -> str:
-    model_name = model
-    hf_model, hf_tokenizer = initialize_hf_model(model_name)
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.extend(history_messages)
-    messages.append({"role": "user", "content": prompt})
-    kwargs.pop("hashing_kv", None)
+@lru_cache(maxsize=None)
+def initialize_hf_embed_model(model_name):
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    embed_model = AutoModel.from_pretrained(model_name).to(_hf_device())
+    embed_model.eval()
+    logger.info(f"Loaded HF embedding model {model_name} on {embed_model.device}")
+    return tokenizer, embed_model
+
+
+def _build_hf_prompt(hf_tokenizer, messages) -> str:
     input_prompt = ""
     try:
         input_prompt = hf_tokenizer.apply_chat_template(
@@ -112,19 +151,142 @@ async def hf_model_if_cache(
                     + ori_message[msgid]["role"]
                     + ">\n"
                 )
+    return input_prompt
 
-    input_ids = hf_tokenizer(
-        input_prompt, return_tensors="pt", padding=True, truncation=True
-    ).to("cuda")
-    inputs = {k: v.to(hf_model.device) for k, v in input_ids.items()}
-    output = hf_model.generate(
-        **input_ids, max_new_tokens=512, num_return_sequences=1, early_stopping=True
-    )
-    response_text = hf_tokenizer.decode(
-        output[0][len(inputs["input_ids"][0]) :], skip_special_tokens=True
-    )
 
-    return response_text
+def _generate_batch(model_name, prompts: list[str]) -> list[str]:
+    """Generate completions for prompts, grouping prompts of similar length"""
+    hf_model, hf_tokenizer = initialize_hf_model(model_name)
+    lengths = [len(ids) for ids in hf_tokenizer(prompts)["input_ids"]]
+    order = sorted(range(len(prompts)), key=lambda i: lengths[i])
+
+    groups, group = [], []
+    for i in order:
+        if group and lengths[i] > HF_PADDING_RATIO * max(lengths[group[0]], 1):
+            groups.append(group)
+            group = []
+        group.append(i)
+    groups.append(group)
+
+    responses = [None] * len(prompts)
+    for group in groups:
+        inputs = hf_tokenizer(
+            [prompts[i] for i in group],
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+        ).to(hf_model.device)
+        with torch.no_grad():
+            output = hf_model.generate(
+                **inputs,
+                max_new_tokens=HF_MAX_NEW_TOKENS,
+                num_return_sequences=1,
+                early_stopping=True,
+                pad_token_id=hf_tokenizer.pad_token_id,
+            )
+        # With left padding, the generated tokens of every row start here
+        prompt_width = inputs["input_ids"].shape[1]
+        for row, i in enumerate(group):
+            responses[i] = hf_tokenizer.decode(
+                output[row][prompt_width:], skip_special_tokens=True
+            )
+    return responses
+
+
+class _HFGenerationBatcher:
+    """Collects concurrent prompts for one model into batched generate calls.
+
+    The first prompt of a batch waits up to HF_BATCH_WAIT_MS for others to
+    join it, up to HF_MAX_BATCH_SIZE prompts. The batch is generated on the HF
+    worker thread while new prompts queue up for the next one. The collecting
+    task stops once the queue is empty and is restarted by the next prompt.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._arrived = asyncio.Event()
+        self._task = None
+
+    async def generate(self, prompt: str) -> str:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((prompt, future))
+        self._arrived.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        while self._pending:
+            if len(self._pending) < HF_MAX_BATCH_SIZE:
+                deadline = asyncio.get_running_loop().time() + HF_BATCH_WAIT_MS / 1000
+                while len(self._pending) < HF_MAX_BATCH_SIZE:
+                    timeout = deadline - asyncio.get_running_loop().time()
+                    if timeout <= 0:
+                        break
+                    self._arrived.clear()
+                    try:
+                        await asyncio.wait_for(self._arrived.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+            batch = self._pending[:HF_MAX_BATCH_SIZE]
+            del self._pending[:HF_MAX_BATCH_SIZE]
+            batch = [(prompt, future) for prompt, future in batch if not future.done()]
+            if not batch:
+                continue
+            logger.debug(f"HF generating a batch of {len(batch)} prompts")
+            try:
+                responses = await _run_on_hf_worker(
+                    _generate_batch, self.model_name, [prompt for prompt, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+
+# event loop -> {model name: batcher}
+_generation_batchers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _get_generation_batcher(model_name) -> _HFGenerationBatcher:
+    batchers = _generation_batchers.setdefault(asyncio.get_running_loop(), {})
+    if model_name not in batchers:
+        batchers[model_name] = _HFGenerationBatcher(model_name)
+    return batchers[model_name]
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    retry=retry_if_exception_type(
+        (RateLimitError, APIConnectionError, APITimeoutError)
+    ),
+)
+async def hf_model_if_cache(
+    model,
+    prompt,
+    system_prompt=None,
+    history_messages=[],
+    **kwargs,
+) -> str:
+    model_name = model
+    # Loads the model once per process, off the event loop
+    _, hf_tokenizer = await _run_on_hf_worker(initialize_hf_model, model_name)
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.extend(history_messages)
+    messages.append({"role": "user", "content": prompt})
+    kwargs.pop("hashing_kv", None)
+    input_prompt = _build_hf_prompt(hf_tokenizer, messages)
+
+    return await _get_generation_batcher(model_name).generate(input_prompt)
 
 
 async def hf_model_complete(
@@ -144,18 +306,8 @@ async def hf_model_complete(
     return result
 
 
-async def hf_embed(texts: list[str], tokenizer, embed_model) -> np.ndarray:
-    # Detect the appropriate device
-    if torch.cuda.is_available():
-        device = next(embed_model.parameters()).device  # Use CUDA if available
-    elif torch.backends.mps.is_available():
-        device = torch.device("mps")  # Use MPS for Apple Silicon
-    else:
-        device = torch.device("cpu")  # Fallback to CPU
-    device = os.getenv("DEVICE")
-    # Move the model to the detected device
-    embed_model = embed_model.to(device)
-
+def _embed_batch(texts: list[str], tokenizer, embed_model) -> np.ndarray:
+    device = next(embed_model.parameters()).device
     # Tokenize the input texts and move them to the same device
     encoded_texts = tokenizer(
         texts, return_tensors="pt", padding=True, truncation=True
@@ -174,3 +326,28 @@ async def hf_embed(texts: list[str], tokenizer, embed_model) -> np.ndarray:
         return embeddings.detach().to(torch.float32).cpu().numpy()
     else:
         return embeddings.detach().cpu().numpy()
+
+
+def _place_embed_model(embed_model):
+    device = _hf_device()
+    if next(embed_model.parameters()).device != device:
+        embed_model = embed_model.to(device)
+    return embed_model
+
+
+async def hf_embed(
+    texts: list[str], tokenizer=None, embed_model=None, model_name: str = None
+) -> np.ndarray:
+    """Embed texts with a local HF model on the HF worker thread.
+
+    Either pass a loaded `tokenizer` and `embed_model`, or `model_name` to use
+    the model loaded once per process by `initialize_hf_embed_model`.
+    """
+    if model_name is not None:
+        tokenizer, embed_model = await _run_on_hf_worker(
+            initialize_hf_embed_model, model_name
+        )
+    else:
+        # Only moves the model if it is not on the target device yet
+        embed_model = await _run_on_hf_worker(_place_embed_model, embed_model)
+    return await _run_on_hf_worker(_embed_batch, texts, tokenizer, embed_model)
@@ -25,10 +25,32 @@ from lightrag.exceptions import (
     APITimeoutError,
 )
 
+from lightrag.llm.client_pool import (
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_TIMEOUT,
+    get_pooled_client,
+    make_client_key,
+)
+
 from typing import Union, List
 import numpy as np
 
 
+def get_lollms_session(headers: dict[str, str]) -> aiohttp.ClientSession:
+    """Return a pooled aiohttp session sending the given headers"""
+    return get_pooled_client(
+        make_client_key("lollms", headers=headers),
+        lambda: aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_MAX_CONNECTIONS, keepalive_timeout=HTTP_KEEPALIVE_EXPIRY
+            ),
+        ),
+        lambda session: session.close(),
+    )
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -79,24 +101,24 @@ async def lollms_model_if_cache(
     full_prompt += prompt
 
     request_data["prompt"] = full_prompt
-    timeout = aiohttp.ClientTimeout(total=kwargs.get("timeout", None))
-
-    async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-        if stream:
+    timeout = aiohttp.ClientTimeout(total=kwargs.get("timeout", HTTP_TIMEOUT))
 
-            async def inner():
-                async with session.post(
-                    f"{base_url}/lollms_generate", json=request_data
-                ) as response:
-                    async for line in response.content:
-                        yield line.decode().strip()
+    session = get_lollms_session(headers)
+    if stream:
 
-            return inner()
-        else:
+        async def inner():
             async with session.post(
-                f"{base_url}/lollms_generate", json=request_data
+                f"{base_url}/lollms_generate", json=request_data, timeout=timeout
             ) as response:
-                return await response.text()
+                async for line in response.content:
+                    yield line.decode().strip()
+
+        return inner()
+    else:
+        async with session.post(
+            f"{base_url}/lollms_generate", json=request_data, timeout=timeout
+        ) as response:
+            return await response.text()
 
 
 async def lollms_model_complete(
@@ -146,16 +168,16 @@ async def lollms_embed(
         if api_key
         else {"Content-Type": "application/json"}
     )
-    async with aiohttp.ClientSession(headers=headers) as session:
-        embeddings = []
-        for text in texts:
-            request_data = {"text": text}
-
-            async with session.post(
-                f"{base_url}/lollms_embed",
-                json=request_data,
-            ) as response:
-                result = await response.json()
-                embeddings.append(result["vector"])
-
-        return np.array(embeddings)
+    session = get_lollms_session(headers)
+    embeddings = []
+    for text in texts:
+        request_data = {"text": text}
+
+        async with session.post(
+            f"{base_url}/lollms_embed",
+            json=request_data,
+        ) as response:
+            result = await response.json()
+            embeddings.append(result["vector"])
+
+    return np.array(embeddings)
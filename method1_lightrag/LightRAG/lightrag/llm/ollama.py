@@ -28,11 +28,38 @@ from lightrag.exceptions import (
     APITimeoutError,
 )
 from lightrag.api import __api_version__
+from lightrag.llm.client_pool import (
+    HTTP_TIMEOUT,
+    get_pooled_client,
+    httpx_limits,
+    make_client_key,
+)
 
 import numpy as np
 from typing import Union
 
 
+def get_ollama_async_client(
+    host: str | None = None,
+    timeout: float | None = None,
+    headers: dict = None,
+    **kwargs,
+) -> ollama.AsyncClient:
+    """Return a pooled ollama.AsyncClient for the given host, timeout and headers"""
+    if timeout is None:
+        timeout = HTTP_TIMEOUT
+    key = make_client_key(
+        "ollama", host=host, timeout=timeout, headers=headers, **kwargs
+    )
+    return get_pooled_client(
+        key,
+        lambda: ollama.AsyncClient(
+            host=host, timeout=timeout, headers=headers, limits=httpx_limits(), **kwargs
+        ),
+        lambda client: client._client.aclose(),
+    )
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -61,7 +88,7 @@ async def _ollama_model_if_cache(
     }
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
-    ollama_client = ollama.AsyncClient(host=host, timeout=timeout, headers=headers)
+    ollama_client = get_ollama_async_client(host=host, timeout=timeout, headers=headers)
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
@@ -127,6 +154,6 @@ async def ollama_embed(texts: list[str], embed_model, **kwargs) -> np.ndarray:
     if api_key:
         headers["Authorization"] = api_key
     kwargs["headers"] = headers
-    ollama_client = ollama.Client(**kwargs)
-    data = ollama_client.embed(model=embed_model, input=texts)
+    ollama_client = get_ollama_async_client(**kwargs)
+    data = await ollama_client.embed(model=embed_model, input=texts)
     return np.array(data["embeddings"])
@@ -15,6 +15,7 @@ if not pm.is_installed("openai"):
 
 from openai import (
     AsyncOpenAI,
+    DefaultAsyncHttpxClient,
     APIConnectionError,
     RateLimitError,
     APITimeoutError,
@@ -34,6 +35,12 @@ from lightrag.utils import (
 )
 from lightrag.types import GPTKeywordExtractionFormat
 from lightrag.api import __api_version__
+from lightrag.llm.client_pool import (
+    HTTP_TIMEOUT,
+    get_pooled_client,
+    httpx_limits,
+    make_client_key,
+)
 
 import numpy as np
 from typing import Any, Union
@@ -97,6 +104,49 @@ def create_openai_async_client(
     return AsyncOpenAI(**merged_configs)
 
 
+def get_openai_async_client(
+    api_key: str | None = None,
+    base_url: str | None = None,
+    client_configs: dict[str, Any] = None,
+) -> AsyncOpenAI:
+    """Return a pooled AsyncOpenAI client for the given configuration.
+
+    Calls with the same api key, base url and client configs share one client
+    and therefore one keep-alive connection pool. Unless `client_configs`
+    provides its own `http_client` or `timeout`, the pool limits and timeout
+    from `lightrag.llm.client_pool` are applied.
+
+    Args:
+        api_key: OpenAI API key. If None, uses the OPENAI_API_KEY environment variable.
+        base_url: Base URL for the OpenAI API. If None, uses the OPENAI_API_BASE
+            environment variable or the default OpenAI API URL.
+        client_configs: Additional configuration options for the AsyncOpenAI client.
+
+    Returns:
+        An AsyncOpenAI client instance owned by the client pool.
+    """
+    if not api_key:
+        api_key = os.environ["OPENAI_API_KEY"]
+    if base_url is None:
+        base_url = os.environ.get("OPENAI_API_BASE", "https://api.openai.com/v1")
+    client_configs = dict(client_configs or {})
+
+    def factory() -> AsyncOpenAI:
+        configs = dict(client_configs)
+        if "http_client" not in configs:
+            configs["http_client"] = DefaultAsyncHttpxClient(limits=httpx_limits())
+        if HTTP_TIMEOUT is not None:
+            configs.setdefault("timeout", HTTP_TIMEOUT)
+        return create_openai_async_client(
+            api_key=api_key, base_url=base_url, client_configs=configs
+        )
+
+    key = make_client_key(
+        "openai", api_key=api_key, base_url=base_url, client_configs=client_configs
+    )
+    return get_pooled_client(key, factory, lambda client: client.close())
+
+
 @retry(
     stop=stop_after_attempt(10000000),
     wait=wait_exponential(multiplier=1, min=60, max=240),
@@ -150,8 +200,8 @@ async def openai_complete_if_cache(
     # Extract client configuration options
     client_configs = kwargs.pop("openai_client_configs", {})
 
-    # Create the OpenAI client
-    openai_async_client = create_openai_async_client(
+    # Reuse the pooled OpenAI client for this configuration
+    openai_async_client = get_openai_async_client(
         api_key=api_key, base_url=base_url, client_configs=client_configs
     )
 
@@ -385,8 +435,8 @@ async def openai_embed(
         RateLimitError: If the OpenAI API rate limit is exceeded.
         APITimeoutError: If the OpenAI API request times out.
     """
-    # Create the OpenAI client
-    openai_async_client = create_openai_async_client(
+    # Reuse the pooled OpenAI client for this configuration
+    openai_async_client = get_openai_async_client(
         api_key=api_key, base_url=base_url, client_configs=client_configs
     )
 
@@ -31,11 +31,29 @@ from lightrag.utils import (
 )
 
 from lightrag.types import GPTKeywordExtractionFormat
+from lightrag.llm.client_pool import get_pooled_client, make_client_key
 
 import numpy as np
 from typing import Union, List, Optional, Dict
 
 
+def get_zhipu_client(api_key: Optional[str] = None):
+    """Return a pooled ZhipuAI client for the given api key"""
+    # dynamically load ZhipuAI
+    try:
+        from zhipuai import ZhipuAI
+    except ImportError:
+        raise ImportError("Please install zhipuai before initialize zhipuai backend.")
+
+    # without api_key the client reads ZHIPUAI_API_KEY from the environment
+    return get_pooled_client(
+        make_client_key("zhipu", api_key=api_key),
+        lambda: ZhipuAI(api_key=api_key) if api_key else ZhipuAI(),
+        lambda client: client.close() if hasattr(client, "close") else None,
+        loop_bound=False,
+    )
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -51,18 +69,7 @@ async def zhipu_complete_if_cache(
     history_messages: List[Dict[str, str]] = [],
     **kwargs,
 ) -> str:
-    # dynamically load ZhipuAI
-    try:
-        from zhipuai import ZhipuAI
-    except ImportError:
-        raise ImportError("Please install zhipuai before initialize zhipuai backend.")
-
-    if api_key:
-        client = ZhipuAI(api_key=api_key)
-    else:
-        # please set ZHIPUAI_API_KEY in your environment
-        # os.environ["ZHIPUAI_API_KEY"]
-        client = ZhipuAI()
+    client = get_zhipu_client(api_key)
 
     messages = []
 
@@ -178,17 +185,7 @@ async def zhipu_complete(
 async def zhipu_embedding(
     texts: list[str], model: str = "embedding-3", api_key: str = None, **kwargs
 ) -> np.ndarray:
-    # dynamically load ZhipuAI
-    try:
-        from zhipuai import ZhipuAI
-    except ImportError:
-        raise ImportError("Please install zhipuai before initialize zhipuai backend.")
-    if api_key:
-        client = ZhipuAI(api_key=api_key)
-    else:
-        # please set ZHIPUAI_API_KEY in your environment
-        # os.environ["ZHIPUAI_API_KEY"]
-        client = ZhipuAI()
+    client = get_zhipu_client(api_key)
 
     # Convert single text to list if needed
     if isinstance(texts, str):
@@ -5,7 +5,9 @@ import traceback
 import json
 import re
 import os
-from typing import Any, AsyncIterator
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator
 from collections import Counter, defaultdict
 
 from .utils import (
@@ -18,8 +20,10 @@ from .utils import (
     pack_user_ass_to_openai_messages,
     split_string_by_multi_markers,
     truncate_list_by_token_size,
+    log_prompt_tokens,
     process_combine_contexts,
-    compute_args_hash,
+    compute_query_args_hash,
+    get_llm_model_identity,
     handle_cache,
     save_to_cache,
     CacheData,
@@ -44,59 +48,102 @@ from dotenv import load_dotenv
 load_dotenv(dotenv_path=".env", override=False)
 
 
-def chunking_by_token_size(
+def _encode_split_segment(
+    tokenizer: Tokenizer,
+    segment: str,
+    max_token_size: int,
+    count_only: bool,
+) -> int | list[int]:
+    """Tokenize one split_by_character segment
+
+    Returns the token count if the segment becomes a single chunk and its tokens
+    if it has to be cut into windows, so that only those travel back from a
+    worker process.
+    """
+    tokens = tokenizer.encode(segment)
+    if count_only or len(tokens) <= max_token_size:
+        return len(tokens)
+    return tokens
+
+
+def iter_chunks_by_token_size(
     tokenizer: Tokenizer,
     content: str,
     split_by_character: str | None = None,
     split_by_character_only: bool = False,
     overlap_token_size: int = 128,
     max_token_size: int = 1024,
-) -> list[dict[str, Any]]:
-    tokens = tokenizer.encode(content)
-    results: list[dict[str, Any]] = []
+    executor: Executor | None = None,
+    segments_per_task: int = 64,
+) -> Iterator[dict[str, Any]]:
+    """Yield the chunks of chunking_by_token_size one at a time, as they are produced
+
+    Every part of the content is tokenized exactly once. With split_by_character
+    the segments can be tokenized by an executor, e.g. a ProcessPoolExecutor for
+    large documents (the tokenizer must then be picklable); segments_per_task
+    segments are sent to a worker at once. Chunks are still yielded in order.
+    """
     if split_by_character:
-        raw_chunks = content.split(split_by_character)
-        new_chunks = []
-        if split_by_character_only:
-            for chunk in raw_chunks:
-                _tokens = tokenizer.encode(chunk)
-                new_chunks.append((len(_tokens), chunk))
+        segments = content.split(split_by_character)
+        encode = partial(
+            _encode_split_segment,
+            tokenizer,
+            max_token_size=max_token_size,
+            count_only=split_by_character_only,
+        )
+        if executor is None:
+            encoded = map(encode, segments)
         else:
-            for chunk in raw_chunks:
-                _tokens = tokenizer.encode(chunk)
-                if len(_tokens) > max_token_size:
-                    for start in range(
-                        0, len(_tokens), max_token_size - overlap_token_size
-                    ):
-                        chunk_content = tokenizer.decode(
-                            _tokens[start : start + max_token_size]
-                        )
-                        new_chunks.append(
-                            (min(max_token_size, len(_tokens) - start), chunk_content)
-                        )
-                else:
-                    new_chunks.append((len(_tokens), chunk))
-        for index, (_len, chunk) in enumerate(new_chunks):
-            results.append(
-                {
-                    "tokens": _len,
-                    "content": chunk.strip(),
+            encoded = executor.map(encode, segments, chunksize=segments_per_task)
+        index = 0
+        for segment, tokens in zip(segments, encoded):
+            if isinstance(tokens, int):
+                yield {
+                    "tokens": tokens,
+                    "content": segment.strip(),
                     "chunk_order_index": index,
                 }
-            )
+                index += 1
+                continue
+            for start in range(0, len(tokens), max_token_size - overlap_token_size):
+                chunk_content = tokenizer.decode(tokens[start : start + max_token_size])
+                yield {
+                    "tokens": min(max_token_size, len(tokens) - start),
+                    "content": chunk_content.strip(),
+                    "chunk_order_index": index,
+                }
+                index += 1
     else:
+        tokens = tokenizer.encode(content)
         for index, start in enumerate(
             range(0, len(tokens), max_token_size - overlap_token_size)
         ):
             chunk_content = tokenizer.decode(tokens[start : start + max_token_size])
-            results.append(
-                {
-                    "tokens": min(max_token_size, len(tokens) - start),
-                    "content": chunk_content.strip(),
-                    "chunk_order_index": index,
-                }
-            )
-    return results
+            yield {
+                "tokens": min(max_token_size, len(tokens) - start),
+                "content": chunk_content.strip(),
+                "chunk_order_index": index,
+            }
+
+
+def chunking_by_token_size(
+    tokenizer: Tokenizer,
+    content: str,
+    split_by_character: str | None = None,
+    split_by_character_only: bool = False,
+    overlap_token_size: int = 128,
+    max_token_size: int = 1024,
+) -> list[dict[str, Any]]:
+    return list(
+        iter_chunks_by_token_size(
+            tokenizer,
+            content,
+            split_by_character,
+            split_by_character_only,
+            overlap_token_size,
+            max_token_size,
+        )
+    )
 
 
 async def _handle_entity_relation_summary(
@@ -229,22 +276,20 @@ async def _handle_single_relationship_extraction(
     )
 
 
-async def _merge_nodes_then_upsert(
-    entity_name: str,
-    nodes_data: list[dict],
-    knowledge_graph_inst: BaseGraphStorage,
-    global_config: dict,
-    pipeline_status: dict = None,
-    pipeline_status_lock=None,
-    llm_response_cache: BaseKVStorage | None = None,
-):
-    """Get existing nodes from knowledge graph use name,if exists, merge data, else create, then upsert."""
+def _collect_node_fields(
+    nodes_data: list[dict], already_node: dict | None
+) -> tuple[dict, int]:
+    """Merge newly extracted entity fragments with the node already in the graph
+
+    Returns:
+        The merged node fields (description not summarized yet) and the number of
+        new description fragments
+    """
     already_entity_types = []
     already_source_ids = []
     already_description = []
     already_file_paths = []
 
-    already_node = await knowledge_graph_inst.get_node(entity_name)
     if already_node is not None:
         already_entity_types.append(already_node["entity_type"])
         already_source_ids.extend(
@@ -271,101 +316,66 @@ async def _merge_nodes_then_upsert(
     file_path = GRAPH_FIELD_SEP.join(
         set([dp["file_path"] for dp in nodes_data] + already_file_paths)
     )
-
-    force_llm_summary_on_merge = global_config["force_llm_summary_on_merge"]
-
-    num_fragment = description.count(GRAPH_FIELD_SEP) + 1
     num_new_fragment = len(set([dp["description"] for dp in nodes_data]))
 
-    if num_fragment > 1:
-        if num_fragment >= force_llm_summary_on_merge:
-            status_message = f"LLM merge N: {entity_name} | {num_new_fragment}+{num_fragment-num_new_fragment}"
-            logger.info(status_message)
-            if pipeline_status is not None and pipeline_status_lock is not None:
-                async with pipeline_status_lock:
-                    pipeline_status["latest_message"] = status_message
-                    pipeline_status["history_messages"].append(status_message)
-            description = await _handle_entity_relation_summary(
-                entity_name,
-                description,
-                global_config,
-                pipeline_status,
-                pipeline_status_lock,
-                llm_response_cache,
-            )
-        else:
-            status_message = f"Merge N: {entity_name} | {num_new_fragment}+{num_fragment-num_new_fragment}"
-            logger.info(status_message)
-            if pipeline_status is not None and pipeline_status_lock is not None:
-                async with pipeline_status_lock:
-                    pipeline_status["latest_message"] = status_message
-                    pipeline_status["history_messages"].append(status_message)
-
-    node_data = dict(
-        entity_id=entity_name,
-        entity_type=entity_type,
-        description=description,
-        source_id=source_id,
-        file_path=file_path,
-    )
-    await knowledge_graph_inst.upsert_node(
-        entity_name,
-        node_data=node_data,
+    return (
+        dict(
+            entity_type=entity_type,
+            description=description,
+            source_id=source_id,
+            file_path=file_path,
+        ),
+        num_new_fragment,
     )
-    node_data["entity_name"] = entity_name
-    return node_data
 
 
-async def _merge_edges_then_upsert(
-    src_id: str,
-    tgt_id: str,
-    edges_data: list[dict],
-    knowledge_graph_inst: BaseGraphStorage,
-    global_config: dict,
-    pipeline_status: dict = None,
-    pipeline_status_lock=None,
-    llm_response_cache: BaseKVStorage | None = None,
-):
+def _collect_edge_fields(
+    edges_data: list[dict], already_edge: dict | None
+) -> tuple[dict, int]:
+    """Merge newly extracted relation fragments with the edge already in the graph
+
+    Returns:
+        The merged edge fields (description not summarized yet) and the number of
+        new description fragments
+    """
     already_weights = []
     already_source_ids = []
     already_description = []
     already_keywords = []
     already_file_paths = []
 
-    if await knowledge_graph_inst.has_edge(src_id, tgt_id):
-        already_edge = await knowledge_graph_inst.get_edge(src_id, tgt_id)
-        # Handle the case where get_edge returns None or missing fields
-        if already_edge:
-            # Get weight with default 0.0 if missing
-            already_weights.append(already_edge.get("weight", 0.0))
-
-            # Get source_id with empty string default if missing or None
-            if already_edge.get("source_id") is not None:
-                already_source_ids.extend(
-                    split_string_by_multi_markers(
-                        already_edge["source_id"], [GRAPH_FIELD_SEP]
-                    )
+    # Handle the case where the edge is missing or has missing fields
+    if already_edge:
+        # Get weight with default 0.0 if missing
+        already_weights.append(already_edge.get("weight", 0.0))
+
+        # Get source_id with empty string default if missing or None
+        if already_edge.get("source_id") is not None:
+            already_source_ids.extend(
+                split_string_by_multi_markers(
+                    already_edge["source_id"], [GRAPH_FIELD_SEP]
                 )
+            )
 
-            # Get file_path with empty string default if missing or None
-            if already_edge.get("file_path") is not None:
-                already_file_paths.extend(
-                    split_string_by_multi_markers(
-                        already_edge["file_path"], [GRAPH_FIELD_SEP]
-                    )
+        # Get file_path with empty string default if missing or None
+        if already_edge.get("file_path") is not None:
+            already_file_paths.extend(
+                split_string_by_multi_markers(
+                    already_edge["file_path"], [GRAPH_FIELD_SEP]
                 )
+            )
 
-            # Get description with empty string default if missing or None
-            if already_edge.get("description") is not None:
-                already_description.append(already_edge["description"])
+        # Get description with empty string default if missing or None
+        if already_edge.get("description") is not None:
+            already_description.append(already_edge["description"])
 
-            # Get keywords with empty string default if missing or None
-            if already_edge.get("keywords") is not None:
-                already_keywords.extend(
-                    split_string_by_multi_markers(
-                        already_edge["keywords"], [GRAPH_FIELD_SEP]
-                    )
+        # Get keywords with empty string default if missing or None
+        if already_edge.get("keywords") is not None:
+            already_keywords.extend(
+                split_string_by_multi_markers(
+                    already_edge["keywords"], [GRAPH_FIELD_SEP]
                 )
+            )
 
     # Process edges_data with None checks
     weight = sum([dp["weight"] for dp in edges_data] + already_weights)
@@ -397,87 +407,279 @@ async def _merge_edges_then_upsert(
             + already_file_paths
         )
     )
+    num_new_fragment = len(
+        set([dp["description"] for dp in edges_data if dp.get("description")])
+    )
+
+    return (
+        dict(
+            weight=weight,
+            description=description,
+            keywords=keywords,
+            source_id=source_id,
+            file_path=file_path,
+        ),
+        num_new_fragment,
+    )
+
+
+def _placeholder_node_data(node_id: str, edge_fields: dict) -> dict:
+    """Node data for an edge endpoint that was not extracted as an entity"""
+    return {
+        "entity_id": node_id,
+        "source_id": edge_fields["source_id"],
+        "description": edge_fields["description"],
+        "entity_type": "UNKNOWN",
+        "file_path": edge_fields["file_path"],
+    }
+
+
+async def _summarize_merged_description(
+    merge_label: str,
+    summary_name: str,
+    description: str,
+    num_new_fragment: int,
+    global_config: dict,
+    pipeline_status: dict = None,
+    pipeline_status_lock=None,
+    llm_response_cache: BaseKVStorage | None = None,
+) -> str:
+    """Report a merge and summarize the merged description with the LLM if it has
+    reached force_llm_summary_on_merge fragments
+
+    Args:
+        merge_label: Status message label, e.g. "N: entity" or "E: src - tgt"
+        summary_name: Entity or relation name passed to the summary prompt
+    """
+    force_llm_summary_on_merge = global_config["force_llm_summary_on_merge"]
+
+    num_fragment = description.count(GRAPH_FIELD_SEP) + 1
+    if num_fragment <= 1:
+        return description
+
+    use_llm = num_fragment >= force_llm_summary_on_merge
+    status_message = f"{'LLM merge' if use_llm else 'Merge'} {merge_label} | {num_new_fragment}+{num_fragment - num_new_fragment}"
+    logger.info(status_message)
+    if pipeline_status is not None and pipeline_status_lock is not None:
+        async with pipeline_status_lock:
+            pipeline_status["latest_message"] = status_message
+            pipeline_status["history_messages"].append(status_message)
+
+    if use_llm:
+        description = await _handle_entity_relation_summary(
+            summary_name,
+            description,
+            global_config,
+            pipeline_status,
+            pipeline_status_lock,
+            llm_response_cache,
+        )
+    return description
+
+
+async def _merge_nodes_then_upsert(
+    entity_name: str,
+    nodes_data: list[dict],
+    knowledge_graph_inst: BaseGraphStorage,
+    global_config: dict,
+    pipeline_status: dict = None,
+    pipeline_status_lock=None,
+    llm_response_cache: BaseKVStorage | None = None,
+):
+    """Get existing nodes from knowledge graph use name,if exists, merge data, else create, then upsert."""
+    already_node = await knowledge_graph_inst.get_node(entity_name)
+    fields, num_new_fragment = _collect_node_fields(nodes_data, already_node)
+    fields["description"] = await _summarize_merged_description(
+        f"N: {entity_name}",
+        entity_name,
+        fields["description"],
+        num_new_fragment,
+        global_config,
+        pipeline_status,
+        pipeline_status_lock,
+        llm_response_cache,
+    )
+    fields["description_tokens"] = global_config["tokenizer"].count_tokens(
+        fields["description"]
+    )
+
+    node_data = dict(entity_id=entity_name, **fields)
+    await knowledge_graph_inst.upsert_node(
+        entity_name,
+        node_data=node_data,
+    )
+    node_data["entity_name"] = entity_name
+    return node_data
+
+
+async def _merge_edges_then_upsert(
+    src_id: str,
+    tgt_id: str,
+    edges_data: list[dict],
+    knowledge_graph_inst: BaseGraphStorage,
+    global_config: dict,
+    pipeline_status: dict = None,
+    pipeline_status_lock=None,
+    llm_response_cache: BaseKVStorage | None = None,
+):
+    already_edge = None
+    if await knowledge_graph_inst.has_edge(src_id, tgt_id):
+        already_edge = await knowledge_graph_inst.get_edge(src_id, tgt_id)
+    fields, num_new_fragment = _collect_edge_fields(edges_data, already_edge)
 
     for need_insert_id in [src_id, tgt_id]:
         if not (await knowledge_graph_inst.has_node(need_insert_id)):
-            # # Discard this edge if the node does not exist
-            # if need_insert_id == src_id:
-            #     logger.warning(
-            #         f"Discard edge: {src_id} - {tgt_id} | Source node missing"
-            #     )
-            # else:
-            #     logger.warning(
-            #         f"Discard edge: {src_id} - {tgt_id} | Target node missing"
-            #     )
-            # return None
             await knowledge_graph_inst.upsert_node(
                 need_insert_id,
-                node_data={
-                    "entity_id": need_insert_id,
-                    "source_id": source_id,
-                    "description": description,
-                    "entity_type": "UNKNOWN",
-                    "file_path": file_path,
-                },
+                node_data=_placeholder_node_data(need_insert_id, fields),
             )
 
-    force_llm_summary_on_merge = global_config["force_llm_summary_on_merge"]
+    fields["description"] = await _summarize_merged_description(
+        f"E: {src_id} - {tgt_id}",
+        f"({src_id}, {tgt_id})",
+        fields["description"],
+        num_new_fragment,
+        global_config,
+        pipeline_status,
+        pipeline_status_lock,
+        llm_response_cache,
+    )
+    fields["description_tokens"] = global_config["tokenizer"].count_tokens(
+        fields["description"]
+    )
 
-    num_fragment = description.count(GRAPH_FIELD_SEP) + 1
-    num_new_fragment = len(
-        set([dp["description"] for dp in edges_data if dp.get("description")])
+    await knowledge_graph_inst.upsert_edge(src_id, tgt_id, edge_data=dict(fields))
+
+    edge_data = dict(src_id=src_id, tgt_id=tgt_id, **fields)
+    edge_data.pop("weight")
+    return edge_data
+
+
+async def _merge_nodes_and_edges_in_bulk(
+    all_nodes: dict[str, list[dict]],
+    all_edges: dict[tuple[str, str], list[dict]],
+    knowledge_graph_inst: BaseGraphStorage,
+    global_config: dict,
+    pipeline_status: dict = None,
+    pipeline_status_lock=None,
+    llm_response_cache: BaseKVStorage | None = None,
+) -> tuple[list[dict], list[dict]]:
+    """Merge extracted entities and relations into the graph with batched storage calls
+
+    Produces the same graph as calling _merge_nodes_then_upsert and
+    _merge_edges_then_upsert for every entity and relation in turn, but fetches
+    all existing nodes and edges with one batch call each, runs the LLM
+    summaries concurrently (bounded by the LLM concurrency limit of
+    llm_model_func) and writes the results with upsert_nodes/upsert_edges.
+    The caller must hold the graph db lock.
+
+    Returns:
+        The merged entity data and relation data for the vector storages
+    """
+    edge_endpoints = [node_id for edge_key in all_edges for node_id in edge_key]
+    node_ids = list(dict.fromkeys([*all_nodes, *edge_endpoints]))
+    existing_nodes, existing_edges = await asyncio.gather(
+        knowledge_graph_inst.get_nodes_batch(node_ids),
+        knowledge_graph_inst.get_edges_batch(
+            [{"src": src_id, "tgt": tgt_id} for src_id, tgt_id in all_edges]
+        ),
     )
 
-    if num_fragment > 1:
-        if num_fragment >= force_llm_summary_on_merge:
-            status_message = f"LLM merge E: {src_id} - {tgt_id} | {num_new_fragment}+{num_fragment-num_new_fragment}"
-            logger.info(status_message)
-            if pipeline_status is not None and pipeline_status_lock is not None:
-                async with pipeline_status_lock:
-                    pipeline_status["latest_message"] = status_message
-                    pipeline_status["history_messages"].append(status_message)
-            description = await _handle_entity_relation_summary(
+    node_fields = {
+        entity_name: _collect_node_fields(entities, existing_nodes.get(entity_name))
+        for entity_name, entities in all_nodes.items()
+    }
+    edge_fields = {
+        edge_key: _collect_edge_fields(edges, existing_edges.get(edge_key))
+        for edge_key, edges in all_edges.items()
+    }
+
+    # Endpoints that neither exist nor were extracted get a placeholder node
+    # built from the first relation that references them
+    placeholder_nodes = {}
+    for edge_key, (fields, _) in edge_fields.items():
+        for node_id in edge_key:
+            if (
+                node_id not in existing_nodes
+                and node_id not in all_nodes
+                and node_id not in placeholder_nodes
+            ):
+                placeholder_nodes[node_id] = _placeholder_node_data(node_id, fields)
+
+    summaries = await asyncio.gather(
+        *[
+            _summarize_merged_description(
+                f"N: {entity_name}",
+                entity_name,
+                fields["description"],
+                num_new_fragment,
+                global_config,
+                pipeline_status,
+                pipeline_status_lock,
+                llm_response_cache,
+            )
+            for entity_name, (fields, num_new_fragment) in node_fields.items()
+        ],
+        *[
+            _summarize_merged_description(
+                f"E: {src_id} - {tgt_id}",
                 f"({src_id}, {tgt_id})",
-                description,
+                fields["description"],
+                num_new_fragment,
                 global_config,
                 pipeline_status,
                 pipeline_status_lock,
                 llm_response_cache,
             )
-        else:
-            status_message = f"Merge E: {src_id} - {tgt_id} | {num_new_fragment}+{num_fragment-num_new_fragment}"
-            logger.info(status_message)
-            if pipeline_status is not None and pipeline_status_lock is not None:
-                async with pipeline_status_lock:
-                    pipeline_status["latest_message"] = status_message
-                    pipeline_status["history_messages"].append(status_message)
-
-    await knowledge_graph_inst.upsert_edge(
-        src_id,
-        tgt_id,
-        edge_data=dict(
-            weight=weight,
-            description=description,
-            keywords=keywords,
-            source_id=source_id,
-            file_path=file_path,
-        ),
+            for (src_id, tgt_id), (fields, num_new_fragment) in edge_fields.items()
+        ],
     )
+    node_summaries = summaries[: len(node_fields)]
+    edge_summaries = summaries[len(node_fields) :]
+    # Stored next to the descriptions so that query time truncation does not
+    # have to encode them again
+    tokenizer: Tokenizer = global_config["tokenizer"]
 
-    edge_data = dict(
-        src_id=src_id,
-        tgt_id=tgt_id,
-        description=description,
-        keywords=keywords,
-        source_id=source_id,
-        file_path=file_path,
-    )
+    nodes_to_upsert = {}
+    entities_data = []
+    for (entity_name, (fields, _)), description in zip(
+        node_fields.items(), node_summaries
+    ):
+        node_data = dict(entity_id=entity_name, **fields)
+        node_data["description"] = description
+        node_data["description_tokens"] = tokenizer.count_tokens(description)
+        nodes_to_upsert[entity_name] = node_data
+        entities_data.append({**node_data, "entity_name": entity_name})
+    nodes_to_upsert.update(placeholder_nodes)
+
+    edges_to_upsert = {}
+    relationships_data = []
+    for (edge_key, (fields, _)), description in zip(
+        edge_fields.items(), edge_summaries
+    ):
+        edge_data = dict(fields)
+        edge_data["description"] = description
+        edge_data["description_tokens"] = tokenizer.count_tokens(description)
+        edges_to_upsert[edge_key] = edge_data
+        relationships_data.append(
+            dict(
+                src_id=edge_key[0],
+                tgt_id=edge_key[1],
+                description=description,
+                keywords=fields["keywords"],
+                source_id=fields["source_id"],
+                file_path=fields["file_path"],
+            )
+        )
 
-    return edge_data
+    # Nodes first, edges can only be attached to existing endpoints
+    await knowledge_graph_inst.upsert_nodes(nodes_to_upsert)
+    await knowledge_graph_inst.upsert_edges(edges_to_upsert)
+    return entities_data, relationships_data
 
 
 async def extract_entities(
-    chunks: dict[str, TextChunkSchema],
+    chunks: dict[str, TextChunkSchema] | AsyncIterator[tuple[str, TextChunkSchema]],
     knowledge_graph_inst: BaseGraphStorage,
     entity_vdb: BaseVectorStorage,
     relationships_vdb: BaseVectorStorage,
@@ -485,11 +687,72 @@ async def extract_entities(
     pipeline_status: dict = None,
     pipeline_status_lock=None,
     llm_response_cache: BaseKVStorage | None = None,
+    chunk_index: BaseKVStorage | None = None,
 ) -> None:
+    """Extract entities and relations from chunks and merge them into the graph
+
+    chunks is either a dict of all chunks or an async iterator of (chunk_key, chunk)
+    pairs, see extract_chunk_entities. With a chunk_index the references of
+    the chunks are recorded in it, see index_chunk_entities.
+    """
+    indexed_chunks: dict[str, TextChunkSchema] = {}
+    if chunk_index is not None:
+        if isinstance(chunks, dict):
+            indexed_chunks = chunks
+        else:
+            chunks = _record_chunks(chunks, indexed_chunks)
+    all_nodes, all_edges = await extract_chunk_entities(
+        chunks,
+        global_config,
+        pipeline_status,
+        pipeline_status_lock,
+        llm_response_cache,
+    )
+    await merge_extracted_entities(
+        all_nodes,
+        all_edges,
+        knowledge_graph_inst,
+        entity_vdb,
+        relationships_vdb,
+        global_config,
+        pipeline_status,
+        pipeline_status_lock,
+        llm_response_cache,
+    )
+    if chunk_index is not None:
+        await index_chunk_entities(chunk_index, indexed_chunks, all_nodes, all_edges)
+
+
+async def _record_chunks(
+    chunks: AsyncIterator[tuple[str, TextChunkSchema]],
+    recorded: dict[str, TextChunkSchema],
+) -> AsyncIterator[tuple[str, TextChunkSchema]]:
+    async for chunk_key, chunk in chunks:
+        recorded[chunk_key] = chunk
+        yield chunk_key, chunk
+
+
+async def extract_chunk_entities(
+    chunks: dict[str, TextChunkSchema] | AsyncIterator[tuple[str, TextChunkSchema]],
+    global_config: dict[str, str],
+    pipeline_status: dict = None,
+    pipeline_status_lock=None,
+    llm_response_cache: BaseKVStorage | None = None,
+) -> tuple[dict[str, list[dict]], dict[tuple[str, str], list[dict]]]:
+    """Extract the entities and relations of chunks with the LLM
+
+    chunks is either a dict of all chunks or an async iterator of (chunk_key, chunk)
+    pairs. From an iterator the extraction of each chunk starts as soon as the
+    chunker produced it; a repeated chunk_key is extracted once. The results are
+    collected in chunk order in both cases.
+
+    Returns:
+        The extracted entities by name and relations by sorted (src, tgt) key,
+        ready for merge_extracted_entities
+    """
     use_llm_func: callable = global_config["llm_model_func"]
     entity_extract_max_gleaning = global_config["entity_extract_max_gleaning"]
 
-    ordered_chunks = list(chunks.items())
     # add language and example number params to prompt
     language = global_config["addon_params"].get(
         "language", PROMPTS["DEFAULT_LANGUAGE"]
@@ -529,14 +792,8 @@ async def extract_entities(
     if_loop_prompt = PROMPTS["entity_if_loop_extraction"]
 
     processed_chunks = 0
-    total_chunks = len(ordered_chunks)
-    total_entities_count = 0
-    total_relations_count = 0
-
-    # Get lock manager from shared storage
-    from .kg.shared_storage import get_graph_db_lock
-
-    graph_db_lock = get_graph_db_lock(enable_logging=False)
+    # Grows while chunks are streamed in
+    total_chunks = len(chunks) if isinstance(chunks, dict) else 0
 
     # Use the global use_llm_func_with_cache function from utils.py
 
@@ -683,9 +940,25 @@ async def extract_entities(
             return await _process_single_content(chunk)
 
     tasks = []
-    for c in ordered_chunks:
-        task = asyncio.create_task(_process_with_semaphore(c))
-        tasks.append(task)
+    if isinstance(chunks, dict):
+        for c in chunks.items():
+            tasks.append(asyncio.create_task(_process_with_semaphore(c)))
+    else:
+        seen_chunk_keys = set()
+        try:
+            async for c in chunks:
+                if c[0] in seen_chunk_keys:
+                    continue
+                seen_chunk_keys.add(c[0])
+                total_chunks += 1
+                tasks.append(asyncio.create_task(_process_with_semaphore(c)))
+        except BaseException:
+            # Chunking failed, the extractions already started are pointless
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.wait(tasks)
+            raise
 
     # Wait for tasks to complete or for the first exception to occur
     # This allows us to cancel remaining tasks if any task fails
@@ -723,39 +996,39 @@ async def extract_entities(
             sorted_edge_key = tuple(sorted(edge_key))
             all_edges[sorted_edge_key].extend(edges)
 
-    # Centralized processing of all nodes and edges
-    entities_data = []
-    relationships_data = []
+    return all_nodes, all_edges
+
 
+async def merge_extracted_entities(
+    all_nodes: dict[str, list[dict]],
+    all_edges: dict[tuple[str, str], list[dict]],
+    knowledge_graph_inst: BaseGraphStorage,
+    entity_vdb: BaseVectorStorage,
+    relationships_vdb: BaseVectorStorage,
+    global_config: dict[str, str],
+    pipeline_status: dict = None,
+    pipeline_status_lock=None,
+    llm_response_cache: BaseKVStorage | None = None,
+) -> None:
+    """Merge the output of extract_chunk_entities into the graph and the entity and relation vector storages"""
+    # Get lock manager from shared storage
+    from .kg.shared_storage import get_graph_db_lock
+
+    graph_db_lock = get_graph_db_lock(enable_logging=False)
+
+    # Centralized processing of all nodes and edges
     # Use graph database lock to ensure atomic merges and updates
     async with graph_db_lock:
-        # Process and update all entities at once
-        for entity_name, entities in all_nodes.items():
-            entity_data = await _merge_nodes_then_upsert(
-                entity_name,
-                entities,
-                knowledge_graph_inst,
-                global_config,
-                pipeline_status,
-                pipeline_status_lock,
-                llm_response_cache,
-            )
-            entities_data.append(entity_data)
-
-        # Process and update all relationships at once
-        for edge_key, edges in all_edges.items():
-            edge_data = await _merge_edges_then_upsert(
-                edge_key[0],
-                edge_key[1],
-                edges,
-                knowledge_graph_inst,
-                global_config,
-                pipeline_status,
-                pipeline_status_lock,
-                llm_response_cache,
-            )
-            if edge_data is not None:
-                relationships_data.append(edge_data)
+        # Merge and update all entities and relationships at once
+        entities_data, relationships_data = await _merge_nodes_and_edges_in_bulk(
+            all_nodes,
+            all_edges,
+            knowledge_graph_inst,
+            global_config,
+            pipeline_status,
+            pipeline_status_lock,
+            llm_response_cache,
+        )
 
         # Update total counts
         total_entities_count = len(entities_data)
@@ -770,17 +1043,7 @@ async def extract_entities(
 
         # Update vector databases with all collected data
         if entity_vdb is not None and entities_data:
-            data_for_vdb = {
-                compute_mdhash_id(dp["entity_name"], prefix="ent-"): {
-                    "entity_name": dp["entity_name"],
-                    "entity_type": dp["entity_type"],
-                    "content": f"{dp['entity_name']}\n{dp['description']}",
-                    "source_id": dp["source_id"],
-                    "file_path": dp.get("file_path", "unknown_source"),
-                }
-                for dp in entities_data
-            }
-            await entity_vdb.upsert(data_for_vdb)
+            await entity_vdb.upsert(entity_vdb_data(entities_data))
 
         log_message = (
             f"Updating vector storage: {total_relations_count} relationships..."
@@ -792,18 +1055,103 @@ async def extract_entities(
                 pipeline_status["history_messages"].append(log_message)
 
         if relationships_vdb is not None and relationships_data:
-            data_for_vdb = {
-                compute_mdhash_id(dp["src_id"] + dp["tgt_id"], prefix="rel-"): {
-                    "src_id": dp["src_id"],
-                    "tgt_id": dp["tgt_id"],
-                    "keywords": dp["keywords"],
-                    "content": f"{dp['src_id']}\t{dp['tgt_id']}\n{dp['keywords']}\n{dp['description']}",
-                    "source_id": dp["source_id"],
-                    "file_path": dp.get("file_path", "unknown_source"),
-                }
-                for dp in relationships_data
-            }
-            await relationships_vdb.upsert(data_for_vdb)
+            await relationships_vdb.upsert(relationship_vdb_data(relationships_data))
+
+
+def entity_vdb_data(entities_data: list[dict]) -> dict[str, dict]:
+    """Entity vector storage records of merged entities, keyed by entity id"""
+    return {
+        compute_mdhash_id(dp["entity_name"], prefix="ent-"): {
+            "entity_name": dp["entity_name"],
+            "entity_type": dp["entity_type"],
+            "content": f"{dp['entity_name']}\n{dp['description']}",
+            "source_id": dp["source_id"],
+            "file_path": dp.get("file_path", "unknown_source"),
+        }
+        for dp in entities_data
+    }
+
+
+def relationship_vdb_data(relationships_data: list[dict]) -> dict[str, dict]:
+    """Relationship vector storage records of merged relations, keyed by relation id"""
+    return {
+        compute_mdhash_id(dp["src_id"] + dp["tgt_id"], prefix="rel-"): {
+            "src_id": dp["src_id"],
+            "tgt_id": dp["tgt_id"],
+            "keywords": dp["keywords"],
+            "content": f"{dp['src_id']}\t{dp['tgt_id']}\n{dp['keywords']}\n{dp['description']}",
+            "source_id": dp["source_id"],
+            "file_path": dp.get("file_path", "unknown_source"),
+        }
+        for dp in relationships_data
+    }
+
+
+def _merge_chunk_refs(refs: dict[str, list], other: dict[str, list]) -> dict[str, list]:
+    return {
+        "entities": sorted({*refs["entities"], *other["entities"]}),
+        "relations": [
+            list(edge_key)
+            for edge_key in sorted(
+                {*map(tuple, refs["relations"]), *map(tuple, other["relations"])}
+            )
+        ],
+    }
+
+
+async def index_chunk_entities(
+    chunk_index: BaseKVStorage,
+    chunks: dict[str, TextChunkSchema],
+    all_nodes: dict[str, list[dict]],
+    all_edges: dict[tuple[str, str], list[dict]],
+    doc_ids: Iterable[str] = (),
+) -> None:
+    """Record the entities and relations extracted from the chunks of each document
+
+    The chunk index maps a document id to
+    `{"chunks": {chunk_id: {"entities": [...], "relations": [[src, tgt], ...]}}}`
+    so that deleting a document only touches the records its chunks produced.
+    The endpoints of a relation count as entities of its chunk, they may have
+    been created from it as placeholders. References already recorded for a
+    document are kept. The documents in doc_ids are recorded even without
+    chunks, so deleting them does not rebuild the index.
+    """
+    chunk_entities: dict[str, set[str]] = defaultdict(set)
+    chunk_relations: dict[str, set[tuple[str, str]]] = defaultdict(set)
+    for entity_name, entities in all_nodes.items():
+        for dp in entities:
+            chunk_entities[dp["source_id"]].add(entity_name)
+    for edge_key, edges in all_edges.items():
+        for dp in edges:
+            chunk_entities[dp["source_id"]].update(edge_key)
+            chunk_relations[dp["source_id"]].add(edge_key)
+
+    documents: dict[str, dict[str, dict[str, list]]] = defaultdict(dict)
+    for doc_id in doc_ids:
+        documents.setdefault(doc_id, {})
+    for chunk_id, chunk in chunks.items():
+        documents[chunk["full_doc_id"]][chunk_id] = {
+            "entities": sorted(chunk_entities[chunk_id]),
+            "relations": [
+                list(edge_key) for edge_key in sorted(chunk_relations[chunk_id])
+            ],
+        }
+    if not documents:
+        return
+
+    doc_ids = list(documents)
+    existing = await asyncio.gather(*map(chunk_index.get_by_id, doc_ids))
+    for doc_id, record in zip(doc_ids, existing):
+        for chunk_id, refs in ((record or {}).get("chunks") or {}).items():
+            indexed = documents[doc_id]
+            indexed[chunk_id] = (
+                _merge_chunk_refs(indexed[chunk_id], refs)
+                if chunk_id in indexed
+                else refs
+            )
+    await chunk_index.upsert(
+        {doc_id: {"chunks": indexed} for doc_id, indexed in documents.items()}
+    )
 
 
 async def kg_query(
@@ -823,7 +1171,7 @@ async def kg_query(
         if query_param.model_func
         else global_config["llm_model_func"]
     )
-    args_hash = compute_args_hash(query_param.mode, query, cache_type="query")
+    args_hash = compute_query_args_hash(query_param, query, global_config)
     cached_response, quantized, min_val, max_val = await handle_cache(
         hashing_kv, args_hash, query, query_param.mode, cache_type="query"
     )
@@ -891,8 +1239,7 @@ async def kg_query(
         return sys_prompt
 
     tokenizer: Tokenizer = global_config["tokenizer"]
-    len_of_prompts = len(tokenizer.encode(query + sys_prompt))
-    logger.debug(f"[kg_query]Prompt Tokens: {len_of_prompts}")
+    log_prompt_tokens("kg_query", tokenizer, query + sys_prompt)
 
     response = await use_model_func(
         query,
@@ -923,6 +1270,7 @@ async def kg_query(
                 max_val=max_val,
                 mode=query_param.mode,
                 cache_type="query",
+                model=get_llm_model_identity(global_config, query_param.model_func),
             ),
         )
 
@@ -974,7 +1322,9 @@ async def extract_keywords_only(
     """
 
     # 1. Handle cache if needed - add cache type for keywords
-    args_hash = compute_args_hash(param.mode, text, cache_type="keywords")
+    args_hash = compute_query_args_hash(
+        param, text, global_config, cache_type="keywords"
+    )
     cached_response, quantized, min_val, max_val = await handle_cache(
         hashing_kv, args_hash, text, param.mode, cache_type="keywords"
     )
@@ -1014,8 +1364,7 @@ async def extract_keywords_only(
     )
 
     tokenizer: Tokenizer = global_config["tokenizer"]
-    len_of_prompts = len(tokenizer.encode(kw_prompt))
-    logger.debug(f"[kg_query]Prompt Tokens: {len_of_prompts}")
+    log_prompt_tokens("kg_query", tokenizer, kw_prompt)
 
     # 5. Call the LLM for keyword extraction
     use_model_func = (
@@ -1055,6 +1404,7 @@ async def extract_keywords_only(
                     max_val=max_val,
                     mode=param.mode,
                     cache_type="keywords",
+                    model=get_llm_model_identity(global_config, param.model_func),
                 ),
             )
 
@@ -1089,7 +1439,7 @@ async def mix_kg_vector_query(
         if query_param.model_func
         else global_config["llm_model_func"]
     )
-    args_hash = compute_args_hash("mix", query, cache_type="query")
+    args_hash = compute_query_args_hash(query_param, query, global_config, mode="mix")
     cached_response, quantized, min_val, max_val = await handle_cache(
         hashing_kv, args_hash, query, "mix", cache_type="query"
     )
@@ -1170,6 +1520,7 @@ async def mix_kg_vector_query(
                     # Merge chunk content and time metadata
                     chunk_with_time = {
                         "content": chunk["content"],
+                        "tokens": chunk.get("tokens"),
                         "created_at": result.get("created_at", None),
                         "file_path": result.get("file_path", None),
                     }
@@ -1183,6 +1534,7 @@ async def mix_kg_vector_query(
                 key=lambda x: x["content"],
                 max_token_size=query_param.max_token_for_text_unit,
                 tokenizer=tokenizer,
+                token_count=lambda x: x["tokens"],
             )
 
             logger.debug(
@@ -1247,8 +1599,7 @@ async def mix_kg_vector_query(
     if query_param.only_need_prompt:
         return sys_prompt
 
-    len_of_prompts = len(tokenizer.encode(query + sys_prompt))
-    logger.debug(f"[mix_kg_vector_query]Prompt Tokens: {len_of_prompts}")
+    log_prompt_tokens("mix_kg_vector_query", tokenizer, query + sys_prompt)
 
     # 6. Generate response
     response = await use_model_func(
@@ -1282,12 +1633,230 @@ async def mix_kg_vector_query(
                     max_val=max_val,
                     mode="mix",
                     cache_type="query",
+                    model=get_llm_model_identity(global_config, query_param.model_func),
                 ),
             )
 
     return response
 
 
+async def _memoized_batch_lookup(
+    memo: dict[Any, asyncio.Future],
+    keys: list[Any],
+    fetch_batch: Callable[[list[Any]], Awaitable[dict[Any, Any]]],
+) -> dict[Any, Any]:
+    """Resolve keys through a shared memo, fetching only the unseen ones in one batch.
+
+    Keys that are already being fetched by a concurrent caller are awaited instead
+    of being requested again. Keys missing from the backend resolve to None and are
+    left out of the returned dict, matching the batch methods of the storages.
+    """
+    loop = asyncio.get_running_loop()
+    missing = []
+    for key in keys:
+        if key not in memo:
+            memo[key] = loop.create_future()
+            missing.append(key)
+    # A failing fetch drops its keys from the memo, hold on to the futures
+    futures = {key: memo[key] for key in keys}
+
+    if missing:
+        error: BaseException | None = None
+        try:
+            fetched = await fetch_batch(missing)
+            for key in missing:
+                futures[key].set_result(fetched.get(key))
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # Fail the futures of this batch on errors and cancellation alike,
+            # so that concurrent callers waiting for them are released
+            for key in missing:
+                future = futures[key]
+                if not future.done():
+                    if memo.get(key) is future:
+                        memo.pop(key, None)
+                    future.set_exception(
+                        error
+                        if isinstance(error, Exception)
+                        else RuntimeError(f"Lookup of {key!r} was cancelled")
+                    )
+                    # Not an error of its own if nobody else waits for it
+                    future.exception()
+
+    result = {}
+    for key in keys:
+        value = await futures[key]
+        if value is not None:
+            result[key] = value
+    return result
+
+
+class _QueryScopedGraphView:
+    """Read-through view over a graph storage that lives for a single query.
+
+    Node, degree and edge lookups are memoized so that the local and global
+    retrieval branches of a hybrid query fetch each graph element only once,
+    even when both branches request it concurrently. Every other attribute is
+    delegated to the wrapped storage. LightRAG.aquery_batch also wraps the
+    storage in one view for the whole batch, shared by all of its queries.
+    """
+
+    def __init__(self, storage: BaseGraphStorage):
+        self._storage = storage
+        self._nodes: dict[str, asyncio.Future] = {}
+        self._node_degrees: dict[str, asyncio.Future] = {}
+        self._node_edges: dict[str, asyncio.Future] = {}
+        self._edges: dict[tuple[str, str], asyncio.Future] = {}
+        self._edge_degrees: dict[tuple[str, str], asyncio.Future] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._storage, name)
+
+    async def get_nodes_batch(self, node_ids: list[str]) -> dict[str, dict]:
+        return await _memoized_batch_lookup(
+            self._nodes, list(dict.fromkeys(node_ids)), self._storage.get_nodes_batch
+        )
+
+    async def node_degrees_batch(self, node_ids: list[str]) -> dict[str, int]:
+        return await _memoized_batch_lookup(
+            self._node_degrees,
+            list(dict.fromkeys(node_ids)),
+            self._storage.node_degrees_batch,
+        )
+
+    async def get_nodes_edges_batch(
+        self, node_ids: list[str]
+    ) -> dict[str, list[tuple[str, str]]]:
+        return await _memoized_batch_lookup(
+            self._node_edges,
+            list(dict.fromkeys(node_ids)),
+            self._storage.get_nodes_edges_batch,
+        )
+
+    async def get_edges_batch(
+        self, pairs: list[dict[str, str]]
+    ) -> dict[tuple[str, str], dict]:
+        async def fetch(keys: list[tuple[str, str]]):
+            return await self._storage.get_edges_batch(
+                [{"src": src, "tgt": tgt} for src, tgt in keys]
+            )
+
+        keys = list(dict.fromkeys((pair["src"], pair["tgt"]) for pair in pairs))
+        return await _memoized_batch_lookup(self._edges, keys, fetch)
+
+    async def edge_degrees_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], int]:
+        return await _memoized_batch_lookup(
+            self._edge_degrees,
+            list(dict.fromkeys(tuple(pair) for pair in edge_pairs)),
+            self._storage.edge_degrees_batch,
+        )
+
+
+class _QueryScopedChunkView:
+    """Read-through view over the text chunk storage that lives for a single query.
+
+    Chunks requested by both hybrid branches are fetched once; every other
+    attribute is delegated to the wrapped storage. Like _QueryScopedGraphView,
+    it is also used batch-wide by LightRAG.aquery_batch.
+    """
+
+    def __init__(self, storage: BaseKVStorage):
+        self._storage = storage
+        self._chunks: dict[str, asyncio.Future] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._storage, name)
+
+    async def _fetch(self, ids: list[str]) -> dict[str, Any]:
+        return dict(zip(ids, await self._storage.get_by_ids(ids)))
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        found = await _memoized_batch_lookup(self._chunks, [id], self._fetch)
+        return found.get(id)
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        found = await _memoized_batch_lookup(
+            self._chunks, list(dict.fromkeys(ids)), self._fetch
+        )
+        return [found.get(id) for id in ids]
+
+
+class _BatchedVectorQueries:
+    """View over a vector storage that answers concurrent searches in one batch.
+
+    Searches issued in the same event loop iteration with the same top_k and
+    ids are sent as a single query_batch call, so backends that search several
+    vectors per request (Qdrant, Milvus) serve the keyword searches of many
+    queries in one round trip. Every other attribute is delegated to the
+    wrapped storage. LightRAG.aquery_batch uses it for the entity,
+    relationship and chunk searches of the whole batch.
+    """
+
+    def __init__(self, storage: BaseVectorStorage):
+        self._storage = storage
+        self._pending: dict[tuple, list[tuple[str, asyncio.Future]]] = {}
+        self._flushes: set[asyncio.Task] = set()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._storage, name)
+
+    async def query(
+        self, query: str, top_k: int, ids: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        key = (top_k, tuple(ids) if ids is not None else None)
+        if key not in self._pending:
+            self._pending[key] = []
+            flush = asyncio.ensure_future(self._flush(key))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key].append((query, future))
+        # Every caller gets its own copy of the shared results
+        return [dict(result) for result in await future]
+
+    async def _flush(self, key: tuple) -> None:
+        # Let the searches started in this iteration join the batch
+        await asyncio.sleep(0)
+        pending = self._pending.pop(key)
+        queries = list(dict.fromkeys(query for query, _ in pending))
+        top_k, ids = key
+        try:
+            results = await self._storage.query_batch(
+                queries, top_k, list(ids) if ids is not None else None
+            )
+        except BaseException as e:
+            error = (
+                e
+                if isinstance(e, Exception)
+                else RuntimeError(
+                    f"Batched search of {len(queries)} queries was cancelled"
+                )
+            )
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            if error is not e:
+                raise
+            return
+        by_query = dict(zip(queries, results))
+        for query, future in pending:
+            if not future.done():
+                future.set_result(by_query[query])
+
+
+async def _timed(coro: Awaitable[Any], timings: dict[str, float], name: str) -> Any:
+    """Await a coroutine and record its wall-clock duration under the given name."""
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
 async def _build_query_context(
     ll_keywords: str,
     hl_keywords: str,
@@ -1298,6 +1867,10 @@ async def _build_query_context(
     query_param: QueryParam,
 ):
     logger.info(f"Process {os.getpid()} buidling query context...")
+    # Share graph and chunk lookups across every retrieval step of this query
+    knowledge_graph_inst = _QueryScopedGraphView(knowledge_graph_inst)
+    text_chunks_db = _QueryScopedChunkView(text_chunks_db)
+
     if query_param.mode == "local":
         entities_context, relations_context, text_units_context = await _get_node_data(
             ll_keywords,
@@ -1315,19 +1888,37 @@ async def _build_query_context(
             query_param,
         )
     else:  # hybrid mode
-        ll_data = await _get_node_data(
-            ll_keywords,
-            knowledge_graph_inst,
-            entities_vdb,
-            text_chunks_db,
-            query_param,
+        # Run the local (entity) and global (relationship) branches concurrently
+        timings: dict[str, float] = {}
+        start = time.perf_counter()
+        ll_data, hl_data = await asyncio.gather(
+            _timed(
+                _get_node_data(
+                    ll_keywords,
+                    knowledge_graph_inst,
+                    entities_vdb,
+                    text_chunks_db,
+                    query_param,
+                ),
+                timings,
+                "local",
+            ),
+            _timed(
+                _get_edge_data(
+                    hl_keywords,
+                    knowledge_graph_inst,
+                    relationships_vdb,
+                    text_chunks_db,
+                    query_param,
+                ),
+                timings,
+                "global",
+            ),
         )
-        hl_data = await _get_edge_data(
-            hl_keywords,
-            knowledge_graph_inst,
-            relationships_vdb,
-            text_chunks_db,
-            query_param,
+        logger.info(
+            f"Hybrid retrieval: local {timings['local']:.3f}s, "
+            f"global {timings['global']:.3f}s, "
+            f"wall {time.perf_counter() - start:.3f}s"
         )
 
         (
@@ -1438,6 +2029,7 @@ async def _get_node_data(
         key=lambda x: x["description"] if x["description"] is not None else "",
         max_token_size=query_param.max_token_for_local_context,
         tokenizer=tokenizer,
+        token_count=lambda x: x.get("description_tokens"),
     )
     logger.debug(
         f"Truncate entities from {len_node_datas} to {len(node_datas)} (max tokens:{query_param.max_token_for_local_context})"
@@ -1621,6 +2213,7 @@ async def _find_most_related_text_unit_from_entities(
         key=lambda x: x["data"]["content"],
         max_token_size=query_param.max_token_for_text_unit,
         tokenizer=tokenizer,
+        token_count=lambda x: x["data"].get("tokens"),
     )
 
     logger.debug(
@@ -1683,6 +2276,7 @@ async def _find_most_related_edges_from_entities(
         key=lambda x: x["description"] if x["description"] is not None else "",
         max_token_size=query_param.max_token_for_global_context,
         tokenizer=tokenizer,
+        token_count=lambda x: x.get("description_tokens"),
     )
 
     logger.debug(
@@ -1747,6 +2341,7 @@ async def _get_edge_data(
         key=lambda x: x["description"] if x["description"] is not None else "",
         max_token_size=query_param.max_token_for_global_context,
         tokenizer=tokenizer,
+        token_count=lambda x: x.get("description_tokens"),
     )
     use_entities, use_text_units = await asyncio.gather(
         _find_most_related_entities_from_relationships(
@@ -1875,6 +2470,7 @@ async def _find_most_related_entities_from_relationships(
         key=lambda x: x["description"] if x["description"] is not None else "",
         max_token_size=query_param.max_token_for_local_context,
         tokenizer=tokenizer,
+        token_count=lambda x: x.get("description_tokens"),
     )
     logger.debug(
         f"Truncate entities from {len_node_datas} to {len(node_datas)} (max tokens:{query_param.max_token_for_local_context})"
@@ -1935,6 +2531,7 @@ async def _find_related_text_unit_from_relationships(
         key=lambda x: x["data"]["content"],
         max_token_size=query_param.max_token_for_text_unit,
         tokenizer=tokenizer,
+        token_count=lambda x: x["data"].get("tokens"),
     )
 
     logger.debug(
@@ -1980,7 +2577,7 @@ async def naive_query(
         if query_param.model_func
         else global_config["llm_model_func"]
     )
-    args_hash = compute_args_hash(query_param.mode, query, cache_type="query")
+    args_hash = compute_query_args_hash(query_param, query, global_config)
     cached_response, quantized, min_val, max_val = await handle_cache(
         hashing_kv, args_hash, query, query_param.mode, cache_type="query"
     )
@@ -2011,6 +2608,7 @@ async def naive_query(
         key=lambda x: x["content"],
         max_token_size=query_param.max_token_for_text_unit,
         tokenizer=tokenizer,
+        token_count=lambda x: x.get("tokens"),
     )
 
     if not maybe_trun_chunks:
@@ -2051,8 +2649,7 @@ async def naive_query(
     if query_param.only_need_prompt:
         return sys_prompt
 
-    len_of_prompts = len(tokenizer.encode(query + sys_prompt))
-    logger.debug(f"[naive_query]Prompt Tokens: {len_of_prompts}")
+    log_prompt_tokens("naive_query", tokenizer, query + sys_prompt)
 
     response = await use_model_func(
         query,
@@ -2085,6 +2682,7 @@ async def naive_query(
                 max_val=max_val,
                 mode=query_param.mode,
                 cache_type="query",
+                model=get_llm_model_identity(global_config, query_param.model_func),
             ),
         )
 
@@ -2115,7 +2713,7 @@ async def kg_query_with_keywords(
         if query_param.model_func
         else global_config["llm_model_func"]
     )
-    args_hash = compute_args_hash(query_param.mode, query, cache_type="query")
+    args_hash = compute_query_args_hash(query_param, query, global_config)
     cached_response, quantized, min_val, max_val = await handle_cache(
         hashing_kv, args_hash, query, query_param.mode, cache_type="query"
     )
@@ -2200,8 +2798,7 @@ async def kg_query_with_keywords(
         return sys_prompt
 
     tokenizer: Tokenizer = global_config["tokenizer"]
-    len_of_prompts = len(tokenizer.encode(query + sys_prompt))
-    logger.debug(f"[kg_query_with_keywords]Prompt Tokens: {len_of_prompts}")
+    log_prompt_tokens("kg_query_with_keywords", tokenizer, query + sys_prompt)
 
     # 6. Generate response
     response = await use_model_func(
@@ -2235,6 +2832,7 @@ async def kg_query_with_keywords(
                     max_val=max_val,
                     mode=query_param.mode,
                     cache_type="query",
+                    model=get_llm_model_identity(global_config, query_param.model_func),
                 ),
             )
 
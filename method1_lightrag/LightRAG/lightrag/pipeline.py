@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from .base import DocProcessingStatus
+from .utils import logger
+
+_STOP = object()
+
+
+class PipelineStage:
+    """A named processing step with a bounded input queue and its own workers
+
+    Items are handed to `handler` one by one, or as lists of up to `batch_size`
+    items when batching is enabled. The handler returns False for items it
+    failed to handle. A batch is handled once it is full, once
+    `batch_timeout` seconds passed since its first item arrived or when the
+    stage is closed. `put` blocks while the queue is full, which throttles the
+    stages in front of this one.
+
+    `on_stats` is called with the stage whenever an item is queued or handled,
+    see `stats` for what is reported.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[bool | None]],
+        workers: int = 1,
+        maxsize: int = 0,
+        batch_size: int | None = None,
+        batch_timeout: float | None = None,
+        on_stats: Callable[[PipelineStage], None] | None = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.on_stats = on_stats
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.in_progress = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._started_at: float | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> PipelineStage:
+        self._started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return self
+
+    async def put(self, item: Any) -> None:
+        await self.queue.put(item)
+        self._report()
+
+    async def close(self) -> None:
+        """Wait until all queued items are handled and stop the workers"""
+        for _ in self._tasks:
+            await self.queue.put(_STOP)
+        await asyncio.gather(*self._tasks)
+
+    def cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        """Backlog, items being handled, totals and throughput in items per second since start"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "workers": self.workers,
+            "backlog": self.queue.qsize(),
+            "in_progress": self.in_progress,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "throughput": round(self.processed / elapsed, 3) if elapsed else 0.0,
+        }
+
+    def _report(self) -> None:
+        if self.on_stats is not None:
+            self.on_stats(self)
+
+    async def _next_batch(self) -> tuple[list[Any], bool]:
+        """Collect the next batch, the flag tells whether the stage was closed"""
+        first = await self.queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = (
+            time.monotonic() + self.batch_timeout
+            if self.batch_timeout is not None
+            else None
+        )
+        while len(batch) < self.batch_size:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _worker(self) -> None:
+        stopped = False
+        while not stopped:
+            if self.batch_size:
+                items, stopped = await self._next_batch()
+                if not items:
+                    break
+                payload = items
+            else:
+                item = await self.queue.get()
+                if item is _STOP:
+                    break
+                items, payload = [item], item
+
+            self.in_progress += len(items)
+            self._report()
+            started = time.monotonic()
+            try:
+                if await self.handler(payload) is False:
+                    self.failed += len(items)
+                else:
+                    self.processed += len(items)
+            except Exception:
+                # Handlers deal with their own failures, this keeps the worker alive
+                self.failed += len(items)
+                logger.error(
+                    f"Pipeline stage {self.name} failed: {traceback.format_exc()}"
+                )
+            finally:
+                self.busy_seconds += time.monotonic() - started
+                self.in_progress -= len(items)
+                self._report()
+
+
+@dataclass
+class DocumentJob:
+    """A document travelling through the ingestion pipeline"""
+
+    doc_id: str
+    status_doc: DocProcessingStatus
+    file_path: str
+    number: int = 0
+    content: str | None = None
+    chunks: dict[str, Any] = field(default_factory=dict)
+    extracted: tuple[dict, dict] | None = None
+    error: BaseException | None = None
+    embedded: asyncio.Event = field(default_factory=asyncio.Event)
+    _chunk_queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def add_chunk(self, chunk_id: str, chunk: dict[str, Any]) -> None:
+        self.chunks[chunk_id] = chunk
+        self._chunk_queue.put_nowait((chunk_id, chunk))
+
+    def chunking_finished(self) -> None:
+        self._chunk_queue.put_nowait(None)
+
+    async def stream_chunks(self) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Yield the chunks as the chunk stage produces them"""
+        while (item := await self._chunk_queue.get()) is not None:
+            yield item
+        if self.error is not None:
+            raise RuntimeError(f"Chunking of document {self.doc_id} failed")
@@ -8,8 +8,10 @@ import logging
 import logging.handlers
 import os
 import re
+import struct
+import time
 from dataclasses import dataclass
-from functools import wraps
+from functools import lru_cache, partial, wraps
 from hashlib import md5
 from typing import Any, Protocol, Callable, TYPE_CHECKING, List
 import xml.etree.ElementTree as ET
@@ -27,6 +29,8 @@ if TYPE_CHECKING:
 load_dotenv(dotenv_path=".env", override=False)
 
 VERBOSE_DEBUG = os.getenv("VERBOSE", "false").lower() == "true"
+# Number of distinct strings whose token counts Tokenizer.count_tokens remembers
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", 100000))
 
 
 def verbose_debug(msg: str, *args, **kwargs):
@@ -258,6 +262,79 @@ def compute_args_hash(*args: Any, cache_type: str | None = None) -> str:
     return hashlib.md5(args_str.encode()).hexdigest()
 
 
+# QueryParam fields that change the answer cached for each cache type
+QUERY_CACHE_KEY_FIELDS: dict[str, tuple[str, ...]] = {
+    "query": (
+        "only_need_context",
+        "only_need_prompt",
+        "response_type",
+        "top_k",
+        "max_token_for_text_unit",
+        "max_token_for_global_context",
+        "max_token_for_local_context",
+        "hl_keywords",
+        "ll_keywords",
+        "conversation_history",
+        "history_turns",
+        "ids",
+    ),
+    "keywords": ("conversation_history", "history_turns"),
+}
+
+
+def get_llm_model_identity(
+    global_config: dict, model_func: Callable | None = None
+) -> str:
+    """Get a stable name for the LLM that answers a query.
+
+    Args:
+        global_config: LightRAG global config
+        model_func: Query specific model function overriding the default LLM, if any
+    Returns:
+        str: The configured model name, or the name of the overriding function
+    """
+    if model_func is None:
+        return str(global_config.get("llm_model_name", ""))
+    while isinstance(model_func, partial):
+        model_func = model_func.func
+    return getattr(model_func, "__qualname__", None) or repr(model_func)
+
+
+def compute_query_args_hash(
+    query_param,
+    query: str,
+    global_config: dict,
+    cache_type: str = "query",
+    mode: str | None = None,
+) -> str:
+    """Compute the LLM cache key of a query.
+
+    Unlike hashing only the mode and query text, the key covers every QueryParam
+    field that affects the cached result for the given cache type and the model
+    identity, so runs with different parameters never share cache entries.
+
+    Args:
+        query_param: The QueryParam of the query
+        query: The query text
+        global_config: LightRAG global config
+        cache_type: Type of cache ('query' or 'keywords')
+        mode: Cache mode to hash, defaults to query_param.mode
+    Returns:
+        str: Hash string
+    """
+    fields = {
+        name: getattr(query_param, name, None)
+        for name in QUERY_CACHE_KEY_FIELDS.get(cache_type, ())
+    }
+    fields["model"] = get_llm_model_identity(global_config, query_param.model_func)
+    return compute_args_hash(
+        mode or query_param.mode,
+        query,
+        json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str),
+        cache_type=cache_type,
+    )
+
+
 def compute_mdhash_id(content: str, prefix: str = "") -> str:
     """
     Compute a unique ID for a given content string.
@@ -360,6 +437,39 @@ class Tokenizer:
         """
         return self.tokenizer.decode(tokens)
 
+    def count_tokens(self, content: str) -> int:
+        """
+        Returns the number of tokens of a string, memoized in an LRU cache.
+
+        Descriptions and chunks recur across queries, so repeated strings are
+        encoded only once per tokenizer.
+
+        Args:
+            content: The string to count the tokens of.
+
+        Returns:
+            The number of tokens.
+        """
+        counter = self.__dict__.get("_count_tokens")
+        if counter is None:
+            counter = lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)(
+                lambda text: len(self.encode(text))
+            )
+            self._count_tokens = counter
+        return counter(content)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The memo of count_tokens wraps a closure, which cannot be pickled,
+        # e.g. for the chunking worker processes
+        state = self.__dict__.copy()
+        state.pop("_count_tokens", None)
+        return state
+
+    def __deepcopy__(self, memo: dict) -> "Tokenizer":
+        # Tokenizers do not change once created, asdict(LightRAG) shares the
+        # instance and with it the memo of count_tokens
+        return self
+
 
 class TiktokenTokenizer(Tokenizer):
     """
@@ -424,23 +534,48 @@ def is_float_regex(value: str) -> bool:
     return bool(re.match(r"^[-+]?[0-9]*\.?[0-9]+$", value))
 
 
+def stored_token_count(value: Any) -> int | None:
+    """Token count stored next to a chunk or description, None if missing or invalid"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 def truncate_list_by_token_size(
     list_data: list[Any],
     key: Callable[[Any], str],
     max_token_size: int,
     tokenizer: Tokenizer,
+    token_count: Callable[[Any], Any] | None = None,
 ) -> list[int]:
-    """Truncate a list of data by token size"""
+    """Truncate a list of data by token size
+
+    token_count returns the token count stored with an item at indexing time,
+    e.g. the tokens field of a chunk. Items without a stored count are counted
+    with tokenizer.count_tokens.
+    """
     if max_token_size <= 0:
         return []
     tokens = 0
     for i, data in enumerate(list_data):
-        tokens += len(tokenizer.encode(key(data)))
+        count = stored_token_count(token_count(data)) if token_count else None
+        if count is None:
+            count = tokenizer.count_tokens(key(data))
+        tokens += count
         if tokens > max_token_size:
             return list_data[:i]
     return list_data
 
 
+def log_prompt_tokens(label: str, tokenizer: Tokenizer, prompt: str) -> None:
+    """Log the token length of a prompt, the prompt is only encoded when debug logging is on"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[{label}]Prompt Tokens: {len(tokenizer.encode(prompt))}")
+
+
 def list_of_list_to_json(data: list[list[str]]) -> list[dict[str, str]]:
     if not data or len(data) <= 1:
         return []
@@ -545,6 +680,444 @@ def process_combine_contexts(
     return combined_data
 
 
+class _SemanticCacheBucket:
+    """Quantized prompt embeddings of one (mode, cache_type) pair.
+
+    Rows live in a single contiguous uint8 matrix together with a matching
+    matrix of dequantized, L2-normalized float32 vectors, so a lookup is one
+    matrix-vector product followed by an argmax. Storage grows geometrically
+    and removals swap the last row into the freed slot.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids: list[str] = []
+        self.row_of: dict[str, int] = {}
+        self._quantized = np.empty((0, dim), dtype=np.uint8)
+        self._normed = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _reserve(self, size: int):
+        capacity = self._quantized.shape[0]
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 16)
+        quantized = np.empty((new_capacity, self.dim), dtype=np.uint8)
+        normed = np.empty((new_capacity, self.dim), dtype=np.float32)
+        quantized[: len(self)] = self._quantized[: len(self)]
+        normed[: len(self)] = self._normed[: len(self)]
+        self._quantized, self._normed = quantized, normed
+
+    def add(self, cache_id: str, quantized: np.ndarray, min_val: float, max_val: float):
+        vector = dequantize_embedding(quantized, min_val, max_val)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+
+        row = self.row_of.get(cache_id)
+        if row is None:
+            row = len(self)
+            self._reserve(row + 1)
+            self.ids.append(cache_id)
+            self.row_of[cache_id] = row
+        self._quantized[row] = quantized
+        self._normed[row] = vector
+
+    def remove(self, cache_id: str):
+        row = self.row_of.pop(cache_id, None)
+        if row is None:
+            return
+        last = len(self) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.row_of[moved_id] = row
+            self._quantized[row] = self._quantized[last]
+            self._normed[row] = self._normed[last]
+        self.ids.pop()
+
+    def search(self, query: np.ndarray) -> tuple[str | None, float]:
+        """Return the id and cosine similarity of the closest cached embedding"""
+        if not self.ids:
+            return None, -1.0
+        scores = self._normed[: len(self)] @ query
+        best = int(np.argmax(scores))
+        return self.ids[best], float(scores[best])
+
+
+# KV storages that keep the LLM cache in files of the working directory, the
+# semantic cache index keeps its embedding sidecar next to them
+_FILE_KV_STORAGES = ("JsonKVStorage", "LogKVStorage")
+
+
+class SemanticCacheIndex:
+    """Vectorized similarity index over the embeddings of an LLM response cache.
+
+    Embeddings are grouped per (mode, cache_type) in `_SemanticCacheBucket`
+    matrices and persisted in an append-only binary sidecar next to the KV
+    cache instead of hex strings inside the cache records. Each sidecar record
+    is a little-endian uint32 header length, a JSON header (mode, cache_type,
+    id, dim, min, max) and `dim` uint8 values; a later record for the same id
+    supersedes earlier ones and a record with dim 0 marks a removal. The
+    sidecar is compacted on load when most of its records are stale.
+
+    A bucket is built lazily on its first lookup from the sidecar, falling
+    back to hex embeddings of caches written by older versions, and is kept
+    up to date by `save_to_cache` afterwards. Before each lookup the records
+    other worker processes appended since are applied, and the index is
+    rebuilt when another process compacted the sidecar. Appends and the
+    compaction hold the namespace lock of the cache storage.
+    """
+
+    _instances: dict[str, "SemanticCacheIndex"] = {}
+    _disabled_storages: set[str] = set()
+
+    def __init__(self, file_name: str, namespace: str):
+        self._file_name = file_name
+        self._namespace = namespace
+        self._buckets: dict[tuple[str, str | None], _SemanticCacheBucket] = {}
+        self._loaded_modes: set[str] = set()
+        self._sidecar: (
+            dict[tuple[str, str], tuple[str | None, np.ndarray, float, float]] | None
+        ) = None
+        # Identity of the sidecar file that was read and how far
+        self._file_id: tuple[int, int] | None = None
+        self._read_offset = 0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def for_storage(cls, hashing_kv) -> "SemanticCacheIndex | None":
+        """Get the shared index of an LLM response cache storage
+
+        Returns None for storages that do not keep the cache in the working
+        directory, a local sidecar would drift from the cache they hold.
+        """
+        storage_type = type(hashing_kv).__name__
+        if storage_type not in _FILE_KV_STORAGES:
+            if storage_type not in cls._disabled_storages:
+                cls._disabled_storages.add(storage_type)
+                logger.info(
+                    f"Semantic cache index is off for {storage_type}, it needs a file based KV storage"
+                )
+            return None
+        working_dir = hashing_kv.global_config.get("working_dir", ".")
+        file_name = os.path.join(
+            working_dir, f"kv_store_{hashing_kv.namespace}.embeddings.bin"
+        )
+        index = cls._instances.get(file_name)
+        if index is None:
+            index = cls._instances[file_name] = cls(file_name, hashing_kv.namespace)
+        return index
+
+    def _sidecar_lock(self):
+        from lightrag.kg.shared_storage import get_namespace_lock
+
+        return get_namespace_lock(self._namespace)
+
+    @staticmethod
+    def _parse_records(data: bytes) -> tuple[list, int]:
+        """Complete records of the data and the offset after the last one
+
+        Each record is ((mode, id), (cache_type, quantized, min, max)), or
+        ((mode, id), None) for a removal.
+        """
+        records = []
+        offset = 0
+        while offset + 4 <= len(data):
+            header_len = struct.unpack_from("<I", data, offset)[0]
+            header_end = offset + 4 + header_len
+            if header_end > len(data):
+                break
+            header = json.loads(data[offset + 4 : header_end])
+            dim = header["dim"]
+            if header_end + dim > len(data):
+                break
+            key = (header["mode"], header["id"])
+            if dim:
+                records.append(
+                    (
+                        key,
+                        (
+                            header.get("cache_type"),
+                            np.frombuffer(
+                                data, dtype=np.uint8, count=dim, offset=header_end
+                            ).copy(),
+                            header["min"],
+                            header["max"],
+                        ),
+                    )
+                )
+            else:
+                records.append((key, None))
+            offset = header_end + dim
+        return records, offset
+
+    async def _read_sidecar(self) -> dict:
+        records: dict[tuple[str, str], tuple[str | None, np.ndarray, float, float]] = {}
+        async with self._sidecar_lock():
+            os.makedirs(os.path.dirname(self._file_name) or ".", exist_ok=True)
+            # Create it up front, so its identity does not change on the first append
+            with open(self._file_name, "ab"):
+                pass
+            with open(self._file_name, "rb") as f:
+                data = f.read()
+            parsed, offset = self._parse_records(data)
+            for key, record in parsed:
+                if record is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = record
+
+            if offset < len(data):
+                logger.warning(
+                    f"Semantic cache sidecar {self._file_name} has a truncated tail, ignoring it"
+                )
+            if len(parsed) > 2 * len(records) + 64 or offset < len(data):
+                self._rewrite_sidecar(records)
+            stat = os.stat(self._file_name)
+            self._file_id = (stat.st_dev, stat.st_ino)
+            self._read_offset = stat.st_size
+        return records
+
+    async def _refresh(self):
+        """Apply the records other processes appended since the sidecar was read"""
+        if self._sidecar is None:
+            return
+        async with self._sidecar_lock().reader():
+            try:
+                stat = os.stat(self._file_name)
+            except FileNotFoundError:
+                stat = None
+            if (
+                stat is None
+                or (stat.st_dev, stat.st_ino) != self._file_id
+                or stat.st_size < self._read_offset
+            ):
+                # Compacted by another process, the index is rebuilt
+                self._buckets.clear()
+                self._loaded_modes.clear()
+                self._sidecar = None
+                return
+            if stat.st_size == self._read_offset:
+                return
+            with open(self._file_name, "rb") as f:
+                f.seek(self._read_offset)
+                data = f.read(stat.st_size - self._read_offset)
+        parsed, offset = self._parse_records(data)
+        self._read_offset += offset
+        for (mode, cache_id), record in parsed:
+            if mode in self._loaded_modes:
+                for (bucket_mode, _), bucket in self._buckets.items():
+                    if bucket_mode == mode:
+                        bucket.remove(cache_id)
+                if record is not None:
+                    self._add_to_bucket(mode, cache_id, *record)
+            elif record is None:
+                self._sidecar.pop((mode, cache_id), None)
+            else:
+                self._sidecar[(mode, cache_id)] = record
+
+    @staticmethod
+    def _encode_record(
+        mode: str,
+        cache_id: str,
+        cache_type: str | None,
+        quantized: np.ndarray | None,
+        min_val: float | None,
+        max_val: float | None,
+    ) -> bytes:
+        payload = (
+            b""
+            if quantized is None
+            else np.ascontiguousarray(quantized, dtype=np.uint8).tobytes()
+        )
+        header = json.dumps(
+            {
+                "mode": mode,
+                "id": cache_id,
+                "cache_type": cache_type,
+                "dim": len(payload),
+                "min": None if min_val is None else float(min_val),
+                "max": None if max_val is None else float(max_val),
+            }
+        ).encode("utf-8")
+        return struct.pack("<I", len(header)) + header + payload
+
+    def _rewrite_sidecar(self, records: dict):
+        """Write the live records to a new sidecar, the namespace lock is held"""
+        tmp_file = self._file_name + ".tmp"
+        with open(tmp_file, "wb") as f:
+            for (mode, cache_id), (
+                cache_type,
+                quantized,
+                min_val,
+                max_val,
+            ) in records.items():
+                f.write(
+                    self._encode_record(
+                        mode, cache_id, cache_type, quantized, min_val, max_val
+                    )
+                )
+        os.replace(tmp_file, self._file_name)
+        logger.info(
+            f"Compacted semantic cache sidecar {self._file_name} to {len(records)} records"
+        )
+
+    async def _append(self, record: bytes):
+        async with self._sidecar_lock():
+            os.makedirs(os.path.dirname(self._file_name) or ".", exist_ok=True)
+            with open(self._file_name, "ab") as f:
+                f.write(record)
+
+    def _add_to_bucket(self, mode, cache_id, cache_type, quantized, min_val, max_val):
+        if min_val is None or max_val is None or min_val >= max_val:
+            logger.warning(
+                f"Invalid embedding min/max values: min={min_val}, max={max_val}"
+            )
+            return
+        quantized = np.asarray(quantized, dtype=np.uint8).reshape(-1)
+        bucket = self._buckets.get((mode, cache_type))
+        if bucket is None:
+            bucket = self._buckets[(mode, cache_type)] = _SemanticCacheBucket(
+                quantized.shape[0]
+            )
+        if bucket.dim != quantized.shape[0]:
+            logger.warning(
+                f"Skipping cached embedding {cache_id} with dimension {quantized.shape[0]}, expected {bucket.dim}"
+            )
+            return
+        bucket.add(cache_id, quantized, min_val, max_val)
+
+    async def _ensure_mode_loaded(self, hashing_kv, mode: str):
+        if self._sidecar is None:
+            self._sidecar = await self._read_sidecar()
+        if mode in self._loaded_modes:
+            return
+        mode_cache = await hashing_kv.get_by_id(mode) or {}
+        migrated = []
+        for cache_id, cache_data in mode_cache.items():
+            if not isinstance(cache_data, dict):
+                continue
+            cache_type = cache_data.get("cache_type")
+            record = self._sidecar.get((mode, cache_id))
+            if record is not None:
+                _, quantized, min_val, max_val = record
+            elif cache_data.get("embedding"):
+                # Caches written before the sidecar existed keep hex embeddings
+                try:
+                    quantized = np.frombuffer(
+                        bytes.fromhex(cache_data["embedding"]), dtype=np.uint8
+                    )
+                except Exception as e:
+                    logger.warning(f"Error processing cached embedding: {str(e)}")
+                    continue
+                min_val = cache_data.get("embedding_min")
+                max_val = cache_data.get("embedding_max")
+                migrated.append(
+                    self._encode_record(
+                        mode, cache_id, cache_type, quantized, min_val, max_val
+                    )
+                )
+            else:
+                continue
+            self._add_to_bucket(mode, cache_id, cache_type, quantized, min_val, max_val)
+
+        if migrated:
+            await self._append(b"".join(migrated))
+        # Sidecar records are only needed until their mode is indexed
+        self._sidecar = {k: v for k, v in self._sidecar.items() if k[0] != mode}
+        self._loaded_modes.add(mode)
+
+    async def add(
+        self,
+        mode: str,
+        cache_id: str,
+        cache_type: str | None,
+        quantized: np.ndarray,
+        min_val: float,
+        max_val: float,
+    ):
+        """Persist an embedding to the sidecar and index it if its mode is loaded"""
+        async with self._lock:
+            await self._append(
+                self._encode_record(
+                    mode, cache_id, cache_type, quantized, min_val, max_val
+                )
+            )
+            if mode in self._loaded_modes:
+                for (bucket_mode, _), bucket in self._buckets.items():
+                    if bucket_mode == mode:
+                        bucket.remove(cache_id)
+                self._add_to_bucket(
+                    mode, cache_id, cache_type, quantized, min_val, max_val
+                )
+            elif self._sidecar is not None:
+                self._sidecar[(mode, cache_id)] = (
+                    cache_type,
+                    np.asarray(quantized, dtype=np.uint8).reshape(-1),
+                    min_val,
+                    max_val,
+                )
+
+    async def remove(self, mode: str, cache_ids: list[str] | None = None):
+        """Forget embeddings of a mode, either all of them or the given ids"""
+        async with self._lock:
+            buckets = [key for key in self._buckets if key[0] == mode]
+            if cache_ids is None:
+                cache_ids = [i for key in buckets for i in self._buckets[key].ids]
+                if self._sidecar is not None:
+                    cache_ids += [k[1] for k in self._sidecar if k[0] == mode]
+            if not cache_ids:
+                return
+            for key in buckets:
+                for cache_id in cache_ids:
+                    self._buckets[key].remove(cache_id)
+            if self._sidecar is not None:
+                for cache_id in cache_ids:
+                    self._sidecar.pop((mode, cache_id), None)
+            await self._append(
+                b"".join(
+                    self._encode_record(mode, cache_id, None, None, None, None)
+                    for cache_id in cache_ids
+                )
+            )
+
+    async def search(
+        self,
+        hashing_kv,
+        embedding: np.ndarray | list[float],
+        mode: str,
+        cache_type: str | None = None,
+    ) -> tuple[str | None, float]:
+        """Find the most similar cached prompt of a mode
+
+        Returns:
+            The id of the best matching cache entry and its cosine similarity,
+            or (None, -1.0) when nothing is cached
+        """
+        async with self._lock:
+            await self._refresh()
+            await self._ensure_mode_loaded(hashing_kv, mode)
+
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        best_id, best_similarity = None, -1.0
+        for (bucket_mode, bucket_type), bucket in self._buckets.items():
+            if bucket_mode != mode or (cache_type and bucket_type != cache_type):
+                continue
+            if bucket.dim != query.shape[0]:
+                continue
+            cache_id, similarity = bucket.search(query)
+            if cache_id is not None and similarity > best_similarity:
+                best_id, best_similarity = cache_id, similarity
+        return best_id, best_similarity
+
+
 async def get_best_cached_response(
     hashing_kv,
     current_embedding,
@@ -558,116 +1131,82 @@ async def get_best_cached_response(
     logger.debug(
         f"get_best_cached_response:  mode={mode} cache_type={cache_type} use_llm_check={use_llm_check}"
     )
-    mode_cache = await hashing_kv.get_by_id(mode)
-    if not mode_cache:
+    semantic_index = SemanticCacheIndex.for_storage(hashing_kv)
+    if semantic_index is None:
         return None
 
-    best_similarity = -1
-    best_response = None
-    best_prompt = None
-    best_cache_id = None
-
-    # Only iterate through cache entries for this mode
-    for cache_id, cache_data in mode_cache.items():
-        # Skip if cache_type doesn't match
-        if cache_type and cache_data.get("cache_type") != cache_type:
-            continue
+    while True:
+        best_cache_id, best_similarity = await semantic_index.search(
+            hashing_kv, current_embedding, mode, cache_type
+        )
+        if best_cache_id is None or best_similarity <= similarity_threshold:
+            return None
 
-        # Check if cache data is valid
-        if cache_data["embedding"] is None:
-            continue
+        if exists_func(hashing_kv, "get_by_mode_and_id"):
+            mode_cache = await hashing_kv.get_by_mode_and_id(mode, best_cache_id) or {}
+        else:
+            mode_cache = await hashing_kv.get_by_id(mode) or {}
+        cache_data = mode_cache.get(best_cache_id)
+        if cache_data is not None:
+            break
+        # The entry was dropped from the KV cache since it was indexed
+        await semantic_index.remove(mode, [best_cache_id])
+
+    best_response = cache_data["return"]
+    best_prompt = cache_data.get("original_prompt")
+
+    # If LLM check is enabled and all required parameters are provided
+    if (
+        use_llm_check
+        and llm_func
+        and original_prompt
+        and best_prompt
+        and best_response is not None
+    ):
+        compare_prompt = PROMPTS["similarity_check"].format(
+            original_prompt=original_prompt, cached_prompt=best_prompt
+        )
 
         try:
-            # Safely convert cached embedding
-            cached_quantized = np.frombuffer(
-                bytes.fromhex(cache_data["embedding"]), dtype=np.uint8
-            ).reshape(cache_data["embedding_shape"])
-
-            # Ensure min_val and max_val are valid float values
-            embedding_min = cache_data.get("embedding_min")
-            embedding_max = cache_data.get("embedding_max")
-
-            if (
-                embedding_min is None
-                or embedding_max is None
-                or embedding_min >= embedding_max
-            ):
-                logger.warning(
-                    f"Invalid embedding min/max values: min={embedding_min}, max={embedding_max}"
-                )
-                continue
-
-            cached_embedding = dequantize_embedding(
-                cached_quantized,
-                embedding_min,
-                embedding_max,
-            )
-        except Exception as e:
-            logger.warning(f"Error processing cached embedding: {str(e)}")
-            continue
-
-        similarity = cosine_similarity(current_embedding, cached_embedding)
-        if similarity > best_similarity:
-            best_similarity = similarity
-            best_response = cache_data["return"]
-            best_prompt = cache_data["original_prompt"]
-            best_cache_id = cache_id
-
-    if best_similarity > similarity_threshold:
-        # If LLM check is enabled and all required parameters are provided
-        if (
-            use_llm_check
-            and llm_func
-            and original_prompt
-            and best_prompt
-            and best_response is not None
-        ):
-            compare_prompt = PROMPTS["similarity_check"].format(
-                original_prompt=original_prompt, cached_prompt=best_prompt
-            )
-
-            try:
-                llm_result = await llm_func(compare_prompt)
-                llm_result = llm_result.strip()
-                llm_similarity = float(llm_result)
-
-                # Replace vector similarity with LLM similarity score
-                best_similarity = llm_similarity
-                if best_similarity < similarity_threshold:
-                    log_data = {
-                        "event": "cache_rejected_by_llm",
-                        "type": cache_type,
-                        "mode": mode,
-                        "original_question": original_prompt[:100] + "..."
-                        if len(original_prompt) > 100
-                        else original_prompt,
-                        "cached_question": best_prompt[:100] + "..."
-                        if len(best_prompt) > 100
-                        else best_prompt,
-                        "similarity_score": round(best_similarity, 4),
-                        "threshold": similarity_threshold,
-                    }
-                    logger.debug(json.dumps(log_data, ensure_ascii=False))
-                    logger.info(f"Cache rejected by LLM(mode:{mode} tpye:{cache_type})")
-                    return None
-            except Exception as e:  # Catch all possible exceptions
-                logger.warning(f"LLM similarity check failed: {e}")
-                return None  # Return None directly when LLM check fails
-
-        prompt_display = (
-            best_prompt[:50] + "..." if len(best_prompt) > 50 else best_prompt
-        )
-        log_data = {
-            "event": "cache_hit",
-            "type": cache_type,
-            "mode": mode,
-            "similarity": round(best_similarity, 4),
-            "cache_id": best_cache_id,
-            "original_prompt": prompt_display,
-        }
-        logger.debug(json.dumps(log_data, ensure_ascii=False))
-        return best_response
-    return None
+            llm_result = await llm_func(compare_prompt)
+            llm_result = llm_result.strip()
+            llm_similarity = float(llm_result)
+
+            # Replace vector similarity with LLM similarity score
+            best_similarity = llm_similarity
+            if best_similarity < similarity_threshold:
+                log_data = {
+                    "event": "cache_rejected_by_llm",
+                    "type": cache_type,
+                    "mode": mode,
+                    "original_question": original_prompt[:100] + "..."
+                    if len(original_prompt) > 100
+                    else original_prompt,
+                    "cached_question": best_prompt[:100] + "..."
+                    if len(best_prompt) > 100
+                    else best_prompt,
+                    "similarity_score": round(best_similarity, 4),
+                    "threshold": similarity_threshold,
+                }
+                logger.debug(json.dumps(log_data, ensure_ascii=False))
+                logger.info(f"Cache rejected by LLM(mode:{mode} tpye:{cache_type})")
+                return None
+        except Exception as e:  # Catch all possible exceptions
+            logger.warning(f"LLM similarity check failed: {e}")
+            return None  # Return None directly when LLM check fails
+
+    best_prompt = best_prompt or ""
+    prompt_display = best_prompt[:50] + "..." if len(best_prompt) > 50 else best_prompt
+    log_data = {
+        "event": "cache_hit",
+        "type": cache_type,
+        "mode": mode,
+        "similarity": round(best_similarity, 4),
+        "cache_id": best_cache_id,
+        "original_prompt": prompt_display,
+    }
+    logger.debug(json.dumps(log_data, ensure_ascii=False))
+    return best_response
 
 
 def cosine_similarity(v1, v2):
@@ -788,6 +1327,7 @@ class CacheData:
     max_val: float | None = None
     mode: str = "default"
     cache_type: str = "query"
+    model: str | None = None
 
 
 async def save_to_cache(hashing_kv, cache_data: CacheData):
@@ -824,12 +1364,15 @@ async def save_to_cache(hashing_kv, cache_data: CacheData):
             )
             return
 
-    # Update cache with new content
+    # Update cache with new content, the embedding itself goes to the binary
+    # sidecar of the semantic cache index instead of the KV record. Without an
+    # index it stays in the record, as it did before the sidecar existed
+    semantic_index = SemanticCacheIndex.for_storage(hashing_kv)
     mode_cache[cache_data.args_hash] = {
         "return": cache_data.content,
         "cache_type": cache_data.cache_type,
         "embedding": cache_data.quantized.tobytes().hex()
-        if cache_data.quantized is not None
+        if semantic_index is None and cache_data.quantized is not None
         else None,
         "embedding_shape": cache_data.quantized.shape
         if cache_data.quantized is not None
@@ -837,6 +1380,8 @@ async def save_to_cache(hashing_kv, cache_data: CacheData):
         "embedding_min": cache_data.min_val,
         "embedding_max": cache_data.max_val,
         "original_prompt": cache_data.prompt,
+        "model": cache_data.model,
+        "create_time": int(time.time()),
     }
 
     logger.info(f" == LLM cache == saving {cache_data.mode}: {cache_data.args_hash}")
@@ -844,6 +1389,16 @@ async def save_to_cache(hashing_kv, cache_data: CacheData):
     # Only upsert if there's actual new content
     await hashing_kv.upsert({cache_data.mode: mode_cache})
 
+    if semantic_index is not None and cache_data.quantized is not None:
+        await semantic_index.add(
+            cache_data.mode,
+            cache_data.args_hash,
+            cache_data.cache_type,
+            cache_data.quantized,
+            cache_data.min_val,
+            cache_data.max_val,
+        )
+
 
 def safe_unicode_decode(content):
     # Regular expression to find all Unicode escape sequences of the form \uXXXX
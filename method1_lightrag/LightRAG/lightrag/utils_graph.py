@@ -171,6 +171,9 @@ async def aedit_entity(
             # 2. Update entity information in the graph
             new_node_data = {**node_data, **updated_data}
             new_node_data["entity_id"] = new_entity_name
+            if "description" in updated_data:
+                # The stored token count belongs to the old description
+                new_node_data.pop("description_tokens", None)
 
             if "entity_name" in new_node_data:
                 del new_node_data[
@@ -377,6 +380,9 @@ async def aedit_relation(
 
             # 2. Update relation information in the graph
             new_edge_data = {**edge_data, **updated_data}
+            if "description" in updated_data:
+                # The stored token count belongs to the old description
+                new_edge_data.pop("description_tokens", None)
             await chunk_entity_relation_graph.upsert_edge(
                 source_entity, target_entity, new_edge_data
             )
@@ -904,6 +910,8 @@ def _merge_entity_attributes(
     all_keys = set()
     for data in entity_data_list:
         all_keys.update(data.keys())
+    # Token counts of the source descriptions do not apply to the merged one
+    all_keys.discard("description_tokens")
 
     # Merge values for each key
     for key in all_keys:
@@ -954,6 +962,8 @@ def _merge_relation_attributes(
     all_keys = set()
     for data in relation_data_list:
         all_keys.update(data.keys())
+    # Token counts of the source descriptions do not apply to the merged one
+    all_keys.discard("description_tokens")
 
     # Merge values for each key
     for key in all_keys:
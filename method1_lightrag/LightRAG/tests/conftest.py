@@ -0,0 +1,79 @@
+import hashlib
+import re
+
+import numpy as np
+import pytest
+
+from lightrag import LightRAG
+from lightrag.kg.shared_storage import (
+    finalize_share_data,
+    initialize_pipeline_status,
+    initialize_share_data,
+)
+from lightrag.utils import EmbeddingFunc, Tokenizer
+
+# Entities the fake LLM extracts from the text it is given
+ENTITY_NAMES = ["ALPHA", "BETA", "GAMMA", "DELTA", "OMEGA"]
+
+
+@pytest.fixture
+def shared_data():
+    """Single process shared data, as set up by LightRAG, reset after the test"""
+    initialize_share_data()
+    yield
+    finalize_share_data()
+
+
+class ByteTokenizer:
+    """One token per UTF-8 byte"""
+
+    def encode(self, content: str) -> list[int]:
+        return list(content.encode("utf-8"))
+
+    def decode(self, tokens: list[int]) -> str:
+        return bytes(tokens).decode("utf-8", errors="replace")
+
+
+async def fake_llm(prompt, system_prompt=None, history_messages=[], **kwargs) -> str:
+    """Extract the ENTITY_NAMES of the text, each related to the next one"""
+    text = prompt.rsplit("Text:", 1)[-1]
+    found = [name for name in ENTITY_NAMES if re.search(rf"\b{name}\b", text)]
+    if "-Goal-" not in prompt or "Text:" not in prompt or not found:
+        return "no"
+    records = [f'("entity"<|>"{name}"<|>"concept"<|>"{name} thing")' for name in found]
+    records += [
+        f'("relationship"<|>"{src}"<|>"{tgt}"<|>"near"<|>"k"<|>1)'
+        for src, tgt in zip(found, found[1:])
+    ]
+    return "##".join(records) + "<|COMPLETE|>"
+
+
+async def fake_embedding(texts: list[str]) -> np.ndarray:
+    return np.array(
+        [
+            np.frombuffer(hashlib.sha256(text.encode()).digest()[:8], dtype=np.uint8)
+            for text in texts
+        ],
+        dtype=np.float32,
+    )
+
+
+@pytest.fixture
+def make_rag(shared_data, tmp_path):
+    """Build LightRAG instances with a fake LLM and embedding in tmp_path"""
+
+    async def make(working_dir=tmp_path, llm_model_func=fake_llm, **kwargs) -> LightRAG:
+        rag = LightRAG(
+            working_dir=str(working_dir),
+            llm_model_func=llm_model_func,
+            embedding_func=EmbeddingFunc(8, 100, fake_embedding),
+            tokenizer=Tokenizer("bytes", ByteTokenizer()),
+            chunk_token_size=40,
+            chunk_overlap_token_size=0,
+            **kwargs,
+        )
+        await rag.initialize_storages()
+        await initialize_pipeline_status()
+        return rag
+
+    return make
@@ -0,0 +1,124 @@
+import asyncio
+
+from lightrag.kg.csr_graph_impl import CSRGraphStorage
+from lightrag.kg.networkx_impl import NetworkXStorage
+
+
+async def _graph_storage(cls, working_dir: str):
+    storage = cls(
+        namespace="chunk_entity_relation",
+        global_config={"working_dir": working_dir},
+        embedding_func=None,
+    )
+    await storage.initialize()
+    return storage
+
+
+async def _fill(storage) -> None:
+    await storage.upsert_nodes(
+        {
+            name: {"entity_id": name, "entity_type": "person"}
+            for name in ("A", "B", "C", "D")
+        }
+    )
+    await storage.upsert_edges(
+        {
+            ("A", "B"): {"weight": "1.0"},
+            ("B", "C"): {"weight": "2.0"},
+            ("C", "A"): {"weight": "3.0"},
+            ("C", "D"): {"weight": "4.0"},
+        }
+    )
+
+
+def test_lookups_and_degrees(shared_data, tmp_path):
+    async def run():
+        storage = await _graph_storage(CSRGraphStorage, str(tmp_path))
+        await _fill(storage)
+        await storage.upsert_node("A", {"description": "first"})
+        await storage.upsert_edge("B", "A", {"weight": "5.0"})
+        return (
+            await storage.get_node("A"),
+            await storage.get_edge("A", "B"),
+            sorted(await storage.get_node_edges("C")),
+            await storage.get_node_edges("missing"),
+            await storage.node_degrees_batch(["A", "C", "D", "missing"]),
+            await storage.edge_degrees_batch([("A", "C"), ("C", "D")]),
+            await storage.has_edge("D", "C"),
+            await storage.has_edge("A", "D"),
+        )
+
+    (node, edge, node_edges, missing, degrees, edge_degrees, has_dc, has_ad) = (
+        asyncio.run(run())
+    )
+    assert node == {"entity_id": "A", "entity_type": "person", "description": "first"}
+    assert edge == {"weight": "5.0"}
+    assert node_edges == [("C", "A"), ("C", "B"), ("C", "D")]
+    assert missing is None
+    assert degrees == {"A": 2, "C": 3, "D": 1, "missing": 0}
+    assert edge_degrees == {("A", "C"): 5, ("C", "D"): 4}
+    assert has_dc and not has_ad
+
+
+def test_removed_nodes_and_edges_are_gone(shared_data, tmp_path):
+    async def run():
+        storage = await _graph_storage(CSRGraphStorage, str(tmp_path))
+        await _fill(storage)
+        await storage.remove_nodes(["C"])
+        await storage.remove_edges([("B", "A")])
+        await storage.upsert_edge("A", "D", {"weight": "6.0"})
+        return (
+            await storage.has_node("C"),
+            await storage.has_edge("A", "B"),
+            await storage.node_degrees_batch(["A", "B", "D"]),
+            await storage.get_nodes_edges_batch(["A", "B", "D"]),
+            await storage.get_all_labels(),
+        )
+
+    has_c, has_ab, degrees, edges, labels = asyncio.run(run())
+    assert not has_c and not has_ab
+    assert degrees == {"A": 1, "B": 0, "D": 1}
+    assert edges == {"A": [("A", "D")], "B": [], "D": [("D", "A")]}
+    assert labels == ["A", "B", "D"]
+
+
+def test_graph_is_compacted_on_save_and_reloaded(shared_data, tmp_path):
+    async def run():
+        storage = await _graph_storage(CSRGraphStorage, str(tmp_path))
+        await _fill(storage)
+        await storage.remove_nodes(["B"])
+        assert await storage.index_done_callback()
+        slots = len(storage._node_ids), storage._edge_count
+        # Slots freed by the save are reused by the next changes
+        await storage.upsert_edge("A", "E", {"weight": "7.0"})
+        assert await storage.index_done_callback()
+        reopened = await _graph_storage(CSRGraphStorage, str(tmp_path))
+        graph = await reopened.get_knowledge_graph("*")
+        return slots, reopened, graph
+
+    slots, reopened, graph = asyncio.run(run())
+    assert slots == (3, 2)
+    assert sorted(node.id for node in graph.nodes) == ["A", "C", "D", "E"]
+    assert sorted(edge.id for edge in graph.edges) == ["A-C", "A-E", "C-D"]
+    assert reopened._node_props.get(reopened._node_slot["C"])["entity_type"] == (
+        "person"
+    )
+
+
+def test_networkx_graph_is_imported(shared_data, tmp_path):
+    async def run():
+        networkx = await _graph_storage(NetworkXStorage, str(tmp_path))
+        await _fill(networkx)
+        assert await networkx.index_done_callback()
+        storage = await _graph_storage(CSRGraphStorage, str(tmp_path))
+        return (
+            await storage.get_node("D"),
+            await storage.get_edge("A", "C"),
+            await storage.get_knowledge_graph("D", max_depth=1),
+        )
+
+    node, edge, subgraph = asyncio.run(run())
+    assert node == {"entity_id": "D", "entity_type": "person"}
+    assert edge == {"weight": "3.0"}
+    assert sorted(node.id for node in subgraph.nodes) == ["C", "D"]
+    assert (tmp_path / "graph_chunk_entity_relation.csr").exists()
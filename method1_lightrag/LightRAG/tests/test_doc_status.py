@@ -0,0 +1,132 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from lightrag.base import (
+    DocProcessingStatus,
+    DocStatus,
+    DocStatusStorage,
+    doc_order_key,
+)
+from lightrag.kg.json_doc_status_impl import JsonDocStatusStorage
+
+
+def _record(i: int, status: DocStatus) -> dict:
+    return {
+        "status": status,
+        "content_summary": f"summary {i}",
+        "content_length": i,
+        "file_path": f"file{i}.txt",
+        "created_at": f"2025-01-{1 + i % 28:02d}T00:00:00",
+        "updated_at": f"2025-02-{1 + i % 28:02d}T00:00:00",
+    }
+
+
+async def _status_storage(working_dir: str) -> JsonDocStatusStorage:
+    storage = JsonDocStatusStorage(
+        namespace="doc_status",
+        global_config={"working_dir": working_dir},
+        embedding_func=None,
+    )
+    await storage.initialize()
+    return storage
+
+
+async def _all_pages(storage, status, limit: int, use_cursor: bool) -> list[str]:
+    doc_ids, cursor, offset = [], None, 0
+    while True:
+        if use_cursor:
+            page, cursor = await storage.get_docs_paginated(status, limit, 0, cursor)
+        else:
+            page, cursor = await storage.get_docs_paginated(status, limit, offset)
+        doc_ids += list(page)
+        offset += limit
+        if cursor is None:
+            return doc_ids
+
+
+def test_counts_and_pages_follow_changes_of_other_instances(shared_data, tmp_path):
+    rng = random.Random(0)
+    statuses = list(DocStatus)
+    docs = {f"doc-{i}": _record(i, rng.choice(statuses)) for i in range(300)}
+
+    async def check(storage):
+        assert await storage.get_status_counts() == {
+            status.value: sum(doc["status"] == status for doc in docs.values())
+            for status in statuses
+        }
+        for status in [None, *statuses]:
+            expected = [
+                doc_id
+                for _, doc_id in sorted(
+                    doc_order_key(doc_id, doc["created_at"])
+                    for doc_id, doc in docs.items()
+                    if status is None or doc["status"] == status
+                )
+            ]
+            for limit in (1, 7, 500):
+                assert await _all_pages(storage, status, limit, True) == expected
+                assert await _all_pages(storage, status, limit, False) == expected
+            # Same page as the generic implementation of the base class
+            assert await storage.get_docs_paginated(
+                status, 13, 5
+            ) == await DocStatusStorage.get_docs_paginated(storage, status, 13, 5)
+
+    async def run():
+        first = await _status_storage(str(tmp_path))
+        second = await _status_storage(str(tmp_path))
+        await first.upsert(docs)
+        for step in range(2):
+            writer, deleter = (first, second) if step else (second, first)
+            changed = {
+                doc_id: _record(int(doc_id[4:]), rng.choice(statuses))
+                for doc_id in rng.sample(sorted(docs), 30)
+            }
+            await writer.upsert(changed)
+            docs.update(changed)
+            removed = rng.sample(sorted(docs), 10)
+            await deleter.delete(removed)
+            for doc_id in removed:
+                del docs[doc_id]
+            await check(first)
+            await check(second)
+
+    asyncio.run(run())
+
+
+def test_invalid_cursor_is_rejected(shared_data, tmp_path):
+    async def run():
+        storage = await _status_storage(str(tmp_path))
+        await storage.get_docs_paginated(cursor="no separator")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_legacy_content_is_moved_to_full_docs(make_rag, tmp_path):
+    legacy = _record(1, DocStatus.PENDING)
+    legacy["content"] = "Legacy content about ALPHA and BETA. " * 10
+    with open(tmp_path / "kv_store_doc_status.json", "w") as f:
+        json.dump({"doc-legacy": legacy}, f)
+
+    async def run():
+        rag = await make_rag()
+        status_doc = DocProcessingStatus(**await rag.doc_status.get_by_id("doc-legacy"))
+        content = await rag._document_content("doc-legacy", status_doc)
+        # Written before a status record without the content can be persisted
+        with open(tmp_path / "kv_store_full_docs.json") as f:
+            flushed = json.load(f)["doc-legacy"]["content"]
+
+        await rag.ainsert("New document about ALPHA. " * 10)
+        counts = await rag.get_processing_status()
+        stored = (await rag.full_docs.get_by_id("doc-legacy"))["content"]
+        await rag.finalize_storages()
+        return content, flushed, counts, stored
+
+    content, flushed, counts, stored = asyncio.run(run())
+    assert content == flushed == stored == legacy["content"]
+    assert counts["processed"] == 2
+    with open(tmp_path / "kv_store_doc_status.json") as f:
+        assert all("content" not in doc for doc in json.load(f).values())
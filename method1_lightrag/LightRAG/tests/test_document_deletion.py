@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+
+from lightrag.base import DocStatus
+from lightrag.kg.shared_storage import finalize_share_data, initialize_share_data
+from lightrag.prompt import GRAPH_FIELD_SEP
+
+from conftest import fake_llm
+
+DOC_A = "ALPHA BETA filler text here.\n\n" * 3 + "ALPHA only part"
+DOC_B = "BETA GAMMA other words.\n\n" * 3 + "GAMMA DELTA end"
+
+
+async def _insert(rag, docs: dict[str, str]) -> None:
+    for doc_id, content in docs.items():
+        await rag.ainsert(content, ids=[doc_id], split_by_character="\n\n")
+
+
+async def _contents(rag):
+    """Graph nodes and edges with their sources and the vector record names"""
+    graph = rag.chunk_entity_relation_graph
+    labels = await graph.get_all_labels()
+    nodes = await graph.get_nodes_batch(labels)
+    pairs = sorted(
+        {
+            tuple(sorted(edge))
+            for edges in (await graph.get_nodes_edges_batch(labels)).values()
+            for edge in edges
+        }
+    )
+    edges = await graph.get_edges_batch(
+        [{"src": src, "tgt": tgt} for src, tgt in pairs]
+    )
+    entities = (await rag.entities_vdb.client_storage)["data"]
+    relations = (await rag.relationships_vdb.client_storage)["data"]
+    chunks = (await rag.chunks_vdb.client_storage)["data"]
+    return (
+        {k: sorted(v["source_id"].split(GRAPH_FIELD_SEP)) for k, v in nodes.items()},
+        {k: sorted(v["source_id"].split(GRAPH_FIELD_SEP)) for k, v in edges.items()},
+        sorted(dp["entity_name"] for dp in entities),
+        sorted((dp["src_id"], dp["tgt_id"]) for dp in relations),
+        sorted(dp["__id__"] for dp in chunks),
+    )
+
+
+def _count_rebuilds(rag) -> list:
+    calls = []
+    rebuild = rag.arebuild_chunk_index
+
+    async def counting_rebuild():
+        calls.append(None)
+        await rebuild()
+
+    rag.arebuild_chunk_index = counting_rebuild
+    return calls
+
+
+@pytest.mark.parametrize("graph_storage", ["NetworkXStorage", "CSRGraphStorage"])
+def test_delete_leaves_what_the_other_documents_built(
+    make_rag, tmp_path, graph_storage
+):
+    async def run():
+        reference = await make_rag(tmp_path / "reference", graph_storage=graph_storage)
+        await _insert(reference, {"doc-b": DOC_B})
+        expected = await _contents(reference)
+        await reference.finalize_storages()
+        # Storages of a namespace share their data within a process
+        finalize_share_data()
+        initialize_share_data()
+
+        rag = await make_rag(graph_storage=graph_storage)
+        await _insert(rag, {"doc-a": DOC_A, "doc-b": DOC_B})
+        index = await rag.chunk_index.get_by_id("doc-a")
+        await rag.adelete_by_doc_id("doc-a")
+        contents = await _contents(rag)
+        index_after = await rag.chunk_index.get_by_id("doc-a")
+        await rag.finalize_storages()
+        return expected, index, contents, index_after
+
+    expected, index, contents, index_after = asyncio.run(run())
+    assert len(index["chunks"]) == 2
+    assert {"entities": ["ALPHA", "BETA"], "relations": [["ALPHA", "BETA"]]} in (
+        index["chunks"].values()
+    )
+    assert contents == expected
+    assert index_after is None
+
+
+def test_delete_without_chunk_index_rebuilds_it(make_rag):
+    async def run():
+        rag = await make_rag()
+        await _insert(rag, {"doc-a": DOC_A, "doc-b": DOC_B})
+        await rag.chunk_index.drop()
+        rebuilds = _count_rebuilds(rag)
+        await rag.adelete_by_doc_id("doc-b")
+        await rag.adelete_by_doc_id("doc-a")
+        contents = await _contents(rag)
+        await rag.finalize_storages()
+        return len(rebuilds), contents
+
+    rebuilds, contents = asyncio.run(run())
+    assert rebuilds == 1
+    assert contents == ({}, {}, [], [], [])
+
+
+def test_relations_removed_with_their_entity_leave_the_vector_store(make_rag):
+    async def run():
+        rag = await make_rag()
+        await _insert(rag, {"doc-a": DOC_A})
+        await rag.ainsert_custom_kg(
+            {
+                "chunks": [{"content": "custom chunk", "source_id": "src-1"}],
+                "entities": [
+                    {"entity_name": "ZETA", "description": "z", "source_id": "src-1"}
+                ],
+                "relationships": [
+                    {
+                        "src_id": "ALPHA",
+                        "tgt_id": "ZETA",
+                        "description": "d",
+                        "keywords": "k",
+                        "source_id": "src-1",
+                    }
+                ],
+            },
+            full_doc_id="doc-c",
+        )
+        index = await rag.chunk_index.get_by_id("doc-c")
+        await rag.adelete_by_doc_id("doc-a")
+        _, edges, _, relations, _ = await _contents(rag)
+        has_alpha = await rag.chunk_entity_relation_graph.has_node("ALPHA")
+        await rag.finalize_storages()
+        return index, edges, relations, has_alpha
+
+    index, edges, relations, has_alpha = asyncio.run(run())
+    assert list(index["chunks"].values()) == [
+        {"entities": ["ALPHA", "ZETA"], "relations": [["ALPHA", "ZETA"]]}
+    ]
+    assert not has_alpha
+    assert edges == {}
+    assert relations == []
+
+
+def test_failed_and_empty_documents_do_not_rebuild_the_index(make_rag):
+    async def failing_llm(prompt, **kwargs):
+        if "OMEGA" in prompt:
+            raise RuntimeError("llm down")
+        return await fake_llm(prompt, **kwargs)
+
+    async def run():
+        rag = await make_rag(llm_model_func=failing_llm)
+        await _insert(rag, {"doc-f": "OMEGA fails here.\n\nOMEGA again"})
+        await rag.ainsert("   ", ids=["doc-empty"])
+        statuses = [
+            (await rag.doc_status.get_by_id(doc_id))["status"]
+            for doc_id in ("doc-f", "doc-empty")
+        ]
+        indexed = [
+            await rag.chunk_index.get_by_id(doc_id) is not None
+            for doc_id in ("doc-f", "doc-empty")
+        ]
+        rebuilds = _count_rebuilds(rag)
+        await rag.adelete_by_doc_id("doc-f")
+        await rag.adelete_by_doc_id("doc-empty")
+        left = (
+            [
+                await rag.doc_status.get_by_id(doc_id)
+                for doc_id in ("doc-f", "doc-empty")
+            ],
+            await rag.text_chunks.get_all(),
+        )
+        await rag.finalize_storages()
+        return statuses, indexed, len(rebuilds), left
+
+    statuses, indexed, rebuilds, left = asyncio.run(run())
+    assert statuses == [DocStatus.FAILED, DocStatus.PROCESSED]
+    assert indexed == [True, True]
+    assert rebuilds == 0
+    assert left == ([None, None], {})
@@ -0,0 +1,93 @@
+import asyncio
+import multiprocessing as mp
+import os
+import sys
+
+import pytest
+
+from lightrag.kg import shared_storage
+from lightrag.kg.shared_storage import (
+    finalize_share_data,
+    get_lock_wait_stats,
+    get_namespace_lock,
+    initialize_share_data,
+)
+
+
+async def _trace_lock_order(lock, tasks):
+    """Run the (name, write, delay) tasks and return the enter and exit events"""
+    events = []
+
+    async def task(name, write, delay):
+        await asyncio.sleep(delay)
+        async with lock.writer() if write else lock.reader():
+            events.append(f"+{name}")
+            await asyncio.sleep(0.05)
+            events.append(f"-{name}")
+
+    await asyncio.gather(*(task(*args) for args in tasks))
+    return events
+
+
+def test_readers_share_the_lock(shared_data):
+    lock = get_namespace_lock("ns")
+    events = asyncio.run(
+        _trace_lock_order(lock, [("r1", False, 0), ("r2", False, 0.01)])
+    )
+    assert events == ["+r1", "+r2", "-r1", "-r2"]
+
+
+def test_writer_is_exclusive(shared_data):
+    lock = get_namespace_lock("ns")
+    events = asyncio.run(
+        _trace_lock_order(
+            lock, [("r", False, 0), ("w", True, 0.01), ("r2", False, 0.02)]
+        )
+    )
+    # The waiting writer holds back the later reader
+    assert events == ["+r", "-r", "+w", "-w", "+r2", "-r2"]
+
+
+def test_lock_wait_stats_are_recorded_and_reset(shared_data):
+    lock = get_namespace_lock("ns")
+    asyncio.run(_trace_lock_order(lock, [("r", False, 0), ("w", True, 0.01)]))
+    stats = get_lock_wait_stats()["namespaces"]["ns"]
+    assert stats["read"]["acquired"] == 1
+    assert stats["write"]["acquired"] == 1
+    assert stats["write"]["max_wait_ms"] > 0
+
+    finalize_share_data()
+    initialize_share_data()
+    assert get_lock_wait_stats() == {"namespaces": {}, "locks": {}}
+
+
+def _hold_and_die(write, ready):
+    async def run():
+        await get_namespace_lock("ns")._acquire(write=write)
+        ready.set()
+        os._exit(0)
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs fork")
+@pytest.mark.parametrize("write", [True, False])
+def test_lock_of_a_dead_worker_is_released(write):
+    context = mp.get_context("fork")
+    initialize_share_data(2)
+    try:
+        ready = context.Event()
+        process = context.Process(target=_hold_and_die, args=(write, ready))
+        process.start()
+        ready.wait()
+        process.join()
+
+        async def take():
+            async with get_namespace_lock("ns").writer():
+                pass
+
+        asyncio.run(asyncio.wait_for(take(), 5))
+        readers, writer, waiting_writers = shared_storage._namespace_lock_states["ns"]
+        assert (dict(readers), writer, dict(waiting_writers)) == ({}, 0, {})
+    finally:
+        finalize_share_data()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+
+from lightrag.kg import networkx_impl
+from lightrag.kg.networkx_impl import NetworkXStorage
+
+
+async def _graph_storage(working_dir: str) -> NetworkXStorage:
+    storage = NetworkXStorage(
+        namespace="chunk_entity_relation",
+        global_config={"working_dir": working_dir},
+        embedding_func=None,
+    )
+    await storage.initialize()
+    return storage
+
+
+async def _fill(storage: NetworkXStorage) -> None:
+    await storage.upsert_nodes(
+        {name: {"entity_type": "person"} for name in ("A", "B", "C")}
+    )
+    await storage.upsert_edges(
+        {("A", "B"): {"weight": "1.0"}, ("B", "C"): {"weight": "2.0"}}
+    )
+    assert await storage.index_done_callback()
+
+
+def test_changes_are_journaled_and_replayed(shared_data, tmp_path):
+    async def run():
+        storage = await _graph_storage(str(tmp_path))
+        await _fill(storage)
+        await storage.remove_nodes(["C"])
+        await storage.upsert_node("A", {"entity_type": "place"})
+        assert await storage.index_done_callback()
+        return await _graph_storage(str(tmp_path))
+
+    reopened = asyncio.run(run())
+    graph = reopened._graph
+    assert sorted(graph.nodes) == ["A", "B"]
+    assert graph.nodes["A"]["entity_type"] == "place"
+    assert sorted(graph.edges) == [("A", "B")]
+    assert not os.path.exists(tmp_path / "graph_chunk_entity_relation.snapshot")
+    assert os.path.exists(tmp_path / "graph_chunk_entity_relation.journal")
+
+
+def test_torn_trailing_record_is_dropped(shared_data, tmp_path):
+    async def run():
+        storage = await _graph_storage(str(tmp_path))
+        await _fill(storage)
+        with open(storage._journal_file, "ab") as f:
+            f.write(b"\x40\x00\x00\x00garbage")
+        reopened = await _graph_storage(str(tmp_path))
+        await reopened.upsert_node("D", {"entity_type": "person"})
+        assert await reopened.index_done_callback()
+        return await _graph_storage(str(tmp_path))
+
+    reopened = asyncio.run(run())
+    assert sorted(reopened._graph.nodes) == ["A", "B", "C", "D"]
+    assert reopened._graph.number_of_edges() == 2
+
+
+def test_journal_is_compacted_into_a_new_snapshot(shared_data, tmp_path, monkeypatch):
+    monkeypatch.setattr(networkx_impl, "GRAPH_JOURNAL_COMPACTION_MIN_BYTES", 0)
+
+    async def run():
+        storage = await _graph_storage(str(tmp_path))
+        await _fill(storage)
+        generation = storage._generation
+        journal_size = os.path.getsize(storage._journal_file)
+        return storage, generation, journal_size, await _graph_storage(str(tmp_path))
+
+    storage, generation, journal_size, reopened = asyncio.run(run())
+    assert generation == 1
+    assert journal_size == networkx_impl._FILE_HEADER.size
+    assert os.path.exists(storage._snapshot_file)
+    assert reopened._generation == 1
+    assert sorted(reopened._graph.edges) == [("A", "B"), ("B", "C")]
+
+
+def test_other_process_applies_only_new_records(shared_data, tmp_path):
+    async def run():
+        writer = await _graph_storage(str(tmp_path))
+        await _fill(writer)
+        reader = await _graph_storage(str(tmp_path))
+        offset = reader._journal_offset
+
+        await writer.upsert_edge("A", "C", {"weight": "3.0"})
+        assert await writer.index_done_callback()
+        # The update flag set by the writer makes the reader catch up
+        assert reader.storage_updated.value
+        has_edge = await reader.has_edge("A", "C")
+        return offset, reader._journal_offset, writer._journal_offset, has_edge
+
+    old_offset, new_offset, writer_offset, has_edge = asyncio.run(run())
+    assert has_edge
+    assert old_offset < new_offset == writer_offset
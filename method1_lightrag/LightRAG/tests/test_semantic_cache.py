@@ -0,0 +1,149 @@
+import asyncio
+import os
+
+import numpy as np
+
+from lightrag.kg.json_kv_impl import JsonKVStorage
+from lightrag.utils import (
+    CacheData,
+    SemanticCacheIndex,
+    get_best_cached_response,
+    quantize_embedding,
+    save_to_cache,
+)
+
+
+def _embedding(seed: int, dim: int = 16) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+
+def _cache_data(args_hash: str, seed: int, mode: str = "local") -> CacheData:
+    quantized, min_val, max_val = quantize_embedding(_embedding(seed))
+    return CacheData(
+        args_hash=args_hash,
+        content=f"answer {args_hash}",
+        prompt=f"prompt {args_hash}",
+        quantized=quantized,
+        min_val=min_val,
+        max_val=max_val,
+        mode=mode,
+    )
+
+
+async def _cache_storage(working_dir: str) -> JsonKVStorage:
+    storage = JsonKVStorage(
+        namespace="llm_response_cache",
+        global_config={"working_dir": working_dir, "embedding_batch_num": 10},
+        embedding_func=None,
+    )
+    await storage.initialize()
+    return storage
+
+
+def _fresh_index(storage) -> SemanticCacheIndex:
+    """An index of its own, like the one of another worker process"""
+    SemanticCacheIndex._instances.clear()
+    return SemanticCacheIndex.for_storage(storage)
+
+
+def test_cached_response_is_found_by_similarity(shared_data, tmp_path):
+    async def run():
+        storage = await _cache_storage(str(tmp_path))
+        SemanticCacheIndex._instances.clear()
+        await save_to_cache(storage, _cache_data("a", 1))
+        await save_to_cache(storage, _cache_data("b", 2))
+
+        found = await get_best_cached_response(
+            storage, _embedding(2), similarity_threshold=0.9, mode="local"
+        )
+        missing = await get_best_cached_response(
+            storage, _embedding(3), similarity_threshold=0.9, mode="local"
+        )
+        return found, missing
+
+    found, missing = asyncio.run(run())
+    assert found == "answer b"
+    assert missing is None
+
+
+def test_index_sees_entries_appended_by_another_process(shared_data, tmp_path):
+    async def run():
+        storage = await _cache_storage(str(tmp_path))
+        await save_to_cache(storage, _cache_data("a", 1))
+        reader = _fresh_index(storage)
+        assert (await reader.search(storage, _embedding(1), "local"))[0] == "a"
+
+        writer = _fresh_index(storage)
+        await save_to_cache(storage, _cache_data("b", 2))
+        await writer.remove("local", ["a"])
+        best_b, _ = await reader.search(storage, _embedding(2), "local")
+        best_a, _ = await reader.search(storage, _embedding(1), "local")
+        return best_b, best_a
+
+    best_b, best_a = asyncio.run(run())
+    assert best_b == "b"
+    assert best_a == "b"
+
+
+def test_index_is_rebuilt_after_another_process_compacts(shared_data, tmp_path):
+    async def run():
+        storage = await _cache_storage(str(tmp_path))
+        await save_to_cache(storage, _cache_data("keep", 1))
+        reader = _fresh_index(storage)
+        assert (await reader.search(storage, _embedding(1), "local"))[0] == "keep"
+
+        writer = _fresh_index(storage)
+        for i in range(100):
+            await writer.add(
+                "local", f"stale{i}", "query", *quantize_embedding(_embedding(100 + i))
+            )
+            await writer.remove("local", [f"stale{i}"])
+        size = os.path.getsize(writer._file_name)
+        # Loading the sidecar compacts it into a new file
+        await _fresh_index(storage).search(storage, _embedding(1), "local")
+        assert os.path.getsize(writer._file_name) < size
+
+        return await reader.search(storage, _embedding(1), "local")
+
+    best, similarity = asyncio.run(run())
+    assert best == "keep"
+    assert similarity > 0.99
+
+
+def test_appends_during_compaction_are_kept(shared_data, tmp_path):
+    async def run():
+        storage = await _cache_storage(str(tmp_path))
+        writer = _fresh_index(storage)
+        for i in range(100):
+            await writer.add(
+                "local", f"stale{i}", "query", *quantize_embedding(_embedding(100 + i))
+            )
+            await writer.remove("local", [f"stale{i}"])
+        compactor = _fresh_index(storage)
+        await asyncio.gather(
+            compactor._read_sidecar(),
+            *(
+                writer.add(
+                    "local", f"new{i}", "query", *quantize_embedding(_embedding(i))
+                )
+                for i in range(20)
+            ),
+        )
+        return await _fresh_index(storage)._read_sidecar()
+
+    records = asyncio.run(run())
+    assert sorted(cache_id for _, cache_id in records) == sorted(
+        f"new{i}" for i in range(20)
+    )
+
+
+def test_index_is_off_for_storages_outside_the_working_dir(shared_data, tmp_path):
+    async def run():
+        storage = await _cache_storage(str(tmp_path))
+        remote = type("PGKVStorage", (), {})()
+        remote.__dict__.update(
+            namespace=storage.namespace, global_config=storage.global_config
+        )
+        return SemanticCacheIndex.for_storage(remote)
+
+    assert asyncio.run(run()) is None
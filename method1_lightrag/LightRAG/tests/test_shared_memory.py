@@ -0,0 +1,107 @@
+import asyncio
+import os
+
+import pytest
+
+from lightrag.kg import networkx_impl, shared_storage
+from lightrag.kg.json_kv_impl import JsonKVStorage
+from lightrag.kg.networkx_impl import NetworkXStorage
+from lightrag.kg.shared_memory import _create_segment, _segment_names, unlink_segment
+from lightrag.kg.shared_storage import finalize_share_data, initialize_share_data
+
+pytestmark = pytest.mark.skipif(
+    not os.path.isdir("/dev/shm"), reason="needs POSIX shared memory"
+)
+
+
+@pytest.fixture
+def multiprocess_data():
+    """Shared data of a two worker setup, used from this process only"""
+    initialize_share_data(2)
+    yield
+    finalize_share_data()
+
+
+async def _kv_storage(working_dir: str) -> JsonKVStorage:
+    storage = JsonKVStorage(
+        namespace="text_chunks",
+        global_config={"working_dir": working_dir, "embedding_batch_num": 10},
+        embedding_func=None,
+    )
+    await storage.initialize()
+    return storage
+
+
+def test_kv_lookups_are_served_from_the_snapshot(multiprocess_data, tmp_path):
+    async def run():
+        storage = await _kv_storage(str(tmp_path))
+        await storage.upsert({"empty": {}, "chunk": {"content": "text", "tokens": 1}})
+        await storage.index_done_callback()
+        assert storage._snapshot._snapshot.is_current
+        # Another worker maps the snapshot published by this one
+        worker = await _kv_storage(str(tmp_path))
+        published = await worker.get_by_ids(["chunk", "empty", "missing"])
+        unknown = await worker.filter_keys({"chunk", "missing"})
+
+        # Until the next save lookups fall back to the shared dict
+        await storage.upsert({"new": {"content": "more"}})
+        assert not storage._snapshot._snapshot.is_current
+        pending = await worker.get_by_id("new")
+        return published, unknown, pending
+
+    published, unknown, pending = asyncio.run(run())
+    assert published == [{"content": "text", "tokens": 1}, {}, None]
+    assert unknown == {"missing"}
+    assert pending == {"content": "more"}
+
+
+def test_graph_snapshot_is_loaded_from_shared_memory(
+    multiprocess_data, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(networkx_impl, "GRAPH_JOURNAL_COMPACTION_MIN_BYTES", 0)
+
+    async def run():
+        storage = NetworkXStorage(
+            namespace="chunk_entity_relation",
+            global_config={"working_dir": str(tmp_path)},
+            embedding_func=None,
+        )
+        await storage.initialize()
+        await storage.upsert_edge("A", "B", {"weight": "1.0"})
+        assert await storage.index_done_callback()
+        # Keep the header, the body can only come from shared memory now
+        with open(storage._snapshot_file, "r+b") as f:
+            f.truncate(networkx_impl._FILE_HEADER.size)
+        # Like a worker that still holds the graph of the previous generation
+        storage._generation = 0
+        storage.storage_updated.value = True
+        return await storage.get_edge("B", "A")
+
+    assert asyncio.run(run()) == {"weight": "1.0"}
+
+
+def test_segments_are_unlinked_on_init_and_finalize(tmp_path):
+    dead_pid = 2**22 + 1
+    while shared_storage._pid_alive(dead_pid):
+        dead_pid += 1
+    stale = f"lightrag_{dead_pid}_deadbeef_ctl"
+    live = f"lightrag_{os.getppid()}_cafe_ctl"
+    for name in (stale, live):
+        _create_segment(name, 8).close()
+    try:
+        initialize_share_data(2)
+        try:
+            assert stale not in _segment_names()
+            assert live in _segment_names()
+            storage = asyncio.run(_kv_storage(str(tmp_path)))
+            asyncio.run(storage.upsert({"chunk": {"content": "text"}}))
+            asyncio.run(storage.index_done_callback())
+            prefix = shared_storage._shared_memory_prefix
+            assert any(name.startswith(f"{prefix}_") for name in _segment_names())
+        finally:
+            finalize_share_data()
+        assert not any(name.startswith(f"{prefix}_") for name in _segment_names())
+        assert live in _segment_names()
+    finally:
+        for name in (stale, live):
+            unlink_segment(name)
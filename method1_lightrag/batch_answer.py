@@ -0,0 +1,146 @@
+import argparse
+import contextlib
+import json
+import os
+
+from lightrag import QueryParam
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_json(data, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def restore_checkpoint(output_data, checkpoint_file):
+    """Copy the answers of an interrupted run from its append-only checkpoint"""
+    if not os.path.exists(checkpoint_file):
+        return 0
+    restored = 0
+    with open(checkpoint_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # the last line may be truncated if the run was killed mid-write
+                continue
+            i = record["index"]
+            if i < len(output_data["question"]) and output_data["question"][i] == record["question"]:
+                output_data["answer"][i] = record["answer"]
+                restored += 1
+    return restored
+
+async def answer_test_set(
+    rag, input_file, output_file, param, concurrency=None, save_answer=None
+):
+    """Answer every unanswered question of a test set with rag.aquery_batch.
+
+    Answers are appended to `<output_file>.checkpoint.jsonl` as soon as they
+    arrive and written to the output JSON once at the end, after which the
+    checkpoint is removed. Rerunning after an interruption resumes from both
+    the partial output file and the checkpoint. save_answer(question, answer)
+    is called for every answer, like query() did for each question.
+    """
+    if not os.path.exists(input_file):
+        print(f"Error: input file not found at {input_file}")
+        return
+
+    input_data = load_json(input_file)
+
+    if os.path.exists(output_file):
+        print(f"Found existing output file: {output_file} — resuming.")
+        output_data = load_json(output_file)
+    else:
+        print("Creating new output file.")
+        output_data = {
+            "question": input_data["question"],
+            "ground_truth": input_data["ground_truth"],
+            "answer": ["" for _ in input_data["question"]]
+        }
+
+    checkpoint_file = output_file + ".checkpoint.jsonl"
+    restored = restore_checkpoint(output_data, checkpoint_file)
+    if restored:
+        print(f"Restored {restored} answers from {checkpoint_file}.")
+
+    pending = [i for i, answer in enumerate(output_data["answer"]) if not answer.strip()]
+    skipped = len(output_data["question"]) - len(pending)
+    if skipped:
+        print(f"SKIPPED {skipped} already answered questions.")
+    print(f"Sending {len(pending)} queries...")
+
+    failed = 0
+    try:
+        with open(checkpoint_file, "a", encoding="utf-8") as checkpoint:
+
+            def on_result(batch_index, response, error):
+                nonlocal failed
+                i = pending[batch_index]
+                if error is not None:
+                    failed += 1
+                    print(f"[{i+1}] ❌ Error during async query: {error}")
+                    return
+                if response is None:
+                    failed += 1
+                    print(f"[{i+1}] ❌ Query failed — no answer returned.")
+                    return
+                answer = str(response).strip()
+                output_data["answer"][i] = answer
+                checkpoint.write(
+                    json.dumps(
+                        {"index": i, "question": output_data["question"][i], "answer": answer},
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+                if save_answer is not None:
+                    save_answer(output_data["question"][i], answer)
+                print(f"[{i+1}] ✅ Answer saved.")
+
+            await rag.aquery_batch(
+                [output_data["question"][i] for i in pending],
+                param=param,
+                max_concurrency=concurrency,
+                on_result=on_result,
+            )
+    finally:
+        save_json(output_data, output_file)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(checkpoint_file)
+
+    if failed:
+        print(f"⚠️ {failed} queries failed, run again to retry them.")
+    print("✔️ All done.")
+
+async def run_cli(init_rag, input_file, output_file, mode, save_answer=None):
+    parser = argparse.ArgumentParser(description="Answer a test set concurrently with LightRAG")
+    parser.add_argument("--input", default=input_file)
+    parser.add_argument("--output", default=output_file)
+    parser.add_argument("--mode", default=mode)
+    parser.add_argument("--top-k", type=int, default=int(os.getenv("TOP_K", 60)))
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("QUERY_CONCURRENCY", 4)),
+        help="max number of questions answered at once",
+    )
+    args = parser.parse_args()
+
+    rag = await init_rag()
+    try:
+        await answer_test_set(
+            rag,
+            args.input,
+            args.output,
+            QueryParam(mode=args.mode, top_k=args.top_k),
+            args.concurrency,
+            save_answer,
+        )
+    finally:
+        await rag.finalize_storages()
@@ -1,6 +1,5 @@
 import os
 import logging
-import json
 import asyncio
 import logging.config
 from lightrag import LightRAG, QueryParam
@@ -124,60 +123,24 @@ async def initialize_rag():
 def save_answer_to_file(question, answer):
     os.makedirs("ans", exist_ok=True)
     
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Microseconds keep the files of concurrently answered questions apart
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     filename = f"ans/answer_{timestamp}_{os.path.basename(os.getenv('WORKING_DIR'))}.txt"
 
     with open(filename, "w", encoding="utf-8") as f:
         f.write(f"Question:\n{question}\n\nAnswer:\n{answer}\n")
 
 
-def clear_hybrid_field(path):
-    with open(path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-
-    def clear_hybrid(obj):
-        if isinstance(obj, dict):
-            if "hybrid" in obj:
-                obj["hybrid"] = None
-            for value in obj.values():
-                clear_hybrid(value)
-        elif isinstance(obj, list):
-            for item in obj:
-                clear_hybrid(item)
-
-    clear_hybrid(data)
-
-    with open(path, 'w', encoding='utf-8') as file:
-        json.dump(data, file, indent=2, ensure_ascii=False)
-
-    print(f"Cache 'hybrid' cleared in file: {path}")
-    
-def clear_local_field(path):
-    with open(path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-
-    def clear_local(obj):
-        if isinstance(obj, dict):
-            if "local" in obj:
-                obj["local"] = None
-            for value in obj.values():
-                clear_local(value)
-        elif isinstance(obj, list):
-            for item in obj:
-                clear_local(item)
-
-    clear_local(data)
-
-    with open(path, 'w', encoding='utf-8') as file:
-        json.dump(data, file, indent=2, ensure_ascii=False)
-
-    print(f"Cache 'local' cleared in file: {path}")
-        
 async def init_rag():
-    clear_hybrid_field(f"{WORKING_DIR}/kv_store_llm_response_cache.json")
-    clear_local_field(f"{WORKING_DIR}/kv_store_llm_response_cache.json")
     configure_logging()
-    return await initialize_rag()
+    rag = await initialize_rag()
+    # Cache keys cover the query parameters and the model, so entries of
+    # other settings are kept apart and reused; only entries older than
+    # CACHE_MAX_AGE seconds are dropped when it is set
+    max_age = os.getenv("CACHE_MAX_AGE")
+    if max_age:
+        await rag.aclear_cache_entries(modes=["hybrid", "local"], max_age=float(max_age))
+    return rag
 
 async def query(rag, question):
     result=None
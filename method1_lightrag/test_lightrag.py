@@ -5,7 +5,6 @@ import logging.config
 from lightrag import LightRAG, QueryParam
 from lightrag.llm.hf import hf_model_complete, hf_embed
 from lightrag.utils import EmbeddingFunc, logger, set_verbose_debug
-from transformers import AutoModel, AutoTokenizer
 from lightrag.kg.shared_storage import initialize_pipeline_status
 import textract
 
@@ -94,13 +93,7 @@ async def initialize_rag():
             embedding_dim=384,
             max_token_size=5000,
             func=lambda texts: hf_embed(
-                texts,
-                tokenizer=AutoTokenizer.from_pretrained(
-                    "sentence-transformers/all-MiniLM-L6-v2"
-                ),
-                embed_model=AutoModel.from_pretrained(
-                    "sentence-transformers/all-MiniLM-L6-v2"
-                ),
+                texts, model_name="sentence-transformers/all-MiniLM-L6-v2"
             ),
         ),
     )
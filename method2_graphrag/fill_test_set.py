@@ -1,14 +1,14 @@
 import json
 import os
 import sys
-from time import sleep
 import asyncio
 
 sys.path.append(".")
-from query import query
+from query import get_service
 
 INPUT_FILE = "../evaluation/test_data/genetics/test_set.json"
 OUTPUT_FILE = "../evaluation/test_data/genetics/test_set_method2_graphrag_drift.json"
+METHOD = os.getenv("GRAPHRAG_METHOD", "drift")
 
 
 def load_json(path):
@@ -37,27 +37,33 @@ async def run():
             "answer": ["" for _ in input_data["question"]]
         }
 
+    pending = []
     for i, q in enumerate(output_data["question"]):
         if output_data["answer"][i].strip():
             print(f"[{i+1}] SKIPPED — already answered.")
             continue
+        pending.append(i)
 
-        print(f"[{i+1}] Sending query...")
-        try:
-            answer = await query(q)
-        except Exception as e:
-            print(f"[{i+1}] ❌ Error during async query: {e}")
-            break
+    # One process with the index loaded once answers all questions concurrently
+    service = await get_service()
 
-        if answer is None:
+    def on_result(batch_index, answer, error):
+        i = pending[batch_index]
+        if error is not None:
+            print(f"[{i+1}] ❌ Error during async query: {error}")
+            return
+        if not answer:
             print(f"[{i+1}] ❌ Query failed — no answer returned.")
-            continue
+            return
 
         output_data["answer"][i] = answer.strip()
         save_json(output_data, OUTPUT_FILE)
         print(f"[{i+1}] ✅ Answer saved.")
 
-        # sleep(1)
+    print(f"Sending {len(pending)} queries...")
+    await service.query_batch(
+        [output_data["question"][i] for i in pending], method=METHOD, on_result=on_result
+    )
 
     print("✔️ All done.")
 
@@ -1,51 +1,25 @@
-import subprocess
-import asyncio
+import os
 
-async def query(question: str) -> str:
-    result = subprocess.run([
-        "graphrag", "query",
-        "--root", ".", 
-        "--method", "drift",
-        "--query", question
-    ], capture_output=True, text=True)
+from query_service import GraphRAGQueryService
 
-    if result.returncode != 0:
-        raise RuntimeError(f"Error: {result.stderr}")
+_service = None
 
-    lines = result.stdout.splitlines()
-    answer_lines = []
-    # result=''
-    # with open("test_output.txt", "r", encoding="utf-8") as f:
-    #     result = f.read()
-    # lines = result.splitlines()
-    # answer_lines = []
+async def get_service() -> GraphRAGQueryService:
+    """The query service of this process, the index is loaded on first use"""
+    global _service
+    if _service is None:
+        _service = await GraphRAGQueryService(
+            root=".", max_concurrency=int(os.getenv("GRAPHRAG_QUERY_CONCURRENCY", 4))
+        ).start()
+    return _service
 
-    skipping_info_block = False
-    brace_balance = 0
-
-    for line in lines:
-        if line.startswith("INFO:"):
-            skipping_info_block = True
-            brace_balance = line.count("{") - line.count("}")
-            continue
-
-        if skipping_info_block:
-            brace_balance += line.count("{") - line.count("}")
-            if brace_balance <= 0:
-                skipping_info_block = False
-            continue
-
-        if line.startswith("SUCCESS:"):
-            continue
-
-        answer_lines.append(line)
-
-    answer_text = "\n".join(answer_lines).strip()
-    return answer_text
+async def query(question: str, method: str = "drift") -> str:
+    service = await get_service()
+    return await service.query(question, method)
 
 # if __name__ == "__main__":
 #     question = "What types of training are students required to complete during the first semester of studies at Gdańsk University of Technology?"
-#     answer = query(question)
+#     answer = asyncio.run(query(question))
 
 #     with open("test_output3.txt", "w", encoding="utf-8") as f:
 #         f.write(answer)
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from graphrag.config.embeddings import (
+    community_full_content_embedding,
+    entity_description_embedding,
+)
+from graphrag.config.load_config import load_config
+from graphrag.query.factory import (
+    get_drift_search_engine,
+    get_global_search_engine,
+    get_local_search_engine,
+)
+from graphrag.query.indexer_adapters import (
+    read_indexer_communities,
+    read_indexer_covariates,
+    read_indexer_entities,
+    read_indexer_relationships,
+    read_indexer_report_embeddings,
+    read_indexer_reports,
+    read_indexer_text_units,
+)
+from graphrag.query.structured_search.drift_search.search import DRIFTSearch
+from graphrag.utils.api import (
+    create_storage_from_config,
+    get_embedding_store,
+    load_search_prompt,
+)
+from graphrag.utils.storage import load_table_from_storage, storage_has_table
+
+METHODS = ("drift", "local", "global")
+
+
+class GraphRAGQueryService:
+    """Answers GraphRAG queries from one long-lived process.
+
+    `graphrag query` starts a new interpreter for every question and reloads
+    the parquet tables and the LanceDB stores each time. The service loads the
+    index artifacts once in `start`, builds a search engine per method on first
+    use and then reuses it for every question, so a whole test set is answered
+    in a single process. Up to `max_concurrency` questions run at once.
+
+    The answers are produced like the non-streaming `graphrag query` command
+    (same config, community level, response type and prompts).
+    """
+
+    def __init__(
+        self,
+        root=".",
+        community_level=2,
+        response_type="Multiple Paragraphs",
+        max_concurrency=4,
+    ):
+        self.root = Path(root).resolve()
+        self.community_level = community_level
+        self.response_type = response_type
+        self.config = None
+        self.tables = {}
+        self._embedding_stores = {}
+        self._engines = {}
+        self._engine_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def start(self):
+        """Load the config and all index tables into memory"""
+        self.config = load_config(self.root)
+        storage = create_storage_from_config(self.config.output)
+        for name in ["entities", "communities", "community_reports", "text_units", "relationships"]:
+            self.tables[name] = await load_table_from_storage(name=name, storage=storage)
+        if await storage_has_table("covariates", storage):
+            self.tables["covariates"] = await load_table_from_storage(name="covariates", storage=storage)
+        print(f"Loaded GraphRAG index from {self.root / self.config.output.base_dir}")
+        return self
+
+    def _embedding_store(self, embedding_name):
+        # LanceDB connections are opened once and shared by all engines
+        if embedding_name not in self._embedding_stores:
+            vector_store_args = {
+                index: store.model_dump() for index, store in self.config.vector_store.items()
+            }
+            self._embedding_stores[embedding_name] = get_embedding_store(
+                config_args=vector_store_args, embedding_name=embedding_name
+            )
+        return self._embedding_stores[embedding_name]
+
+    def _prompt(self, path):
+        return load_search_prompt(self.config.root_dir, path)
+
+    def _build_engine(self, method):
+        t = self.tables
+        if method == "drift":
+            reports = read_indexer_reports(t["community_reports"], t["communities"], self.community_level)
+            read_indexer_report_embeddings(reports, self._embedding_store(community_full_content_embedding))
+            return get_drift_search_engine(
+                config=self.config,
+                reports=reports,
+                text_units=read_indexer_text_units(t["text_units"]),
+                entities=read_indexer_entities(t["entities"], t["communities"], self.community_level),
+                relationships=read_indexer_relationships(t["relationships"]),
+                description_embedding_store=self._embedding_store(entity_description_embedding),
+                local_system_prompt=self._prompt(self.config.drift_search.prompt),
+                reduce_system_prompt=self._prompt(self.config.drift_search.reduce_prompt),
+                response_type=self.response_type,
+            )
+        if method == "local":
+            covariates = t.get("covariates")
+            return get_local_search_engine(
+                config=self.config,
+                reports=read_indexer_reports(t["community_reports"], t["communities"], self.community_level),
+                text_units=read_indexer_text_units(t["text_units"]),
+                entities=read_indexer_entities(t["entities"], t["communities"], self.community_level),
+                relationships=read_indexer_relationships(t["relationships"]),
+                covariates={"claims": read_indexer_covariates(covariates) if covariates is not None else []},
+                description_embedding_store=self._embedding_store(entity_description_embedding),
+                response_type=self.response_type,
+                system_prompt=self._prompt(self.config.local_search.prompt),
+            )
+        if method == "global":
+            return get_global_search_engine(
+                self.config,
+                reports=read_indexer_reports(
+                    t["community_reports"],
+                    t["communities"],
+                    community_level=self.community_level,
+                    dynamic_community_selection=False,
+                ),
+                entities=read_indexer_entities(t["entities"], t["communities"], community_level=self.community_level),
+                communities=read_indexer_communities(t["communities"], t["community_reports"]),
+                response_type=self.response_type,
+                dynamic_community_selection=False,
+                map_system_prompt=self._prompt(self.config.global_search.map_prompt),
+                reduce_system_prompt=self._prompt(self.config.global_search.reduce_prompt),
+                general_knowledge_inclusion_prompt=self._prompt(self.config.global_search.knowledge_prompt),
+            )
+        raise ValueError(f"Unknown method {method}, expected one of {METHODS}")
+
+    async def _engine(self, method):
+        async with self._engine_lock:
+            if method not in self._engines:
+                # Building an engine reads and indexes the tables, keep it off the loop
+                self._engines[method] = await asyncio.to_thread(self._build_engine, method)
+            engine = self._engines[method]
+        if method == "drift":
+            # DRIFTSearch keeps the state of the running query on the instance,
+            # so every question gets its own one on top of the shared context
+            engine = DRIFTSearch(
+                model=engine.model,
+                context_builder=engine.context_builder,
+                token_encoder=engine.token_encoder,
+            )
+        return engine
+
+    async def query(self, question, method="drift"):
+        """Answer a single question"""
+        if self.config is None:
+            await self.start()
+        engine = await self._engine(method)
+        async with self._semaphore:
+            answer = ""
+            async for chunk in engine.stream_search(query=question):
+                answer += chunk
+        return answer.strip()
+
+    async def query_batch(self, questions, method="drift", on_result=None):
+        """Answer questions concurrently, calling on_result(index, answer, error) as each finishes"""
+
+        async def answer(i, question):
+            try:
+                result, error = await self.query(question, method), None
+            except Exception as e:
+                result, error = None, e
+            if on_result is not None:
+                on_result(i, result, error)
+            return result if error is None else error
+
+        return await asyncio.gather(*(answer(i, q) for i, q in enumerate(questions)))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Answer questions with a GraphRAG index loaded once")
+    parser.add_argument("questions", nargs="*", help="questions to answer, read line by line from stdin if omitted")
+    parser.add_argument("--root", default=".")
+    parser.add_argument("--method", default="drift", choices=METHODS)
+    parser.add_argument("--community-level", type=int, default=2)
+    parser.add_argument("--response-type", default="Multiple Paragraphs")
+    args = parser.parse_args()
+
+    service = await GraphRAGQueryService(args.root, args.community_level, args.response_type).start()
+    questions = args.questions or (line.strip() for line in sys.stdin)
+    for question in questions:
+        if question:
+            print(await service.query(question, args.method))
+            print()
+
+if __name__ == "__main__":
+    asyncio.run(main())